@@ -47,6 +47,7 @@ export default function BatchResultsPage() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [refreshInterval, setRefreshInterval] = useState<NodeJS.Timeout | null>(null)
+  const [liveProgress, setLiveProgress] = useState<any>(null)
   
   // Filter states
   const [showSuccessful, setShowSuccessful] = useState(true)
@@ -103,6 +104,32 @@ export default function BatchResultsPage() {
     }
   }, [batchId])
   
+  // Live progress stream (snapshot first, then one event per completed machine)
+  useEffect(() => {
+    if (!batchId) return
+    
+    const source = new EventSource(`${API_BASE_URL}/api/v1/batch-progress/${batchId}/stream`)
+    const applyEvent = (message: MessageEvent) => {
+      const event = JSON.parse(message.data)
+      setLiveProgress((previous: any) => ({ ...previous, ...event }))
+    }
+    
+    source.addEventListener('snapshot', applyEvent)
+    source.addEventListener('machine_completed', applyEvent)
+    source.addEventListener('batch_started', applyEvent)
+    const finish = (message: MessageEvent) => {
+      applyEvent(message)
+      source.close()
+      fetchBatchResults()
+    }
+    source.addEventListener('batch_completed', finish)
+    source.addEventListener('batch_failed', finish)
+    // The stream ends after the final event; don't let EventSource reconnect
+    source.onerror = () => source.close()
+    
+    return () => source.close()
+  }, [batchId])
+  
   // Handle manual refresh
   const handleRefresh = () => {
     fetchBatchResults()
@@ -307,7 +334,10 @@ export default function BatchResultsPage() {
   }
   
   const stats = batchData?.stats || {}
-  const progressPercent = stats.progress_percentage || 0
+  const live = liveProgress?.counters
+  const progressPercent = live && live.total
+    ? Math.round((live.completed / live.total) * 100)
+    : stats.progress_percentage || 0
   const entries = filterEntries()
   
   return (
@@ -340,33 +370,37 @@ export default function BatchResultsPage() {
         <CardContent>
           <div className="flex items-center p-3 mb-4 text-sm border rounded-md bg-blue-50 border-blue-200 text-blue-800">
             <Info className="h-4 w-4 mr-2 flex-shrink-0" />
-            <p>Auto-refresh has been disabled to prevent high CPU usage. Use the Refresh button to get updated results.</p>
+            {liveProgress?.status === 'running' ? (
+              <p>Live: concurrency {liveProgress.concurrency ?? '-'}, {liveProgress.credits_spent ?? 0} credits spent. Machine results load when the batch completes.</p>
+            ) : (
+              <p>Auto-refresh has been disabled to prevent high CPU usage. Use the Refresh button to get updated results.</p>
+            )}
           </div>
           
           <div className="grid grid-cols-3 md:grid-cols-6 gap-4 mb-4">
             <div className="space-y-1">
               <p className="text-sm font-medium">Total Machines</p>
-              <p className="text-2xl font-bold">{stats.total_machines || 0}</p>
+              <p className="text-2xl font-bold">{live?.total ?? (stats.total_machines || 0)}</p>
             </div>
             <div className="space-y-1">
               <p className="text-sm font-medium">Completed</p>
-              <p className="text-2xl font-bold">{stats.completed_machines || 0}</p>
+              <p className="text-2xl font-bold">{live?.completed ?? (stats.completed_machines || 0)}</p>
             </div>
             <div className="space-y-1">
               <p className="text-sm font-medium">Successful</p>
-              <p className="text-2xl font-bold text-green-600">{stats.successful_machines || 0}</p>
+              <p className="text-2xl font-bold text-green-600">{live?.successful ?? (stats.successful_machines || 0)}</p>
             </div>
             <div className="space-y-1">
               <p className="text-sm font-medium">Failed</p>
-              <p className="text-2xl font-bold text-red-600">{stats.failed_machines || 0}</p>
+              <p className="text-2xl font-bold text-red-600">{live?.failed ?? (stats.failed_machines || 0)}</p>
             </div>
             <div className="space-y-1">
               <p className="text-sm font-medium">Unchanged</p>
-              <p className="text-2xl font-bold text-gray-600">{stats.unchanged_prices || 0}</p>
+              <p className="text-2xl font-bold text-gray-600">{live?.unchanged ?? (stats.unchanged_prices || 0)}</p>
             </div>
             <div className="space-y-1">
               <p className="text-sm font-medium">Updated</p>
-              <p className="text-2xl font-bold text-blue-600">{stats.updated_prices || 0}</p>
+              <p className="text-2xl font-bold text-blue-600">{live?.updated ?? (stats.updated_prices || 0)}</p>
             </div>
           </div>
           
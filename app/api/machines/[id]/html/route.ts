@@ -4,6 +4,22 @@ import { createClient } from "@supabase/supabase-js"
 // Specify nodejs runtime to ensure environment variables are properly accessible
 export const runtime = 'nodejs';
 
+// Scraped pages live in the price extractor's HTML snapshot store; machines keep only html_hash
+async function fetchSnapshot(htmlHash: string): Promise<string | null> {
+  const pythonServiceUrl = process.env.PYTHON_SERVICE_URL || 'http://localhost:8000';
+  try {
+    const response = await fetch(`${pythonServiceUrl}/api/v1/html-snapshots/${htmlHash}`, { cache: 'no-store' });
+    if (!response.ok) {
+      console.error(`Snapshot ${htmlHash} not available: ${response.status}`);
+      return null;
+    }
+    return await response.text();
+  } catch (error) {
+    console.error("Error fetching HTML snapshot:", error);
+    return null;
+  }
+}
+
 export async function GET(
   request: Request,
   { params }: { params: { id: string } }
@@ -42,9 +58,19 @@ export async function GET(
       return NextResponse.json({ error: "Machine not found" }, { status: 404 });
     }
 
+    // Pages scraped since the snapshot store was introduced are loaded by hash;
+    // older rows still carry their own html_content
+    let html = data;
+    if (data.html_hash) {
+      const snapshotHtml = await fetchSnapshot(data.html_hash);
+      if (snapshotHtml !== null) {
+        html = { ...data, html_content: snapshotHtml, html_compressed: false };
+      }
+    }
+
     // Set cache headers to cache for 1 hour
     return NextResponse.json(
-      { data },
+      { data: html },
       { 
         headers: {
           'Cache-Control': 'public, max-age=3600, s-maxage=3600',
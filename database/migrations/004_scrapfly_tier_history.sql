@@ -0,0 +1,63 @@
+-- Migration 004: Scrapfly Tier History
+-- One row per domain with the last successful Scrapfly tier, plus a bulk
+-- increment function so the price extractor can flush buffered successes
+-- in a single call without a read-modify-write race.
+
+CREATE TABLE IF NOT EXISTS scrapfly_tier_history (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    domain text NOT NULL,
+    successful_tier integer NOT NULL DEFAULT 1,
+    success_count integer NOT NULL DEFAULT 0,
+    last_success_at timestamp,
+    created_at timestamp DEFAULT now()
+);
+
+-- Earlier writers could leave several rows per domain. Merge them into the
+-- latest row (summing the success counts) so the unique index can be built.
+WITH ranked AS (
+    SELECT
+        id,
+        row_number() OVER (
+            PARTITION BY domain
+            ORDER BY last_success_at DESC NULLS LAST, created_at DESC NULLS LAST, id
+        ) AS position,
+        sum(success_count) OVER (PARTITION BY domain) AS total_count,
+        count(*) OVER (PARTITION BY domain) AS copies
+    FROM scrapfly_tier_history
+),
+merged AS (
+    UPDATE scrapfly_tier_history t
+    SET success_count = ranked.total_count
+    FROM ranked
+    WHERE t.id = ranked.id AND ranked.position = 1 AND ranked.copies > 1
+)
+DELETE FROM scrapfly_tier_history t
+USING ranked
+WHERE t.id = ranked.id AND ranked.position > 1;
+
+-- Upserts are keyed on domain
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scrapfly_tier_history_domain ON scrapfly_tier_history(domain);
+
+-- Bulk upsert that increments success_count on the server.
+-- p_rows: [{"domain": text, "successful_tier": int, "increment": int, "last_success_at": timestamp}]
+CREATE OR REPLACE FUNCTION increment_scrapfly_tier_history(p_rows jsonb)
+RETURNS integer AS $$
+DECLARE
+    v_count integer;
+BEGIN
+    INSERT INTO scrapfly_tier_history (domain, successful_tier, success_count, last_success_at)
+    SELECT
+        r->>'domain',
+        (r->>'successful_tier')::integer,
+        (r->>'increment')::integer,
+        (r->>'last_success_at')::timestamp
+    FROM jsonb_array_elements(p_rows) AS r
+    ON CONFLICT (domain) DO UPDATE SET
+        successful_tier = EXCLUDED.successful_tier,
+        success_count = scrapfly_tier_history.success_count + EXCLUDED.success_count,
+        last_success_at = GREATEST(scrapfly_tier_history.last_success_at, EXCLUDED.last_success_at);
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
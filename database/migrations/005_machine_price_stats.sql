@@ -0,0 +1,191 @@
+-- Migration 005: Machine Price Stats
+-- One row per machine with its all-time low/high, last price and last check,
+-- maintained by triggers on price_history. The price extractor reads this row
+-- (by primary key) to set is_all_time_low / is_all_time_high instead of scanning
+-- the machine's whole price history on every successful extraction.
+
+CREATE TABLE IF NOT EXISTS machine_price_stats (
+    machine_id uuid PRIMARY KEY REFERENCES machines(id) ON DELETE CASCADE,
+    min_price numeric,
+    max_price numeric,
+    last_price numeric,
+    price_count integer NOT NULL DEFAULT 0,
+    last_checked_at timestamptz,
+    check_count integer NOT NULL DEFAULT 0,
+    updated_at timestamptz DEFAULT now()
+);
+
+-- Stale flags are cleared per machine; partial indexes keep that to the flagged rows
+CREATE INDEX IF NOT EXISTS idx_price_history_all_time_low ON price_history(machine_id) WHERE is_all_time_low;
+CREATE INDEX IF NOT EXISTS idx_price_history_all_time_high ON price_history(machine_id) WHERE is_all_time_high;
+
+-- Only these statuses are real prices (same set the extractor used when scanning history)
+CREATE OR REPLACE FUNCTION is_counted_price_status(p_status text)
+RETURNS boolean AS $$
+    SELECT p_status IN ('AUTO_APPLIED', 'APPROVED', 'SUCCESS', 'MANUAL_CORRECTION');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Keeps machine_price_stats current and clears superseded all-time flags, O(1) per insert
+CREATE OR REPLACE FUNCTION update_machine_price_stats()
+RETURNS trigger AS $$
+DECLARE
+    v_min numeric;
+    v_max numeric;
+    v_counted boolean := NEW.price IS NOT NULL AND is_counted_price_status(NEW.status);
+BEGIN
+    SELECT min_price, max_price INTO v_min, v_max
+    FROM machine_price_stats
+    WHERE machine_id = NEW.machine_id
+    FOR UPDATE;
+
+    -- A strictly new low/high replaces the previously flagged rows
+    IF NEW.is_all_time_low AND v_min IS NOT NULL AND NEW.price < v_min - 0.01 THEN
+        UPDATE price_history SET is_all_time_low = false
+        WHERE machine_id = NEW.machine_id AND is_all_time_low AND id <> NEW.id;
+    END IF;
+    IF NEW.is_all_time_high AND v_max IS NOT NULL AND NEW.price > v_max + 0.01 THEN
+        UPDATE price_history SET is_all_time_high = false
+        WHERE machine_id = NEW.machine_id AND is_all_time_high AND id <> NEW.id;
+    END IF;
+
+    INSERT INTO machine_price_stats AS s (
+        machine_id, min_price, max_price, last_price, price_count, last_checked_at, check_count, updated_at
+    )
+    VALUES (
+        NEW.machine_id,
+        CASE WHEN v_counted THEN NEW.price END,
+        CASE WHEN v_counted THEN NEW.price END,
+        CASE WHEN v_counted THEN NEW.price END,
+        CASE WHEN v_counted THEN 1 ELSE 0 END,
+        NEW.date,
+        1,
+        now()
+    )
+    ON CONFLICT (machine_id) DO UPDATE SET
+        min_price = CASE WHEN v_counted THEN LEAST(s.min_price, NEW.price) ELSE s.min_price END,
+        max_price = CASE WHEN v_counted THEN GREATEST(s.max_price, NEW.price) ELSE s.max_price END,
+        last_price = CASE WHEN v_counted THEN NEW.price ELSE s.last_price END,
+        price_count = s.price_count + CASE WHEN v_counted THEN 1 ELSE 0 END,
+        last_checked_at = GREATEST(s.last_checked_at, NEW.date),
+        check_count = s.check_count + 1,
+        updated_at = now();
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_update_machine_price_stats ON price_history;
+CREATE TRIGGER trg_update_machine_price_stats
+    AFTER INSERT ON price_history
+    FOR EACH ROW EXECUTE FUNCTION update_machine_price_stats();
+
+-- Rebuilds one machine's row from its history (same status filter as above). Manual corrections,
+-- approvals and deletions can remove a bad low/high, which the incremental insert path never forgets.
+-- Flags left on rows that no longer hold the low/high are cleared, and if the flagged row itself
+-- went away the latest row at the restored low/high is flagged instead.
+CREATE OR REPLACE FUNCTION recompute_machine_price_stats(p_machine_id uuid)
+RETURNS void AS $$
+DECLARE
+    v_min numeric;
+    v_max numeric;
+BEGIN
+    -- History removed by ON DELETE CASCADE of the machine itself needs no stats
+    IF p_machine_id IS NULL OR NOT EXISTS (SELECT 1 FROM machines WHERE id = p_machine_id) THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO machine_price_stats AS s (
+        machine_id, min_price, max_price, last_price, price_count, last_checked_at, check_count, updated_at
+    )
+    SELECT
+        p_machine_id,
+        MIN(ph.price) FILTER (WHERE ph.price IS NOT NULL AND is_counted_price_status(ph.status)),
+        MAX(ph.price) FILTER (WHERE ph.price IS NOT NULL AND is_counted_price_status(ph.status)),
+        (ARRAY_AGG(ph.price ORDER BY ph.date DESC) FILTER (WHERE ph.price IS NOT NULL AND is_counted_price_status(ph.status)))[1],
+        COUNT(*) FILTER (WHERE ph.price IS NOT NULL AND is_counted_price_status(ph.status)),
+        MAX(ph.date),
+        COUNT(*),
+        now()
+    FROM price_history ph
+    WHERE ph.machine_id = p_machine_id
+    ON CONFLICT (machine_id) DO UPDATE SET
+        min_price = EXCLUDED.min_price,
+        max_price = EXCLUDED.max_price,
+        last_price = EXCLUDED.last_price,
+        price_count = EXCLUDED.price_count,
+        last_checked_at = EXCLUDED.last_checked_at,
+        check_count = EXCLUDED.check_count,
+        updated_at = now()
+    RETURNING min_price, max_price INTO v_min, v_max;
+
+    UPDATE price_history SET is_all_time_low = false
+    WHERE machine_id = p_machine_id AND is_all_time_low
+      AND (price IS NULL OR NOT is_counted_price_status(status) OR v_min IS NULL OR price > v_min + 0.01);
+    UPDATE price_history SET is_all_time_high = false
+    WHERE machine_id = p_machine_id AND is_all_time_high
+      AND (price IS NULL OR NOT is_counted_price_status(status) OR v_max IS NULL OR price < v_max - 0.01);
+
+    IF v_min IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM price_history WHERE machine_id = p_machine_id AND is_all_time_low
+    ) THEN
+        UPDATE price_history SET is_all_time_low = true
+        WHERE id = (
+            SELECT id FROM price_history
+            WHERE machine_id = p_machine_id AND price IS NOT NULL AND is_counted_price_status(status)
+              AND price <= v_min + 0.01
+            ORDER BY date DESC LIMIT 1
+        );
+    END IF;
+    IF v_max IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM price_history WHERE machine_id = p_machine_id AND is_all_time_high
+    ) THEN
+        UPDATE price_history SET is_all_time_high = true
+        WHERE id = (
+            SELECT id FROM price_history
+            WHERE machine_id = p_machine_id AND price IS NOT NULL AND is_counted_price_status(status)
+              AND price >= v_max - 0.01
+            ORDER BY date DESC LIMIT 1
+        );
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION refresh_machine_price_stats()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.price IS NOT DISTINCT FROM OLD.price
+       AND NEW.status IS NOT DISTINCT FROM OLD.status
+       AND NEW.date IS NOT DISTINCT FROM OLD.date
+       AND NEW.machine_id IS NOT DISTINCT FROM OLD.machine_id THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM recompute_machine_price_stats(OLD.machine_id);
+    IF TG_OP = 'UPDATE' AND NEW.machine_id IS DISTINCT FROM OLD.machine_id THEN
+        PERFORM recompute_machine_price_stats(NEW.machine_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Flag-only updates (including the ones made above) do not fire this trigger
+DROP TRIGGER IF EXISTS trg_refresh_machine_price_stats ON price_history;
+CREATE TRIGGER trg_refresh_machine_price_stats
+    AFTER UPDATE OF price, status, date, machine_id OR DELETE ON price_history
+    FOR EACH ROW EXECUTE FUNCTION refresh_machine_price_stats();
+
+-- Backfill from existing history
+INSERT INTO machine_price_stats (machine_id, min_price, max_price, last_price, price_count, last_checked_at, check_count)
+SELECT
+    ph.machine_id,
+    MIN(ph.price) FILTER (WHERE ph.price IS NOT NULL AND is_counted_price_status(ph.status)),
+    MAX(ph.price) FILTER (WHERE ph.price IS NOT NULL AND is_counted_price_status(ph.status)),
+    (ARRAY_AGG(ph.price ORDER BY ph.date DESC) FILTER (WHERE ph.price IS NOT NULL AND is_counted_price_status(ph.status)))[1],
+    COUNT(*) FILTER (WHERE ph.price IS NOT NULL AND is_counted_price_status(ph.status)),
+    MAX(ph.date),
+    COUNT(*)
+FROM price_history ph
+JOIN machines m ON m.id = ph.machine_id
+GROUP BY ph.machine_id
+ON CONFLICT (machine_id) DO NOTHING;
@@ -0,0 +1,108 @@
+-- Migration 006: Batch Stats
+-- One row of running counters per batch, kept current by a trigger on
+-- batch_results so progress polls read a single row instead of rescanning
+-- every result of the batch.
+
+CREATE TABLE IF NOT EXISTS batch_stats (
+    batch_id uuid PRIMARY KEY REFERENCES batches(id) ON DELETE CASCADE,
+    total integer NOT NULL DEFAULT 0,
+    successful integer NOT NULL DEFAULT 0,
+    failed integer NOT NULL DEFAULT 0,
+    excluded integer NOT NULL DEFAULT 0,
+    increased integer NOT NULL DEFAULT 0,
+    decreased integer NOT NULL DEFAULT 0,
+    unchanged integer NOT NULL DEFAULT 0,
+    change_pct_sum numeric NOT NULL DEFAULT 0,
+    change_pct_count integer NOT NULL DEFAULT 0,
+    max_increase_pct numeric,
+    max_decrease_pct numeric,
+    updated_at timestamptz DEFAULT now()
+);
+
+-- Counter deltas for one batch_results row
+CREATE OR REPLACE FUNCTION batch_result_stat_deltas(
+    p_success boolean, p_error text, p_old numeric, p_new numeric,
+    OUT successful integer, OUT failed integer, OUT excluded integer,
+    OUT increased integer, OUT decreased integer, OUT unchanged integer,
+    OUT change_pct numeric
+) AS $$
+DECLARE
+    v_excluded boolean := NOT COALESCE(p_success, false)
+        AND COALESCE(p_error, '') ILIKE '%excluded from price tracking%';
+    v_priced boolean := COALESCE(p_success, false) AND p_old IS NOT NULL AND p_new IS NOT NULL;
+BEGIN
+    successful := CASE WHEN COALESCE(p_success, false) THEN 1 ELSE 0 END;
+    excluded := CASE WHEN v_excluded THEN 1 ELSE 0 END;
+    failed := CASE WHEN NOT COALESCE(p_success, false) AND NOT v_excluded THEN 1 ELSE 0 END;
+    increased := CASE WHEN v_priced AND p_new > p_old THEN 1 ELSE 0 END;
+    decreased := CASE WHEN v_priced AND p_new < p_old THEN 1 ELSE 0 END;
+    unchanged := CASE WHEN v_priced AND p_new = p_old THEN 1 ELSE 0 END;
+    change_pct := CASE WHEN v_priced AND p_old > 0 THEN (p_new - p_old) / p_old * 100 END;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION update_batch_stats()
+RETURNS trigger AS $$
+DECLARE
+    d record;
+BEGIN
+    IF NEW.batch_id IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    d := batch_result_stat_deltas(NEW.success, NEW.error, NEW.old_price, NEW.new_price);
+
+    INSERT INTO batch_stats AS s (
+        batch_id, total, successful, failed, excluded, increased, decreased, unchanged,
+        change_pct_sum, change_pct_count, max_increase_pct, max_decrease_pct, updated_at
+    )
+    VALUES (
+        NEW.batch_id, 1, d.successful, d.failed, d.excluded, d.increased, d.decreased, d.unchanged,
+        COALESCE(d.change_pct, 0),
+        CASE WHEN d.change_pct IS NULL THEN 0 ELSE 1 END,
+        CASE WHEN d.change_pct > 0 THEN d.change_pct END,
+        CASE WHEN d.change_pct < 0 THEN d.change_pct END,
+        now()
+    )
+    ON CONFLICT (batch_id) DO UPDATE SET
+        total = s.total + 1,
+        successful = s.successful + d.successful,
+        failed = s.failed + d.failed,
+        excluded = s.excluded + d.excluded,
+        increased = s.increased + d.increased,
+        decreased = s.decreased + d.decreased,
+        unchanged = s.unchanged + d.unchanged,
+        change_pct_sum = s.change_pct_sum + COALESCE(d.change_pct, 0),
+        change_pct_count = s.change_pct_count + CASE WHEN d.change_pct IS NULL THEN 0 ELSE 1 END,
+        max_increase_pct = CASE WHEN d.change_pct > 0 THEN GREATEST(s.max_increase_pct, d.change_pct) ELSE s.max_increase_pct END,
+        max_decrease_pct = CASE WHEN d.change_pct < 0 THEN LEAST(s.max_decrease_pct, d.change_pct) ELSE s.max_decrease_pct END,
+        updated_at = now();
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_update_batch_stats ON batch_results;
+CREATE TRIGGER trg_update_batch_stats
+    AFTER INSERT ON batch_results
+    FOR EACH ROW EXECUTE FUNCTION update_batch_stats();
+
+-- Backfill existing batches
+INSERT INTO batch_stats (
+    batch_id, total, successful, failed, excluded, increased, decreased, unchanged,
+    change_pct_sum, change_pct_count, max_increase_pct, max_decrease_pct
+)
+SELECT
+    br.batch_id,
+    COUNT(*),
+    SUM(d.successful), SUM(d.failed), SUM(d.excluded),
+    SUM(d.increased), SUM(d.decreased), SUM(d.unchanged),
+    COALESCE(SUM(d.change_pct), 0),
+    COUNT(d.change_pct),
+    MAX(d.change_pct) FILTER (WHERE d.change_pct > 0),
+    MIN(d.change_pct) FILTER (WHERE d.change_pct < 0)
+FROM batch_results br
+JOIN batches b ON b.id = br.batch_id
+CROSS JOIN LATERAL batch_result_stat_deltas(br.success, br.error, br.old_price, br.new_price) AS d
+GROUP BY br.batch_id
+ON CONFLICT (batch_id) DO NOTHING;
@@ -0,0 +1,34 @@
+-- Migration 007: Batch Failure Events
+-- One row per failed machine update in a batch (stage, error class, scrape tier
+-- and credits). Retests look failures up by batch_id instead of parsing the
+-- batch's log file.
+
+CREATE TABLE IF NOT EXISTS batch_failure_events (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    batch_id uuid NOT NULL REFERENCES batches(id) ON DELETE CASCADE,
+    machine_id uuid REFERENCES machines(id) ON DELETE CASCADE,
+    machine_name text,
+    url text,
+    stage text NOT NULL,          -- lookup, url, fetch, extract, database, exception
+    error_class text,
+    error text,
+    tier integer,
+    credits integer,
+    created_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_batch_failure_events_batch ON batch_failure_events(batch_id, machine_id);
+CREATE INDEX IF NOT EXISTS idx_batch_failure_events_machine ON batch_failure_events(machine_id, created_at DESC);
+
+-- Backfill extraction and fetch failures recorded in price_history
+INSERT INTO batch_failure_events (batch_id, machine_id, stage, error, created_at)
+SELECT
+    ph.batch_id,
+    ph.machine_id,
+    CASE WHEN ph.failure_reason ILIKE 'Failed to fetch%' THEN 'fetch' ELSE 'extract' END,
+    ph.failure_reason,
+    ph.date
+FROM price_history ph
+JOIN batches b ON b.id = ph.batch_id
+WHERE ph.failure_reason ILIKE 'Failed to extract price%'
+   OR ph.failure_reason ILIKE 'Failed to fetch product page%';
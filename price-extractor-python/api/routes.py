@@ -1,9 +1,15 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 from loguru import logger
 from typing import Optional, List
+import json
+import re
 
 from services.price_service import PriceService
+from services.concurrency_governor import get_concurrency_governor
+from services.batch_events import get_batch_event_bus
+from services.html_snapshot_store import get_snapshot_store
 from services.learning_service import DailyLearningService
 from services.url_discovery import URLDiscoveryService
 from services.config_discovery import ConfigDiscoveryService
@@ -15,6 +21,11 @@ learning_service = DailyLearningService()
 url_discovery = URLDiscoveryService()
 config_discovery = ConfigDiscoveryService()
 
+@router.on_event("shutdown")
+async def close_price_service():
+    """Write back buffered tier history before the server exits."""
+    await price_service.close()
+
 # Include cost tracking routes
 from api.cost_routes import router as cost_router
 router.include_router(cost_router, prefix="/cost", tags=["cost-tracking"])
@@ -58,6 +69,25 @@ async def health_check():
     """Simple health check endpoint."""
     return {"status": "ok"}
 
+@router.get("/concurrency")
+async def get_concurrency_metrics():
+    """Current adaptive concurrency limit, latency and recent limit changes."""
+    return {"success": True, **get_concurrency_governor().get_metrics()}
+
+@router.get("/html-snapshots/{snapshot_hash}")
+async def get_html_snapshot(snapshot_hash: str):
+    """
+    Serve a stored page from the HTML snapshot store by its hash (machines.html_hash).
+    
+    Used by the admin HTML viewer. Pages are returned as plain text so scraped scripts never run.
+    """
+    if not re.fullmatch(r"[0-9a-f]{64}", snapshot_hash):
+        raise HTTPException(status_code=400, detail="Invalid snapshot hash")
+    html_content = get_snapshot_store().load(snapshot_hash)
+    if html_content is None:
+        raise HTTPException(status_code=404, detail=f"Snapshot {snapshot_hash} not found")
+    return Response(content=html_content, media_type="text/plain; charset=utf-8")
+
 @router.post("/update-price", response_model=UpdateResponse)
 async def update_machine_price(request: MachineUpdateRequest):
     """
@@ -137,15 +167,24 @@ async def batch_update_machines(request: dict, background_tasks: BackgroundTasks
             - limit (Optional[int]): Maximum machines to update
             - machine_ids (List[str], optional): Specific machine IDs to update
             - max_workers (Optional[int]): Number of concurrent workers for processing
+            - schedule (str, optional): "adaptive" to pick machines by per-machine recheck interval
+            - credit_budget (Optional[int]): Expected Scrapfly credits for an adaptive run
+            - resume (bool, optional): Resume the interrupted batch given by batch_id
+            - batch_id (str, optional): Batch to resume (required with resume)
     """
     try:
+        if request.get("resume"):
+            return await _start_batch_resume(request, background_tasks)
+        
         days_threshold = request.get("days_threshold", 7)
         limit = request.get("limit", None)
         machine_ids = request.get("machine_ids", None)
         max_workers = request.get("max_workers", None)
         use_scrapfly = request.get("use_scrapfly", True)
+        schedule = request.get("schedule", None)
+        credit_budget = request.get("credit_budget", None)
         
-        logger.info(f"Batch update request with days={days_threshold}, limit={limit}, max_workers={max_workers}, use_scrapfly={use_scrapfly}, machine_ids={machine_ids[:5] if machine_ids and len(machine_ids) > 5 else machine_ids}")
+        logger.info(f"Batch update request with days={days_threshold}, limit={limit}, max_workers={max_workers}, use_scrapfly={use_scrapfly}, schedule={schedule}, credit_budget={credit_budget}, machine_ids={machine_ids[:5] if machine_ids and len(machine_ids) > 5 else machine_ids}")
         
         if background_tasks:
             # Pass the specific machine_ids to the batch update if provided
@@ -155,7 +194,9 @@ async def batch_update_machines(request: dict, background_tasks: BackgroundTasks
                 limit,
                 machine_ids,
                 max_workers,
-                use_scrapfly
+                use_scrapfly,
+                schedule,
+                credit_budget
             )
             return {
                 "success": True, 
@@ -166,9 +207,13 @@ async def batch_update_machines(request: dict, background_tasks: BackgroundTasks
                 days_threshold=days_threshold, 
                 limit=limit,
                 machine_ids=machine_ids,
-                use_scrapfly=use_scrapfly
+                use_scrapfly=use_scrapfly,
+                schedule=schedule,
+                credit_budget=credit_budget
             )
             return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Error starting batch update: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error starting batch update: {str(e)}")
@@ -220,6 +265,58 @@ async def batch_update_prices(request: BatchUpdateRequest, background_tasks: Bac
         logger.exception(f"Error starting batch update: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error starting batch update: {str(e)}")
 
+def _sse_event(event: dict) -> str:
+    """Format an event as a Server-Sent Events message."""
+    return f"id: {event.get('seq', 0)}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@router.get("/batch-progress/{batch_id}/stream")
+async def stream_batch_progress(batch_id: str):
+    """
+    Stream live progress for a batch as Server-Sent Events.
+    
+    The first event is a snapshot of the batch (counters, concurrency, credits spent, recent
+    machines), followed by machine_completed events and a final batch_completed/batch_failed.
+    Batches not running in this process get a single snapshot built from the database.
+    """
+    event_bus = get_batch_event_bus()
+    
+    if event_bus.has_batch(batch_id):
+        events = event_bus.subscribe(batch_id)
+    else:
+        stats = await price_service.db_service.get_batch_stats(batch_id)
+        if not stats:
+            raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+        counts = stats.get("success_counts", {})
+        price_stats = stats.get("price_stats", {})
+        snapshot = {
+            "type": "snapshot",
+            "batch_id": batch_id,
+            "source": "database",
+            "status": stats.get("batch", {}).get("status"),
+            "counters": {
+                "total": stats.get("batch", {}).get("total_machines"),
+                "completed": counts.get("total", 0),
+                "successful": counts.get("successful", 0),
+                "failed": counts.get("failed", 0),
+                "unchanged": price_stats.get("unchanged", 0),
+                "updated": price_stats.get("updated", 0)
+            }
+        }
+        
+        async def single_snapshot():
+            yield snapshot
+        events = single_snapshot()
+    
+    async def event_stream():
+        async for event in events:
+            yield _sse_event(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/batch-results/{batch_id}", response_model=dict)
 async def get_batch_results(batch_id: str):
     """
@@ -251,13 +348,39 @@ async def get_batch_results(batch_id: str):
             "error": f"Error fetching batch results: {str(e)}"
         }
 
-async def _process_batch_update(days_threshold: int, limit: Optional[int] = None, machine_ids: List[str] = None, max_workers: Optional[int] = None, use_scrapfly: bool = True):
+async def _process_batch_update(days_threshold: int, limit: Optional[int] = None, machine_ids: List[str] = None, max_workers: Optional[int] = None, use_scrapfly: bool = True, schedule: Optional[str] = None, credit_budget: Optional[int] = None):
     """Process a batch update in the background."""
     try:
-        await price_service.batch_update_machines(days_threshold, max_workers=max_workers, limit=limit, machine_ids=machine_ids, use_scrapfly=use_scrapfly)
+        await price_service.batch_update_machines(days_threshold, max_workers=max_workers, limit=limit, machine_ids=machine_ids, use_scrapfly=use_scrapfly, schedule=schedule, credit_budget=credit_budget)
     except Exception as e:
         logger.exception(f"Error in background batch update: {str(e)}")
 
+async def _start_batch_resume(request: dict, background_tasks: Optional[BackgroundTasks] = None):
+    """Resume an interrupted batch under its original batch_id."""
+    batch_id = request.get("batch_id")
+    if not batch_id:
+        raise HTTPException(status_code=400, detail="batch_id is required to resume a batch")
+    
+    max_workers = request.get("max_workers", None)
+    use_scrapfly = request.get("use_scrapfly", True)
+    logger.info(f"Batch resume request for batch {batch_id} with max_workers={max_workers}")
+    
+    if background_tasks:
+        background_tasks.add_task(_process_batch_resume, batch_id, max_workers, use_scrapfly)
+        return {
+            "success": True,
+            "batch_id": batch_id,
+            "message": f"Resuming batch {batch_id} in the background"
+        }
+    return await price_service.resume_batch(batch_id, max_workers=max_workers, use_scrapfly=use_scrapfly)
+
+async def _process_batch_resume(batch_id: str, max_workers: Optional[int] = None, use_scrapfly: bool = True):
+    """Resume a batch in the background."""
+    try:
+        await price_service.resume_batch(batch_id, max_workers=max_workers, use_scrapfly=use_scrapfly)
+    except Exception as e:
+        logger.exception(f"Error in background batch resume: {str(e)}")
+
 async def _process_specific_machines(machine_ids: List[str], max_workers: Optional[int] = None):
     """Process specific machines in the background using concurrent processing."""
     try:
@@ -473,7 +596,7 @@ async def get_batch_failures(batch_id: str):
     try:
         logger.info(f"Getting ACTUAL extraction failures for batch ID: {batch_id}")
         
-        # Get machines that completely failed extraction from batch logs
+        # Get machines that completely failed extraction from the batch failure store
         failed_machine_ids = await price_service.get_batch_failures(batch_id)
         
         return {
@@ -503,7 +626,7 @@ async def get_batch_failures_and_corrections(batch_id: str):
     try:
         logger.info(f"Getting machines needing retest for batch ID: {batch_id}")
         
-        # Get machines that completely failed extraction from batch logs
+        # Get machines that completely failed extraction from the batch failure store
         failed_machine_ids = await price_service.get_batch_failures(batch_id)
         
         # Get manually corrected machines from database
@@ -554,7 +677,7 @@ async def batch_retest(request: dict, background_tasks: BackgroundTasks):
         
         logger.info(f"Starting batch retest for batch {batch_id} with {len(machine_ids)} machines")
         
-        # Use provided machine IDs if available, otherwise get from batch log
+        # Use provided machine IDs if available, otherwise get from the batch failure store
         if machine_ids:
             all_machine_ids = machine_ids
             failed_machine_count = "provided"
@@ -567,7 +690,7 @@ async def batch_retest(request: dict, background_tasks: BackgroundTasks):
             all_machine_ids = list(set(failed_machine_ids + corrected_machine_ids))
             failed_machine_count = len(failed_machine_ids)
             corrected_machine_count = len(corrected_machine_ids)
-            logger.info(f"Retrieved from logs: {len(all_machine_ids)} machines")
+            logger.info(f"Retrieved from batch failures: {len(all_machine_ids)} machines")
         
         if not all_machine_ids:
             return {
@@ -692,7 +815,9 @@ async def correct_price(request: PriceCorrectionRequest):
         # Get machine data for URL
         machine = await price_service.db_service.get_machine_by_id(machine_id)
         url = machine.get("product_link") if machine else None
-        html_content = machine.get("html_content") if machine else None
+        html_content = None
+        if machine:
+            html_content = machine.get("html_content") or get_snapshot_store().load(machine.get("html_hash"))
         
         # Update the price_history entry with corrected price
         updated_entry = await price_service.db_service.update_price_history_entry(
@@ -35,7 +35,10 @@ async def batch_update_prices(days_threshold=7):
     logger.info(f"Starting batch update with threshold of {days_threshold} days")
     print(f"Starting batch update for machines not updated in the last {days_threshold} days...")
     
-    result = await price_service.batch_update_machines(days_threshold)
+    try:
+        result = await price_service.batch_update_machines(days_threshold)
+    finally:
+        await price_service.close()
     
     # Print the result summary
     if result["success"]:
@@ -11,6 +11,12 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 # Use service role key for database updates, fallback to regular key
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_KEY")
+# PostgREST endpoint for the async data layer (override to point at a local PostgREST)
+SUPABASE_REST_URL = os.getenv("SUPABASE_REST_URL") or (f"{SUPABASE_URL.rstrip('/')}/rest/v1" if SUPABASE_URL else None)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))  # Pooled HTTP/2 connections to PostgREST
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "30"))
+BATCH_WRITE_MAX_ROWS = int(os.getenv("BATCH_WRITE_MAX_ROWS", "50"))  # Buffered batch rows per multi-row insert
+BATCH_WRITE_FLUSH_SECONDS = float(os.getenv("BATCH_WRITE_FLUSH_SECONDS", "5"))  # Max time a buffered row waits
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
 
@@ -40,6 +46,41 @@ MIN_PRICE_THRESHOLD = float(os.getenv("MIN_PRICE_THRESHOLD", "10"))  # Minimum p
 
 # Concurrent Processing Configuration
 MAX_CONCURRENT_EXTRACTIONS = int(os.getenv("MAX_CONCURRENT_EXTRACTIONS", "5"))  # Default to 5 concurrent workers
+SCRAPFLY_MAX_CONCURRENT_REQUESTS = int(os.getenv("SCRAPFLY_MAX_CONCURRENT_REQUESTS", "3"))  # Starting in-flight Scrapfly requests per process
+
+# Adaptive (AIMD) concurrency shared by batch workers and Scrapfly requests.
+# The governor starts at SCRAPFLY_MAX_CONCURRENT_REQUESTS and moves between CONCURRENCY_MIN and
+# CONCURRENCY_MAX. The ceiling defaults to the old static worker count on purpose: without
+# configuration a deployment never runs more concurrent scrapes (or spends Scrapfly credits
+# faster) than it did before, and AIMD only backs off from there. Set CONCURRENCY_MAX higher
+# to let the governor climb as far as the upstream sites and the Scrapfly plan allow.
+CONCURRENCY_MIN = int(os.getenv("CONCURRENCY_MIN", "1"))
+CONCURRENCY_MAX = int(os.getenv("CONCURRENCY_MAX", str(MAX_CONCURRENT_EXTRACTIONS)))  # Worker ceiling the governor can grow to
+CONCURRENCY_LATENCY_FACTOR = float(os.getenv("CONCURRENCY_LATENCY_FACTOR", "2.0"))  # p95 above baseline * factor backs off
+CONCURRENCY_FAILURE_THRESHOLD = int(os.getenv("CONCURRENCY_FAILURE_THRESHOLD", "5"))  # Failures per minute that back off
+
+# Volatility-driven recheck scheduling
+RECHECK_MIN_DAYS = float(os.getenv("RECHECK_MIN_DAYS", "1"))  # Shortest interval between checks of one machine
+RECHECK_MAX_DAYS = float(os.getenv("RECHECK_MAX_DAYS", "30"))  # Longest interval for machines whose price never moves
+RECHECK_DEFAULT_DAYS = float(os.getenv("RECHECK_DEFAULT_DAYS", "7"))  # Interval for machines with too little history
+RECHECK_HISTORY_DAYS = int(os.getenv("RECHECK_HISTORY_DAYS", "90"))  # Price history window used to estimate volatility
+RECHECK_CREDIT_BUDGET = int(os.getenv("RECHECK_CREDIT_BUDGET", "500"))  # Default Scrapfly credits per scheduled run
+
+# Playwright browser pool (shared browser processes, one isolated context per page lease)
+BROWSER_POOL_BROWSERS = int(os.getenv("BROWSER_POOL_BROWSERS", "1"))  # Chromium processes shared by all leases
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "5"))  # Maximum concurrent page leases
+BROWSER_POOL_PREWARM = int(os.getenv("BROWSER_POOL_PREWARM", "2"))  # Pages opened ahead of the first lease
+BROWSER_PAGE_MAX_USES = int(os.getenv("BROWSER_PAGE_MAX_USES", "20"))  # Leases before a page's context is recycled
+BROWSER_PAGE_MAX_HEAP_MB = float(os.getenv("BROWSER_PAGE_MAX_HEAP_MB", "150"))  # JS heap size that recycles a page
+BROWSER_BLOCK_RESOURCES = os.getenv("BROWSER_BLOCK_RESOURCES", "true").lower() in ("1", "true", "yes")  # Block images/media/fonts/trackers on dynamic pages (site rules can opt out)
+VARIANT_CAPTURE_ENABLED = os.getenv("VARIANT_CAPTURE_ENABLED", "true").lower() in ("1", "true", "yes")  # Resolve variant prices from product/variation JSON before clicking
+
+# Static extraction process pool (0 = one worker per CPU core)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "0"))
+
+# HTML snapshot store (content-addressed, compressed page archive)
+# Resolved to an absolute path so the store does not depend on the working directory
+HTML_SNAPSHOT_DIR = os.path.abspath(os.getenv("HTML_SNAPSHOT_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_snapshots"))
 
 # Configure logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -98,6 +98,7 @@ class ComMarkerSalePriceFixer:
         
         # Update the rules in the extractor
         self.extractor.site_rules['commarker.com'] = COMMARKER_ENHANCED_CONFIG
+        self.extractor.rebuild_rules_index()
         
         logger.info("✅ ComMarker rules updated with sale price preference")
         return True
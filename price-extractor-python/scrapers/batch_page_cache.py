@@ -0,0 +1,194 @@
+"""
+Per-batch page cache for price extraction.
+Fetches each product URL once per batch and shares the page across every machine that uses it.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from bs4 import BeautifulSoup
+from loguru import logger
+
+
+# Query parameters that never change the page content we extract from
+TRACKING_PARAMS = {'fbclid', 'gclid', 'msclkid', 'ref', 'srsltid', '_pos', '_sid', '_ss'}
+
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
+    """
+    Normalize a product URL so that variants of the same page share one cache key.
+
+    Lowercases scheme and host, drops "www.", default ports, fragments, trailing slashes
+    and tracking parameters, and sorts the remaining query parameters. Parameters such as
+    ?variant=... are kept because they select different prices on Shopify stores.
+
+    Args:
+        url: URL to normalize
+
+    Returns:
+        Normalized URL, or the input unchanged if it cannot be parsed
+    """
+    if not url:
+        return url
+
+    try:
+        parsed = urlparse(url.strip())
+        scheme = (parsed.scheme or 'https').lower()
+        host = (parsed.hostname or '').lower()
+        if host.startswith('www.'):
+            host = host[4:]
+
+        netloc = host
+        if parsed.port and not ((scheme == 'http' and parsed.port == 80) or (scheme == 'https' and parsed.port == 443)):
+            netloc = f"{host}:{parsed.port}"
+
+        path = parsed.path or '/'
+        if len(path) > 1:
+            path = path.rstrip('/')
+
+        query_params = [
+            (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+        ]
+        query = urlencode(sorted(query_params))
+
+        return urlunparse((scheme, netloc, path, '', query, ''))
+    except Exception:
+        return url
+
+
+class BatchPageCache:
+    """
+    Single-flight page cache scoped to one batch run.
+
+    The first machine that asks for a URL triggers the fetch; concurrent and later requests
+    for the same normalized URL await that same fetch. Entries are reference counted from the
+    batch machine list and dropped as soon as the last machine using the URL is done, so the
+    cache never holds more pages than are actively shared.
+    """
+
+    def __init__(self, scraper, machines: Optional[List[Dict]] = None, parse: bool = True,
+                 related_url: Optional[Callable[[str], Optional[str]]] = None):
+        """
+        Initialize the page cache.
+
+        Args:
+            scraper: Scraper exposing async fetch_page(url, parse=...) -> (html, soup, operation)
+            machines: Batch machine records, used to count how many machines share each URL
+            parse: Whether the scraper should build a BeautifulSoup object for each page
+            related_url: Maps a product URL to another URL its machine may fetch (e.g. the store's
+                product JSON endpoint); those URLs are reference counted and released with it
+        """
+        self.scraper = scraper
+        self.parse = parse
+        self.related_url = related_url
+        self._pending: Counter = Counter()
+        self._fetches: Dict[str, asyncio.Task] = {}
+        self._operations: Dict[str, Dict] = {}
+        self.stats = {
+            'fetches': 0,
+            'hits': 0
+        }
+        self.credits_spent = 0
+
+        for machine in machines or []:
+            for key in self._keys(machine.get('product_link')):
+                self._pending[key] += 1
+
+    def _keys(self, url: Optional[str]) -> List[str]:
+        """Cache keys a machine with this product URL holds: the URL and its related URL."""
+        key = normalize_url(url)
+        if not key:
+            return []
+        related = normalize_url(self.related_url(url)) if self.related_url else None
+        return [key, related] if related and related != key else [key]
+
+    @staticmethod
+    def group_machines_by_url(machines: List[Dict]) -> List[Dict]:
+        """
+        Order machines so that machines sharing a normalized URL are adjacent.
+
+        Groups keep the position of their first machine, so the original batch order is
+        preserved apart from pulling duplicates forward next to each other.
+
+        Args:
+            machines: Batch machine records
+
+        Returns:
+            New list of machine records grouped by URL
+        """
+        groups: Dict[str, List[Dict]] = {}
+        for index, machine in enumerate(machines):
+            key = normalize_url(machine.get('product_link')) or f"__no_url_{index}"
+            groups.setdefault(key, []).append(machine)
+
+        return [machine for group in groups.values() for machine in group]
+
+    def shared_url_count(self) -> int:
+        """Return the number of URLs used by more than one machine in this batch."""
+        return sum(1 for count in self._pending.values() if count > 1)
+
+    async def get_page_content(self, url: str, **fetch_options) -> Tuple[Optional[str], Optional[BeautifulSoup], bool]:
+        """
+        Get page content for a URL, fetching it at most once per batch.
+
+        Args:
+            url: URL to fetch
+            **fetch_options: Extra scraper options for the first fetch (e.g. tier_key)
+
+        Returns:
+            Tuple of (html_content, BeautifulSoup object, served_from_cache)
+        """
+        key = normalize_url(url)
+
+        task = self._fetches.get(key)
+        if task is not None:
+            self.stats['hits'] += 1
+            logger.info(f"♻️ Page cache hit for {url} (shared with other machines in batch)")
+            html_content, soup = await asyncio.shield(task)
+            return html_content, soup, True
+
+        self.stats['fetches'] += 1
+        task = asyncio.ensure_future(self._fetch(key, url, fetch_options))
+        self._fetches[key] = task
+        html_content, soup = await asyncio.shield(task)
+        return html_content, soup, False
+
+    async def _fetch(self, key: str, url: str, fetch_options: Optional[Dict] = None) -> Tuple[Optional[str], Optional[BeautifulSoup]]:
+        """Fetch a page through the underlying scraper and remember its credit usage."""
+        # Tier and credits come back with this fetch; the scraper's last_operation is shared by
+        # every concurrent fetch and may already describe another URL
+        html_content, soup, operation = await self.scraper.fetch_page(url, parse=self.parse, **(fetch_options or {}))
+        if operation:
+            self._operations[key] = dict(operation)
+            self.credits_spent += operation.get('credits') or 0
+
+        return html_content, soup
+
+    def get_operation(self, url: str) -> Optional[Dict]:
+        """Return the tier/credit data recorded for the fetch of this URL."""
+        return self._operations.get(normalize_url(url))
+
+    def release(self, url: Optional[str]):
+        """
+        Mark one machine using this URL as done; evict the page (and its related URL's page)
+        once no machine needs it.
+
+        Args:
+            url: Product URL the machine used
+        """
+        for key in self._keys(url):
+            if self._pending[key] > 0:
+                self._pending[key] -= 1
+
+            if self._pending[key] <= 0:
+                self._pending.pop(key, None)
+                self._fetches.pop(key, None)
+                self._operations.pop(key, None)
+
+    def clear(self):
+        """Drop all cached pages."""
+        self._pending.clear()
+        self._fetches.clear()
+        self._operations.clear()
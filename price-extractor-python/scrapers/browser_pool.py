@@ -1,134 +1,296 @@
 """
 Browser Pool Manager for concurrent price extraction.
-Provides dedicated browser instances to prevent resource conflicts.
+Shares one or two browser processes and leases isolated, prewarmed pages (one BrowserContext each).
 """
 
 import asyncio
-from typing import Optional, List
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
 from loguru import logger
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 from contextlib import asynccontextmanager
 
+from scrapers.resource_blocker import release_page
+
+from config import (
+    BROWSER_POOL_BROWSERS,
+    BROWSER_POOL_SIZE,
+    BROWSER_POOL_PREWARM,
+    BROWSER_PAGE_MAX_USES,
+    BROWSER_PAGE_MAX_HEAP_MB
+)
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-default-apps',
+    '--disable-extensions',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-ipc-flooding-protection'
+]
+
+
+@dataclass
+class PooledPage:
+    """A page in its own browser context, reused across leases until recycled"""
+    browser: Browser
+    context: BrowserContext
+    page: Page
+    uses: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    failed: bool = False
+
 
 class BrowserPool:
-    """Manages a pool of dedicated browser instances for concurrent processing."""
-    
-    def __init__(self, pool_size: int = 5):
+    """
+    Page-lease pool on top of a few shared browser processes.
+
+    Each lease gets a page in its own BrowserContext (separate cookies, storage and cache),
+    which costs tens of MB instead of a full browser process. Pages are opened ahead of
+    demand, health-checked before every lease, wiped after it, and recycled (context closed
+    and replaced) after max_uses leases, when their JS heap passes the memory threshold, or
+    when the lease raised. A disconnected browser is relaunched on demand.
+    """
+
+    def __init__(self, pool_size: int = BROWSER_POOL_SIZE, browser_count: int = BROWSER_POOL_BROWSERS,
+                 prewarm: int = BROWSER_POOL_PREWARM, max_uses: int = BROWSER_PAGE_MAX_USES,
+                 max_heap_mb: float = BROWSER_PAGE_MAX_HEAP_MB, health_timeout: float = 5.0):
         """
         Initialize browser pool.
-        
+
         Args:
-            pool_size (int): Number of browser instances to maintain in pool
+            pool_size (int): Maximum concurrent page leases
+            browser_count (int): Browser processes shared by the leases
+            prewarm (int): Pages opened during initialization
+            max_uses (int): Leases before a page is recycled
+            max_heap_mb (float): JS heap size (MB) above which a page is recycled
+            health_timeout (float): Seconds a health check may take
         """
-        self.pool_size = pool_size
+        self.pool_size = max(1, pool_size)
+        self.browser_count = max(1, browser_count)
+        self.prewarm = min(max(0, prewarm), self.pool_size)
+        self.max_uses = max(1, max_uses)
+        self.max_heap_mb = max_heap_mb
+        self.health_timeout = health_timeout
+
         self.playwright = None
-        self.browsers: List[Browser] = []
-        self.available_browsers = asyncio.Queue()
+        self.browsers: List[Optional[Browser]] = []
+        self._idle: Deque[PooledPage] = deque()
+        self._leases: Optional[asyncio.Semaphore] = None
+        self._lock = asyncio.Lock()
+        self._next_browser = 0
+        self._active = 0
         self.is_initialized = False
-        
+        self.stats = {
+            'leases': 0,
+            'pages_created': 0,
+            'pages_recycled': 0,
+            'health_failures': 0,
+            'browser_restarts': 0
+        }
+
     async def initialize(self):
-        """Initialize the browser pool with dedicated instances."""
+        """Start the shared browsers and prewarm pages."""
         if self.is_initialized:
             return
-            
-        logger.info(f"🚀 Initializing browser pool with {self.pool_size} instances...")
-        
+
+        logger.info(f"🚀 Initializing browser pool: {self.browser_count} browser(s), up to {self.pool_size} page leases...")
+
         try:
-            # Start Playwright
-            self.playwright = await async_playwright().start()
-            
-            # Create browser instances
-            for i in range(self.pool_size):
-                browser = await self._create_browser_instance(i)
-                self.browsers.append(browser)
-                await self.available_browsers.put(browser)
-                logger.info(f"✅ Browser instance {i+1}/{self.pool_size} created")
-            
+            # Start Playwright (unless a driver was supplied)
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+
+            for i in range(self.browser_count):
+                self.browsers.append(await self._launch_browser(i))
+
+            self._leases = asyncio.Semaphore(self.pool_size)
+            for _ in range(self.prewarm):
+                self._idle.append(await self._new_page())
+
             self.is_initialized = True
-            logger.info(f"🎉 Browser pool initialized successfully with {self.pool_size} instances")
-            
+            logger.info(f"🎉 Browser pool ready with {len(self._idle)} prewarmed pages")
+
         except Exception as e:
             logger.error(f"❌ Failed to initialize browser pool: {str(e)}")
-            await self.cleanup()
+            await self.cleanup(force=True)
             raise
-    
-    async def _create_browser_instance(self, instance_id: int) -> Browser:
-        """Create a single browser instance with optimal settings."""
+
+    async def _launch_browser(self, index: int) -> Browser:
+        """Launch one shared browser process with optimal settings."""
         try:
             # Try Chromium first
-            browser = await self.playwright.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--no-first-run',
-                    '--no-default-browser-check',
-                    '--disable-default-apps',
-                    '--disable-extensions',
-                    '--disable-background-timer-throttling',
-                    '--disable-renderer-backgrounding',
-                    '--disable-backgrounding-occluded-windows',
-                    '--disable-ipc-flooding-protection',
-                    f'--user-data-dir=/tmp/browser-pool-{instance_id}'
-                ]
-            )
-            logger.debug(f"Browser instance {instance_id} created with Chromium")
+            browser = await self.playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+            logger.debug(f"Browser {index} launched with Chromium")
             return browser
-            
+
         except Exception as e:
-            logger.warning(f"Chromium launch failed for instance {instance_id}, trying Firefox: {str(e)}")
+            logger.warning(f"Chromium launch failed for browser {index}, trying Firefox: {str(e)}")
             # Fallback to Firefox
             browser = await self.playwright.firefox.launch(
                 headless=True,
                 args=['--no-sandbox']
             )
-            logger.debug(f"Browser instance {instance_id} created with Firefox")
+            logger.debug(f"Browser {index} launched with Firefox")
             return browser
-    
+
+    async def _get_browser(self) -> Browser:
+        """Pick the next shared browser round-robin, relaunching it if it has died."""
+        async with self._lock:
+            index = self._next_browser % len(self.browsers)
+            self._next_browser += 1
+            browser = self.browsers[index]
+            if browser is None or not browser.is_connected():
+                logger.warning(f"Browser {index} disconnected, relaunching...")
+                browser = await self._launch_browser(index)
+                self.browsers[index] = browser
+                self.stats['browser_restarts'] += 1
+            return browser
+
+    async def _new_page(self) -> PooledPage:
+        """Open a page in a fresh, isolated context."""
+        browser = await self._get_browser()
+        context = await browser.new_context(user_agent=USER_AGENT)
+        page = await context.new_page()
+        self.stats['pages_created'] += 1
+        return PooledPage(browser=browser, context=context, page=page)
+
+    async def _close_page(self, pooled: PooledPage):
+        """Close a page's context (closing its page with it)."""
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser context: {str(e)}")
+
+    async def _is_healthy(self, pooled: PooledPage) -> bool:
+        """Check that a page's browser is connected and its page still responds."""
+        try:
+            if not pooled.browser.is_connected() or pooled.page.is_closed():
+                return False
+            return await asyncio.wait_for(pooled.page.evaluate("() => 1"), timeout=self.health_timeout) == 1
+        except Exception:
+            return False
+
+    async def _heap_mb(self, pooled: PooledPage) -> Optional[float]:
+        """JS heap in use by the page in MB (Chromium only)."""
+        try:
+            used = await asyncio.wait_for(
+                pooled.page.evaluate("() => (performance.memory && performance.memory.usedJSHeapSize) || null"),
+                timeout=self.health_timeout
+            )
+            return used / (1024 * 1024) if used else None
+        except Exception:
+            return None
+
+    async def _checkout(self) -> PooledPage:
+        """Take a healthy idle page, or open a new one."""
+        while self._idle:
+            # Most recently used first, so warm pages are reused before cold ones
+            pooled = self._idle.pop()
+            if await self._is_healthy(pooled):
+                return pooled
+            self.stats['health_failures'] += 1
+            logger.warning("🩺 Pooled page failed health check, replacing it")
+            await self._close_page(pooled)
+        return await self._new_page()
+
+    async def _checkin(self, pooled: PooledPage):
+        """Wipe a page after a lease and keep it, or recycle it."""
+        pooled.uses += 1
+        # Request interception belongs to the lease, not the page
+        await release_page(pooled.page)
+        reason = None
+        if pooled.failed:
+            reason = "lease failed"
+        elif pooled.uses >= self.max_uses:
+            reason = f"{pooled.uses} uses"
+        else:
+            heap_mb = await self._heap_mb(pooled)
+            if heap_mb is not None and heap_mb > self.max_heap_mb:
+                reason = f"JS heap {heap_mb:.0f} MB"
+
+        if reason is None:
+            try:
+                # Drop the previous site's state and stop its scripts before the next lease
+                await pooled.page.evaluate("() => { try { localStorage.clear(); sessionStorage.clear(); } catch (e) {} }")
+                await pooled.context.clear_cookies()
+                await pooled.page.goto("about:blank")
+            except Exception as e:
+                reason = f"reset failed: {str(e)}"
+
+        if reason is None:
+            self._idle.append(pooled)
+            return
+
+        logger.debug(f"♻️ Recycling pooled page ({reason})")
+        self.stats['pages_recycled'] += 1
+        await self._close_page(pooled)
+
     @asynccontextmanager
-    async def get_browser(self):
+    async def lease_page(self):
         """
-        Get a browser instance from the pool.
-        
+        Lease an isolated page from the pool.
+
         Yields:
-            Browser: A dedicated browser instance
+            PooledPage: Page with its context; returned to the pool (or recycled) on exit
         """
         if not self.is_initialized:
             await self.initialize()
-        
-        # Get browser from pool (blocks if none available)
-        browser = await self.available_browsers.get()
-        
-        try:
-            # Verify browser is still connected
-            if not browser.is_connected():
-                logger.warning("Browser disconnected, creating new instance...")
-                browser = await self._create_browser_instance(len(self.browsers))
-            
-            yield browser
-            
-        finally:
-            # Return browser to pool
-            await self.available_browsers.put(browser)
-    
-    async def cleanup(self):
-        """Clean up all browser instances and resources."""
-        if not self.is_initialized:
+
+        # Blocks while pool_size leases are out
+        async with self._leases:
+            pooled = await self._checkout()
+            self.stats['leases'] += 1
+            self._active += 1
+            try:
+                yield pooled
+            except BaseException:
+                pooled.failed = True
+                raise
+            finally:
+                self._active -= 1
+                await asyncio.shield(self._checkin(pooled))
+
+    def get_metrics(self) -> Dict:
+        """Return pool size, idle/active pages and counters."""
+        return {
+            'browsers': sum(1 for browser in self.browsers if browser is not None and browser.is_connected()),
+            'max_leases': self.pool_size,
+            'active_leases': self._active,
+            'idle_pages': len(self._idle),
+            'stats': dict(self.stats)
+        }
+
+    async def cleanup(self, force: bool = False):
+        """Clean up all pages, browsers and Playwright."""
+        if not self.is_initialized and not force:
             return
-            
+
         logger.info("🧹 Cleaning up browser pool...")
-        
+
+        while self._idle:
+            await self._close_page(self._idle.popleft())
+
         # Close all browsers
         for i, browser in enumerate(self.browsers):
             try:
-                if browser.is_connected():
+                if browser is not None and browser.is_connected():
                     await browser.close()
-                    logger.debug(f"Browser instance {i+1} closed")
+                    logger.debug(f"Browser {i+1} closed")
             except Exception as e:
-                logger.warning(f"Error closing browser instance {i+1}: {str(e)}")
-        
+                logger.warning(f"Error closing browser {i+1}: {str(e)}")
+
         # Stop Playwright
         if self.playwright:
             try:
@@ -136,12 +298,12 @@ class BrowserPool:
                 logger.debug("Playwright stopped")
             except Exception as e:
                 logger.warning(f"Error stopping Playwright: {str(e)}")
-        
+
         # Reset state
         self.browsers.clear()
-        self.available_browsers = asyncio.Queue()
+        self.playwright = None
         self.is_initialized = False
-        
+
         logger.info("✅ Browser pool cleanup completed")
 
 
@@ -149,21 +311,21 @@ class BrowserPool:
 _browser_pool: Optional[BrowserPool] = None
 
 
-async def get_browser_pool(pool_size: int = 5) -> BrowserPool:
+async def get_browser_pool(pool_size: int = BROWSER_POOL_SIZE) -> BrowserPool:
     """Get or create the global browser pool instance."""
     global _browser_pool
-    
+
     if _browser_pool is None:
         _browser_pool = BrowserPool(pool_size)
         await _browser_pool.initialize()
-    
+
     return _browser_pool
 
 
 async def cleanup_browser_pool():
     """Clean up the global browser pool."""
     global _browser_pool
-    
+
     if _browser_pool:
         await _browser_pool.cleanup()
         _browser_pool = None
@@ -171,79 +333,60 @@ async def cleanup_browser_pool():
 
 class PooledDynamicScraper:
     """
-    Dynamic scraper that uses the browser pool for resource isolation.
-    Drop-in replacement for DynamicScraper with better concurrency support.
+    Dynamic scraper that runs on a leased page from the browser pool.
+    Drop-in replacement for DynamicScraper without per-use browser startup.
     """
-    
-    def __init__(self, pool_size: int = 5):
+
+    def __init__(self, pool_size: int = BROWSER_POOL_SIZE):
         self.pool_size = pool_size
         self.browser = None
         self.context = None
         self.page = None
         self.browser_pool = None
-        
+        self._lease = None
+
     async def __aenter__(self):
-        """Async context manager entry - get browser from pool."""
+        """Async context manager entry - lease a page from the pool."""
         self.browser_pool = await get_browser_pool(self.pool_size)
-        
-        # Get dedicated browser from pool
-        self.browser_manager = self.browser_pool.get_browser()
-        self.browser = await self.browser_manager.__aenter__()
-        
-        # Create fresh context and page
-        self.context = await self.browser.new_context()
-        self.page = await self.context.new_page()
-        
-        # Set realistic headers
-        await self.page.set_extra_http_headers({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        
-        logger.debug("✅ PooledDynamicScraper initialized with dedicated browser")
+
+        self._lease = self.browser_pool.lease_page()
+        pooled = await self._lease.__aenter__()
+        self.browser = pooled.browser
+        self.context = pooled.context
+        self.page = pooled.page
+
+        logger.debug("✅ PooledDynamicScraper leased a pooled page")
         return self
-        
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit - return browser to pool."""
+        """Async context manager exit - return the page to the pool."""
         try:
-            # Close page and context (but keep browser)
-            if self.page:
-                await self.page.close()
-            if self.context:
-                await self.context.close()
-            
-            # Return browser to pool
-            if self.browser_manager:
-                await self.browser_manager.__aexit__(exc_type, exc_val, exc_tb)
-                
-            logger.debug("✅ PooledDynamicScraper cleaned up, browser returned to pool")
-            
+            if self._lease:
+                await self._lease.__aexit__(exc_type, exc_val, exc_tb)
+            logger.debug("✅ PooledDynamicScraper returned its page to the pool")
+
         except Exception as e:
             logger.warning(f"Error during PooledDynamicScraper cleanup: {str(e)}")
-    
+        finally:
+            self._lease = None
+            self.page = None
+            self.context = None
+
+    def _scraper(self):
+        """DynamicScraper bound to the leased page."""
+        from scrapers.dynamic_scraper import DynamicScraper
+
+        scraper = DynamicScraper()
+        scraper.page = self.page
+        scraper.browser = self.browser
+        scraper.playwright = self.browser_pool.playwright
+        return scraper
+
     # All the essential methods from DynamicScraper
     async def extract_price_with_variants(self, url, machine_name, variant_rules, machine_data=None):
-        """Extract price from a page that requires variant selection - using pooled browser."""
-        # Import the implementation from the original DynamicScraper
-        from scrapers.dynamic_scraper import DynamicScraper
-        
-        # Create a temporary instance to access the methods
-        temp_scraper = DynamicScraper()
-        
-        # Copy the state to the temporary scraper
-        temp_scraper.page = self.page
-        temp_scraper.browser = self.browser
-        temp_scraper.playwright = self.browser_pool.playwright
-        
-        # Call the original method
-        return await temp_scraper.extract_price_with_variants(url, machine_name, variant_rules, machine_data)
-    
+        """Extract price from a page that requires variant selection - using a pooled page."""
+        return await self._scraper().extract_price_with_variants(url, machine_name, variant_rules, machine_data)
+
     async def get_html_after_variant_selection(self, url, machine_name):
-        """Get HTML content after variant selection - using pooled browser."""
-        from scrapers.dynamic_scraper import DynamicScraper
-        
-        temp_scraper = DynamicScraper()
-        temp_scraper.page = self.page
-        temp_scraper.browser = self.browser
-        temp_scraper.playwright = self.browser_pool.playwright
-        
-        return await temp_scraper.get_html_after_variant_selection(url, machine_name)
\ No newline at end of file
+        """Get HTML content after variant selection - using a pooled page."""
+        return await self._scraper().get_html_after_variant_selection(url, machine_name)
@@ -6,19 +6,32 @@ Integrates Playwright automation into the price extraction workflow.
 import asyncio
 import json
 import re
-from urllib.parse import urlparse
+from urllib.parse import parse_qs, urlparse
 from loguru import logger
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 
+from config import BROWSER_BLOCK_RESOURCES, VARIANT_CAPTURE_ENABLED
+from scrapers.page_readiness import PageReadiness
+from scrapers.resource_blocker import ResourceBlocker
+from scrapers.site_specific_extractors import SiteSpecificExtractor
+from scrapers.variant_capture import VariantCapture, prefer_terms_for
+
 
 class DynamicScraper:
     """Enhanced scraper with JavaScript automation for complex product pages."""
     
-    def __init__(self):
+    def __init__(self, block_resources=BROWSER_BLOCK_RESOURCES, capture_variants=VARIANT_CAPTURE_ENABLED):
         self.playwright = None
         self.browser = None
         self.page = None
+        self.block_resources = block_resources
+        self.resource_blocker = None
+        self.last_resource_stats = None
+        self.readiness = None
+        self.last_wait_stats = None
+        self.capture_variants = capture_variants
+        self.variant_capture = None
         
     async def __aenter__(self):
         """Async context manager entry."""
@@ -81,6 +94,130 @@ class DynamicScraper:
         except Exception as e:
             logger.error(f"Error closing Playwright browser: {str(e)}")
     
+    async def _goto(self, url, **kwargs):
+        """Navigate the page with the site's resource blocking, readiness tracking and variant capture in place."""
+        await self._block_resources_for(url)
+        self._page_readiness()
+        if self.capture_variants and self.variant_capture is None:
+            self.variant_capture = VariantCapture(self.page)
+        return await self.page.goto(url, **kwargs)
+    
+    async def _block_resources_for(self, url):
+        """Attach a request blocker following the URL's site resource policy."""
+        if not self.block_resources or self.page is None:
+            return
+        
+        domain = urlparse(url).netloc.lower()
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        if self.resource_blocker and self.resource_blocker.site == domain:
+            return
+        
+        await self._release_resource_blocker()
+        policy = SiteSpecificExtractor().get_resource_policy(domain)
+        if not policy.get('enabled', True):
+            logger.debug(f"Resource blocking disabled for {domain}")
+            return
+        
+        blocker = ResourceBlocker(policy, url)
+        await blocker.attach(self.page)
+        self.resource_blocker = blocker
+    
+    async def _release_resource_blocker(self):
+        """Detach the request blocker and report what it saved."""
+        blocker, self.resource_blocker = self.resource_blocker, None
+        if blocker is None:
+            return
+        await blocker.detach()
+        self.last_resource_stats = dict(blocker.stats, site=blocker.site)
+        logger.info(f"🚫 {blocker.site}: {blocker.summary()}")
+    
+    def _page_readiness(self):
+        """Readiness waits for the current page (request tracking starts on first use)."""
+        if self.readiness is None or self.readiness.page is not self.page:
+            if self.readiness is not None:
+                self.readiness.detach()
+            self.readiness = PageReadiness(self.page)
+        return self.readiness
+    
+    async def _wait_for_page_ready(self, selector=None, timeout_ms=10000):
+        """Wait after navigation until a price (or the given selector) is rendered."""
+        return await self._page_readiness().wait_for_page_ready(selector, timeout_ms)
+    
+    async def _wait_for_price_update(self, timeout_ms=2000):
+        """Wait after a variant click until its requests finish and the price settles (timeout_ms covers both)."""
+        return await self._page_readiness().wait_after_interaction(timeout_ms)
+    
+    async def _wait_for_price_settle(self, quiet_ms=300, timeout_ms=3000):
+        """Wait until price elements stop changing."""
+        return await self._page_readiness().wait_for_price_settle(quiet_ms, timeout_ms)
+    
+    async def _wait_for_network_idle(self, timeout_ms=3000):
+        """Wait until the page has no requests in flight."""
+        return await self._page_readiness().wait_for_network_idle(timeout_ms=timeout_ms)
+    
+    async def _wait_for_selector(self, selector, timeout_ms=10000):
+        """Wait until a selector is visible."""
+        return await self._page_readiness().wait_for_selector(selector, timeout_ms)
+    
+    async def _price_from_captured_variants(self, machine_name, variant_rules=None, url=None):
+        """
+        Resolve the machine's variant price from product/variation JSON captured during page load.
+        
+        A known variant (the site rules' target_variant_id, then the URL's ?variant=) is used when
+        it was captured. Otherwise variants are matched by name, and equally good matches at
+        different prices return None so variant selection on the page decides.
+        
+        Args:
+            machine_name: Machine name to match against variant titles and attributes
+            variant_rules: Site variant rules (target_variant_id, variant_prefer_terms, expected price range)
+            url: Product page URL
+            
+        Returns:
+            tuple: (price, variant title) or None to fall back to variant selection
+        """
+        if self.variant_capture is None:
+            return None
+        
+        variant_rules = variant_rules or {}
+        variants = await self.variant_capture.collect()
+        if not variants:
+            return None
+        
+        url_variant = parse_qs(urlparse(url or '').query).get('variant', [None])[0]
+        variant_ids = {variant.variant_id for variant in variants}
+        target = next((str(t) for t in (variant_rules.get('target_variant_id'), url_variant) if t and str(t) in variant_ids), None)
+        variant = self.variant_capture.match(
+            machine_name,
+            prefer_terms=prefer_terms_for(machine_name, variant_rules),
+            target_variant_id=target
+        )
+        if variant is None:
+            logger.info(f"📦 {len(variants)} captured variants, none unambiguously matches {machine_name}")
+            return None
+        
+        min_price = variant_rules.get('min_expected_price')
+        max_price = variant_rules.get('max_expected_price')
+        if (min_price and variant.price < min_price) or (max_price and variant.price > max_price):
+            logger.warning(f"📦 Captured variant '{variant.title}' price ${variant.price} outside expected range, using variant selection")
+            return None
+        
+        logger.info(f"📦 Matched captured {variant.source} variant '{variant.title}' at ${variant.price} ({len(variants)} variants)")
+        return variant.price, variant.title
+    
+    async def _release_page(self):
+        """Detach per-page helpers and report resource and wait statistics."""
+        await self._release_resource_blocker()
+        capture, self.variant_capture = self.variant_capture, None
+        if capture is not None:
+            capture.detach()
+        readiness, self.readiness = self.readiness, None
+        if readiness is None:
+            return
+        self.last_wait_stats = readiness.detach()
+        logger.info(f"⏱️ Readiness waits: {self.last_wait_stats['waited_ms']}ms over {self.last_wait_stats['waits']} waits "
+                    f"({self.last_wait_stats['ceilings_hit']} hit their ceiling)")
+    
     async def extract_full_product_data(self, url, variant_rules=None, machine_data=None):
         """
         Extract full product data from a page (beyond just price).
@@ -97,8 +234,8 @@ class DynamicScraper:
             logger.info(f"Starting full product extraction for {url}")
             
             # Navigate to the page
-            await self.page.goto(url, wait_until='domcontentloaded', timeout=30000)
-            await self.page.wait_for_timeout(2000)
+            await self._goto(url, wait_until='domcontentloaded', timeout=30000)
+            await self._wait_for_page_ready()
             
             # Remove popups
             await self._remove_popups()
@@ -119,6 +256,8 @@ class DynamicScraper:
         except Exception as e:
             logger.error(f"Error in full product extraction: {str(e)}")
             return None
+        finally:
+            await self._release_page()
     
     async def extract_price_with_variants(self, url, machine_name, variant_rules, machine_data=None):
         """
@@ -139,23 +278,32 @@ class DynamicScraper:
             
             # Navigate to the page
             logger.info(f"Navigating to {url}")
-            await self.page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            await self._goto(url, wait_until='domcontentloaded', timeout=30000)
             
-            # Wait for page to fully load
-            await self.page.wait_for_timeout(2000)
+            # Wait for the price to render
+            await self._wait_for_page_ready()
             
             # Remove popups and overlays
             await self._remove_popups()
             
+            domain = urlparse(url).netloc.lower()
+            if domain.startswith('www.'):
+                domain = domain[4:]
+            
+            # Product/variation JSON seen during the load usually has every variant's price.
+            # CloudRay links with ?variant= are priced from the base URL below instead.
+            if not ('cloudraylaser.com' in domain and '?variant=' in url):
+                captured = await self._price_from_captured_variants(machine_name, variant_rules, url)
+                if captured:
+                    price, variant_title = captured
+                    return price, f"Dynamic extraction (captured variant JSON: {variant_title})"
+            
             # Scroll down to find variant selection section
             await self.page.evaluate('window.scrollTo(0, 800)')
-            await self.page.wait_for_timeout(1000)
+            await self._wait_for_network_idle(timeout_ms=2000)
             
             # Apply variant selection based on machine name and site
-            domain = urlparse(url).netloc.lower()
-            if domain.startswith('www.'):
-                domain = domain[4:]
-                
+
             logger.info(f"Applying variant selection for domain: {domain}")
             logger.info(f"DEBUG: variant_rules = {variant_rules}")
             logger.info(f"DEBUG: machine_name = {repr(machine_name)}")
@@ -169,8 +317,8 @@ class DynamicScraper:
                 if '?variant=' in url:
                     base_url = url.split('?variant=')[0]
                     logger.info(f"CloudRay URL has variant parameter - navigating to base URL for base price: {base_url}")
-                    await self.page.goto(base_url, wait_until='domcontentloaded', timeout=30000)
-                    await self.page.wait_for_timeout(2000)
+                    await self._goto(base_url, wait_until='domcontentloaded', timeout=30000)
+                    await self._wait_for_page_ready()
                 else:
                     logger.info("DEBUG: Calling _select_cloudray_variant")
                     await self._select_cloudray_variant(machine_name)
@@ -191,7 +339,7 @@ class DynamicScraper:
                 logger.warning(f"No variant selection rules for domain: {domain}")
             
             # Wait for price updates after variant selection
-            await self.page.wait_for_timeout(1000)
+            await self._wait_for_price_update(timeout_ms=1000)
             
             # Extract updated price
             price, method = await self._extract_price_from_page(machine_data, machine_name)
@@ -206,6 +354,8 @@ class DynamicScraper:
         except Exception as e:
             logger.error(f"Error in dynamic price extraction: {str(e)}")
             return None, None
+        finally:
+            await self._release_page()
     
     async def _remove_popups(self):
         """Remove common popups and overlays."""
@@ -311,7 +461,7 @@ class DynamicScraper:
                             await element.click()
                             selected_power = True
                             logger.info(f"✅ Successfully clicked {power}W button")
-                            await self.page.wait_for_timeout(2000)  # Wait for price update
+                            await self._wait_for_price_update()  # Wait for price update
                             break
                     except Exception as e:
                         logger.debug(f"Failed with selector {selector}: {str(e)}")
@@ -333,7 +483,7 @@ class DynamicScraper:
                             await select_element.select_option(option_value)
                             selected_power = True
                             logger.info(f"✅ Successfully selected {power}W via dropdown")
-                            await self.page.wait_for_timeout(2000)  # Wait for price update
+                            await self._wait_for_price_update()  # Wait for price update
                     except Exception as e:
                         logger.debug(f"Dropdown selection failed: {str(e)}")
                 
@@ -406,7 +556,7 @@ class DynamicScraper:
                                 await power_option.click()
                                 logger.info(f"✅ Successfully selected {power}W from Effect Power section")
                                 selected_power = True
-                                await self.page.wait_for_timeout(1500)
+                                await self._wait_for_price_update(timeout_ms=1500)
                     except Exception as e:
                         logger.debug(f"Effect Power section fallback failed: {str(e)}")
             
@@ -426,7 +576,7 @@ class DynamicScraper:
                         if element:
                             await element.click()
                             logger.info("Selected MOPA option")
-                            await self.page.wait_for_timeout(500)
+                            await self._wait_for_price_update(timeout_ms=1000)
                             break
                     except Exception as e:
                         logger.debug(f"MOPA selector {selector} failed: {str(e)}")
@@ -476,7 +626,7 @@ class DynamicScraper:
                                 await element.click(timeout=5000)
                                 logger.info(f"✅ Successfully clicked Basic Bundle button")
                                 bundle_selected = True
-                                await self.page.wait_for_timeout(3000)
+                                await self._wait_for_price_update(timeout_ms=3000)
                                 break
                         except Exception as e:
                             logger.debug(f"Bundle button selector '{selector}' failed: {str(e)}")
@@ -496,7 +646,7 @@ class DynamicScraper:
                                 await select_element.select_option(option_value)
                                 bundle_selected = True
                                 logger.info(f"✅ Successfully selected Basic Bundle via dropdown")
-                                await self.page.wait_for_timeout(3000)  # Wait for price update
+                                await self._wait_for_price_update(timeout_ms=3000)  # Wait for price update
                         except Exception as e:
                             logger.debug(f"Package dropdown selection failed: {str(e)}")
                     
@@ -505,7 +655,7 @@ class DynamicScraper:
                     else:
                         # After bundle selection, wait and check what price is shown
                         logger.info("🔍 Bundle selected, waiting for price to update...")
-                        await self.page.wait_for_timeout(5000)  # Extra wait for price update
+                        await self._wait_for_price_update(timeout_ms=5000)  # Extra wait for price update
                         
                         # Try to find the specific bundle price
                         bundle_price_selectors = [
@@ -538,7 +688,7 @@ class DynamicScraper:
             
             # Verify power selection was successful by checking for price updates
             # Wait for JavaScript to update the main product price
-            await self.page.wait_for_timeout(2000)
+            await self._wait_for_price_update()
             
             # Additional verification: check if price area shows loading or updates
             try:
@@ -552,7 +702,7 @@ class DynamicScraper:
                 logger.debug(f"Price area verification failed: {str(e)}")
             
             # Final wait for any remaining AJAX updates
-            await self.page.wait_for_timeout(1000)
+            await self._wait_for_network_idle(timeout_ms=2000)
             
         except Exception as e:
             logger.error(f"Error selecting ComMarker variant: {str(e)}")
@@ -583,14 +733,14 @@ class DynamicScraper:
                         if element:
                             await element.click()
                             logger.info(f"Selected model option: {model}")
-                            await self.page.wait_for_timeout(500)
+                            await self._wait_for_price_update(timeout_ms=1000)
                             break
                     except Exception as e:
                         logger.debug(f"Model selector {selector} failed: {str(e)}")
                         continue
             
             # Wait for any AJAX updates
-            await self.page.wait_for_timeout(1000)
+            await self._wait_for_price_update(timeout_ms=1000)
             
         except Exception as e:
             logger.error(f"Error selecting Cloudray variant: {str(e)}")
@@ -610,7 +760,7 @@ class DynamicScraper:
                 logger.info("Looking for F1 Lite button to click...")
                 
                 # Wait for page to fully load and version options to appear
-                await self.page.wait_for_timeout(3000)
+                await self._wait_for_selector('text="F1 Lite"')
                 
                 # Debug: Take a screenshot before clicking
                 try:
@@ -631,7 +781,7 @@ class DynamicScraper:
                     variant_selected = True
                     
                     # Wait for price to update
-                    await self.page.wait_for_timeout(2000)
+                    await self._wait_for_price_update()
                     
                     # Debug: Take a screenshot after clicking F1 Lite
                     try:
@@ -648,7 +798,7 @@ class DynamicScraper:
                         
                         await self.page.click('text="F1 Lite Standalone"', timeout=3000)
                         logger.info("✅ Successfully clicked F1 Lite Standalone package")
-                        await self.page.wait_for_timeout(2000)
+                        await self._wait_for_price_update()
                         
                         # Debug: Take final screenshot
                         try:
@@ -670,8 +820,8 @@ class DynamicScraper:
                 # Only continue with complex selectors if simple approach failed
                 logger.warning("Simple text click failed, trying other methods...")
                 
-                # Wait a bit for page to fully load
-                await self.page.wait_for_timeout(2000)
+                # Let pending requests finish
+                await self._wait_for_network_idle(timeout_ms=3000)
                 
                 # Debug: Let's see what's on the page
                 page_text = await self.page.evaluate('() => document.body.innerText')
@@ -745,7 +895,7 @@ class DynamicScraper:
                 if clicked:
                     logger.info("✅ Successfully clicked F1 Lite using JavaScript")
                     variant_selected = True
-                    await self.page.wait_for_timeout(3000)  # Wait for price to load
+                    await self._wait_for_price_update(timeout_ms=3000)  # Wait for price to load
                 else:
                     logger.warning("⚠️ Could not click F1 Lite button with JavaScript")
                     
@@ -767,7 +917,7 @@ class DynamicScraper:
                                     await element.click(force=True)  # Force click even if covered
                                     logger.info("✅ Successfully clicked F1 Lite element")
                                     variant_selected = True
-                                    await self.page.wait_for_timeout(3000)
+                                    await self._wait_for_price_update(timeout_ms=3000)
                                     break
                             except Exception as e:
                                 logger.debug(f"Failed to click element: {str(e)}")
@@ -794,7 +944,7 @@ class DynamicScraper:
                     version_section = await self.page.query_selector('.product-options__section--version, .product-options, [class*="version"]')
                     if version_section:
                         await version_section.scroll_into_view_if_needed()
-                        await self.page.wait_for_timeout(500)
+                        await self._wait_for_network_idle(timeout_ms=1000)
                 except:
                     pass
                 
@@ -826,7 +976,7 @@ class DynamicScraper:
                                         variant_selected = True
                                     
                                     # Wait for price to load after clicking
-                                    await self.page.wait_for_timeout(3000)
+                                    await self._wait_for_price_update(timeout_ms=3000)
                                     
                                     # Verify the click worked by checking for price updates
                                     price_elements = await self.page.query_selector_all('.price .money, [data-product-price], .product-price')
@@ -878,7 +1028,7 @@ class DynamicScraper:
                             if element and await element.is_visible():
                                 await element.click(timeout=5000)
                                 logger.info("✅ Successfully selected F1 Lite Standalone package")
-                                await self.page.wait_for_timeout(2000)
+                                await self._wait_for_price_update()
                                 break
                         except Exception as e:
                             logger.debug(f"Package selector {selector} failed: {str(e)}")
@@ -911,7 +1061,7 @@ class DynamicScraper:
                                         await area.click(timeout=3000)
                                         logger.info(f"✅ Successfully clicked potential F1 Lite element {i}")
                                         variant_selected = True
-                                        await self.page.wait_for_timeout(2000)
+                                        await self._wait_for_price_update()
                                         break
                                 except Exception as click_error:
                                     logger.debug(f"Failed to click element {i}: {str(click_error)}")
@@ -925,7 +1075,7 @@ class DynamicScraper:
                 logger.info("Detected xTool S1 - selecting 40W variant")
                 
                 # Wait for page to fully load and variant options to appear
-                await self.page.wait_for_timeout(3000)
+                await self._wait_for_selector('text=40W')
                 
                 # S1 40W specific handling with comprehensive selectors
                 power_selectors = [
@@ -951,7 +1101,7 @@ class DynamicScraper:
                             await element.click(timeout=5000)
                             logger.info(f"✅ Successfully selected 40W variant for S1 using: {selector}")
                             variant_selected = True
-                            await self.page.wait_for_timeout(2000)  # Wait for price to update
+                            await self._wait_for_price_update()  # Wait for price to update
                             break
                     except Exception as e:
                         logger.debug(f"Failed to click S1 40W selector {selector}: {str(e)}")
@@ -962,7 +1112,7 @@ class DynamicScraper:
                     logger.info("S1 might show 40W price by default, continuing with extraction")
                 
                 # Additional wait for price to stabilize
-                await self.page.wait_for_timeout(1000)
+                await self._wait_for_price_settle()
                 
                 # Debug: Check what price elements are available on xTool S1 page
                 logger.info("🔍 Debugging xTool S1 page structure...")
@@ -996,7 +1146,7 @@ class DynamicScraper:
                         pass
             
             # Final wait for any price updates
-            await self.page.wait_for_timeout(1000)
+            await self._wait_for_price_update(timeout_ms=1000)
             
         except Exception as e:
             logger.error(f"Error selecting xTool variant: {str(e)}")
@@ -1032,7 +1182,7 @@ class DynamicScraper:
                                 logger.info(f"✅ Clicked variant element: {variant_id}")
                             
                             # Wait for price update
-                            await self.page.wait_for_timeout(2000)
+                            await self._wait_for_price_update()
                             return True
                     except Exception as e:
                         logger.debug(f"Variant selector {selector} failed: {str(e)}")
@@ -1060,7 +1210,7 @@ class DynamicScraper:
                         if element and await element.is_visible():
                             await element.click()
                             logger.info(f"✅ Selected option: {option1}")
-                            await self.page.wait_for_timeout(1500)
+                            await self._wait_for_price_update(timeout_ms=1500)
                             
                             # Select second option if needed
                             if option2:
@@ -1078,7 +1228,7 @@ class DynamicScraper:
                                         if element2 and await element2.is_visible():
                                             await element2.click()
                                             logger.info(f"✅ Selected second option: {option2}")
-                                            await self.page.wait_for_timeout(1500)
+                                            await self._wait_for_price_update(timeout_ms=1500)
                                             return True
                                     except Exception as e:
                                         logger.debug(f"Option2 selector {selector2} failed: {str(e)}")
@@ -1109,7 +1259,7 @@ class DynamicScraper:
             logger.info(f"Detected Aeon model: {model}")
             
             # Step 1: Wait for configurator to load
-            await self.page.wait_for_timeout(3000)
+            await self._wait_for_page_ready(f'text={model}' if model else None)
             
             # Step 2: Look for model selection (e.g., "Mira S" vs other models)
             if model:
@@ -1129,7 +1279,7 @@ class DynamicScraper:
                         if element:
                             await element.click()
                             logger.info(f"✅ Selected model: {model}")
-                            await self.page.wait_for_timeout(2000)
+                            await self._wait_for_price_update()
                             model_selected = True
                             break
                     except Exception as e:
@@ -1146,7 +1296,7 @@ class DynamicScraper:
                             if text and model.lower() in text.lower():
                                 await element.click()
                                 logger.info(f"✅ Selected model option: {text.strip()}")
-                                await self.page.wait_for_timeout(2000)
+                                await self._wait_for_price_update()
                                 model_selected = True
                                 break
                         except:
@@ -1174,7 +1324,7 @@ class DynamicScraper:
                         if is_enabled and is_visible:
                             await next_button.click()
                             logger.info(f"✅ Clicked configurator step: {step_text}")
-                            await self.page.wait_for_timeout(2000)
+                            await self._wait_for_price_update()
                             break
                 except Exception as e:
                     logger.debug(f"Configurator step {step_text} failed: {str(e)}")
@@ -1200,7 +1350,7 @@ class DynamicScraper:
                             if text and ('mira5' in text.lower() or 'mira 5' in text.lower()):
                                 await element.click()
                                 logger.info(f"✅ Selected MIRA variant: {text.strip()}")
-                                await self.page.wait_for_timeout(2000)
+                                await self._wait_for_price_update()
                                 break
                         else:
                             continue
@@ -1246,8 +1396,8 @@ class DynamicScraper:
                                         if emp_model.upper() in text.upper() or emp_model.upper().replace('J', ' J') in text.upper():
                                             await element.click()
                                             logger.info(f"✅ Selected EMP variant: {text.strip()}")
-                                            # Wait longer for price update after variant selection
-                                            await self.page.wait_for_timeout(4000)
+                                            # The configurator recalculates slowly; allow a longer settle ceiling
+                                            await self._wait_for_price_update(timeout_ms=4000)
                                             
                                             # Check if the price has updated
                                             price_elements = await self.page.query_selector_all('.price, .total, .tot-price')
@@ -1267,8 +1417,8 @@ class DynamicScraper:
                                 if element:
                                     await element.click()
                                     logger.info(f"✅ Selected EMP variant using selector: {selector}")
-                                    # Wait longer for price update after variant selection
-                                    await self.page.wait_for_timeout(4000)
+                                    # The configurator recalculates slowly; allow a longer settle ceiling
+                                    await self._wait_for_price_update(timeout_ms=4000)
                                     
                                     # Check if the price has updated
                                     price_elements = await self.page.query_selector_all('.price, .total, .tot-price')
@@ -1310,7 +1460,7 @@ class DynamicScraper:
                         if 'button' in selector:
                             await element.click()
                             logger.info(f"✅ Clicked final configurator step")
-                            await self.page.wait_for_timeout(3000)
+                            await self._wait_for_price_update(timeout_ms=3000)
                         else:
                             # If it's a price display, we're done
                             logger.info(f"✅ Found final pricing display")
@@ -1320,7 +1470,7 @@ class DynamicScraper:
                     continue
             
             # Step 6: Final wait for all price updates
-            await self.page.wait_for_timeout(2000)
+            await self._wait_for_price_settle()
             
             logger.info("🎯 Aeon configurator navigation completed")
             
@@ -1799,7 +1949,7 @@ class DynamicScraper:
             logger.info(f"Getting post-interaction HTML for Claude analysis: {url}")
             
             # Navigate to the page
-            await self.page.goto(url, wait_until="networkidle", timeout=30000)
+            await self._goto(url, wait_until="networkidle", timeout=30000)
             
             # Apply variant selection
             domain = urlparse(url).netloc.lower()
@@ -1811,7 +1961,7 @@ class DynamicScraper:
                 await self._navigate_aeon_configurator(machine_name)
             
             # Wait for any price updates
-            await self.page.wait_for_timeout(2000)
+            await self._wait_for_price_update()
             
             # Get the updated HTML content
             html_content = await self.page.content()
@@ -1823,6 +1973,8 @@ class DynamicScraper:
             logger.error(f"Error getting post-interaction HTML: {str(e)}")
             # Return empty string to trigger fallback to original HTML
             return ""
+        finally:
+            await self._release_page()
 
 
 # Example usage and integration
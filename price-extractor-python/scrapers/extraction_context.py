@@ -0,0 +1,25 @@
+"""
+Per-call state for price extraction.
+Passed explicitly through the extraction pipeline so one PriceExtractor can serve concurrent workers.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+@dataclass(frozen=True)
+class ExtractionContext:
+    """Everything an extraction call knows about the machine and page it is working on"""
+    url: Optional[str] = None
+    old_price: Optional[float] = None
+    machine_name: Optional[str] = None
+    machine_data: Optional[Dict] = None
+
+    @property
+    def domain(self) -> str:
+        """Page domain without 'www.' prefix."""
+        if not self.url:
+            return ''
+        domain = urlparse(self.url).netloc.lower()
+        return domain[4:] if domain.startswith('www.') else domain
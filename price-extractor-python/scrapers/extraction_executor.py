@@ -0,0 +1,154 @@
+"""
+Process pool for CPU-heavy HTML parsing and static price extraction.
+Keeps BeautifulSoup parsing and selector passes off the asyncio event loop.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from config import EXTRACTION_WORKERS
+
+
+# Per-process state for pool workers (set by _init_worker)
+_worker_extractor = None
+_worker_trace: List[Tuple[str, str]] = []
+
+
+def _init_worker(log_level: str):
+    """Create one PriceExtractor per worker and capture its log output as a trace."""
+    global _worker_extractor
+
+    from scrapers.price_extractor import PriceExtractor
+
+    # Worker log lines are sent back with the result and replayed by the parent
+    logger.remove()
+    logger.add(lambda message: _worker_trace.append((message.record['level'].name, message.record['message'])), level=log_level)
+
+    _worker_extractor = PriceExtractor()
+
+
+def _run_extraction(extractor, html_content: str, url: str, old_price: Optional[float],
+                    machine_name: Optional[str], machine_data: Optional[Dict]) -> Tuple[Optional[float], Optional[str], Dict]:
+    """Parse the page and run static extraction (Methods 2-4)."""
+    from bs4 import BeautifulSoup
+
+    started = time.perf_counter()
+    soup = BeautifulSoup(html_content, 'html.parser')
+    parsed = time.perf_counter()
+
+    extractor._log_page_diagnostics(soup, html_content)
+    price, method = extractor.extract_price_static(soup, html_content, url, old_price, machine_name, machine_data)
+    finished = time.perf_counter()
+
+    trace = {
+        'pid': os.getpid(),
+        'parse_seconds': round(parsed - started, 4),
+        'extract_seconds': round(finished - parsed, 4),
+        'messages': []
+    }
+    return price, method, trace
+
+
+def extract_in_worker(html_content: str, url: str, old_price: Optional[float] = None,
+                      machine_name: Optional[str] = None, machine_data: Optional[Dict] = None):
+    """Pool entry point: extract a price and return (price, method, trace)."""
+    _worker_trace.clear()
+    try:
+        price, method, trace = _run_extraction(_worker_extractor, html_content, url, old_price, machine_name, machine_data)
+    except Exception as e:
+        logger.error(f"Extraction worker error for {url}: {str(e)}")
+        price, method, trace = None, None, {'pid': os.getpid(), 'error': str(e)}
+    trace['messages'] = list(_worker_trace)
+    _worker_trace.clear()
+    return price, method, trace
+
+
+class ExtractionExecutor:
+    """
+    Runs static price extraction in a pool of worker processes.
+
+    The raw HTML and machine context are shipped to a worker, which parses the page and
+    runs the site-specific, structured-data and common-selector passes. The event loop only
+    awaits the result, so async workers keep doing I/O while pages are being parsed.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, log_level: str = "DEBUG"):
+        """
+        Initialize the executor. Worker processes are started on first use.
+
+        Args:
+            max_workers: Worker process count (defaults to EXTRACTION_WORKERS, or one per CPU core)
+            log_level: Lowest worker log level included in the returned trace
+        """
+        self.max_workers = max_workers or EXTRACTION_WORKERS or os.cpu_count() or 1
+        self.log_level = log_level
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._fallback_extractor = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.log_level,)
+            )
+            logger.info(f"🧮 Extraction process pool started with {self.max_workers} workers")
+        return self._pool
+
+    async def extract(self, html_content: str, url: str, old_price: Optional[float] = None,
+                      machine_name: Optional[str] = None, machine_data: Optional[Dict] = None) -> Tuple[Optional[float], Optional[str], Dict]:
+        """
+        Extract a price from raw HTML in a worker process.
+
+        Args:
+            html_content: Raw HTML content
+            url: Page URL
+            old_price: Previous price for context
+            machine_name: Machine name for variant selection
+            machine_data: Machine record with learned_selectors
+
+        Returns:
+            Tuple of (price, method, trace); trace holds timings and the worker's log messages
+        """
+        loop = asyncio.get_running_loop()
+        job = partial(extract_in_worker, html_content, url, old_price, machine_name, machine_data)
+
+        try:
+            return await loop.run_in_executor(self._get_pool(), job)
+        except BrokenProcessPool as e:
+            logger.error(f"Extraction process pool failed ({str(e)}) - restarting pool, running this page in a thread")
+            self._pool = None
+            return await loop.run_in_executor(None, partial(self._extract_in_thread, html_content, url, old_price, machine_name, machine_data))
+
+    def _extract_in_thread(self, html_content, url, old_price, machine_name, machine_data):
+        """Fallback when the pool is unavailable: extract in this process (logs go straight to our logger)."""
+        if self._fallback_extractor is None:
+            from scrapers.price_extractor import PriceExtractor
+            self._fallback_extractor = PriceExtractor()
+        return _run_extraction(self._fallback_extractor, html_content, url, old_price, machine_name, machine_data)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global extraction executor instance
+_extraction_executor: Optional[ExtractionExecutor] = None
+
+
+def get_extraction_executor() -> ExtractionExecutor:
+    """Get or create the global extraction executor instance."""
+    global _extraction_executor
+
+    if _extraction_executor is None:
+        _extraction_executor = ExtractionExecutor()
+
+    return _extraction_executor
@@ -0,0 +1,241 @@
+"""
+Event-driven readiness waits for Playwright pages.
+Replaces fixed sleeps with waits that end as soon as the page is ready: a selector appears,
+variant XHRs finish, or price text stops changing. Every wait has a timeout ceiling.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+from loguru import logger
+
+
+# Elements whose text changes when a variant is selected
+PRICE_SELECTORS = [
+    '.price',
+    '[class*="price"]',
+    '[class*="Price"]',
+    '[data-price]',
+    '[itemprop="price"]',
+    '.woocommerce-Price-amount',
+    '.total'
+]
+
+# Smallest settle ceiling after an interaction (just above the default quiet period)
+MIN_SETTLE_WINDOW_MS = 400
+
+# Long-lived requests that never finish and must not hold up network idle
+IGNORED_RESOURCE_TYPES = {'websocket', 'eventsource', 'media'}
+
+# Resolves once no price-related mutation has happened for quietMs, or at the ceiling.
+# Mutations are matched on the mutated node's ancestors and on added nodes, so price
+# blocks that are replaced wholesale (WooCommerce variation HTML) still count.
+PRICE_SETTLE_SCRIPT = '''({selectors, quietMs, timeoutMs}) => new Promise(resolve => {
+    const selector = selectors.join(', ');
+    const start = performance.now();
+    let changes = 0;
+    let quietTimer = null;
+    const matches = node => {
+        const element = node && (node.nodeType === 1 ? node : node.parentElement);
+        if (!element) return false;
+        try {
+            return !!(element.closest(selector) || (element.querySelector && element.querySelector(selector)));
+        } catch (e) {
+            return true;
+        }
+    };
+    const finish = settled => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(ceiling);
+        resolve({settled, changes, elapsed: Math.round(performance.now() - start)});
+    };
+    const observer = new MutationObserver(records => {
+        if (!records.some(record => matches(record.target) || Array.from(record.addedNodes).some(matches))) return;
+        changes += 1;
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+    observer.observe(document.body || document.documentElement, {subtree: true, childList: true, characterData: true});
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    const ceiling = setTimeout(() => finish(false), timeoutMs);
+})'''
+
+
+class PageReadiness:
+    """
+    Readiness waits for one page.
+
+    Tracks the page's in-flight requests (Playwright's 'networkidle' load state only
+    covers the initial navigation, not XHRs fired by a later click) and keeps totals of
+    time spent waiting and ceilings hit so callers can report real per-page latency.
+    """
+
+    def __init__(self, page, price_selectors: Optional[List[str]] = None):
+        """
+        Initialize readiness waits and start tracking requests.
+
+        Args:
+            page: Playwright page
+            price_selectors: Selectors watched for price changes (defaults to PRICE_SELECTORS)
+        """
+        self.page = page
+        self.price_selectors = price_selectors or PRICE_SELECTORS
+        self._inflight = set()
+        self._last_activity = time.monotonic()
+        self.stats = {'waits': 0, 'waited_ms': 0, 'ceilings_hit': 0}
+
+        self._listeners = {
+            'request': self._on_request,
+            'requestfinished': self._on_request_done,
+            'requestfailed': self._on_request_done
+        }
+        for event, listener in self._listeners.items():
+            page.on(event, listener)
+
+    def _on_request(self, request):
+        if request.resource_type in IGNORED_RESOURCE_TYPES:
+            return
+        self._inflight.add(request)
+        self._last_activity = time.monotonic()
+
+    def _on_request_done(self, request):
+        if request in self._inflight:
+            self._inflight.discard(request)
+            self._last_activity = time.monotonic()
+
+    def _record(self, started: float, ready: bool) -> bool:
+        self.stats['waits'] += 1
+        self.stats['waited_ms'] += int((time.monotonic() - started) * 1000)
+        if not ready:
+            self.stats['ceilings_hit'] += 1
+        return ready
+
+    async def wait_for_network_idle(self, idle_ms: int = 300, timeout_ms: int = 5000) -> bool:
+        """
+        Wait until no request has been in flight for idle_ms.
+
+        The quiet period is measured from the call at the earliest, so requests fired by
+        the interaction just before the call are seen before idle is declared.
+
+        Args:
+            idle_ms: Quiet period that counts as idle
+            timeout_ms: Ceiling
+
+        Returns:
+            bool: True if the network went idle, False at the ceiling
+        """
+        started = time.monotonic()
+        self._last_activity = max(self._last_activity, started)
+        deadline = started + timeout_ms / 1000
+
+        while time.monotonic() < deadline:
+            if not self._inflight and time.monotonic() - self._last_activity >= idle_ms / 1000:
+                return self._record(started, True)
+            await asyncio.sleep(0.05)
+
+        logger.debug(f"Network still busy after {timeout_ms}ms ({len(self._inflight)} requests in flight)")
+        return self._record(started, False)
+
+    async def wait_for_price_settle(self, quiet_ms: int = 300, timeout_ms: int = 3000,
+                                    selectors: Optional[List[str]] = None) -> bool:
+        """
+        Wait until price elements stop changing.
+
+        Returns after quiet_ms without a price-related DOM mutation, so an already stable
+        price costs only quiet_ms.
+
+        Args:
+            quiet_ms: Period without changes that counts as settled
+            timeout_ms: Ceiling
+            selectors: Price selectors (defaults to this page's price selectors)
+
+        Returns:
+            bool: True if the price settled, False at the ceiling
+        """
+        started = time.monotonic()
+        try:
+            result = await self.page.evaluate(PRICE_SETTLE_SCRIPT, {
+                'selectors': selectors or self.price_selectors,
+                'quietMs': quiet_ms,
+                'timeoutMs': timeout_ms
+            })
+        except Exception as e:
+            # Navigation mid-wait destroys the execution context
+            logger.debug(f"Price settle wait interrupted: {str(e)}")
+            return self._record(started, False)
+
+        if result.get('changes'):
+            logger.debug(f"Price settled after {result.get('changes')} changes in {result.get('elapsed')}ms")
+        return self._record(started, bool(result.get('settled')))
+
+    async def wait_for_selector(self, selector: str, timeout_ms: int = 10000, state: str = 'visible') -> bool:
+        """
+        Wait until a selector appears.
+
+        Args:
+            selector: Playwright selector
+            timeout_ms: Ceiling
+            state: 'attached' or 'visible'
+
+        Returns:
+            bool: True if it appeared, False at the ceiling
+        """
+        started = time.monotonic()
+        try:
+            await self.page.wait_for_selector(selector, state=state, timeout=timeout_ms)
+            return self._record(started, True)
+        except Exception as e:
+            logger.debug(f"Selector {selector} not ready after {timeout_ms}ms: {str(e)}")
+            return self._record(started, False)
+
+    async def wait_for_page_ready(self, selector: Optional[str] = None, timeout_ms: int = 10000) -> bool:
+        """
+        Wait after navigation until the content extraction needs is rendered.
+
+        Args:
+            selector: Element to wait for (any price element by default)
+            timeout_ms: Ceiling for the element to appear
+
+        Returns:
+            bool: True if the page is ready
+        """
+        appeared = await self.wait_for_selector(selector or ', '.join(self.price_selectors), timeout_ms, state='attached')
+        settled = await self.wait_for_price_settle(quiet_ms=500, timeout_ms=3000)
+        return appeared and settled
+
+    async def wait_after_interaction(self, timeout_ms: int = 2000, selectors: Optional[List[str]] = None) -> bool:
+        """
+        Wait after a click or select until the variant's requests finish and its price settles.
+
+        timeout_ms is one ceiling for both waits, so pages that keep polling cost about as much
+        as the fixed sleep the wait replaced instead of a network ceiling plus a settle ceiling.
+
+        Args:
+            timeout_ms: Ceiling for the whole wait
+            selectors: Price selectors to watch
+
+        Returns:
+            bool: True if both conditions were met before the ceiling
+        """
+        started = time.monotonic()
+        idle = await self.wait_for_network_idle(timeout_ms=timeout_ms)
+        remaining_ms = timeout_ms - int((time.monotonic() - started) * 1000)
+        # The settle check always gets a short window to see a price that is still changing
+        settled = await self.wait_for_price_settle(timeout_ms=max(remaining_ms, MIN_SETTLE_WINDOW_MS), selectors=selectors)
+        return idle and settled
+
+    def detach(self) -> Dict:
+        """
+        Stop tracking requests.
+
+        Returns:
+            dict: Wait statistics
+        """
+        for event, listener in self._listeners.items():
+            try:
+                self.page.remove_listener(event, listener)
+            except Exception:
+                pass
+        self._inflight.clear()
+        return dict(self.stats)
@@ -0,0 +1,150 @@
+"""
+Store platform adapters for price extraction.
+Reads prices from a platform's structured product endpoint (a few KB of JSON) instead of
+rendering the product page, falling back to the HTML pipeline when that is not possible.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from bs4 import BeautifulSoup
+from loguru import logger
+
+from scrapers.site_specific_extractors import SITE_RULES
+from scrapers.variant_capture import match_variant, parse_shopify_product
+
+
+SHOPIFY_RULE_TYPES = {'shopify', 'shopify_variants'}
+SHOPIFY_PRODUCT_PATH = re.compile(r'^(.*?/products/[^/?#.]+)')
+
+
+class ShopifyProductAdapter:
+    """
+    Shopify product JSON adapter.
+
+    Applies to product URLs on stores whose site rules declare a Shopify type (or that are
+    served from *.myshopify.com). The price comes from /products/<handle>.json, with the
+    variant picked by matching option values against the machine name. Sites opt out with
+    'product_json': False in their site rules.
+    """
+
+    platform = 'shopify'
+
+    def __init__(self, site_rules: Optional[Dict] = None):
+        """
+        Initialize the adapter.
+
+        Args:
+            site_rules: Site rules keyed by domain (defaults to SITE_RULES)
+        """
+        self.site_rules = site_rules if site_rules is not None else SITE_RULES
+
+    def applies_to(self, url: str) -> bool:
+        """Whether the URL is a product page on a Shopify store that allows the JSON path."""
+        return self.product_json_url(url) is not None
+
+    def product_json_url(self, url: str) -> Optional[str]:
+        """
+        Build the product JSON URL for a product page.
+
+        Args:
+            url: Product page URL
+
+        Returns:
+            str: https://<host>/.../products/<handle>.json, or None if the adapter does not apply
+        """
+        if not url:
+            return None
+        parsed = urlparse(url)
+        host = (parsed.hostname or '').lower()
+        domain = host[4:] if host.startswith('www.') else host
+
+        rules = self.site_rules.get(domain) or {}
+        is_shopify = rules.get('type') in SHOPIFY_RULE_TYPES or rules.get('platform') == 'shopify' or domain.endswith('.myshopify.com')
+        if not is_shopify or rules.get('product_json') is False:
+            return None
+
+        match = SHOPIFY_PRODUCT_PATH.match(parsed.path or '')
+        if not match:
+            return None
+        return f"{parsed.scheme or 'https'}://{parsed.netloc}{match.group(1)}.json"
+
+    def tier_key(self, url: str) -> str:
+        """Tier history key for the store's product JSON, kept apart from its HTML pages."""
+        host = (urlparse(url).hostname or '').lower()
+        return f"{host[4:] if host.startswith('www.') else host}/products.json"
+
+    def extract(self, content: Optional[str], url: str, machine_name: str, old_price: Optional[float] = None,
+                target_variant_id: Optional[str] = None, prefer_terms: Optional[List[str]] = None,
+                avoid_terms: Optional[List[str]] = None, prefer_lowest: bool = False,
+                price_range: Optional[Tuple[float, float]] = None) -> Optional[Tuple[float, str]]:
+        """
+        Pick the machine's variant price from product JSON.
+
+        Args:
+            content: Fetched product JSON (JS-rendered fetches wrap it in HTML)
+            url: Product page URL (its ?variant=, when present in the JSON, picks the variant)
+            machine_name: Machine name to match against variant options
+            old_price: Previous price, used to break ties
+            target_variant_id: Variant ID from the machine's site rules; wins over ?variant=
+            prefer_terms: Variant phrases the site rules prefer for this machine
+            avoid_terms: Variant phrases the site rules rule out (bundles, add-ons)
+            prefer_lowest: Break ties with the lowest price (sites listed at their base price)
+            price_range: (min, max) expected price; a variant outside it falls back to the HTML pipeline
+
+        Returns:
+            tuple: (price, method) or None to fall back to the HTML pipeline
+        """
+        if not content:
+            return None
+
+        text = content.strip()
+        if text.startswith('<'):
+            text = BeautifulSoup(text, 'html.parser').get_text().strip()
+        try:
+            data = json.loads(text)
+        except ValueError:
+            logger.info(f"🛍️ Product JSON for {url} is not JSON (blocked or disabled)")
+            return None
+
+        variants = parse_shopify_product(data, cents=False)
+        if not variants:
+            return None
+
+        # A known variant (site rules, then the product link's) wins; name matching is for links without one
+        url_variant = parse_qs(urlparse(url).query).get('variant', [None])[0]
+        variant_ids = {variant.variant_id for variant in variants}
+        target = next((str(t) for t in (target_variant_id, url_variant) if t and str(t) in variant_ids), None)
+        variant = match_variant(variants, machine_name, prefer_terms=prefer_terms, target_variant_id=target,
+                                anchor_price=old_price, avoid_terms=avoid_terms, prefer_lowest=prefer_lowest)
+        if variant is None:
+            logger.info(f"🛍️ No unambiguous variant for {machine_name} among {len(variants)} product JSON variants")
+            return None
+        if price_range and not price_range[0] <= variant.price <= price_range[1]:
+            logger.info(f"🛍️ Variant '{variant.title}' at ${variant.price} is outside {price_range} for {machine_name}")
+            return None
+
+        return variant.price, f"Shopify product JSON ({variant.title})"
+
+
+# Adapters tried in order before the HTML pipeline
+PLATFORM_ADAPTERS: List = [ShopifyProductAdapter]
+
+
+def get_platform_adapter(url: str, site_rules: Optional[Dict] = None):
+    """
+    Find the platform adapter for a product URL.
+
+    Args:
+        url: Product page URL
+        site_rules: Site rules keyed by domain (defaults to SITE_RULES)
+
+    Returns:
+        Adapter instance, or None when the URL should go through the HTML pipeline
+    """
+    for adapter_class in PLATFORM_ADAPTERS:
+        adapter = adapter_class(site_rules)
+        if adapter.applies_to(url):
+            return adapter
+    return None
@@ -7,6 +7,8 @@ from decimal import Decimal, InvalidOperation
 from scrapers.site_specific_extractors import SiteSpecificExtractor
 from scrapers.dynamic_scraper import DynamicScraper
 from scrapers.browser_pool import PooledDynamicScraper
+from scrapers.extraction_executor import get_extraction_executor
+from scrapers.extraction_context import ExtractionContext
 from scrapers.selector_blacklist import is_selector_blacklisted, get_blacklist_reason
 
 class PriceExtractor:
@@ -22,7 +24,7 @@ class PriceExtractor:
         Extract price using multiple methods in order of preference.
         
         Args:
-            soup (BeautifulSoup): Parsed HTML content.
+            soup (BeautifulSoup): Parsed HTML content, or None to parse and extract in the extraction process pool.
             html_content (str): Raw HTML content.
             url (str): Page URL.
             old_price (float, optional): Previous price for context.
@@ -33,36 +35,12 @@ class PriceExtractor:
             tuple: (price as float, method used) or (None, None) if extraction failed.
         """
         
-        # Store URL and old price for price parsing context
-        self._current_url = url
-        self._old_price = old_price
-        
         # Enhanced logging for batch analysis
         logger.info(f"=== PRICE EXTRACTION START ===")
         logger.info(f"Machine: {machine_name}")
         logger.info(f"URL: {url}")
         logger.info(f"Old Price: ${old_price}")
-        logger.info(f"Page Title: {soup.title.string if soup.title else 'No title'}")
         logger.info(f"HTML Size: {len(html_content)} chars")
-        
-        # Log page characteristics for debugging
-        price_elements = soup.find_all(string=re.compile(r'\$[\d,]+'))
-        logger.info(f"Price-like elements found: {len(price_elements)}")
-        if len(price_elements) <= 10:  # Only log if reasonable number
-            logger.info(f"Price candidates: {[p.strip() for p in price_elements[:5]]}")
-        
-        # Check for common error indicators
-        error_indicators = ['404', 'not found', 'error', 'temporarily unavailable', 'out of stock']
-        page_text = html_content.lower()
-        found_errors = [err for err in error_indicators if err in page_text]
-        if found_errors:
-            logger.warning(f"Error indicators found: {found_errors}")
-        
-        # Check for bot detection
-        bot_indicators = ['captcha', 'robot', 'automated', 'suspicious activity']
-        found_bot_signs = [bot for bot in bot_indicators if bot in page_text]
-        if found_bot_signs:
-            logger.warning(f"Bot detection indicators: {found_bot_signs}")
         # Method 0: MCP Learning System removed - was redundant with dynamic scraper
         # The MCP system was just another layer of Playwright automation on top of our existing dynamic scraper
 
@@ -118,13 +96,69 @@ class PriceExtractor:
             else:
                 logger.info(f"⏭️ METHOD 1 SKIPPED: Dynamic extraction not required for this URL")
         
-        # Method 2: Try site-specific extraction (static) - now includes learned selectors!
-        logger.info(f"🎯 METHOD 2: Attempting site-specific extraction with rules and learned selectors")
+        # Methods 2-4 need nothing but the fetched page
+        if soup is None:
+            # Parsing and selector passes are CPU-bound - run them in the extraction process pool
+            price, method, trace = await get_extraction_executor().extract(html_content, url, old_price, machine_name, machine_data)
+            for level, message in trace.get('messages', []):
+                logger.log(level, message)
+            logger.debug(f"Extraction worker {trace.get('pid')}: parse {trace.get('parse_seconds')}s, extract {trace.get('extract_seconds')}s")
+            return price, method
+        
+        self._log_page_diagnostics(soup, html_content)
+        return self.extract_price_static(soup, html_content, url, old_price, machine_name, machine_data)
+    
+    def _log_page_diagnostics(self, soup, html_content):
+        """Log page characteristics (title, price-like text, error and bot indicators) for batch analysis."""
+        logger.info(f"Page Title: {soup.title.string if soup.title else 'No title'}")
+        
+        # Log page characteristics for debugging
+        price_elements = soup.find_all(string=re.compile(r'\$[\d,]+'))
+        logger.info(f"Price-like elements found: {len(price_elements)}")
+        if len(price_elements) <= 10:  # Only log if reasonable number
+            logger.info(f"Price candidates: {[p.strip() for p in price_elements[:5]]}")
         
+        # Check for common error indicators
+        error_indicators = ['404', 'not found', 'error', 'temporarily unavailable', 'out of stock']
+        page_text = html_content.lower()
+        found_errors = [err for err in error_indicators if err in page_text]
+        if found_errors:
+            logger.warning(f"Error indicators found: {found_errors}")
+        
+        # Check for bot detection
+        bot_indicators = ['captcha', 'robot', 'automated', 'suspicious activity']
+        found_bot_signs = [bot for bot in bot_indicators if bot in page_text]
+        if found_bot_signs:
+            logger.warning(f"Bot detection indicators: {found_bot_signs}")
+    
+    def extract_price_static(self, soup, html_content, url, old_price=None, machine_name=None, machine_data=None):
+        """
+        Extract price from an already fetched page using only static methods (no browser, no network).
+        
+        Runs site-specific rules, structured data and common selectors in that order. Used by
+        extract_price after dynamic extraction and directly for offline re-extraction of snapshots.
+        
+        Args:
+            soup (BeautifulSoup): Parsed HTML content.
+            html_content (str): Raw HTML content.
+            url (str): Page URL.
+            old_price (float, optional): Previous price for context.
+            machine_name (str, optional): Machine name for variant selection.
+            machine_data (dict, optional): Machine record with learned_selectors.
+            
+        Returns:
+            tuple: (price as float, method used) or (None, None) if extraction failed.
+        """
         # Construct machine_data if not provided but we have machine_name
         if machine_data is None and machine_name:
             machine_data = {'Machine Name': machine_name}
         
+        # Per-call state travels with the call, never on the shared instance
+        context = ExtractionContext(url=url, old_price=old_price, machine_name=machine_name, machine_data=machine_data)
+        
+        # Method 2: Try site-specific extraction (static) - now includes learned selectors!
+        logger.info(f"🎯 METHOD 2: Attempting site-specific extraction with rules and learned selectors")
+        
         price, method = self.site_extractor.extract_price_with_rules(soup, html_content, url, machine_data)
         if price is not None:
             # Validate the price against expected ranges and old price
@@ -160,7 +194,7 @@ class PriceExtractor:
         else:
             logger.warning(f"METHOD 3: Skipping rules fetch - machine_data: {machine_data is not None}, machine_name: '{machine_name}'")
         
-        price, method = self._extract_from_structured_data(soup, skip_meta_tags=should_skip_meta, url=url, machine_name=machine_name, machine_data=machine_data, rules=rules)
+        price, method = self._extract_from_structured_data(soup, skip_meta_tags=should_skip_meta, rules=rules, context=context)
         if price is not None:
             # Validate the price against expected ranges and old price
             if self._validate_extracted_price(price, url, old_price, machine_name):
@@ -182,7 +216,7 @@ class PriceExtractor:
         
         # Method 4: Try common price selectors
         logger.info(f"🔍 METHOD 4: Attempting common CSS selectors")
-        price, method = self._extract_from_common_selectors(soup)
+        price, method = self._extract_from_common_selectors(soup, context)
         if price is not None:
             # Validate the price against expected ranges and old price
             if self._validate_extracted_price(price, url, old_price, machine_name):
@@ -215,20 +249,26 @@ class PriceExtractor:
         
         return None, None
     
-    def _extract_from_structured_data(self, soup, skip_meta_tags=False, url=None, machine_name=None, machine_data=None, rules=None):
+    def _extract_from_structured_data(self, soup, skip_meta_tags=False, url=None, machine_name=None, machine_data=None, rules=None, context=None):
         """
         Extract price from structured data like JSON-LD or microdata.
         
         Args:
             soup (BeautifulSoup): Parsed HTML content.
             skip_meta_tags (bool): Whether to skip meta tag extraction.
-            url (str, optional): Page URL for domain-specific logic.
-            machine_name (str, optional): Machine name for variant selection.
-            machine_data (dict, optional): Machine record with specifications.
+            url (str, optional): Page URL for domain-specific logic (ignored when context is given).
+            machine_name (str, optional): Machine name for variant selection (ignored when context is given).
+            machine_data (dict, optional): Machine record with specifications (ignored when context is given).
+            rules (dict, optional): Machine-specific rules.
+            context (ExtractionContext, optional): Per-call extraction state.
             
         Returns:
             tuple: (price as float, method used) or (None, None) if not found.
         """
+        if context is None:
+            context = ExtractionContext(url=url, machine_name=machine_name, machine_data=machine_data)
+        url, machine_name, machine_data = context.url, context.machine_name, context.machine_data
+        
         try:
             # First check meta tags (og:price:amount) - unless skipped for machine-specific rules
             if not skip_meta_tags:
@@ -237,7 +277,7 @@ class PriceExtractor:
                     price_content = meta_price.get('content')
                     logger.debug(f"Found og:price:amount meta tag: {price_content}")
                     # Parse the price (handle comma as thousands separator)
-                    price = self._parse_price(price_content)
+                    price = self._parse_price(price_content, context)
                     if price is not None and 10 <= price <= 100000:
                         logger.info(f"Extracted price ${price} from og:price:amount meta tag")
                         return price, "Meta tag (og:price:amount)"
@@ -311,7 +351,7 @@ class PriceExtractor:
                                             logger.warning(f"Price {price} from JSON-LD is outside reasonable range, ignoring")
                                 else:
                                     # For string values, use the parser
-                                    price = self._parse_price(value)
+                                    price = self._parse_price(value, context)
                                     if price is not None:
                                         # Verify price is in a reasonable range
                                         if 10 <= price <= 100000:  # Price should be between $10 and $100,000
@@ -382,7 +422,7 @@ class PriceExtractor:
                                     if isinstance(value, (int, float)):
                                         price = float(value)
                                     else:
-                                        price = self._parse_price(value)
+                                        price = self._parse_price(value, context)
                                     
                                     if price is not None and 10 <= price <= 100000:
                                         # Get offer name/description if available
@@ -467,7 +507,7 @@ class PriceExtractor:
                         price_value = price_prop.text
                     
                     logger.debug(f"Found microdata price: {repr(price_value)}")
-                    price = self._parse_price(price_value)
+                    price = self._parse_price(price_value, context)
                     if price is not None:
                         # Verify price is in a reasonable range
                         if 10 <= price <= 100000:  # Price should be between $10 and $100,000
@@ -481,7 +521,7 @@ class PriceExtractor:
         
         return None, None
     
-    def _extract_from_common_selectors(self, soup):
+    def _extract_from_common_selectors(self, soup, context=None):
         """
         Extract price using common CSS selectors found on e-commerce sites.
         
@@ -537,7 +577,7 @@ class PriceExtractor:
                         price_text = element.text
                     
                     # Parse and validate the price
-                    price = self._parse_price(price_text)
+                    price = self._parse_price(price_text, context)
                     if price is not None:
                         logger.info(f"Extracted price {price} using selector '{selector}'")
                         return price, f"CSS Selector '{selector}'"
@@ -619,13 +659,14 @@ LOOK FOR:
 - Shopify product pricing sections
 - Main price display areas"""
     
-    def _parse_price(self, price_text):
+    def _parse_price(self, price_text, context=None):
         """
         Parse a price string and extract the numeric value.
         Handles multiple prices by splitting and parsing each separately.
         
         Args:
             price_text (str): Raw price text containing currency symbols and formatting.
+            context (ExtractionContext, optional): Per-call state; its old_price picks among multiple prices.
             
         Returns:
             float: Parsed price value or None if parsing failed.
@@ -656,9 +697,10 @@ LOOK FOR:
                 
                 if parsed_prices:
                     # If we have an old price, find the closest match
-                    if hasattr(self, '_old_price') and self._old_price:
-                        closest_price = min(parsed_prices, key=lambda x: abs(x - self._old_price))
-                        logger.info(f"Multiple prices found {parsed_prices}, selecting closest to old price ${self._old_price}: ${closest_price}")
+                    old_price = context.old_price if context else None
+                    if old_price:
+                        closest_price = min(parsed_prices, key=lambda x: abs(x - old_price))
+                        logger.info(f"Multiple prices found {parsed_prices}, selecting closest to old price ${old_price}: ${closest_price}")
                         return closest_price
                     
                     # Fallback: return the first price found
@@ -918,6 +960,8 @@ LOOK FOR:
                     'option[value*="{value}"]',
                     '[data-variant*="{value}"]'
                 ],
+                # B6 MOPA is listed at its Basic Bundle price; other machines use the base machine
+                'variant_prefer_terms': {'B6 MOPA': ['basic bundle']},
                 'min_expected_price': 500,
                 'max_expected_price': 15000
             },
@@ -0,0 +1,101 @@
+"""
+FIFO request limiter for outbound scraping requests.
+Replaces counter polling with an awaitable slot queue that wakes waiters in arrival order.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque
+
+
+class FifoRequestLimiter:
+    """
+    Async concurrency limiter with strict FIFO hand-off and an adjustable limit.
+
+    Unlike polling a shared counter, waiting tasks park on a future and are woken
+    exactly once, in the order they arrived, when a slot frees up. The limit can be
+    changed at runtime; lowering it lets in-flight requests finish and simply stops
+    handing out slots until the active count drops below the new limit.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Initialize the limiter.
+
+        Args:
+            limit: Maximum number of concurrently held slots (minimum 1)
+        """
+        self._limit = max(1, int(limit))
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        """Current maximum number of concurrent slots."""
+        return self._limit
+
+    @property
+    def active(self) -> int:
+        """Number of slots currently held."""
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        """Number of tasks queued for a slot."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def set_limit(self, limit: int):
+        """
+        Change the concurrency limit.
+
+        Args:
+            limit: New maximum number of concurrent slots (minimum 1)
+        """
+        self._limit = max(1, int(limit))
+        self._wake_waiters()
+
+    async def acquire(self):
+        """Wait for a slot, in FIFO order behind any earlier waiters."""
+        if self._active < self._limit and not self._waiters:
+            self._active += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed to us just as we were cancelled - pass it on
+                self._active -= 1
+                self._wake_waiters()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self):
+        """Release a held slot and hand it to the next waiter."""
+        self._active = max(0, self._active - 1)
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Hand free slots to waiters in arrival order."""
+        for waiter in list(self._waiters):
+            if self._active >= self._limit:
+                break
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(True)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of the block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,211 @@
+"""
+Request interception for Playwright pages.
+Aborts images, media, fonts and third-party trackers that price extraction never looks at,
+following per-domain policies kept with the site rules.
+"""
+
+import weakref
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+from loguru import logger
+
+
+# Applied to every site unless its site rules carry a 'resource_policy' override
+DEFAULT_RESOURCE_POLICY = {
+    'enabled': True,
+    'block_types': ['image', 'media', 'font'],  # Playwright resource types
+    'block_trackers': True,  # Third-party hosts in THIRD_PARTY_BLOCKLIST
+    'allow_domains': [],  # Hosts never blocked (e.g. a CDN the variant JS loads data from)
+    'block_domains': []  # Extra hosts always blocked
+}
+
+# Third-party hosts (and their subdomains) that carry no price data
+THIRD_PARTY_BLOCKLIST = (
+    # Analytics and advertising
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'googlesyndication.com',
+    'doubleclick.net', 'facebook.net', 'facebook.com', 'bat.bing.com', 'clarity.ms', 'hotjar.com',
+    'analytics.tiktok.com', 'snap.licdn.com', 'ct.pinterest.com', 'criteo.com', 'criteo.net',
+    'taboola.com', 'outbrain.com', 'hs-analytics.net', 'hs-scripts.com', 'hubspot.com',
+    # Chat widgets
+    'intercom.io', 'intercomcdn.com', 'tidio.co', 'tidiochat.com', 'zdassets.com', 'zopim.com',
+    'gorgias.chat', 'livechatinc.com', 'tawk.to', 'crisp.chat',
+    # Marketing popups
+    'klaviyo.com', 'privy.com', 'justuno.com'
+)
+
+# Rough transfer size of one request of each type, used to estimate what blocking saved
+ESTIMATED_BYTES = {
+    'image': 80_000,
+    'media': 1_000_000,
+    'font': 40_000,
+    'script': 60_000,
+    'stylesheet': 20_000
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+def merge_resource_policy(override: Optional[Dict]) -> Dict:
+    """
+    Apply a site's 'resource_policy' override to the default policy.
+
+    Besides replacing any default key, an override may list 'allow_types' to remove
+    resource types from the default block list (the opt-out for sites whose variant
+    JS needs, say, images to lay out its swatches).
+
+    Args:
+        override: Site rule 'resource_policy' dict, or None
+
+    Returns:
+        dict: Complete policy
+    """
+    policy = {key: list(value) if isinstance(value, list) else value for key, value in DEFAULT_RESOURCE_POLICY.items()}
+    if not override:
+        return policy
+    policy.update({key: value for key, value in override.items() if key != 'allow_types'})
+    allowed = set(override.get('allow_types', ()))
+    policy['block_types'] = [resource_type for resource_type in policy['block_types'] if resource_type not in allowed]
+    return policy
+
+
+def _site_of(url: str) -> str:
+    """Host of a URL without 'www.'."""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    """Whether host is one of domains or a subdomain of one."""
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+# Blocker currently routing each page, so a pool can unroute a page it takes back
+_attached: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+class ResourceBlocker:
+    """
+    Per-page request interceptor.
+
+    Attach before navigating; every request is then either aborted (blocked resource type,
+    blocked or tracker host) or continued. Counts of blocked requests by reason and an
+    estimate of the bytes they would have transferred are kept in stats.
+    """
+
+    def __init__(self, policy: Dict, page_url: str):
+        """
+        Initialize the blocker.
+
+        Args:
+            policy: Complete resource policy (see merge_resource_policy)
+            page_url: URL of the page being loaded; hosts outside its site are third-party
+        """
+        self.policy = policy
+        self.site = _site_of(page_url)
+        self.block_types = set(policy.get('block_types', ()))
+        self.page = None
+        self.stats = {
+            'requests_allowed': 0,
+            'requests_blocked': 0,
+            'blocked_by_reason': {},
+            'estimated_bytes_saved': 0
+        }
+
+    def _is_third_party(self, host: str) -> bool:
+        site_parts = self.site.split('.')
+        # Compare on the registrable part (last two labels) so shop./cdn. subdomains stay first-party
+        base = '.'.join(site_parts[-2:]) if len(site_parts) >= 2 else self.site
+        return not _host_matches(host, [base])
+
+    def block_reason(self, url: str, resource_type: str) -> Optional[str]:
+        """
+        Decide whether a request is blocked.
+
+        Args:
+            url: Request URL
+            resource_type: Playwright resource type (document, script, image, ...)
+
+        Returns:
+            str: Reason it is blocked ('tracker', 'domain' or the resource type), or None to allow
+        """
+        if resource_type == 'document' or not url.startswith('http'):
+            return None
+
+        host = (urlparse(url).hostname or '').lower()
+        if _host_matches(host, self.policy.get('allow_domains', ())):
+            return None
+        if _host_matches(host, self.policy.get('block_domains', ())):
+            return 'domain'
+        if self.policy.get('block_trackers') and self._is_third_party(host) and _host_matches(host, THIRD_PARTY_BLOCKLIST):
+            return 'tracker'
+        if resource_type in self.block_types:
+            return resource_type
+        return None
+
+    async def _handle(self, route):
+        """Route handler: abort or continue one request."""
+        request = route.request
+        reason = self.block_reason(request.url, request.resource_type)
+        try:
+            if reason is None:
+                self.stats['requests_allowed'] += 1
+                await route.continue_()
+                return
+
+            self.stats['requests_blocked'] += 1
+            by_reason = self.stats['blocked_by_reason']
+            by_reason[reason] = by_reason.get(reason, 0) + 1
+            self.stats['estimated_bytes_saved'] += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+            await route.abort('blockedbyclient')
+        except Exception as e:
+            # Route already handled or page closed mid-request
+            logger.debug(f"Request interception skipped for {request.url}: {str(e)}")
+
+    async def attach(self, page):
+        """
+        Start intercepting a page's requests (replacing any blocker already on it).
+
+        Args:
+            page: Playwright page
+        """
+        previous = _attached.get(page)
+        if previous is not None and previous is not self:
+            await previous.detach()
+        await page.route('**/*', self._handle)
+        self.page = page
+        _attached[page] = self
+
+    async def detach(self):
+        """Stop intercepting; the page loads everything again."""
+        page, self.page = self.page, None
+        if page is None:
+            return
+        if _attached.get(page) is self:
+            del _attached[page]
+        try:
+            if not page.is_closed():
+                await page.unroute('**/*', self._handle)
+        except Exception as e:
+            logger.debug(f"Error removing request interception: {str(e)}")
+
+    def summary(self) -> str:
+        """One-line description of what was blocked."""
+        reasons = ', '.join(f"{count} {reason}" for reason, count in sorted(self.stats['blocked_by_reason'].items()))
+        return (f"blocked {self.stats['requests_blocked']} of "
+                f"{self.stats['requests_blocked'] + self.stats['requests_allowed']} requests "
+                f"(~{self.stats['estimated_bytes_saved'] / 1024:.0f} KB){': ' + reasons if reasons else ''}")
+
+
+async def release_page(page):
+    """
+    Remove whichever blocker is routing a page, if any.
+
+    Args:
+        page: Playwright page
+
+    Returns:
+        ResourceBlocker that was detached, or None
+    """
+    blocker = _attached.get(page)
+    if blocker is not None:
+        await blocker.detach()
+    return blocker
@@ -3,6 +3,8 @@ Scrapfly Web Scraper - Drop-in replacement for Puppeteer/Playwright HTML fetchin
 Implements tiered credit optimization while maintaining exact same interface
 """
 import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, Tuple, Any
 from urllib.parse import urlparse
 from bs4 import BeautifulSoup
@@ -19,6 +21,9 @@ from scrapfly import (
 )
 
 from services.database import DatabaseService
+from scrapers.request_limiter import FifoRequestLimiter
+from services.concurrency_governor import get_concurrency_governor
+from services.tier_history_cache import get_tier_history_cache
 
 
 class ScrapflyWebScraper:
@@ -41,12 +46,23 @@ class ScrapflyWebScraper:
         if not self.api_key:
             raise ValueError("Scrapfly API key not provided. Set SCRAPFLY_API_KEY environment variable.")
         
+        # Concurrency adapts to upstream feedback; size the SDK for the governor's ceiling
+        self.governor = get_concurrency_governor()
+        self.max_concurrent = self.governor.max_limit
+        
         self.client = ScrapflyClient(
             key=self.api_key,
-            max_concurrency=5  # Reduced to prevent 429 throttling in production
+            max_concurrency=self.max_concurrent
+        )
+        # async_scrape runs on the client's own executor - size it to the highest slot limit
+        # so requests never queue a second time inside the SDK
+        self.client.async_executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent,
+            thread_name_prefix='scrapfly'
         )
         
         self.db_service = database_service or DatabaseService()
+        self.tier_cache = get_tier_history_cache(self.db_service)
         
         # Track last operation for credit logging
         self.last_operation = {
@@ -56,29 +72,67 @@ class ScrapflyWebScraper:
         }
         
         # Rate limiting for failed requests and concurrency control
-        self.failed_requests = []  # List of timestamps for failed requests
+        self.failed_requests = deque()  # Timestamps of failed requests (oldest first)
         self.max_failed_per_minute = 15  # Stay well under Scrapfly's 25/min limit
         self.throttle_until = None  # Timestamp when throttling ends
-        self.concurrent_requests = 0  # Track active concurrent requests
-        self.max_concurrent = 3  # Limit concurrent requests to prevent 429s
+        self.request_limiter = FifoRequestLimiter(self.governor.limit)  # FIFO request slots
+        self.governor.add_listener(self.request_limiter.set_limit)
         
         logger.info("Scrapfly web scraper initialized with tiered fetching and rate limiting")
     
-    async def get_page_content(self, url: str) -> Tuple[Optional[str], Optional[BeautifulSoup]]:
+    def close(self):
+        """
+        Release the scraper's hold on shared state.
+        
+        Unregisters the request limiter from the global concurrency governor (which would
+        otherwise keep this scraper alive and resize a dead limiter) and shuts down the SDK executor.
+        """
+        self.governor.remove_listener(self.request_limiter.set_limit)
+        self.client.async_executor.shutdown(wait=False)
+        logger.debug("Scrapfly web scraper closed")
+    
+    @property
+    def concurrent_requests(self) -> int:
+        """Number of Scrapfly requests currently in flight."""
+        return self.request_limiter.active
+    
+    async def get_page_content(self, url: str, parse: bool = True, tier_key: Optional[str] = None) -> Tuple[Optional[str], Optional[BeautifulSoup]]:
         """
         Main interface method - fetches page content using tiered approach.
         Maintains exact same return format as existing web scraper.
         
         Args:
             url: URL to scrape
+            parse: Build a BeautifulSoup object; pass False when parsing happens in the extraction process pool
+            tier_key: Tier history key (defaults to the URL's domain); endpoints that need a different
+                tier than the domain's pages, such as store product JSON, keep their own history
+            
+        Returns:
+            Tuple of (html_content, BeautifulSoup object or None when parse is False)
+        """
+        html_content, soup, operation = await self.fetch_page(url, parse=parse, tier_key=tier_key)
+        self.last_operation = operation
+        return html_content, soup
+    
+    async def fetch_page(self, url: str, parse: bool = True, tier_key: Optional[str] = None) -> Tuple[Optional[str], Optional[BeautifulSoup], Dict]:
+        """
+        Fetch page content together with the tier and credits of this fetch.
+        
+        Concurrent callers must use this instead of reading last_operation, which any
+        other fetch finishing in between overwrites.
+        
+        Args:
+            url: URL to scrape
+            parse: Build a BeautifulSoup object
+            tier_key: Tier history key (defaults to the URL's domain)
             
         Returns:
-            Tuple of (html_content, BeautifulSoup object)
+            Tuple of (html_content, BeautifulSoup object or None, operation dict with tier/credits/success)
         """
         logger.info(f"🚀 Scrapfly fetch: {url}")
         
         # Get domain for tier history lookup
-        domain = self._extract_domain(url)
+        domain = tier_key or self._extract_domain(url)
         
         # Get optimal starting tier based on history
         start_tier = await self._get_optimal_tier(domain)
@@ -90,30 +144,25 @@ class ScrapflyWebScraper:
             if html_content:
                 # Success - update tier history and return
                 await self._record_success(domain, tier, metadata)
-                soup = BeautifulSoup(html_content, 'html.parser')
+                soup = BeautifulSoup(html_content, 'html.parser') if parse else None
                 
-                # Track operation for credit logging
-                self.last_operation = {
+                logger.info(f"✅ Scrapfly success: Tier {tier}, {metadata.get('cost', 0)} credits")
+                return html_content, soup, {
                     'tier': tier,
                     'credits': metadata.get('cost', 1),
                     'success': True
                 }
-                
-                logger.info(f"✅ Scrapfly success: Tier {tier}, {metadata.get('cost', 0)} credits")
-                return html_content, soup
             
             # Log failure and try next tier
             logger.warning(f"❌ Tier {tier} failed for {url}: {metadata.get('error', 'Unknown error')}")
         
         # All tiers failed
-        self.last_operation = {
+        logger.error(f"❌ All tiers failed for {url}")
+        return None, None, {
             'tier': 3,  # Highest tier attempted
             'credits': 0,  # No credits charged for failures
             'success': False
         }
-        
-        logger.error(f"❌ All tiers failed for {url}")
-        return None, None
     
     async def validate_url_health(self, url: str) -> Dict[str, Any]:
         """
@@ -165,8 +214,19 @@ class ScrapflyWebScraper:
         # Could be enhanced later to suggest domain variations
         return []
     
+    def _prune_failed_requests(self) -> int:
+        """Drop failed-request timestamps older than 60 seconds and return the remaining count."""
+        cutoff_time = datetime.now() - timedelta(seconds=60)
+        while self.failed_requests and self.failed_requests[0] <= cutoff_time:
+            self.failed_requests.popleft()
+        return len(self.failed_requests)
+    
+    def _record_failure(self):
+        """Record a failed request for the failures-per-minute budget."""
+        self.failed_requests.append(datetime.now())
+    
     async def _check_rate_limit(self) -> None:
-        """Check and enforce rate limiting for failed requests and concurrency."""
+        """Enforce throttling and the failed-requests-per-minute budget before taking a request slot."""
         # If we're currently throttled, wait
         if self.throttle_until and datetime.now() < self.throttle_until:
             wait_seconds = (self.throttle_until - datetime.now()).total_seconds()
@@ -174,19 +234,11 @@ class ScrapflyWebScraper:
             await asyncio.sleep(wait_seconds)
             self.throttle_until = None
         
-        # Clean up old failed requests (older than 60 seconds)
-        cutoff_time = datetime.now() - timedelta(seconds=60)
-        self.failed_requests = [ts for ts in self.failed_requests if ts > cutoff_time]
-        
         # If we're approaching the failed request limit, add delay
-        if len(self.failed_requests) >= self.max_failed_per_minute - 5:
-            logger.warning(f"⚠️ Approaching rate limit ({len(self.failed_requests)} failed requests in last minute)")
+        failed_count = self._prune_failed_requests()
+        if failed_count >= self.max_failed_per_minute - 5:
+            logger.warning(f"⚠️ Approaching rate limit ({failed_count} failed requests in last minute)")
             await asyncio.sleep(3)  # Slow down
-        
-        # Enforce concurrency limit to prevent 429 errors
-        while self.concurrent_requests >= self.max_concurrent:
-            logger.info(f"⏳ Waiting for concurrent request slot ({self.concurrent_requests}/{self.max_concurrent})")
-            await asyncio.sleep(0.5)  # Wait for a slot to open
     
     async def _fetch_with_tier(self, url: str, tier: int) -> Tuple[Optional[str], Dict]:
         """
@@ -199,39 +251,68 @@ class ScrapflyWebScraper:
         Returns:
             Tuple of (html_content, metadata)
         """
-        # Check rate limiting and get request slot
         await self._check_rate_limit()
         
-        # Increment concurrent request counter
-        self.concurrent_requests += 1
+        if self.request_limiter.active >= self.request_limiter.limit:
+            logger.info(f"⏳ Waiting for request slot ({self.request_limiter.active}/{self.request_limiter.limit}, {self.request_limiter.waiting} queued)")
+        
+        # Concurrency slots are handed out in FIFO order - no polling
+        async with self.request_limiter.slot():
+            started = time.monotonic()
+            html_content, metadata = await self._scrape(url, tier)
+            self._report_to_governor(metadata, time.monotonic() - started)
         
+        return html_content, metadata
+    
+    def _report_to_governor(self, metadata: Dict, latency: float):
+        """
+        Feed the outcome of a request to the concurrency governor.
+        
+        Args:
+            metadata: Metadata returned by _scrape
+            latency: Request duration in seconds, excluding time spent waiting for a slot
+        """
+        error = str(metadata.get('error') or '')
+        if metadata.get('status_code') == 429 or '429' in error or 'throttled' in error.lower():
+            self.governor.record_throttle()
+        elif metadata.get('success'):
+            self.governor.record_success(latency)
+        else:
+            self.governor.record_failure(self._prune_failed_requests())
+    
+    async def _scrape(self, url: str, tier: int) -> Tuple[Optional[str], Dict]:
+        """
+        Run a single Scrapfly request while holding a request slot.
+        
+        Args:
+            url: URL to fetch
+            tier: Tier level (1, 2, or 3)
+            
+        Returns:
+            Tuple of (html_content, metadata)
+        """
         try:
             config = self._get_tier_config(url, tier)
             
-            # Run the synchronous scrape method in thread pool to avoid blocking event loop
-            # This enables true concurrent processing while maintaining response integrity
             try:
-                loop = asyncio.get_event_loop()
-                response: ScrapeApiResponse = await loop.run_in_executor(
-                    None,  # Use default thread pool executor
-                    self.client.scrape,
-                    config
-                )
+                response: ScrapeApiResponse = await self.client.async_scrape(config)
                 
-                # Debug logging for thread pool response
                 if response is None:
-                    logger.error(f"Thread pool returned None response for {url}")
+                    logger.error(f"Scrapfly returned None response for {url}")
                     return None, {
                         'tier': tier,
                         'status_code': None,
                         'success': False,
-                        'error': 'Thread pool returned None response',
+                        'error': 'Scrapfly returned None response',
                         'cost': 0,
                         'url': url
                     }
                     
+            except (UpstreamHttpClientError, UpstreamHttpServerError, ScrapflyScrapeError):
+                raise
             except Exception as e:
                 logger.error(f"Scrapfly request failed for {url} (tier {tier}): {str(e)}")
+                self._record_failure()
                 return None, {
                     'tier': tier,
                     'status_code': None,
@@ -311,7 +392,7 @@ class ScrapflyWebScraper:
             
         except UpstreamHttpClientError as e:
             # Track failed request
-            self.failed_requests.append(datetime.now())
+            self._record_failure()
             
             return None, {
                 'tier': tier,
@@ -324,7 +405,7 @@ class ScrapflyWebScraper:
             
         except UpstreamHttpServerError as e:
             # Track failed request
-            self.failed_requests.append(datetime.now())
+            self._record_failure()
             
             return None, {
                 'tier': tier,
@@ -337,7 +418,7 @@ class ScrapflyWebScraper:
             
         except ScrapflyScrapeError as e:
             # Track failed request
-            self.failed_requests.append(datetime.now())
+            self._record_failure()
             
             # Check if it's a 429 throttling error
             if "429" in str(e) or "throttled" in str(e).lower():
@@ -356,7 +437,7 @@ class ScrapflyWebScraper:
             
         except Exception as e:
             # Track failed request
-            self.failed_requests.append(datetime.now())
+            self._record_failure()
             
             # Check if it's a 429 throttling error
             if "429" in str(e) or "throttled" in str(e).lower():
@@ -372,9 +453,6 @@ class ScrapflyWebScraper:
                 'cost': 0,
                 'url': url
             }
-        finally:
-            # Always decrement concurrent request counter
-            self.concurrent_requests = max(0, self.concurrent_requests - 1)
     
     def _get_tier_config(self, url: str, tier: int) -> ScrapeConfig:
         """
@@ -447,27 +525,8 @@ class ScrapflyWebScraper:
             Optimal starting tier (1, 2, or 3)
         """
         try:
-            # Query tier history directly from Supabase
-            response = self.db_service.supabase.table('scrapfly_tier_history') \
-                .select('successful_tier, success_count, last_success_at') \
-                .eq('domain', domain) \
-                .order('last_success_at', desc=True) \
-                .limit(1) \
-                .execute()
-            
-            if response.data and len(response.data) > 0:
-                history = response.data[0]
-                success_count = history.get('success_count', 0)
-                successful_tier = history.get('successful_tier', 1)
-                
-                # If tier has been successful 3+ times, start there
-                if success_count >= 3:
-                    logger.info(f"📊 Using learned tier {successful_tier} for {domain} ({success_count} successes)")
-                    return successful_tier
-            
-            # Default to Tier 1 for new domains
-            return 1
-            
+            # Served from the in-memory tier history (loaded once per process/batch)
+            return await self.tier_cache.get_optimal_tier(domain)
         except Exception as e:
             logger.warning(f"Error getting optimal tier for {domain}: {str(e)}")
             return 1
@@ -482,37 +541,8 @@ class ScrapflyWebScraper:
             metadata: Response metadata
         """
         try:
-            from datetime import datetime
-            
-            # Try to upsert tier history using Supabase upsert
-            data = {
-                'domain': domain,
-                'successful_tier': tier,
-                'success_count': 1,
-                'last_success_at': datetime.utcnow().isoformat()
-            }
-            
-            # First check if record exists
-            existing = self.db_service.supabase.table('scrapfly_tier_history') \
-                .select('success_count') \
-                .eq('domain', domain) \
-                .execute()
-            
-            if existing.data:
-                # Update existing record
-                current_count = existing.data[0].get('success_count', 0)
-                data['success_count'] = current_count + 1
-                
-                self.db_service.supabase.table('scrapfly_tier_history') \
-                    .update(data) \
-                    .eq('domain', domain) \
-                    .execute()
-            else:
-                # Insert new record
-                self.db_service.supabase.table('scrapfly_tier_history') \
-                    .insert(data) \
-                    .execute()
-            
+            # Buffered in memory and written back in bulk by the tier history cache
+            self.tier_cache.record_success(domain, tier)
             logger.debug(f"📊 Recorded tier {tier} success for {domain}")
             
         except Exception as e:
@@ -550,7 +580,8 @@ class ScrapflyWebScraper:
             if machine_id:
                 data['machine_id'] = machine_id
             
-            self.db_service.supabase.table('scrapfly_credit_log') \
+            # Async client - a blocking insert here would stall every batch worker on the loop
+            await self.db_service.rest.table('scrapfly_credit_log') \
                 .insert(data) \
                 .execute()
             
@@ -0,0 +1,155 @@
+"""
+Compiled index over site-specific extraction rules.
+Built once at import so per-page rule resolution is a dictionary lookup plus a short trie walk.
+"""
+
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+
+class MachinePatternTrie:
+    """
+    Character trie over lowercase machine patterns.
+
+    find_all walks the trie from every position of the machine name, so every pattern that
+    occurs as a substring is found in one pass regardless of how many patterns a site has.
+    """
+
+    def __init__(self, patterns: List[str]):
+        """
+        Build the trie.
+
+        Args:
+            patterns: Lowercase patterns; the index of each pattern is what find_all reports
+        """
+        self._root: Dict = {}
+        for index, pattern in enumerate(patterns):
+            node = self._root
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(index)
+
+    def find_all(self, text: str) -> List[int]:
+        """Return the indices of every pattern occurring in text."""
+        found = []
+        for start in range(len(text)):
+            node = self._root
+            for char in text[start:]:
+                node = node.get(char)
+                if node is None:
+                    break
+                if None in node:
+                    found.extend(node[None])
+        return found
+
+
+class CompiledDomainRules:
+    """Site rules for one domain with machine-specific overrides pre-merged."""
+
+    def __init__(self, domain: str, site_rule: Dict):
+        self.domain = domain
+        self.site_rule = MappingProxyType(dict(site_rule))
+
+        # Longest pattern first; ties keep rule-file order (matches the old sorted() scan)
+        machine_rules = site_rule.get('machine_specific_rules', {})
+        ordered = sorted(enumerate(machine_rules.items()), key=lambda item: (-len(item[1][0]), item[0]))
+
+        self.patterns: List[str] = [pattern for _, (pattern, _) in ordered]
+        self.url_patterns: List[Tuple[str, ...]] = [tuple(rules.get('url_patterns', [])) for _, (_, rules) in ordered]
+        self.merged: List[Mapping] = [MappingProxyType(merge_machine_rules(site_rule, rules)) for _, (_, rules) in ordered]
+        self.matcher = MachinePatternTrie([pattern.lower() for pattern in self.patterns])
+
+    def match(self, machine_name: str, url: str) -> Optional[int]:
+        """
+        Find the machine-specific rule for a machine and URL.
+
+        Args:
+            machine_name: Machine name from the database
+            url: Product URL
+
+        Returns:
+            Index of the longest matching pattern whose URL patterns also match, or None
+        """
+        if not self.patterns or not machine_name:
+            return None
+
+        url_lower = (url or '').lower()
+        for index in sorted(set(self.matcher.find_all(machine_name.lower()))):
+            url_patterns = self.url_patterns[index]
+            if url_patterns and any(pattern in url_lower for pattern in url_patterns):
+                return index
+        return None
+
+
+def merge_machine_rules(site_rule: Dict, specific_rules: Dict) -> Dict:
+    """
+    Merge a machine-specific rule into its site rule.
+
+    Args:
+        site_rule: Domain-level rule
+        specific_rules: Entry from the domain's machine_specific_rules
+
+    Returns:
+        New rule dict with the machine's overrides applied
+    """
+    merged = dict(site_rule)
+    if 'price_selectors' in specific_rules:
+        merged['price_selectors'] = specific_rules['price_selectors']
+    if 'avoid_selectors' in specific_rules:
+        merged['avoid_selectors'] = site_rule.get('avoid_selectors', []) + specific_rules['avoid_selectors']
+    # Use historical price validation instead of hardcoded ranges
+    if 'avoid_meta_tags' in specific_rules:
+        merged['avoid_meta_tags'] = specific_rules['avoid_meta_tags']
+    if 'requires_dynamic' in specific_rules:
+        merged['requires_dynamic'] = specific_rules['requires_dynamic']
+    if 'variant_detection_rules' in specific_rules:
+        merged['variant_detection_rules'] = specific_rules['variant_detection_rules']
+    return merged
+
+
+class SiteRulesIndex:
+    """Immutable domain -> CompiledDomainRules index with memoized rule resolution."""
+
+    def __init__(self, site_rules: Dict[str, Dict], cache_size: int = 4096):
+        """
+        Compile every domain's rules.
+
+        Args:
+            site_rules: Raw rules keyed by domain (without 'www.')
+            cache_size: Number of (domain, machine, url) resolutions to memoize
+        """
+        self.domains: Mapping[str, CompiledDomainRules] = MappingProxyType({
+            domain: CompiledDomainRules(domain, rule) for domain, rule in site_rules.items()
+        })
+        self._resolve = lru_cache(maxsize=cache_size)(self._resolve_uncached)
+
+    def __contains__(self, domain: str) -> bool:
+        return domain in self.domains
+
+    def _resolve_uncached(self, domain: str, machine_name: str, url: str) -> Tuple[Optional[Mapping], Optional[str]]:
+        compiled = self.domains.get(domain)
+        if compiled is None:
+            return None, None
+        index = compiled.match(machine_name, url)
+        if index is None:
+            return compiled.site_rule, None
+        return compiled.merged[index], compiled.patterns[index]
+
+    def resolve(self, domain: str, machine_name: Optional[str], url: Optional[str]) -> Tuple[Optional[Mapping], Optional[str]]:
+        """
+        Resolve the effective rules for a machine page.
+
+        Args:
+            domain: Domain without 'www.' prefix
+            machine_name: Machine name (may be empty)
+            url: Product URL
+
+        Returns:
+            Tuple of (read-only rules or None if the domain has no rules, matched machine pattern or None)
+        """
+        return self._resolve(domain, machine_name or '', url or '')
+
+    def cache_info(self):
+        """lru_cache statistics for rule resolution."""
+        return self._resolve.cache_info()
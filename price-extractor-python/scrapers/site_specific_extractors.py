@@ -3,111 +3,25 @@ Site-specific price extraction rules to fix common extraction failures.
 This module provides enhanced extraction logic for specific domains.
 """
 
+import copy
 import json
 import re
 from urllib.parse import urlparse
 from loguru import logger
 
+from scrapers.site_rules_index import SiteRulesIndex
+from scrapers.resource_blocker import merge_resource_policy
 
-class SiteSpecificExtractor:
-    """Enhanced price extractor with site-specific rules."""
-    
-    def __init__(self):
-        self.site_rules = {
-            'commarker.com': {
-                'type': 'woocommerce',
-                'machine_specific_rules': {
-                    # Machine-specific rules for problematic ComMarker machines
-                    'ComMarker B6 MOPA 60W': {
-                        'url_patterns': ['/commarker-b6-jpt-mopa', '/b6-mopa'],
-                        'price_selectors': [
-                            # PRIORITIZE sale prices - ComMarker runs frequent sales
-                            '.entry-summary .price ins .amount',  # Sale price in <ins> tag (highest priority)
-                            '.product-summary .price ins .amount',  # Sale price in product summary
-                            '.single-product-content .price ins .amount',
-                            'form.cart .price ins .amount',
-                            
-                            # Target main product price area (regular prices)
-                            '.entry-summary .price .amount:last-child',
-                            '.product-summary .price .amount:last-child',
-                            '.woocommerce-product-details-short .price .woocommerce-Price-amount.amount',
-                            '.product-price .price .amount',
-                            '.single-product .price .amount'
-                        ],
-                        'avoid_selectors': [
-                            '.bundle-price',  # Avoid bundle pricing
-                            '.package-price',
-                            '.related .price',
-                            '.upsell .price',
-                            '.cross-sell .price',
-                            '.package-selection .price',  # Avoid package selection prices
-                            '.bundle-selection .price',
-                            '.selected-package .price'
-                        ],
-                        'requires_dynamic': True  # May need variant selection for exact match
-                    },
-                    'ComMarker B4 100W MOPA': {
-                        'url_patterns': ['/b4-100w-jpt-mopa', '/b4-100w'],
-                        'price_selectors': [
-                            '.entry-summary .price ins .amount',  # Prioritize sale price
-                            '[data-price]',  # Data attribute method that worked
-                            '.product-summary .price ins .amount'
-                        ],
-                        'avoid_data_price_contamination': True
-                    },
-                    'ComMarker B6 30W': {
-                        'url_patterns': ['/commarker-b6', '/b6-30w'],
-                        'requires_dynamic': True,  # MUST select 30W variant first
-                        'variant_selection': {
-                            'wattage_selector': 'input[value="30W"]',  # Select 30W radio button
-                            'wait_for_update': '.wd-swatch-tooltip .price',  # Wait for bundle prices to update
-                        },
-                        'price_selectors': [
-                            # PRIORITY: Look for sale price first (ins tag)
-                            '.price ins .woocommerce-Price-amount bdi',
-                            'ins .woocommerce-Price-amount bdi',
-                            '.price ins .amount bdi',
-                            # Then try bundle-specific selectors
-                            '.wd-swatch-tooltip:has(.wd-swatch-text:contains("B6 Basic Bundle")) .price ins bdi',
-                            '.wd-swatch-tooltip:has(.wd-swatch-text:contains("B6 Basic Bundle")) .price bdi',
-                            # Fallback to variation price
-                            '.single_variation_wrap .price ins .amount',
-                            '.variations_form .price ins .amount'
-                        ],
-                        'prefer_contexts': [
-                            'wd-swatch-tooltip', 'wd-swatch-info'
-                        ],
-                        'avoid_selectors': [
-                            '.entry-summary > .price',  # AVOID header price (static 20W price)
-                            '.summary > .price',  # AVOID summary header price
-                            '.saveprice',  # Avoid discount/savings amounts
-                            '.product-navigation',  # Avoid header/navigation prices
-                            'header .price'  # Avoid any header prices
-                        ],
-                        'price_validation': {
-                            'min': 2300,  # ComMarker B6 30W should be at least $2300
-                            'max': 2500   # And no more than $2500
-                        },
-                        'notes': 'MUST select 30W variant then extract B6 Basic Bundle price ($2,399). Header shows static 20W price.'
-                    }
-                },
-                'avoid_contexts': [
-                    'related-products', 'cross-sells', 'up-sells', 
-                    'product-recommendations', 'comparison', 'bundle', 'package',
-                    'accessories', 'addons', 'extras', 'upsell-products',
-                    'related_products', 'cross-sell-products'
-                ],
-                'avoid_selectors': [
-                    '.bundle-price', '.bundle-price *', '.package-price', '.package-price *',
-                    '.addon-price', '.extra-price', '.accessories-price',
-                    '.cross-sell', '.up-sell', '.related', '.recommendation',
-                    '.upsell-products', '.related_products', '.cross-sell-products',
-                    'section.related', 'section.upsell', '.woocommerce-Tabs-panel'
-                ],
-                'prefer_contexts': [
-                    'product-summary', 'single-product', 'product-main',
-                    'woocommerce-product-details', 'entry-summary', 'product-price-wrapper'
-                ],
+
+# Extraction rules keyed by domain (without 'www.'). Compiled once into SITE_RULES_INDEX below.
+SITE_RULES = {
+    'commarker.com': {
+        'type': 'woocommerce',
+        'fetch_policy': {'max_concurrent': 2, 'min_interval': 1.0},  # Many variant machines share pages
+        'machine_specific_rules': {
+            # Machine-specific rules for problematic ComMarker machines
+            'ComMarker B6 MOPA 60W': {
+                'url_patterns': ['/commarker-b6-jpt-mopa', '/b6-mopa'],
                 'price_selectors': [
                     # PRIORITIZE sale prices - ComMarker runs frequent sales
                     '.entry-summary .price ins .amount',  # Sale price in <ins> tag (highest priority)
@@ -115,805 +29,936 @@ class SiteSpecificExtractor:
                     '.single-product-content .price ins .amount',
                     'form.cart .price ins .amount',
                     
-                    # Regular prices as fallback
-                    '.product-summary .price .amount:last-child',
+                    # Target main product price area (regular prices)
                     '.entry-summary .price .amount:last-child',
-                    
-                    # Fallback to basic price structure (avoid bundle contexts)
-                    '.product-price .amount:last-child',
-                    '.woocommerce-Price-amount:last-child',
-                    '.price-current .amount',
-                ],
-                'blacklist_selectors': [
-                    # Comprehensive bundle pricing blacklist
-                    '.bundle-price', '.bundle-price .main-amount', '.bundle-price *',
-                    '.package-price', '.package-price *', '.combo-price', '.combo-price *',
-                    '.package-selection .price', '.package-selection .amount',
-                    '.selected-package .price', '.selected-package .amount',
-                    '.basic-bundle .price', '.standard-bundle .price', '.premium-bundle .price',
-                    '.bundle-option .price', '.package-option .price',
-                    '.upsell-products .price', '.related_products .price',
-                    # Blacklist learned selectors that commonly extract wrong prices
-                    '.price[data-bundle]', '.amount[data-package]'
-                ],
-                'strict_validation': True,  # Enable strict price validation
-                'requires_dynamic': True,  # Re-enable dynamic extraction for variant selection
-                'prioritize_sale_prices': True,  # New flag to prioritize <ins> tags
-            },
-            
-            'store.commarker.com': {
-                'type': 'shopify',
-                'requires_variant_detection': True,
-                'machine_specific_rules': {
-                    'ComMarker B4 100W MOPA': {
-                        'url_patterns': ['/b4-jpt-mopa-fiber-laser-engraver'],
-                        'variant_keywords': ['100W', 'MOPA', '100 W'],
-                        'base_price_range': [6000, 7000],
-                        'expected_price': 6666.00
-                    },
-                    'ComMarker B6 MOPA 20W': {
-                        'url_patterns': ['/b6-jpt-mopa-fiber-laser-engraver'],
-                        'variant_keywords': ['20W', 'MOPA', '20 W', 'Basic'],
-                        'base_price_range': [3000, 4000],
-                        'expected_price': 3059.00
-                    },
-                    'ComMarker B6 MOPA 30W': {
-                        'url_patterns': ['/b6-jpt-mopa-fiber-laser-engraver'],
-                        'variant_keywords': ['30W', 'MOPA', '30 W'],
-                        'base_price_range': [3500, 4500],
-                        'expected_price': 3699.00
-                    },
-                    'ComMarker B6 MOPA 60W': {
-                        'url_patterns': ['/b6-jpt-mopa-fiber-laser-engraver'],
-                        'variant_keywords': ['60W', 'MOPA', '60 W'],
-                        'base_price_range': [4500, 5500],
-                        'expected_price': 4999.00
-                    },
-                    'ComMarker B4 20W': {
-                        'url_patterns': ['/b4-fiber-laser-engraver'],
-                        'variant_keywords': ['20W', '20 W', 'Without rotary'],
-                        'base_price_range': [1400, 1600],
-                        'expected_price': 1499.00
-                    },
-                    'ComMarker B4 30W': {
-                        'url_patterns': ['/b4-fiber-laser-engraver'],
-                        'variant_keywords': ['30W', '30 W', 'Without rotary'],
-                        'base_price_range': [1700, 1900],
-                        'expected_price': 1799.00
-                    },
-                    'ComMarker B6 20W': {
-                        'url_patterns': ['/b6-metal-fiber-laser-engraver'],
-                        'variant_keywords': ['20W', '20 W', 'Without rotary'],
-                        'base_price_range': [2100, 2300],
-                        'expected_price': 2199.00
-                    },
-                    'ComMarker B6 30W': {
-                        'url_patterns': ['/b6-metal-fiber-laser-engraver'],
-                        'variant_keywords': ['30W', '30 W', 'Without rotary'],
-                        'base_price_range': [2300, 2500],
-                        'expected_price': 2399.00
-                    }
-                },
-                'price_selectors': [
-                    # Shopify variant prices
-                    '.price__current .money',
-                    '.price-item--regular .money',
-                    '.price .money',
-                    '.product-price .money',
-                    'span.money',
-                    '.price__current',
-                    '.price-item--regular',
-                    # Fallback selectors
-                    '[data-price]',
-                    '.product-price-current'
+                    '.product-summary .price .amount:last-child',
+                    '.woocommerce-product-details-short .price .woocommerce-Price-amount.amount',
+                    '.product-price .price .amount',
+                    '.single-product .price .amount'
                 ],
                 'avoid_selectors': [
-                    '.price--compare .money',  # Compare at prices
-                    '.price-item--compare .money',  # Compare prices
-                    '.bundle-price *',  # Bundle pricing
-                    '.cart-item .money'  # Cart items
-                ],
-                'variant_selectors': [
-                    'input[name="id"][value*="20W"]',
-                    'input[name="id"][value*="30W"]', 
-                    'input[name="id"][value*="60W"]',
-                    'input[name="id"][value*="100W"]',
-                    'select[data-variant] option',
-                    '.product-variant-option input'
+                    '.bundle-price',  # Avoid bundle pricing
+                    '.package-price',
+                    '.related .price',
+                    '.upsell .price',
+                    '.cross-sell .price',
+                    '.package-selection .price',  # Avoid package selection prices
+                    '.bundle-selection .price',
+                    '.selected-package .price'
                 ],
-                'prefer_json_ld': True,
-                'json_ld_paths': [
-                    'hasVariant.offers.price',
-                    'offers.price',
-                    'price'
-                ]
+                'requires_dynamic': True  # May need variant selection for exact match
             },
-            
-            'cloudraylaser.com': {
-                'type': 'shopify',
-                'avoid_selectors': [
-                    '[name*="items"] [data-price]',  # Addon form elements
-                    '.product-form [data-price]',    # Form controls
-                    'select [data-price]',           # Dropdown options
-                    'option[data-price]',            # Variant option elements
-                    '.hdt-select [data-price]',      # Custom select widgets
-                    '[data-price*="W"]',             # Wattage options (100W, 50W, etc)
-                    '[data-price*="nm"]',            # Wavelength options (1064nm, etc)
-                    'input[data-price]',             # Input elements with prices
-                    '.product-form__input [data-price]',  # Form inputs
-                    '.variant-selector [data-price]', # Variant selectors
-                    '.product-form__buttons [data-price]',  # Button price data
-                    # IMPORTANT: Avoid bundle/total prices
-                    '.product-bundle-total [data-price]',  # Bundle total
-                    '.total-price [data-price]',  # Total price
-                    '[data-price]:last-of-type'  # Often the bundle total
-                ],
-                'prefer_json_ld': True,
-                'json_ld_paths': [
-                    'hasVariant.0.offers.price',
-                    'offers.price',
-                    'price'
-                ],
+            'ComMarker B4 100W MOPA': {
+                'url_patterns': ['/b4-100w-jpt-mopa', '/b4-100w'],
                 'price_selectors': [
-                    # Primary price display areas - individual machine price
-                    '.price__container .price__regular .price-item--regular',
-                    '.price__container .price-item--sale',
-                    '.product__price .price-item--regular',
-                    '.product__price .price-item--sale',
-                    
-                    # Individual product price (NOT bundle)
-                    '.price:not(.total-price):not(.bundle-price) [data-price]',
-                    '.product-single__price [data-price]',
-                    
-                    # Fallback selectors
-                    '.product-price .price',
-                    '.price-current', 
-                    '.product__price'
+                    '.entry-summary .price ins .amount',  # Prioritize sale price
+                    '[data-price]',  # Data attribute method that worked
+                    '.product-summary .price ins .amount'
                 ],
-                'price_validation': {
-                    'min': 2000,  # CloudRay machines are expensive (minimum $2000, base prices start ~$2599)
-                    'max': 50000  # Maximum reasonable price
-                }
+                'avoid_data_price_contamination': True
             },
-            
-            'xtool.com': {
-                'type': 'anniversary_sale',
-                'anniversary_pricing': True,
+            'ComMarker B6 30W': {
+                'url_patterns': ['/commarker-b6', '/b6-30w'],
+                'requires_dynamic': True,  # MUST select 30W variant first
+                'variant_selection': {
+                    'wattage_selector': 'input[value="30W"]',  # Select 30W radio button
+                    'wait_for_update': '.wd-swatch-tooltip .price',  # Wait for bundle prices to update
+                },
                 'price_selectors': [
-                    # Priority 1: Look for Final Price (Anniversary sale specific)
-                    '.price-wrapper span:contains("Final Price") + span',
-                    'span:contains("$1,149")',  # Specific for M1 Ultra final price
-                    'span:contains("$3,599")',  # Specific for P2S final price
-                    
-                    # Priority 2: Sale/anniversary prices
-                    '.price--on-sale .money',
-                    '.product__price--sale',
-                    '.anniversary-price',
-                    '.special-price',
-                    
-                    # Priority 3: Standard Shopify price selectors
-                    '.product__price .price__current',
-                    '.price__current .money',
-                    '.product-price-current',
-                    'meta[property="product:price:amount"]'
+                    # PRIORITY: Look for sale price first (ins tag)
+                    '.price ins .woocommerce-Price-amount bdi',
+                    'ins .woocommerce-Price-amount bdi',
+                    '.price ins .amount bdi',
+                    # Then try bundle-specific selectors
+                    '.wd-swatch-tooltip:has(.wd-swatch-text:contains("B6 Basic Bundle")) .price ins bdi',
+                    '.wd-swatch-tooltip:has(.wd-swatch-text:contains("B6 Basic Bundle")) .price bdi',
+                    # Fallback to variation price
+                    '.single_variation_wrap .price ins .amount',
+                    '.variations_form .price ins .amount'
+                ],
+                'prefer_contexts': [
+                    'wd-swatch-tooltip', 'wd-swatch-info'
                 ],
                 'avoid_selectors': [
-                    '.price--compare',  # Original/compare prices
-                    '.was-price',
-                    '.original-price',
-                    'del .money'  # Struck-through prices
+                    '.entry-summary > .price',  # AVOID header price (static 20W price)
+                    '.summary > .price',  # AVOID summary header price
+                    '.saveprice',  # Avoid discount/savings amounts
+                    '.product-navigation',  # Avoid header/navigation prices
+                    'header .price'  # Avoid any header prices
                 ],
-                'price_extraction_strategy': 'anniversary_final',  # Special handling for anniversary sales
-                'validation': {
-                    'prefer_lower_price': True,  # When multiple prices exist, prefer the lower one
-                    'look_for_keywords': ['Final Price', 'Material Discount', 'Anniversary']
-                }
+                'price_validation': {
+                    'min': 2300,  # ComMarker B6 30W should be at least $2300
+                    'max': 2500   # And no more than $2500
+                },
+                'notes': 'MUST select 30W variant then extract B6 Basic Bundle price ($2,399). Header shows static 20W price.'
+            }
+        },
+        'avoid_contexts': [
+            'related-products', 'cross-sells', 'up-sells', 
+            'product-recommendations', 'comparison', 'bundle', 'package',
+            'accessories', 'addons', 'extras', 'upsell-products',
+            'related_products', 'cross-sell-products'
+        ],
+        'avoid_selectors': [
+            '.bundle-price', '.bundle-price *', '.package-price', '.package-price *',
+            '.addon-price', '.extra-price', '.accessories-price',
+            '.cross-sell', '.up-sell', '.related', '.recommendation',
+            '.upsell-products', '.related_products', '.cross-sell-products',
+            'section.related', 'section.upsell', '.woocommerce-Tabs-panel'
+        ],
+        'prefer_contexts': [
+            'product-summary', 'single-product', 'product-main',
+            'woocommerce-product-details', 'entry-summary', 'product-price-wrapper'
+        ],
+        'price_selectors': [
+            # PRIORITIZE sale prices - ComMarker runs frequent sales
+            '.entry-summary .price ins .amount',  # Sale price in <ins> tag (highest priority)
+            '.product-summary .price ins .amount',  # Sale price in product summary
+            '.single-product-content .price ins .amount',
+            'form.cart .price ins .amount',
+            
+            # Regular prices as fallback
+            '.product-summary .price .amount:last-child',
+            '.entry-summary .price .amount:last-child',
+            
+            # Fallback to basic price structure (avoid bundle contexts)
+            '.product-price .amount:last-child',
+            '.woocommerce-Price-amount:last-child',
+            '.price-current .amount',
+        ],
+        'blacklist_selectors': [
+            # Comprehensive bundle pricing blacklist
+            '.bundle-price', '.bundle-price .main-amount', '.bundle-price *',
+            '.package-price', '.package-price *', '.combo-price', '.combo-price *',
+            '.package-selection .price', '.package-selection .amount',
+            '.selected-package .price', '.selected-package .amount',
+            '.basic-bundle .price', '.standard-bundle .price', '.premium-bundle .price',
+            '.bundle-option .price', '.package-option .price',
+            '.upsell-products .price', '.related_products .price',
+            # Blacklist learned selectors that commonly extract wrong prices
+            '.price[data-bundle]', '.amount[data-package]'
+        ],
+        'strict_validation': True,  # Enable strict price validation
+        'requires_dynamic': True,  # Re-enable dynamic extraction for variant selection
+        'prioritize_sale_prices': True,  # New flag to prioritize <ins> tags
+    },
+    
+    'store.commarker.com': {
+        'type': 'shopify',
+        'fetch_policy': {'max_concurrent': 2, 'min_interval': 1.0},
+        'requires_variant_detection': True,
+        'machine_specific_rules': {
+            'ComMarker B4 100W MOPA': {
+                'url_patterns': ['/b4-jpt-mopa-fiber-laser-engraver'],
+                'variant_keywords': ['100W', 'MOPA', '100 W'],
+                'base_price_range': [6000, 7000],
+                'expected_price': 6666.00
             },
-            
-            'acmerlaser.com': {
-                'type': 'custom',
-                'price_selectors': [
-                    '.product-price-wrapper .price',
-                    '.current-price',
-                    '.sale-price'
-                ],
-                'avoid_contexts': ['recommended', 'related']
+            'ComMarker B6 MOPA 20W': {
+                'url_patterns': ['/b6-jpt-mopa-fiber-laser-engraver'],
+                'variant_keywords': ['20W', 'MOPA', '20 W', 'Basic'],
+                'base_price_range': [3000, 4000],
+                'expected_price': 3059.00
             },
-            
-            'aeonlaser.us': {
-                'type': 'configurator',
-                'requires_interaction': True,
-                'requires_dynamic': False,  # Now redirects to emplaser.com with static table
-                'redirect_to': 'emplaser.com',  # Site redirects to emplaser.com
-                'price_selectors': [
-                    '.total b',  # Final configurator total
-                    '.tot-price .total',  # Alternative total selector
-                    '.price strong',  # Starting price display
-                    '.selected .price'  # Selected option price
-                ],
-                'configurator_selectors': {
-                    'model_step': 'li.js-option.js-radio',
-                    'model_options': '.option-label',
-                    'total_display': '.total, .tot-price'
-                },
-                'variant_detection_rules': {
-                    'EMP ST30R': {
-                        'keywords': ['ST30R', 'ST 30R', '30R'],
-                        'price_tolerance': 0.1,  # 10% tolerance
-                        'variant_selector': 'li.js-option.js-radio:contains("ST30R"), li.js-option.js-radio:contains("ST 30R")',
-                    },
-                    'EMP ST50R': {
-                        'keywords': ['ST50R', 'ST 50R'],  # Removed risky '50R' keyword
-                        'price_tolerance': 0.1,
-                        'variant_selector': 'li.js-option.js-radio:contains("ST50R"), li.js-option.js-radio:contains("ST 50R")',
-                    },
-                    'EMP ST60J': {
-                        'keywords': ['ST60J', 'ST 60J', '60J'],
-                        'price_tolerance': 0.1,
-                        'variant_selector': 'li.js-option.js-radio:contains("ST60J"), li.js-option.js-radio:contains("ST 60J")',
-                    },
-                    'EMP ST100J': {
-                        'keywords': ['ST100J', 'ST 100J', '100J'],
-                        'price_tolerance': 0.1,
-                        'variant_selector': 'li.js-option.js-radio:contains("ST100J"), li.js-option.js-radio:contains("ST 100J")',
-                    }
-                },
-                'variant_matching_strategy': 'keyword_based',  # Match machine name to variant keywords
-                'fallback_patterns': [
-                    r'ST30R[\s\S]*?\$?([\d,]+)',  # Find ST30R followed by price
-                    r'ST50R[\s\S]*?\$?([\d,]+)',  # Find ST50R followed by price
-                    r'ST60J[\s\S]*?\$?([\d,]+)',  # Find ST60J followed by price
-                    r'ST100J[\s\S]*?\$?([\d,]+)'  # Find ST100J followed by price
-                ]
+            'ComMarker B6 MOPA 30W': {
+                'url_patterns': ['/b6-jpt-mopa-fiber-laser-engraver'],
+                'variant_keywords': ['30W', 'MOPA', '30 W'],
+                'base_price_range': [3500, 4500],
+                'expected_price': 3699.00
             },
-            
-            'emplaser.com': {
-                'type': 'static_table',
-                'requires_dynamic': False,  # Price table is in static HTML
-                'machine_specific_rules': {
-                    # EMP machines with static price table
-                    'EMP ST30R': {
-                        'keywords': ['ST30R', 'ST 30R', '30R'],
-                        'table_column': 0,  # First price column
-                    },
-                    'EMP ST50R': {
-                        'keywords': ['ST50R', 'ST 50R'],  # Removed risky '50R' keyword
-                        'table_column': 2,                 # Corrected column (was 3, now 2)
-                    },
-                    'EMP ST60J': {
-                        'keywords': ['ST60J', 'ST 60J', '60J'],
-                        'table_column': 4,  # Fixed: Column 4 = $8995, Column 5 was $11995
-                    },
-                    'EMP ST100J': {
-                        'keywords': ['ST100J', 'ST 100J', '100J'],
-                        'table_column': 5,  # Column 5 = $11,995 (was incorrectly 6 which had warranty prices)
-                    },
-                    'EMP ST30J': {
-                        'keywords': ['ST30J', 'ST 30J'],
-                        'table_column': 3,  # Fourth price column
+            'ComMarker B6 MOPA 60W': {
+                'url_patterns': ['/b6-jpt-mopa-fiber-laser-engraver'],
+                'variant_keywords': ['60W', 'MOPA', '60 W'],
+                'base_price_range': [4500, 5500],
+                'expected_price': 4999.00
+            },
+            'ComMarker B4 20W': {
+                'url_patterns': ['/b4-fiber-laser-engraver'],
+                'variant_keywords': ['20W', '20 W', 'Without rotary'],
+                'base_price_range': [1400, 1600],
+                'expected_price': 1499.00
+            },
+            'ComMarker B4 30W': {
+                'url_patterns': ['/b4-fiber-laser-engraver'],
+                'variant_keywords': ['30W', '30 W', 'Without rotary'],
+                'base_price_range': [1700, 1900],
+                'expected_price': 1799.00
+            },
+            'ComMarker B6 20W': {
+                'url_patterns': ['/b6-metal-fiber-laser-engraver'],
+                'variant_keywords': ['20W', '20 W', 'Without rotary'],
+                'base_price_range': [2100, 2300],
+                'expected_price': 2199.00
+            },
+            'ComMarker B6 30W': {
+                'url_patterns': ['/b6-metal-fiber-laser-engraver'],
+                'variant_keywords': ['30W', '30 W', 'Without rotary'],
+                'base_price_range': [2300, 2500],
+                'expected_price': 2399.00
+            }
+        },
+        'price_selectors': [
+            # Shopify variant prices
+            '.price__current .money',
+            '.price-item--regular .money',
+            '.price .money',
+            '.product-price .money',
+            'span.money',
+            '.price__current',
+            '.price-item--regular',
+            # Fallback selectors
+            '[data-price]',
+            '.product-price-current'
+        ],
+        'avoid_selectors': [
+            '.price--compare .money',  # Compare at prices
+            '.price-item--compare .money',  # Compare prices
+            '.bundle-price *',  # Bundle pricing
+            '.cart-item .money'  # Cart items
+        ],
+        'variant_selectors': [
+            'input[name="id"][value*="20W"]',
+            'input[name="id"][value*="30W"]', 
+            'input[name="id"][value*="60W"]',
+            'input[name="id"][value*="100W"]',
+            'select[data-variant] option',
+            '.product-variant-option input'
+        ],
+        'prefer_json_ld': True,
+        'json_ld_paths': [
+            'hasVariant.offers.price',
+            'offers.price',
+            'price'
+        ]
+    },
+    
+    'cloudraylaser.com': {
+        'type': 'shopify',
+        'fetch_policy': {'max_concurrent': 2, 'min_interval': 1.0},
+        'avoid_selectors': [
+            '[name*="items"] [data-price]',  # Addon form elements
+            '.product-form [data-price]',    # Form controls
+            'select [data-price]',           # Dropdown options
+            'option[data-price]',            # Variant option elements
+            '.hdt-select [data-price]',      # Custom select widgets
+            '[data-price*="W"]',             # Wattage options (100W, 50W, etc)
+            '[data-price*="nm"]',            # Wavelength options (1064nm, etc)
+            'input[data-price]',             # Input elements with prices
+            '.product-form__input [data-price]',  # Form inputs
+            '.variant-selector [data-price]', # Variant selectors
+            '.product-form__buttons [data-price]',  # Button price data
+            # IMPORTANT: Avoid bundle/total prices
+            '.product-bundle-total [data-price]',  # Bundle total
+            '.total-price [data-price]',  # Total price
+            '[data-price]:last-of-type'  # Often the bundle total
+        ],
+        'prefer_json_ld': True,
+        'json_ld_paths': [
+            'hasVariant.0.offers.price',
+            'offers.price',
+            'price'
+        ],
+        'price_selectors': [
+            # Primary price display areas - individual machine price
+            '.price__container .price__regular .price-item--regular',
+            '.price__container .price-item--sale',
+            '.product__price .price-item--regular',
+            '.product__price .price-item--sale',
+            
+            # Individual product price (NOT bundle)
+            '.price:not(.total-price):not(.bundle-price) [data-price]',
+            '.product-single__price [data-price]',
+            
+            # Fallback selectors
+            '.product-price .price',
+            '.price-current', 
+            '.product__price'
+        ],
+        'price_validation': {
+            'min': 2000,  # CloudRay machines are expensive (minimum $2000, base prices start ~$2599)
+            'max': 50000  # Maximum reasonable price
+        }
+    },
+    
+    'xtool.com': {
+        'type': 'anniversary_sale',
+        'anniversary_pricing': True,
+        'price_selectors': [
+            # Priority 1: Look for Final Price (Anniversary sale specific)
+            '.price-wrapper span:contains("Final Price") + span',
+            'span:contains("$1,149")',  # Specific for M1 Ultra final price
+            'span:contains("$3,599")',  # Specific for P2S final price
+            
+            # Priority 2: Sale/anniversary prices
+            '.price--on-sale .money',
+            '.product__price--sale',
+            '.anniversary-price',
+            '.special-price',
+            
+            # Priority 3: Standard Shopify price selectors
+            '.product__price .price__current',
+            '.price__current .money',
+            '.product-price-current',
+            'meta[property="product:price:amount"]'
+        ],
+        'avoid_selectors': [
+            '.price--compare',  # Original/compare prices
+            '.was-price',
+            '.original-price',
+            'del .money'  # Struck-through prices
+        ],
+        'price_extraction_strategy': 'anniversary_final',  # Special handling for anniversary sales
+        'validation': {
+            'prefer_lower_price': True,  # When multiple prices exist, prefer the lower one
+            'look_for_keywords': ['Final Price', 'Material Discount', 'Anniversary']
+        }
+    },
+    
+    'acmerlaser.com': {
+        'type': 'custom',
+        'price_selectors': [
+            '.product-price-wrapper .price',
+            '.current-price',
+            '.sale-price'
+        ],
+        'avoid_contexts': ['recommended', 'related']
+    },
+    
+    'aeonlaser.us': {
+        'type': 'configurator',
+        'requires_interaction': True,
+        'requires_dynamic': False,  # Now redirects to emplaser.com with static table
+        'redirect_to': 'emplaser.com',  # Site redirects to emplaser.com
+        'price_selectors': [
+            '.total b',  # Final configurator total
+            '.tot-price .total',  # Alternative total selector
+            '.price strong',  # Starting price display
+            '.selected .price'  # Selected option price
+        ],
+        'configurator_selectors': {
+            'model_step': 'li.js-option.js-radio',
+            'model_options': '.option-label',
+            'total_display': '.total, .tot-price'
+        },
+        'variant_detection_rules': {
+            'EMP ST30R': {
+                'keywords': ['ST30R', 'ST 30R', '30R'],
+                'price_tolerance': 0.1,  # 10% tolerance
+                'variant_selector': 'li.js-option.js-radio:contains("ST30R"), li.js-option.js-radio:contains("ST 30R")',
+            },
+            'EMP ST50R': {
+                'keywords': ['ST50R', 'ST 50R'],  # Removed risky '50R' keyword
+                'price_tolerance': 0.1,
+                'variant_selector': 'li.js-option.js-radio:contains("ST50R"), li.js-option.js-radio:contains("ST 50R")',
+            },
+            'EMP ST60J': {
+                'keywords': ['ST60J', 'ST 60J', '60J'],
+                'price_tolerance': 0.1,
+                'variant_selector': 'li.js-option.js-radio:contains("ST60J"), li.js-option.js-radio:contains("ST 60J")',
+            },
+            'EMP ST100J': {
+                'keywords': ['ST100J', 'ST 100J', '100J'],
+                'price_tolerance': 0.1,
+                'variant_selector': 'li.js-option.js-radio:contains("ST100J"), li.js-option.js-radio:contains("ST 100J")',
+            }
+        },
+        'variant_matching_strategy': 'keyword_based',  # Match machine name to variant keywords
+        'fallback_patterns': [
+            r'ST30R[\s\S]*?\$?([\d,]+)',  # Find ST30R followed by price
+            r'ST50R[\s\S]*?\$?([\d,]+)',  # Find ST50R followed by price
+            r'ST60J[\s\S]*?\$?([\d,]+)',  # Find ST60J followed by price
+            r'ST100J[\s\S]*?\$?([\d,]+)'  # Find ST100J followed by price
+        ]
+    },
+    
+    'emplaser.com': {
+        'type': 'static_table',
+        'requires_dynamic': False,  # Price table is in static HTML
+        'machine_specific_rules': {
+            # EMP machines with static price table
+            'EMP ST30R': {
+                'keywords': ['ST30R', 'ST 30R', '30R'],
+                'table_column': 0,  # First price column
+            },
+            'EMP ST50R': {
+                'keywords': ['ST50R', 'ST 50R'],  # Removed risky '50R' keyword
+                'table_column': 2,                 # Corrected column (was 3, now 2)
+            },
+            'EMP ST60J': {
+                'keywords': ['ST60J', 'ST 60J', '60J'],
+                'table_column': 4,  # Fixed: Column 4 = $8995, Column 5 was $11995
+            },
+            'EMP ST100J': {
+                'keywords': ['ST100J', 'ST 100J', '100J'],
+                'table_column': 5,  # Column 5 = $11,995 (was incorrectly 6 which had warranty prices)
+            },
+            'EMP ST30J': {
+                'keywords': ['ST30J', 'ST 30J'],
+                'table_column': 3,  # Fourth price column
+            },
+            'EMP ST50J': {
+                'keywords': ['ST50J', 'ST 50J'],
+                'table_column': 4,  # Fifth price column
+            }
+        },
+        'price_selectors': [
+            # Table-based price extraction
+            'table tr:contains("Pricing") td',  # Price row in table
+            'tr:has(th:contains("Pricing")) td',  # Alternative table selector
+            'td:contains("$")'  # Table cells with prices
+        ],
+        'extraction_strategy': 'table_column',  # Use table column matching
+        'fallback_patterns': [
+            r'ST30R[\s\S]*?\$?([\d,]+)',  # Find ST30R followed by price
+            r'ST50R[\s\S]*?\$?([\d,]+)',  # Find ST50R followed by price
+            r'ST60J[\s\S]*?\$?([\d,]+)',  # Find ST60J followed by price
+            r'ST100J[\s\S]*?\$?([\d,]+)'  # Find ST100J followed by price
+        ]
+    },
+    
+    'shop.glowforge.com': {
+        'type': 'shopify',
+        'use_base_price': True,
+        'multi_price_strategy': 'highest_visible',
+        'price_selectors': [
+            '.price--main:not(.price--compare)',  # Main price, not comparison price
+            '.product__price .price--main',        # Product page main price
+            '[data-price]:not(.price--compare)',   # Data attribute price
+            '.price:not(.price--compare) .money'   # Money element without compare
+        ],
+        'avoid_selectors': [
+            '.price--compare',     # Old/comparison price
+            '.was-price',         # Previous price
+            'strike',             # Struck-through price
+            '.price--save',       # Savings amount
+            '.bundle-price'       # Bundle pricing
+        ],
+        'validation': {
+            'price_ranges': {
+                'plus': {'min': 4000, 'max': 5000},
+                'plus-hd': {'min': 4500, 'max': 5500},
+                'pro': {'min': 5500, 'max': 6500},
+                'pro-hd': {'min': 6500, 'max': 7500}
+            }
+        },
+        'strict_validation': True,
+        'fallback_patterns': [
+            r'starting at \$?([\d,]+)',  # "starting at $6995"
+            r'total[\s\n]*\$?([\d,]+)'   # "Total $6995"
+        ]
+    },
+    
+    'omtechlaser.com': {
+        'type': 'woocommerce',
+        'price_selectors': [
+            '.single_variation_wrap .woocommerce-variation-price .amount',
+            '.variations_form .single_variation .price .amount',
+            '.product-summary .price .amount',
+            '.summary .price .amount'
+        ],
+        'machine_specific_rules': {
+            'OMTech Pro 2440': {
+                'url_patterns': ['/omtech-pro-2440-80w-and-100w', '/pro-2440-80w-and-100w'],
+                'variant_detection_rules': {
+                    '80W': {
+                        'keywords': ['80W', '80 W', '80-watt', 'USB-2440-US'],
+                        'expected_price_range': [6000, 7000]  # 80W is $6699.99
                     },
-                    'EMP ST50J': {
-                        'keywords': ['ST50J', 'ST 50J'],
-                        'table_column': 4,  # Fifth price column
+                    '100W': {
+                        'keywords': ['100W', '100 W', '100-watt', 'USB-2440-U1'],
+                        'expected_price_range': [7000, 8000]  # 100W is $7599.99
                     }
                 },
+                'variant_matching_strategy': 'wattage_based',
+                'requires_dynamic': True,  # May need dynamic selection for variants
+                'notes': 'Pro 2440 comes in 80W and 100W variants on same page'
+            }
+        },
+        'avoid_selectors': [
+            '.bundle-price',
+            '.package-price',
+            '.addon-price'
+        ]
+    },
+    
+    'xtool.com': {
+        'type': 'shopify',
+        'fetch_policy': {'max_concurrent': 2, 'min_interval': 1.0},  # Throttles quickly on variant pages
+        'avoid_meta_tags': True,  # Meta tags often inaccurate for xTool
+        'requires_dynamic': True,  # Better extraction with dynamic scraper
+        'machine_specific_rules': {
+            # Machine-specific URL patterns and extraction rules
+            'xTool S1': {
+                'url_patterns': ['/s1', '/xtool-s1'],
+                'avoid_meta_tags': True,  # Meta tags show wrong 10W price
+                'requires_dynamic': True,  # Need dynamic scraper to get correct variant
                 'price_selectors': [
-                    # Table-based price extraction
-                    'table tr:contains("Pricing") td',  # Price row in table
-                    'tr:has(th:contains("Pricing")) td',  # Alternative table selector
-                    'td:contains("$")'  # Table cells with prices
-                ],
-                'extraction_strategy': 'table_column',  # Use table column matching
-                'fallback_patterns': [
-                    r'ST30R[\s\S]*?\$?([\d,]+)',  # Find ST30R followed by price
-                    r'ST50R[\s\S]*?\$?([\d,]+)',  # Find ST50R followed by price
-                    r'ST60J[\s\S]*?\$?([\d,]+)',  # Find ST60J followed by price
-                    r'ST100J[\s\S]*?\$?([\d,]+)'  # Find ST100J followed by price
-                ]
-            },
-            
-            'shop.glowforge.com': {
-                'type': 'shopify',
-                'use_base_price': True,
-                'multi_price_strategy': 'highest_visible',
-                'price_selectors': [
-                    '.price--main:not(.price--compare)',  # Main price, not comparison price
-                    '.product__price .price--main',        # Product page main price
-                    '[data-price]:not(.price--compare)',   # Data attribute price
-                    '.price:not(.price--compare) .money'   # Money element without compare
+                    # More specific selectors to get current price, not compare price
+                    '.price__current .money:first-child',  # Current price (first in list)
+                    '.price__sale .money',  # Sale price specifically
+                    '.price .money:not(.price--compare):first-child',  # First price that's not compare
+                    '.product-price .price--sale .money',  # Sale price container
+                    '.price-item--sale .money'  # Sale price item
                 ],
                 'avoid_selectors': [
-                    '.price--compare',     # Old/comparison price
-                    '.was-price',         # Previous price
-                    'strike',             # Struck-through price
-                    '.price--save',       # Savings amount
-                    '.bundle-price'       # Bundle pricing
+                    '.price--compare',  # Compare/struck-out price ($2,199)
+                    '.price__was',  # "Was" price
+                    '.price--was',  # Alternative "was" price
+                    '[data-variant-price]',  # Wrong variant
+                    'meta[property="og:price:amount"]'  # Avoid meta tags for S1
                 ],
-                'validation': {
-                    'price_ranges': {
-                        'plus': {'min': 4000, 'max': 5000},
-                        'plus-hd': {'min': 4500, 'max': 5500},
-                        'pro': {'min': 5500, 'max': 6500},
-                        'pro-hd': {'min': 6500, 'max': 7500}
-                    }
-                },
-                'strict_validation': True,
-                'fallback_patterns': [
-                    r'starting at \$?([\d,]+)',  # "starting at $6995"
-                    r'total[\s\n]*\$?([\d,]+)'   # "Total $6995"
-                ]
+                # No price range - use old price for validation instead
             },
-            
-            'omtechlaser.com': {
-                'type': 'woocommerce',
+            'xTool F1': {
+                'url_patterns': ['/f1', '/xtool-f1'],
                 'price_selectors': [
-                    '.single_variation_wrap .woocommerce-variation-price .amount',
-                    '.variations_form .single_variation .price .amount',
-                    '.product-summary .price .amount',
-                    '.summary .price .amount'
+                    '.product-badge-price',
+                    '.product-info .price-current'
                 ],
-                'machine_specific_rules': {
-                    'OMTech Pro 2440': {
-                        'url_patterns': ['/omtech-pro-2440-80w-and-100w', '/pro-2440-80w-and-100w'],
-                        'variant_detection_rules': {
-                            '80W': {
-                                'keywords': ['80W', '80 W', '80-watt', 'USB-2440-US'],
-                                'expected_price_range': [6000, 7000]  # 80W is $6699.99
-                            },
-                            '100W': {
-                                'keywords': ['100W', '100 W', '100-watt', 'USB-2440-U1'],
-                                'expected_price_range': [7000, 8000]  # 100W is $7599.99
-                            }
-                        },
-                        'variant_matching_strategy': 'wattage_based',
-                        'requires_dynamic': True,  # May need dynamic selection for variants
-                        'notes': 'Pro 2440 comes in 80W and 100W variants on same page'
-                    }
-                },
-                'avoid_selectors': [
-                    '.bundle-price',
-                    '.package-price',
-                    '.addon-price'
-                ]
             },
-            
-            'xtool.com': {
-                'type': 'shopify',
-                'avoid_meta_tags': True,  # Meta tags often inaccurate for xTool
-                'requires_dynamic': True,  # Better extraction with dynamic scraper
-                'machine_specific_rules': {
-                    # Machine-specific URL patterns and extraction rules
-                    'xTool S1': {
-                        'url_patterns': ['/s1', '/xtool-s1'],
-                        'avoid_meta_tags': True,  # Meta tags show wrong 10W price
-                        'requires_dynamic': True,  # Need dynamic scraper to get correct variant
-                        'price_selectors': [
-                            # More specific selectors to get current price, not compare price
-                            '.price__current .money:first-child',  # Current price (first in list)
-                            '.price__sale .money',  # Sale price specifically
-                            '.price .money:not(.price--compare):first-child',  # First price that's not compare
-                            '.product-price .price--sale .money',  # Sale price container
-                            '.price-item--sale .money'  # Sale price item
-                        ],
-                        'avoid_selectors': [
-                            '.price--compare',  # Compare/struck-out price ($2,199)
-                            '.price__was',  # "Was" price
-                            '.price--was',  # Alternative "was" price
-                            '[data-variant-price]',  # Wrong variant
-                            'meta[property="og:price:amount"]'  # Avoid meta tags for S1
-                        ],
-                        # No price range - use old price for validation instead
-                    },
-                    'xTool F1': {
-                        'url_patterns': ['/f1', '/xtool-f1'],
-                        'price_selectors': [
-                            '.product-badge-price',
-                            '.product-info .price-current'
-                        ],
-                    },
-                    'xTool F1 Lite': {
-                        'url_patterns': ['/f1', '/xtool-f1'],  # Same URL as F1, requires variant selection
-                        'requires_dynamic': True,  # MUST use dynamic scraper for variant selection
-                        'force_dynamic': True,  # Force dynamic extraction even if static finds a price
-                        # REMOVED shopify_variant_selection - using custom xTool variant selection instead
-                        'target_variant_id': '46187559157999',  # F1 Lite Standalone variant ID
-                        'variant_selection': {
-                            'method': 'shopify_options',  # Use Shopify option system
-                            'option1': 'F1 Lite',  # First option: Version
-                            'option2': 'F1 Lite Standalone',  # Second option: Package
-                            'selectors': [
-                                # Shopify variant selectors
-                                'select[name="id"] option[value="46187559157999"]',
-                                'input[name="id"][value="46187559157999"]',
-                                'button[data-variant-id="46187559157999"]',
-                                # Option-based selectors
-                                '.product-options__section--version .option[data-value="F1 Lite"]',
-                                '.product-options__section--package .option[data-value="F1 Lite Standalone"]'
-                            ]
-                        },
-                        'price_selectors': [
-                            # From the screenshot, the price appears in a standard Shopify price format
-                            # The sale price $799 is the current price we want
-                            '.price__current .money',  # Current price in Shopify format
-                            '.price__sale .money',  # Sale price
-                            '.price-item--sale .money',  # Sale price item
-                            '.product__price .price__current',  # Product price current
-                            '[data-product-price]',  # Product price data attribute
-                            '.product-price-current',  # Current product price
-                            # Fallback selectors
-                            '.price:not(.price--compare) .money',  # Price that's not comparison
-                            'span.money:first-of-type'  # First money span
-                        ],
-                        'avoid_selectors': [
-                            '.price--compare',  # Avoid comparison price
-                            '.bundle-price',  # Avoid bundle pricing
-                            '.shipping-price'  # Avoid shipping costs
-                        ],
-                        'preferred_price': 799,  # Exact expected price
-                        'validation_context': 'Use closest to $799 when multiple prices found'
-                    },
-                    'xTool F2 Ultra': {
-                        'url_patterns': ['/f2-ultra', '/xtool-f2-ultra'],
-                        'price_selectors': [
-                            '.product-badge-price',
-                            '.product-info .price-current',
-                            '.price__current .money'
-                        ],
-                        'avoid_meta_tags': True,  # Meta tags inaccurate
-                    }
+            'xTool F1 Lite': {
+                'url_patterns': ['/f1', '/xtool-f1'],  # Same URL as F1, requires variant selection
+                'requires_dynamic': True,  # MUST use dynamic scraper for variant selection
+                'force_dynamic': True,  # Force dynamic extraction even if static finds a price
+                # REMOVED shopify_variant_selection - using custom xTool variant selection instead
+                'target_variant_id': '46187559157999',  # F1 Lite Standalone variant ID
+                'variant_selection': {
+                    'method': 'shopify_options',  # Use Shopify option system
+                    'option1': 'F1 Lite',  # First option: Version
+                    'option2': 'F1 Lite Standalone',  # Second option: Package
+                    'selectors': [
+                        # Shopify variant selectors
+                        'select[name="id"] option[value="46187559157999"]',
+                        'input[name="id"][value="46187559157999"]',
+                        'button[data-variant-id="46187559157999"]',
+                        # Option-based selectors
+                        '.product-options__section--version .option[data-value="F1 Lite"]',
+                        '.product-options__section--package .option[data-value="F1 Lite Standalone"]'
+                    ]
                 },
                 'price_selectors': [
-                    # PRIORITIZE sale price selectors (xTool frequently runs sales)
-                    '.price__sale .money',  # Sale price (highest priority)
-                    '.price__current .money:first-child',  # Current price when on sale
+                    # From the screenshot, the price appears in a standard Shopify price format
+                    # The sale price $799 is the current price we want
+                    '.price__current .money',  # Current price in Shopify format
+                    '.price__sale .money',  # Sale price
                     '.price-item--sale .money',  # Sale price item
-                    '.sale-price .money',  # Alternative sale price
-                    '.price--on-sale .money',  # On sale price
-                    '.product-price .price--sale .money',  # Sale price in product area
-                    
-                    # Primary selectors for current pricing
-                    '.product-badge-price',  # xTool's primary price display
-                    '.product-info .price .money',  # Main product price display
-                    '.price-container .price-current',  # Current price container
-                    '.product-price .current-price',  # Product page current price
-                    '[data-product-price] .money',  # Data attribute price
-                    '.price__regular .money',  # Regular price element
-                    
+                    '.product__price .price__current',  # Product price current
+                    '[data-product-price]',  # Product price data attribute
+                    '.product-price-current',  # Current product price
                     # Fallback selectors
-                    '.product-block-price .money',  # Product block price
-                    '.price-item--regular',  # Shopify regular price
-                    '.price .amount',  # Generic price amount
-                    '.current-price'  # Current price fallback
-                ],
-                'avoid_selectors': [
-                    '.price--compare',  # Comparison price (crossed out)
-                    '.was-price',  # Old price
-                    '.compare-at-price',  # Compare at price
-                    '.price__compare',  # Compare price element
-                    '.bundle-price',  # Bundle pricing
-                    '.shipping-price',  # Shipping costs
-                    '.tax-price'  # Tax amounts
-                ],
-                'validation': {
-                    # Price ranges based on known xTool machines
-                    'price_ranges': {
-                        'f1': {'min': 800, 'max': 1500},  # F1 series
-                        'f2': {'min': 3000, 'max': 6000},  # F2 series  
-                        's1': {'min': 1500, 'max': 2500},  # S1 series
-                        'p2': {'min': 3000, 'max': 4500},  # P2 series
-                        'm1': {'min': 800, 'max': 1200},   # M1 series
-                        'd1': {'min': 200, 'max': 600}     # D1 series
-                    }
-                },
-                'closest_to_old_price': True,  # Use closest to historical price logic
-                'meta_tag_fallback': False,  # Don't fall back to meta tags
-                'extraction_strategy': 'dynamic_preferred',  # Prefer dynamic over static
-                'notes': 'xTool frequently runs sales - sale price selectors are prioritized'
-            },
-            
-            'atomstack.com': {
-                'type': 'shopify',
-                'price_selectors': [
-                    # Atomstack Shopify selectors
-                    '.product__price .price__current',
-                    '.price__container .price-item--regular',
-                    '.product-price-current',
-                    '[data-price-wrapper] .price-item--regular',
-                    '.ProductItem__Price .Price--highlight',
-                    '.price.price--large .price-item--regular',
-                    # Standard Shopify selectors
-                    '.price--current',
-                    '.price-item--regular',
-                    'span.money',
-                    '[data-price]'
+                    '.price:not(.price--compare) .money',  # Price that's not comparison
+                    'span.money:first-of-type'  # First money span
                 ],
                 'avoid_selectors': [
-                    '.price--compare',
-                    '.price-item--sale',
-                    '.CompareAtPrice',
-                    '.bundle-price'
+                    '.price--compare',  # Avoid comparison price
+                    '.bundle-price',  # Avoid bundle pricing
+                    '.shipping-price'  # Avoid shipping costs
                 ],
-                'strict_validation': True
+                'preferred_price': 799,  # Exact expected price
+                'validation_context': 'Use closest to $799 when multiple prices found'
             },
-            
-            'atomstack.net': {
-                'type': 'shopify',
+            'xTool F2 Ultra': {
+                'url_patterns': ['/f2-ultra', '/xtool-f2-ultra'],
                 'price_selectors': [
-                    # Same selectors for both domains
-                    '.product__price .price__current',
-                    '.price__container .price-item--regular',
-                    '.product-price-current',
-                    '[data-price-wrapper] .price-item--regular',
-                    '.ProductItem__Price .Price--highlight',
-                    '.price.price--large .price-item--regular',
-                    # Standard Shopify selectors
-                    '.price--current',
-                    '.price-item--regular',
-                    'span.money',
-                    '[data-price]'
-                ],
-                'avoid_selectors': [
-                    '.price--compare',
-                    '.price-item--sale',
-                    '.CompareAtPrice',
-                    '.bundle-price'
+                    '.product-badge-price',
+                    '.product-info .price-current',
+                    '.price__current .money'
                 ],
-                'strict_validation': True
+                'avoid_meta_tags': True,  # Meta tags inaccurate
+            }
+        },
+        'price_selectors': [
+            # PRIORITIZE sale price selectors (xTool frequently runs sales)
+            '.price__sale .money',  # Sale price (highest priority)
+            '.price__current .money:first-child',  # Current price when on sale
+            '.price-item--sale .money',  # Sale price item
+            '.sale-price .money',  # Alternative sale price
+            '.price--on-sale .money',  # On sale price
+            '.product-price .price--sale .money',  # Sale price in product area
+            
+            # Primary selectors for current pricing
+            '.product-badge-price',  # xTool's primary price display
+            '.product-info .price .money',  # Main product price display
+            '.price-container .price-current',  # Current price container
+            '.product-price .current-price',  # Product page current price
+            '[data-product-price] .money',  # Data attribute price
+            '.price__regular .money',  # Regular price element
+            
+            # Fallback selectors
+            '.product-block-price .money',  # Product block price
+            '.price-item--regular',  # Shopify regular price
+            '.price .amount',  # Generic price amount
+            '.current-price'  # Current price fallback
+        ],
+        'avoid_selectors': [
+            '.price--compare',  # Comparison price (crossed out)
+            '.was-price',  # Old price
+            '.compare-at-price',  # Compare at price
+            '.price__compare',  # Compare price element
+            '.bundle-price',  # Bundle pricing
+            '.shipping-price',  # Shipping costs
+            '.tax-price'  # Tax amounts
+        ],
+        'validation': {
+            # Price ranges based on known xTool machines
+            'price_ranges': {
+                'f1': {'min': 800, 'max': 1500},  # F1 series
+                'f2': {'min': 3000, 'max': 6000},  # F2 series  
+                's1': {'min': 1500, 'max': 2500},  # S1 series
+                'p2': {'min': 3000, 'max': 4500},  # P2 series
+                'm1': {'min': 800, 'max': 1200},   # M1 series
+                'd1': {'min': 200, 'max': 600}     # D1 series
+            }
+        },
+        'closest_to_old_price': True,  # Use closest to historical price logic
+        'meta_tag_fallback': False,  # Don't fall back to meta tags
+        'extraction_strategy': 'dynamic_preferred',  # Prefer dynamic over static
+        'notes': 'xTool frequently runs sales - sale price selectors are prioritized'
+    },
+    
+    'atomstack.com': {
+        'type': 'shopify',
+        'price_selectors': [
+            # Atomstack Shopify selectors
+            '.product__price .price__current',
+            '.price__container .price-item--regular',
+            '.product-price-current',
+            '[data-price-wrapper] .price-item--regular',
+            '.ProductItem__Price .Price--highlight',
+            '.price.price--large .price-item--regular',
+            # Standard Shopify selectors
+            '.price--current',
+            '.price-item--regular',
+            'span.money',
+            '[data-price]'
+        ],
+        'avoid_selectors': [
+            '.price--compare',
+            '.price-item--sale',
+            '.CompareAtPrice',
+            '.bundle-price'
+        ],
+        'strict_validation': True
+    },
+    
+    'atomstack.net': {
+        'type': 'shopify',
+        'price_selectors': [
+            # Same selectors for both domains
+            '.product__price .price__current',
+            '.price__container .price-item--regular',
+            '.product-price-current',
+            '[data-price-wrapper] .price-item--regular',
+            '.ProductItem__Price .Price--highlight',
+            '.price.price--large .price-item--regular',
+            # Standard Shopify selectors
+            '.price--current',
+            '.price-item--regular',
+            'span.money',
+            '[data-price]'
+        ],
+        'avoid_selectors': [
+            '.price--compare',
+            '.price-item--sale',
+            '.CompareAtPrice',
+            '.bundle-price'
+        ],
+        'strict_validation': True
+    },
+    
+    'wecreat.com': {
+        'type': 'shopify',
+        'price_selectors': [
+            # WeCreat Shopify selectors
+            '.product__price .price__current',
+            '.price__container .price-item--regular',
+            '.product-single__price',
+            '.product__price-amount',
+            '[data-price-wrapper] .price-item--regular',
+            # Standard Shopify selectors
+            '.price--current',
+            '.price-item--regular',
+            'span.money',
+            '[data-price]'
+        ],
+        'avoid_selectors': [
+            '.price--compare',
+            '.bundle-price'
+        ],
+        'strict_validation': True
+    },
+    
+    'mr-carve.com': {
+        'type': 'custom',
+        'price_selectors': [
+            # Mr Carve specific selectors
+            '.product-price',
+            '.price-now',
+            '.current-price',
+            '.product-info-price',
+            # Generic price selectors
+            '.price',
+            'span.price',
+            '[data-price]'
+        ],
+        'strict_validation': True
+    },
+    
+    'monportlaser.com': {
+        'type': 'shopify_variants',
+        'base_machine_preference': True,  # Prefer base machine over bundles
+        'price_selectors': [
+            # Specific Monport selectors based on their structure
+            '.product__info .price__regular .price-item--regular',
+            '.product__info .price .price-item--regular',
+            '.price__container .price-item--regular',
+            '.price__container .price__regular',
+            '[data-price-wrapper] .price-item--regular',
+            # Shopify standard selectors
+            '.product-price .price',
+            '.price--current',
+            '.money',
+            '[data-price]',
+            # Fallback selectors
+            'span.price-item--regular',
+            '.price-item.price-item--regular'
+        ],
+        'avoid_selectors': [
+            '.bundle-price',  # Avoid bundle pricing
+            '.addon-price',   # Avoid addon prices
+            '.variant-price[data-variant*="bundle"]',  # Avoid bundle variants
+            '.variant-price[data-variant*="lightburn"]',  # Avoid LightBurn bundles
+            '.variant-price[data-variant*="rotary"]',  # Avoid rotary bundles
+            '.price-item--sale'  # Avoid sale prices (often wrong variant)
+        ],
+        'prefer_contexts': [
+            'product__info',
+            'product-form-wrapper',
+            'product-price-container', 
+            'price-container',
+            'product-details'
+        ],
+        'variant_selection_rules': {
+            'prefer_base_machine': True,
+            'avoid_bundles': ['lightburn', 'rotary', 'bundle', 'combo', 'free 40w'],
+            'base_keywords': ['base', 'machine', 'standalone', 'only'],
+            'selector_base_machine': 'input[value*="Machine"]:not([value*="+"]), input[value*="base"], select option[value*="Machine"]:not([value*="+"])'
+        },
+        'requires_dynamic': True,  # Monport needs dynamic extraction for variant selection
+        'decimal_parsing': {
+            'fix_comma_decimal_confusion': True,
+            'expected_decimal_places': 2,
+            'common_price_patterns': [
+                r'\$(\d{1,2},?\d{3}\.\d{2})',  # $1,399.99 or $1399.99
+                r'(\d{1,2},?\d{3}\.\d{2})',   # 1,399.99 or 1399.99  
+                r'\$(\d{1,2},?\d{3})',        # $1,399 or $1399
+                r'(\d{1,2},?\d{3})'           # 1,399 or 1399
+            ]
+        }
+    },
+    
+    'glowforge.com': {
+        'type': 'variant_configurator',
+        'requires_variant_detection': True,
+        'machine_variant_mapping': {
+            'Glowforge Pro HD': {
+                'keywords': ['pro', 'hd'], 
+                'selector_hints': ['.pro.hd', '[data-variant*="pro-hd"]']
             },
-            
-            'wecreat.com': {
-                'type': 'shopify',
-                'price_selectors': [
-                    # WeCreat Shopify selectors
-                    '.product__price .price__current',
-                    '.price__container .price-item--regular',
-                    '.product-single__price',
-                    '.product__price-amount',
-                    '[data-price-wrapper] .price-item--regular',
-                    # Standard Shopify selectors
-                    '.price--current',
-                    '.price-item--regular',
-                    'span.money',
-                    '[data-price]'
-                ],
-                'avoid_selectors': [
-                    '.price--compare',
-                    '.bundle-price'
-                ],
-                'strict_validation': True
+            'Glowforge Pro': {
+                'keywords': ['pro'], 
+                'exclude_keywords': ['hd'],
+                'selector_hints': ['.pro:not(.hd)', '[data-variant*="pro"]:not([data-variant*="hd"])']
             },
-            
-            'mr-carve.com': {
-                'type': 'custom',
-                'price_selectors': [
-                    # Mr Carve specific selectors
-                    '.product-price',
-                    '.price-now',
-                    '.current-price',
-                    '.product-info-price',
-                    # Generic price selectors
-                    '.price',
-                    'span.price',
-                    '[data-price]'
-                ],
-                'strict_validation': True
+            'Glowforge Plus HD': {
+                'keywords': ['plus', 'hd'], 
+                'selector_hints': ['.plus.hd', '[data-variant*="plus-hd"]']
             },
-            
-            'monportlaser.com': {
-                'type': 'shopify_variants',
-                'base_machine_preference': True,  # Prefer base machine over bundles
-                'price_selectors': [
-                    # Specific Monport selectors based on their structure
-                    '.product__info .price__regular .price-item--regular',
-                    '.product__info .price .price-item--regular',
-                    '.price__container .price-item--regular',
-                    '.price__container .price__regular',
-                    '[data-price-wrapper] .price-item--regular',
-                    # Shopify standard selectors
-                    '.product-price .price',
-                    '.price--current',
-                    '.money',
-                    '[data-price]',
-                    # Fallback selectors
-                    'span.price-item--regular',
-                    '.price-item.price-item--regular'
-                ],
-                'avoid_selectors': [
-                    '.bundle-price',  # Avoid bundle pricing
-                    '.addon-price',   # Avoid addon prices
-                    '.variant-price[data-variant*="bundle"]',  # Avoid bundle variants
-                    '.variant-price[data-variant*="lightburn"]',  # Avoid LightBurn bundles
-                    '.variant-price[data-variant*="rotary"]',  # Avoid rotary bundles
-                    '.price-item--sale'  # Avoid sale prices (often wrong variant)
-                ],
-                'prefer_contexts': [
-                    'product__info',
-                    'product-form-wrapper',
-                    'product-price-container', 
-                    'price-container',
-                    'product-details'
-                ],
-                'variant_selection_rules': {
-                    'prefer_base_machine': True,
-                    'avoid_bundles': ['lightburn', 'rotary', 'bundle', 'combo', 'free 40w'],
-                    'base_keywords': ['base', 'machine', 'standalone', 'only'],
-                    'selector_base_machine': 'input[value*="Machine"]:not([value*="+"]), input[value*="base"], select option[value*="Machine"]:not([value*="+"])'
-                },
-                'requires_dynamic': True,  # Monport needs dynamic extraction for variant selection
-                'decimal_parsing': {
-                    'fix_comma_decimal_confusion': True,
-                    'expected_decimal_places': 2,
-                    'common_price_patterns': [
-                        r'\$(\d{1,2},?\d{3}\.\d{2})',  # $1,399.99 or $1399.99
-                        r'(\d{1,2},?\d{3}\.\d{2})',   # 1,399.99 or 1399.99  
-                        r'\$(\d{1,2},?\d{3})',        # $1,399 or $1399
-                        r'(\d{1,2},?\d{3})'           # 1,399 or 1399
-                    ]
-                }
+            'Glowforge Plus': {
+                'keywords': ['plus'], 
+                'exclude_keywords': ['hd'],
+                'selector_hints': ['.plus:not(.hd)', '[data-variant*="plus"]:not([data-variant*="hd"])']
             },
-            
-            'glowforge.com': {
-                'type': 'variant_configurator',
-                'requires_variant_detection': True,
-                'machine_variant_mapping': {
-                    'Glowforge Pro HD': {
-                        'keywords': ['pro', 'hd'], 
-                        'selector_hints': ['.pro.hd', '[data-variant*="pro-hd"]']
-                    },
-                    'Glowforge Pro': {
-                        'keywords': ['pro'], 
-                        'exclude_keywords': ['hd'],
-                        'selector_hints': ['.pro:not(.hd)', '[data-variant*="pro"]:not([data-variant*="hd"])']
-                    },
-                    'Glowforge Plus HD': {
-                        'keywords': ['plus', 'hd'], 
-                        'selector_hints': ['.plus.hd', '[data-variant*="plus-hd"]']
-                    },
-                    'Glowforge Plus': {
-                        'keywords': ['plus'], 
-                        'exclude_keywords': ['hd'],
-                        'selector_hints': ['.plus:not(.hd)', '[data-variant*="plus"]:not([data-variant*="hd"])']
+            'Glowforge Aura': {
+                'url_contains': ['/craft', '/aura'], 
+                'separate_page': True
+            }
+        },
+        'avoid_selectors': [
+            '.bundle-price', '.promotion-price', '.package-price',
+            '.main-bundle-price', '.bundle .main-amount',
+            '.financing-price', '.monthly-price'
+        ],
+        'price_selectors': [
+            '.product-price:not(.bundle-price)',
+            '.variant-price:not([class*="bundle"])',
+            '.base-price',
+            '.current-price:not(.bundle)',
+            '[data-price]:not([data-bundle])'
+        ],
+        'prefer_contexts': [
+            'product-variants',
+            'variant-selector', 
+            'product-options',
+            'configurator-step',
+            'product-pricing'
+        ],
+        'variant_detection_patterns': [
+            r'(?i)glowforge\s+(pro|plus)\s*(hd)?',
+            r'(?i)(pro|plus)(?:\s+hd)?',
+            r'(?i)\$(\d{1,2},?\d{3})'
+        ]
+    },
+    
+    'thunderlaserusa.com': {
+        'type': 'custom',
+        'fetch_policy': {'max_concurrent': 1, 'min_interval': 2.0},  # ASP tier - one request at a time
+        'requires_dynamic': True,  # Better extraction with dynamic scraper
+        'price_selectors': [
+            # PRIORITIZE sale prices for Thunder Laser
+            '.sale-price',  # Direct sale price class
+            '.price-now',  # Current price (often sale price)
+            '.special-price',  # Special pricing
+            '.product-price .sale',  # Sale price in product area
+            '.price-box .special-price .price',  # Special price box
+            '.price-item--sale',  # Sale price item
+            
+            # Regular price selectors as fallback
+            '.product-price-value',
+            '.price-box .price',
+            '.product-info-price .price',
+            '.product-price .amount',
+            '.price-wrapper .price',
+            'span[itemprop="price"]',
+            '[data-price-type="finalPrice"]'
+        ],
+        'avoid_selectors': [
+            '.old-price',  # Original price before sale
+            '.was-price',  # Previous price
+            '.regular-price',  # Regular price when sale exists
+            '.price-box .old-price',  # Old price in price box
+            '.compare-price',  # Comparison price
+            '.bundle-price',  # Bundle pricing
+            '.package-price',  # Package deals
+            '.addon-price'  # Add-on pricing
+        ],
+        'decimal_parsing': {
+            'enforce_two_decimal': True,
+            'comma_as_thousand': True
+        },
+        'notes': 'Thunder Laser frequently runs sales - prioritize sale prices over regular prices'
+    },
+    
+    'rolyautomation.com': {
+        'type': 'shopify',
+        'requires_variant_detection': True,
+        'machine_specific_rules': {
+            'LaserMATIC Mk2': {
+                'url_patterns': ['/lasermatic-mk2', '/lasermatic'],
+                'variant_keywords': ['30W', '30 W', 'LaserMATIC30'],
+                'expected_price': 1199.00,
+                'base_price_range': [1000, 1300],
+                'prefer_rotary': True,  # Prefer "with Chuck Rotary" variants as base price
+                'variant_detection_rules': {
+                    '30W': {
+                        'keywords': ['LaserMATIC30', '30W', '30 W'],
+                        'expected_price_range': [1000, 1300]
                     },
-                    'Glowforge Aura': {
-                        'url_contains': ['/craft', '/aura'], 
-                        'separate_page': True
+                    '20W': {
+                        'keywords': ['LaserMATIC20', '20W', '20 W'], 
+                        'expected_price_range': [700, 900]
                     }
-                },
-                'avoid_selectors': [
-                    '.bundle-price', '.promotion-price', '.package-price',
-                    '.main-bundle-price', '.bundle .main-amount',
-                    '.financing-price', '.monthly-price'
-                ],
-                'price_selectors': [
-                    '.product-price:not(.bundle-price)',
-                    '.variant-price:not([class*="bundle"])',
-                    '.base-price',
-                    '.current-price:not(.bundle)',
-                    '[data-price]:not([data-bundle])'
-                ],
-                'prefer_contexts': [
-                    'product-variants',
-                    'variant-selector', 
-                    'product-options',
-                    'configurator-step',
-                    'product-pricing'
-                ],
-                'variant_detection_patterns': [
-                    r'(?i)glowforge\s+(pro|plus)\s*(hd)?',
-                    r'(?i)(pro|plus)(?:\s+hd)?',
-                    r'(?i)\$(\d{1,2},?\d{3})'
-                ]
-            },
-            
-            'thunderlaserusa.com': {
-                'type': 'custom',
-                'requires_dynamic': True,  # Better extraction with dynamic scraper
-                'price_selectors': [
-                    # PRIORITIZE sale prices for Thunder Laser
-                    '.sale-price',  # Direct sale price class
-                    '.price-now',  # Current price (often sale price)
-                    '.special-price',  # Special pricing
-                    '.product-price .sale',  # Sale price in product area
-                    '.price-box .special-price .price',  # Special price box
-                    '.price-item--sale',  # Sale price item
-                    
-                    # Regular price selectors as fallback
-                    '.product-price-value',
-                    '.price-box .price',
-                    '.product-info-price .price',
-                    '.product-price .amount',
-                    '.price-wrapper .price',
-                    'span[itemprop="price"]',
-                    '[data-price-type="finalPrice"]'
-                ],
-                'avoid_selectors': [
-                    '.old-price',  # Original price before sale
-                    '.was-price',  # Previous price
-                    '.regular-price',  # Regular price when sale exists
-                    '.price-box .old-price',  # Old price in price box
-                    '.compare-price',  # Comparison price
-                    '.bundle-price',  # Bundle pricing
-                    '.package-price',  # Package deals
-                    '.addon-price'  # Add-on pricing
-                ],
-                'decimal_parsing': {
-                    'enforce_two_decimal': True,
-                    'comma_as_thousand': True
-                },
-                'notes': 'Thunder Laser frequently runs sales - prioritize sale prices over regular prices'
-            },
+                }
+            }
+        },
+        'price_selectors': ['.price__current .money', 'span.money', '[data-price]'],
+        'variant_selectors': ['select[name="id"]', 'input[name="id"]'],
+        'prefer_json_ld': True,
+        'notes': 'LaserMATIC Mk2 has 20W and 30W variants - must select correct wattage variant'
+    },
+    
+}
+
+SITE_RULES_INDEX = SiteRulesIndex(SITE_RULES)
+
+
+class SiteSpecificExtractor:
+    """Enhanced price extractor with site-specific rules."""
+    
+    # Per-domain fetch limits for batch scheduling; sites override via 'fetch_policy' in site_rules
+    DEFAULT_FETCH_POLICY = {
+        'max_concurrent': 2,  # Concurrent requests to one host
+        'min_interval': 0.5  # Minimum seconds between request starts on one host
+    }
+    
+    def __init__(self):
+        # Each extractor owns its rules; the shared index stays valid until they are changed
+        self.site_rules = copy.deepcopy(SITE_RULES)
+        self.rules_index = SITE_RULES_INDEX
+    
+    def rebuild_rules_index(self):
+        """Recompile this extractor's rule index after changing self.site_rules."""
+        self.rules_index = SiteRulesIndex(self.site_rules)
+    
+    def get_fetch_policy(self, domain):
+        """
+        Get the batch fetch policy (concurrency cap and request spacing) for a domain.
+        
+        Args:
+            domain: Domain without 'www.' prefix
             
-            'rolyautomation.com': {
-                'type': 'shopify',
-                'requires_variant_detection': True,
-                'machine_specific_rules': {
-                    'LaserMATIC Mk2': {
-                        'url_patterns': ['/lasermatic-mk2', '/lasermatic'],
-                        'variant_keywords': ['30W', '30 W', 'LaserMATIC30'],
-                        'expected_price': 1199.00,
-                        'base_price_range': [1000, 1300],
-                        'prefer_rotary': True,  # Prefer "with Chuck Rotary" variants as base price
-                        'variant_detection_rules': {
-                            '30W': {
-                                'keywords': ['LaserMATIC30', '30W', '30 W'],
-                                'expected_price_range': [1000, 1300]
-                            },
-                            '20W': {
-                                'keywords': ['LaserMATIC20', '20W', '20 W'], 
-                                'expected_price_range': [700, 900]
-                            }
-                        }
-                    }
-                },
-                'price_selectors': ['.price__current .money', 'span.money', '[data-price]'],
-                'variant_selectors': ['select[name="id"]', 'input[name="id"]'],
-                'prefer_json_ld': True,
-                'notes': 'LaserMATIC Mk2 has 20W and 30W variants - must select correct wattage variant'
-            },
+        Returns:
+            dict: {'max_concurrent': int, 'min_interval': float}
+        """
+        policy = dict(self.DEFAULT_FETCH_POLICY)
+        site_rule = self.site_rules.get(domain)
+        if site_rule and 'fetch_policy' in site_rule:
+            policy.update(site_rule['fetch_policy'])
+        return policy
+    
+    def get_resource_policy(self, domain):
+        """
+        Get the request-blocking policy for dynamic (Playwright) loads of a domain.
+        
+        Sites opt out of blocking via 'resource_policy' in site_rules, e.g.
+        {'allow_types': ['image']} when variant swatches need images, or {'enabled': False}.
+        
+        Args:
+            domain: Domain without 'www.' prefix
             
-        }
+        Returns:
+            dict: Resource policy (see scrapers.resource_blocker.DEFAULT_RESOURCE_POLICY)
+        """
+        site_rule = self.site_rules.get(domain) or {}
+        return merge_resource_policy(site_rule.get('resource_policy'))
     
     def get_machine_specific_rules(self, domain, machine_name, url):
         """
         Get machine-specific extraction rules for problematic machines.
         Returns modified site rules if machine-specific rules exist.
+        
+        Resolution goes through the precompiled SITE_RULES_INDEX and is memoized per
+        (domain, machine, url), so repeated lookups for the same page are cheap.
         """
-        if domain in self.site_rules:
-            site_rule = self.site_rules[domain].copy()
-            machine_rules = site_rule.get('machine_specific_rules', {})
-            
-            # Check if we have specific rules for this machine
-            # Sort patterns by specificity (longer patterns first) to match "xTool F1 Lite" before "xTool F1"
-            sorted_patterns = sorted(machine_rules.items(), key=lambda x: len(x[0]), reverse=True)
-            
-            for machine_pattern, specific_rules in sorted_patterns:
-                if machine_pattern.lower() in machine_name.lower():
-                    # Check URL patterns to confirm this is the right machine
-                    url_patterns = specific_rules.get('url_patterns', [])
-                    logger.info(f"Checking URL patterns for {machine_pattern}: {url_patterns}")
-                    logger.info(f"Against URL: {url.lower()}")
-                    if url_patterns and any(pattern in url.lower() for pattern in url_patterns):
-                        logger.info(f"🎯 Using machine-specific rules for {machine_name} (pattern: {machine_pattern})")
-                        
-                        # Merge machine-specific rules with site rules
-                        if 'price_selectors' in specific_rules:
-                            site_rule['price_selectors'] = specific_rules['price_selectors']
-                        if 'avoid_selectors' in specific_rules:
-                            site_rule['avoid_selectors'] = site_rule.get('avoid_selectors', []) + specific_rules['avoid_selectors']
-                        # Use historical price validation instead of hardcoded ranges
-                        if 'avoid_meta_tags' in specific_rules:
-                            site_rule['avoid_meta_tags'] = specific_rules['avoid_meta_tags']
-                        if 'requires_dynamic' in specific_rules:
-                            site_rule['requires_dynamic'] = specific_rules['requires_dynamic']
-                        if 'variant_detection_rules' in specific_rules:
-                            site_rule['variant_detection_rules'] = specific_rules['variant_detection_rules']
-                            logger.info(f"✅ Copied variant_detection_rules from machine-specific rules: {list(specific_rules['variant_detection_rules'].keys())}")
-                        
-                        logger.info(f"🔍 Final site_rule keys: {list(site_rule.keys())}")
-                        return site_rule
-            
-            return site_rule
-        return None
+        rules, pattern = self.rules_index.resolve(domain, machine_name, url)
+        if rules is None:
+            return None
+        if pattern:
+            logger.debug(f"🎯 Using machine-specific rules for {machine_name} (pattern: {pattern})")
+        # Callers get their own top-level dict, as before
+        return dict(rules)
+
+    def get_machine_rule(self, domain, machine_name, url):
+        """
+        Get the machine_specific_rules entry that applies to a machine page, unmerged.
+        
+        Returns:
+            dict: The entry (variant keywords, target variant ID, ...), or None if no machine rule applies
+        """
+        _, pattern = self.rules_index.resolve(domain, machine_name, url)
+        if not pattern:
+            return None
+        return dict(self.site_rules[domain]['machine_specific_rules'][pattern])
 
     def extract_price_with_rules(self, soup, html_content, url, machine_data=None):
         """
@@ -0,0 +1,330 @@
+"""
+Variant price capture from product and variation JSON.
+Records Shopify product JSON and WooCommerce variation data seen during one page load and
+resolves a machine's variant price from it, without clicking swatches.
+"""
+
+import asyncio
+import re
+from urllib.parse import unquote, urlparse
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from loguru import logger
+
+
+SHOPIFY_PRODUCT_URL = re.compile(r'/products/([^/?#.]+)\.(js|json)(?:$|[?#])')
+SHOPIFY_PRODUCT_PATH = re.compile(r'/products/([^/?#.]+)/?$')
+WOOCOMMERCE_VARIATION_URL = re.compile(r'[?&]wc-ajax=get_variation(?:$|&)')
+
+# Words that distinguish one model of a product family from another (F1 vs F1 Lite)
+MODEL_QUALIFIERS = {'lite', 'pro', 'max', 'plus', 'ultra', 'mopa', 'uv', 'rf', 'galvo', 'mini', 'rotary'}
+
+# Package words; bundles are only wanted when the machine name or site rules ask for them
+BUNDLE_TERMS = {'bundle', 'package', 'kit', 'combo', 'set'}
+STANDALONE_TERMS = {'standalone', 'only'}
+
+# Reads WooCommerce variation data embedded in the page and the page's product handle and,
+# when the page is a Shopify product that did not request its own product JSON, fetches it
+# once (same origin, no clicks).
+PAGE_VARIANT_SCRIPT = '''async ({capturedHandles}) => {
+    const found = {woocommerce: [], shopify: null, pathname: location.pathname};
+    document.querySelectorAll('form.variations_form[data-product_variations]').forEach(form => {
+        try {
+            const variations = JSON.parse(form.getAttribute('data-product_variations'));
+            if (Array.isArray(variations)) found.woocommerce.push(...variations);
+        } catch (e) {}
+    });
+    const handle = (location.pathname.match(/\\/products\\/([^\\/?#.]+)\\/?$/) || [])[1];
+    if (handle && window.Shopify && !capturedHandles.includes(decodeURIComponent(handle).toLowerCase())) {
+        try {
+            const response = await fetch(location.pathname.replace(/\\/$/, '') + '.js', {credentials: 'same-origin'});
+            if (response.ok) found.shopify = await response.json();
+        } catch (e) {}
+    }
+    return found;
+}'''
+
+
+@dataclass(frozen=True)
+class CapturedVariant:
+    """One purchasable variant read from product or variation JSON"""
+    source: str
+    variant_id: str
+    title: str
+    price: float
+    available: bool = True
+    compare_at_price: Optional[float] = None
+
+
+def product_handle(url_or_path: Optional[str]) -> Optional[str]:
+    """Shopify product handle of a product page URL or path (/collections/x/products/<handle>), if any."""
+    match = SHOPIFY_PRODUCT_PATH.search(urlparse(url_or_path or '').path)
+    return unquote(match.group(1)).lower() if match else None
+
+
+def _to_float(value, cents: bool = False) -> Optional[float]:
+    if value in (None, '', False):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return round(number / 100, 2) if cents else number
+
+
+def parse_shopify_product(data: Dict, cents: bool) -> List[CapturedVariant]:
+    """
+    Parse Shopify product JSON.
+
+    Args:
+        data: /products/<handle>.js payload (prices in cents) or .json payload ({'product': ...}, prices in dollars)
+        cents: Whether prices are in cents
+
+    Returns:
+        list: Variants with a price
+    """
+    product = data.get('product', data) if isinstance(data, dict) else {}
+    variants = []
+    for variant in product.get('variants') or []:
+        price = _to_float(variant.get('price'), cents)
+        if price is None:
+            continue
+        options = [variant.get(f'option{i}') for i in range(1, 4) if variant.get(f'option{i}')]
+        title = variant.get('title') or ' / '.join(options)
+        # Single-variant products only have a placeholder title
+        if title.lower() == 'default title':
+            title = product.get('title') or title
+        variants.append(CapturedVariant(
+            source='shopify',
+            variant_id=str(variant.get('id')),
+            title=title,
+            price=price,
+            available=variant.get('available', True) is not False,
+            compare_at_price=_to_float(variant.get('compare_at_price'), cents)
+        ))
+    return variants
+
+
+def parse_woocommerce_variations(variations: Iterable[Dict]) -> List[CapturedVariant]:
+    """
+    Parse WooCommerce variation data (data-product_variations or a get_variation response).
+
+    Args:
+        variations: Variation dicts with 'attributes' and 'display_price'
+
+    Returns:
+        list: Variants with a price
+    """
+    parsed = []
+    for variation in variations:
+        if not isinstance(variation, dict):
+            continue
+        price = _to_float(variation.get('display_price'))
+        if price is None:
+            continue
+        values = [str(value).replace('-', ' ') for value in (variation.get('attributes') or {}).values() if value]
+        parsed.append(CapturedVariant(
+            source='woocommerce',
+            variant_id=str(variation.get('variation_id')),
+            title=' / '.join(values) or str(variation.get('sku') or variation.get('variation_id')),
+            price=price,
+            available=bool(variation.get('is_in_stock', True)),
+            compare_at_price=_to_float(variation.get('display_regular_price'))
+        ))
+    return parsed
+
+
+def _tokens(text: str) -> List[str]:
+    """Lowercase word tokens with '60 W' normalised to '60w'."""
+    text = re.sub(r'(\d+(?:\.\d+)?)\s*w\b', r'\1w', (text or '').lower())
+    return re.findall(r'[a-z0-9]+(?:\.\d+)?', text)
+
+
+def prefer_terms_for(machine_name: str, variant_rules: Optional[Dict]) -> List[str]:
+    """
+    Preferred variant phrases for a machine from site variant rules.
+
+    Args:
+        machine_name: Machine name from the database
+        variant_rules: Site variant rules; 'variant_prefer_terms' maps a name part to its phrases
+
+    Returns:
+        list: Phrases for every name part that occurs in the machine name
+    """
+    return [
+        term
+        for name_part, terms in ((variant_rules or {}).get('variant_prefer_terms') or {}).items()
+        if name_part.lower() in (machine_name or '').lower()
+        for term in terms
+    ]
+
+
+def match_variant(variants: List[CapturedVariant], machine_name: str, prefer_terms: Optional[List[str]] = None,
+                  target_variant_id: Optional[str] = None, anchor_price: Optional[float] = None,
+                  avoid_terms: Optional[List[str]] = None, prefer_lowest: bool = False) -> Optional[CapturedVariant]:
+    """
+    Pick the variant that corresponds to a machine.
+
+    Variants with a different wattage are excluded; the rest are scored on words shared with
+    the machine name, minus model qualifiers the machine does not have (Lite, Pro, MOPA, ...)
+    and unrequested bundles. Variants containing an avoided phrase the machine name lacks are
+    excluded. Ties at different prices go to the lowest price when prefer_lowest is set, then
+    to the price closest to anchor_price, and are otherwise left unresolved.
+
+    Args:
+        variants: Captured variants
+        machine_name: Machine name from the database
+        prefer_terms: Phrases that should win when present (e.g. ['basic bundle'])
+        target_variant_id: Known variant ID, used when it is among the variants
+        anchor_price: Previous price, used to break ties
+        avoid_terms: Phrases that rule a variant out (e.g. ['rotary', 'lightburn'])
+        prefer_lowest: Break ties with the lowest price (sites listed at their base price)
+
+    Returns:
+        CapturedVariant, or None when no variant matches unambiguously
+    """
+    if not variants:
+        return None
+    if target_variant_id:
+        for variant in variants:
+            if variant.variant_id == str(target_variant_id):
+                return variant
+    if len({(variant.title.lower(), variant.price) for variant in variants}) == 1:
+        return variants[0]
+
+    machine_tokens = set(_tokens(machine_name))
+    machine_watts = {token for token in machine_tokens if re.fullmatch(r'\d+(?:\.\d+)?w', token)}
+    prefer = [' '.join(_tokens(term)) for term in prefer_terms or []]
+    machine_text = ' '.join(_tokens(machine_name))
+    avoid = [' '.join(_tokens(term)) for term in avoid_terms or [] if ' '.join(_tokens(term)) not in machine_text]
+
+    scored = []
+    for variant in variants:
+        variant_text = ' '.join(_tokens(variant.title))
+        if any(term in variant_text for term in avoid):
+            continue
+        variant_tokens = set(_tokens(variant.title))
+        variant_watts = {token for token in variant_tokens if re.fullmatch(r'\d+(?:\.\d+)?w', token)}
+        if machine_watts and variant_watts and not machine_watts & variant_watts:
+            continue
+
+        score = len(machine_tokens & variant_tokens)
+        score -= 2 * len((variant_tokens & MODEL_QUALIFIERS) - machine_tokens)
+        if prefer and any(term in variant_text for term in prefer):
+            score += 3
+        elif (variant_tokens & BUNDLE_TERMS) - machine_tokens:
+            score -= 1
+        elif variant_tokens & STANDALONE_TERMS:
+            score += 1
+        scored.append((score, variant))
+
+    if not scored:
+        return None
+    best_score = max(score for score, _ in scored)
+    if best_score <= 0:
+        return None
+    best = [variant for score, variant in scored if score == best_score]
+    if len({variant.price for variant in best}) == 1:
+        return best[0]
+    if prefer_lowest:
+        return min(best, key=lambda variant: variant.price)
+    if anchor_price:
+        return min(best, key=lambda variant: abs(variant.price - anchor_price))
+
+    logger.debug(f"Ambiguous variant match for {machine_name}: {[(v.title, v.price) for v in best]}")
+    return None
+
+
+class VariantCapture:
+    """
+    Records product and variation JSON responses for one page.
+
+    Attach before navigating; after the page has loaded, collect() adds variation data
+    embedded in the page (and Shopify product JSON if the page never requested it), and
+    match() resolves a machine's variant from everything captured. Shopify product JSON is
+    kept per product handle and only the page's own product is used: themes also load
+    upsell, bundle and cart products whose variants must not compete with the machine's.
+    """
+
+    def __init__(self, page):
+        """
+        Initialize capture and start listening for responses.
+
+        Args:
+            page: Playwright page
+        """
+        self.page = page
+        self.variants: Dict[tuple, CapturedVariant] = {}
+        self.shopify_products: Dict[str, tuple] = {}  # handle -> (product JSON, prices in cents)
+        self.responses = 0
+        self._pending = set()
+        page.on('response', self._on_response)
+
+    def _on_response(self, response):
+        url = response.url
+        if response.status != 200:
+            return
+        shopify = SHOPIFY_PRODUCT_URL.search(url)
+        if not shopify and not WOOCOMMERCE_VARIATION_URL.search(url):
+            return
+        task = asyncio.ensure_future(self._read(response, shopify))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _read(self, response, shopify):
+        try:
+            data = await response.json()
+        except Exception as e:
+            logger.debug(f"Unreadable variant response {response.url}: {str(e)}")
+            return
+        self.responses += 1
+        if shopify:
+            self.shopify_products[unquote(shopify.group(1)).lower()] = (data, shopify.group(2) == 'js')
+        else:
+            self._add(parse_woocommerce_variations([data] if isinstance(data, dict) else []))
+
+    def _add(self, variants: List[CapturedVariant]):
+        for variant in variants:
+            self.variants[(variant.source, variant.variant_id)] = variant
+
+    async def collect(self, timeout: float = 5.0) -> List[CapturedVariant]:
+        """
+        Finish reading captured responses and add variation data embedded in the page.
+
+        Args:
+            timeout: Seconds to wait for pending response bodies
+
+        Returns:
+            list: Captured WooCommerce variants and the variants of the page's Shopify product
+        """
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=timeout)
+
+        try:
+            found = await self.page.evaluate(PAGE_VARIANT_SCRIPT, {'capturedHandles': list(self.shopify_products)})
+        except Exception as e:
+            logger.debug(f"Could not read embedded variant data: {str(e)}")
+            found = {}
+
+        self._add(parse_woocommerce_variations(found.get('woocommerce') or []))
+        handle = product_handle(found.get('pathname') or getattr(self.page, 'url', None))
+        if handle and found.get('shopify'):
+            self.shopify_products[handle] = (found['shopify'], True)
+        if handle in self.shopify_products:
+            data, cents = self.shopify_products[handle]
+            self._add(parse_shopify_product(data, cents))
+        return list(self.variants.values())
+
+    def match(self, machine_name: str, **options) -> Optional[CapturedVariant]:
+        """Resolve a machine's variant from the captured data (see match_variant)."""
+        return match_variant(list(self.variants.values()), machine_name, **options)
+
+    def detach(self):
+        """Stop listening for responses."""
+        try:
+            self.page.remove_listener('response', self._on_response)
+        except Exception:
+            pass
+        for task in self._pending:
+            task.cancel()
+        self._pending.clear()
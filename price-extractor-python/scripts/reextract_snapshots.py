@@ -0,0 +1,73 @@
+"""
+Re-run price extraction over stored HTML snapshots without touching the network.
+
+Usage:
+  python scripts/reextract_snapshots.py                       # latest page of every machine
+  python scripts/reextract_snapshots.py --batch-id <batch>    # pages captured in one batch
+  python scripts/reextract_snapshots.py --manifest path.jsonl # any manifest file
+
+Writes a JSON diff report of recorded vs. re-extracted prices and methods.
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import HTML_SNAPSHOT_DIR
+from services.html_snapshot_store import HtmlSnapshotStore
+from services.offline_reextraction import (
+    jobs_from_manifest,
+    jobs_from_store,
+    run_reextraction,
+    build_diff_report,
+    write_report
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline re-extraction over stored HTML snapshots')
+    parser.add_argument('--snapshot-dir', default=HTML_SNAPSHOT_DIR, help='Snapshot store directory')
+    parser.add_argument('--batch-id', help='Only re-extract pages captured in this batch')
+    parser.add_argument('--manifest', help='Path to a snapshot manifest (.jsonl)')
+    parser.add_argument('--machines', help='JSON file with machine records (list or dict by id), e.g. for learned_selectors')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output', default='reports/reextraction_report.json', help='Report path')
+
+    args = parser.parse_args()
+
+    store = HtmlSnapshotStore(args.snapshot_dir)
+    if args.manifest:
+        jobs = jobs_from_manifest(args.manifest)
+    else:
+        jobs = jobs_from_store(store, batch_id=args.batch_id)
+
+    if not jobs:
+        print("No snapshots found to re-extract")
+        sys.exit(1)
+
+    machine_data = None
+    if args.machines:
+        with open(args.machines, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        machine_data = records if isinstance(records, dict) else {record['id']: record for record in records}
+
+    results = run_reextraction(jobs, args.snapshot_dir, max_workers=args.workers, machine_data=machine_data)
+    report = build_diff_report(results)
+    write_report(report, args.output)
+
+    print(f"\nRe-extracted {report['total']} snapshots")
+    for status, count in report['summary'].items():
+        if count:
+            print(f"  {status}: {count}")
+    for row in report['differences'][:20]:
+        print(f"  [{row['status']}] {row['machine_name'] or row['machine_id']}: "
+              f"${row['old_price']} ({row['old_method']}) -> ${row['new_price']} ({row['new_method']})")
+    if len(report['differences']) > 20:
+        print(f"  ... {len(report['differences']) - 20} more in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+In-process event bus for live batch progress.
+Batch runs publish per-machine completions and running counters; API streams subscribe to them.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Dict, Optional, Set
+from loguru import logger
+
+
+class BatchEventBus:
+    """
+    Fan-out of batch progress events to any number of subscribers.
+
+    Every batch keeps a snapshot (status, counters, concurrency, credits, recent machine
+    events) that a late subscriber receives before live events. Subscriber queues are
+    bounded; when a slow subscriber falls behind, its oldest events are dropped, which is
+    safe because every event carries the running counters. Finished batches keep their
+    final snapshot until they age out of the retention window.
+    """
+
+    TERMINAL_EVENTS = ('batch_completed', 'batch_failed')
+
+    def __init__(self, queue_size: int = 500, recent_events: int = 50, retained_batches: int = 20):
+        """
+        Initialize the event bus.
+
+        Args:
+            queue_size: Maximum pending events per subscriber
+            recent_events: Machine events kept in each batch snapshot
+            retained_batches: Finished batches whose final snapshot is kept
+        """
+        self.queue_size = queue_size
+        self.recent_events = recent_events
+        self.retained_batches = retained_batches
+        self._snapshots: Dict[str, Dict] = {}
+        self._recent: Dict[str, Deque[Dict]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._sequence = 0
+
+    def has_batch(self, batch_id: str) -> bool:
+        """Whether this process has progress for the batch (running or recently finished)."""
+        return batch_id in self._snapshots
+
+    def is_active(self, batch_id: str) -> bool:
+        """Whether the batch is running in this process."""
+        return batch_id in self._snapshots and batch_id not in self._finished
+
+    def active_batches(self):
+        """IDs of the batches running in this process."""
+        return [batch_id for batch_id in self._snapshots if batch_id not in self._finished]
+
+    def snapshot(self, batch_id: str) -> Optional[Dict]:
+        """
+        Current state of a batch.
+
+        Args:
+            batch_id: Batch ID
+
+        Returns:
+            Snapshot event dict, or None if the batch is unknown to this process
+        """
+        state = self._snapshots.get(batch_id)
+        if state is None:
+            return None
+        return {
+            'type': 'snapshot',
+            'batch_id': batch_id,
+            'seq': self._sequence,
+            **state,
+            'recent': list(self._recent.get(batch_id, ()))
+        }
+
+    def publish(self, batch_id: str, event_type: str, **data):
+        """
+        Record an event for a batch and deliver it to its subscribers.
+
+        Top-level fields other than 'machine' (status, counters, concurrency, credits_spent, ...)
+        are merged into the batch snapshot; 'machine' payloads go to the recent events list.
+
+        Args:
+            batch_id: Batch ID
+            event_type: Event name (batch_started, machine_completed, batch_completed, ...)
+            **data: Event payload
+        """
+        self._sequence += 1
+        event = {'type': event_type, 'batch_id': batch_id, 'seq': self._sequence, 'time': time.time(), **data}
+
+        if event_type == 'batch_started':
+            self._finished.pop(batch_id, None)
+            self._recent[batch_id] = deque(maxlen=self.recent_events)
+            self._snapshots[batch_id] = {'status': 'running'}
+        state = self._snapshots.setdefault(batch_id, {'status': 'running'})
+        state.update({key: value for key, value in data.items() if key != 'machine'})
+        state['updated_at'] = event['time']
+        if 'machine' in data:
+            self._recent.setdefault(batch_id, deque(maxlen=self.recent_events)).append(data['machine'])
+
+        if event_type in self.TERMINAL_EVENTS:
+            state['status'] = 'completed' if event_type == 'batch_completed' else 'failed'
+            self._finish(batch_id)
+
+        for queue in self._subscribers.get(batch_id, ()):
+            self._offer(queue, event)
+
+    def _offer(self, queue: asyncio.Queue, event: Dict):
+        """Queue an event, dropping the subscriber's oldest event if it is full."""
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(event)
+
+    def _finish(self, batch_id: str):
+        """Mark a batch finished and forget the oldest finished batches."""
+        self._finished[batch_id] = time.time()
+        self._finished.move_to_end(batch_id)
+        while len(self._finished) > self.retained_batches:
+            old_batch_id, _ = self._finished.popitem(last=False)
+            self._snapshots.pop(old_batch_id, None)
+            self._recent.pop(old_batch_id, None)
+
+    async def subscribe(self, batch_id: str, heartbeat: Optional[float] = 15.0) -> AsyncIterator[Dict]:
+        """
+        Stream a batch's events, starting with its current snapshot.
+
+        The stream ends after the batch's terminal event (immediately after the snapshot
+        if the batch has already finished).
+
+        Args:
+            batch_id: Batch ID
+            heartbeat: Seconds without events before a heartbeat event is yielded (None to disable)
+
+        Yields:
+            Event dicts
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(batch_id, set()).add(queue)
+        try:
+            snapshot = self.snapshot(batch_id)
+            if snapshot is not None:
+                yield snapshot
+                if batch_id in self._finished:
+                    return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield {'type': 'heartbeat', 'batch_id': batch_id, 'seq': self._sequence, 'time': time.time()}
+                    continue
+
+                yield event
+                if event['type'] in self.TERMINAL_EVENTS:
+                    return
+        finally:
+            subscribers = self._subscribers.get(batch_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[batch_id]
+            logger.debug(f"📡 Progress subscriber for batch {batch_id} disconnected")
+
+
+# Global event bus instance
+_batch_event_bus: Optional[BatchEventBus] = None
+
+
+def get_batch_event_bus() -> BatchEventBus:
+    """Get or create the global batch event bus instance."""
+    global _batch_event_bus
+
+    if _batch_event_bus is None:
+        _batch_event_bus = BatchEventBus()
+
+    return _batch_event_bus
@@ -0,0 +1,63 @@
+"""
+Batch prefetch of per-machine state.
+Loads everything a batch worker reads from the database up front, with a few set-based queries.
+"""
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
+from loguru import logger
+
+
+# Machine columns used by price updates and extraction (never html_content)
+BATCH_MACHINE_COLUMNS = (
+    'id, "Machine Name", "Company", Price, product_link, "Affiliate Link", '
+    '"Laser Power A", learned_selectors, price_tracking_enabled, html_timestamp'
+)
+
+
+@dataclass(frozen=True)
+class MachineSnapshot:
+    """Read-only view of one machine's database state at the start of a batch"""
+    machine: Mapping
+    recent_corrections: Tuple[Mapping, ...] = ()
+
+    @property
+    def machine_id(self) -> str:
+        return self.machine.get('id')
+
+
+async def prefetch_batch_state(db_service, machine_ids: List[str], correction_days: int = 7) -> Dict[str, MachineSnapshot]:
+    """
+    Load machine records and recent manual corrections for every machine in a batch.
+
+    Args:
+        db_service: DatabaseService
+        machine_ids: Machines in the batch
+        correction_days: Window for recent manual corrections (used by the approval check)
+
+    Returns:
+        dict: machine_id -> MachineSnapshot; empty if prefetching failed (workers then load per machine)
+    """
+    if not machine_ids:
+        return {}
+
+    try:
+        machines = await db_service.get_machines_by_ids(machine_ids, columns=BATCH_MACHINE_COLUMNS)
+        corrections = await db_service.get_recent_manual_corrections(machine_ids, days=correction_days)
+    except Exception as e:
+        logger.warning(f"Batch prefetch failed, falling back to per-machine lookups: {str(e)}")
+        return {}
+
+    snapshots = {
+        machine['id']: MachineSnapshot(
+            machine=MappingProxyType(dict(machine)),
+            recent_corrections=tuple(MappingProxyType(dict(entry)) for entry in corrections.get(machine['id'], []))
+        )
+        for machine in machines
+    }
+
+    missing = len(set(machine_ids)) - len(snapshots)
+    logger.info(f"📦 Prefetched {len(snapshots)} machines and {sum(len(c) for c in corrections.values())} recent corrections"
+                + (f" ({missing} not found)" if missing else ""))
+    return snapshots
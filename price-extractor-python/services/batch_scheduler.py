@@ -0,0 +1,180 @@
+"""
+Domain-aware fair scheduler for batch price updates.
+Interleaves work across domains so one host never absorbs every worker.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Union
+from urllib.parse import urlparse
+from loguru import logger
+
+
+def get_machine_domain(machine: Dict) -> str:
+    """
+    Get the scheduling domain for a machine from its product link.
+
+    Args:
+        machine: Machine record with a product_link
+
+    Returns:
+        Domain without 'www.' prefix, or '' if the machine has no usable URL
+    """
+    try:
+        domain = urlparse(machine.get('product_link') or '').netloc.lower()
+        return domain[4:] if domain.startswith('www.') else domain
+    except Exception:
+        return ''
+
+
+class _DomainQueue:
+    """Pending work and in-flight accounting for one domain."""
+
+    def __init__(self, domain: str, max_concurrent: int, min_interval: float):
+        self.domain = domain
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.min_interval = max(0.0, float(min_interval))
+        self.items: Deque[Any] = deque()
+        self.active = 0
+        self.last_start = None
+
+    def ready_at(self, now: float) -> Optional[float]:
+        """Return the time this domain can start its next item, or None if it is at its cap."""
+        if not self.items or self.active >= self.max_concurrent:
+            return None
+        if self.last_start is None:
+            return now
+        return max(now, self.last_start + self.min_interval)
+
+
+class DomainFairScheduler:
+    """
+    Round-robin scheduler over per-domain queues.
+
+    Each domain keeps its own queue with a concurrency cap and minimum spacing between
+    request starts. Workers take the next item from the next domain in rotation that has
+    capacity, so a long run of machines on one host cannot starve the others, and an idle
+    worker picks up work from any domain that is ready.
+    """
+
+    def __init__(self, items: List[Any], max_workers: Union[int, Callable[[], int]],
+                 domain_func: Callable[[Any], str] = get_machine_domain,
+                 policy_func: Optional[Callable[[str], Dict]] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            items: Work items (machine records) in their original order
+            max_workers: Global worker cap, or a callable returning the current cap
+            domain_func: Maps an item to its domain
+            policy_func: Maps a domain to {'max_concurrent': int, 'min_interval': float}
+        """
+        self._max_workers = max_workers
+        self._policy_func = policy_func or (lambda domain: {})
+        self._queues: Dict[str, _DomainQueue] = {}
+        self._rotation: Deque[str] = deque()
+        self._condition = asyncio.Condition()
+        self._active = 0
+        self._remaining = 0
+
+        for item in items:
+            domain = domain_func(item)
+            queue = self._queues.get(domain)
+            if queue is None:
+                policy = self._policy_func(domain) or {}
+                queue = _DomainQueue(
+                    domain,
+                    policy.get('max_concurrent', 2),
+                    policy.get('min_interval', 0.0)
+                )
+                self._queues[domain] = queue
+                self._rotation.append(domain)
+            queue.items.append(item)
+            self._remaining += 1
+
+    @property
+    def worker_limit(self) -> int:
+        """Current global worker cap."""
+        limit = self._max_workers() if callable(self._max_workers) else self._max_workers
+        return max(1, int(limit))
+
+    def domain_summary(self) -> Dict[str, int]:
+        """Return the number of queued items per domain."""
+        return {domain: len(queue.items) for domain, queue in self._queues.items()}
+
+    def _take_next(self, now: float):
+        """
+        Pick the next item in round-robin order.
+
+        Returns:
+            (queue, item, None) when an item is ready, or (None, None, wait_seconds) otherwise
+        """
+        earliest = None
+        for _ in range(len(self._rotation)):
+            domain = self._rotation[0]
+            self._rotation.rotate(-1)
+            queue = self._queues[domain]
+            ready_at = queue.ready_at(now)
+            if ready_at is None:
+                continue
+            if ready_at <= now:
+                queue.active += 1
+                queue.last_start = now
+                return queue, queue.items.popleft(), None
+            earliest = ready_at if earliest is None else min(earliest, ready_at)
+
+        wait = (earliest - now) if earliest is not None else None
+        return None, None, wait
+
+    async def _next(self):
+        """Wait until an item is ready and a global worker slot is free."""
+        async with self._condition:
+            while True:
+                if self._remaining == 0:
+                    return None, None
+
+                wait = None
+                if self._active < self.worker_limit:
+                    queue, item, wait = self._take_next(time.monotonic())
+                    if queue is not None:
+                        self._active += 1
+                        self._remaining -= 1
+                        return queue, item
+
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=wait if wait is not None else 1.0)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _done(self, queue: _DomainQueue):
+        """Return a domain slot and wake waiting workers."""
+        async with self._condition:
+            queue.active -= 1
+            self._active -= 1
+            self._condition.notify_all()
+
+    async def run(self, handler: Callable[[Any], Awaitable[Any]], worker_count: Optional[int] = None):
+        """
+        Process every item with a pool of workers.
+
+        Args:
+            handler: Coroutine function called once per item
+            worker_count: Number of worker tasks to start (defaults to the current worker cap)
+        """
+        worker_count = worker_count or self.worker_limit
+        logger.info(f"📅 Scheduling {self._remaining} items across {len(self._queues)} domains with {worker_count} workers")
+
+        async def worker():
+            while True:
+                queue, item = await self._next()
+                if queue is None:
+                    return
+                try:
+                    await handler(item)
+                except Exception as e:
+                    logger.exception(f"Scheduler handler error for {queue.domain}: {str(e)}")
+                finally:
+                    await self._done(queue)
+
+        await asyncio.gather(*[worker() for _ in range(max(1, worker_count))])
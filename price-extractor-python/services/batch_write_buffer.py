@@ -0,0 +1,156 @@
+"""
+Write-behind buffer for a batch's price_history rows.
+Collects rows for one batch and writes them with multi-row inserts instead of one request per row.
+Rows that resumes and retests read back (batch_results, batch_failure_events) are not buffered.
+"""
+
+import asyncio
+import uuid
+from typing import Dict, List, Optional
+from loguru import logger
+
+from config import BATCH_WRITE_MAX_ROWS, BATCH_WRITE_FLUSH_SECONDS
+
+
+class BatchWriteBuffer:
+    """
+    Buffered bulk writer owned by a single batch.
+
+    Rows are flushed when a table reaches max_rows, when the oldest row has waited
+    flush_interval seconds, and when the batch closes the buffer. Every row gets a
+    client-generated UUID before it is queued and inserts ignore existing ids, so a
+    retried flush (after a timeout or a lost response) never writes a row twice.
+    """
+
+    def __init__(self, db_service, batch_id: str, max_rows: int = BATCH_WRITE_MAX_ROWS,
+                 flush_interval: float = BATCH_WRITE_FLUSH_SECONDS, max_retries: int = 3,
+                 retry_delay: float = 1.0):
+        """
+        Initialize the buffer.
+
+        Args:
+            db_service: DatabaseService used for the multi-row inserts
+            batch_id: Batch that owns the buffer
+            max_rows: Rows per table that trigger an immediate flush (and the insert chunk size)
+            flush_interval: Seconds a row may wait before a timed flush
+            max_retries: Attempts per chunk before the rows are kept for the next flush
+            retry_delay: Base delay between attempts (doubled each retry)
+        """
+        self.db_service = db_service
+        self.batch_id = batch_id
+        self.max_rows = max(1, max_rows)
+        self.flush_interval = flush_interval
+        self.max_retries = max(1, max_retries)
+        self.retry_delay = retry_delay
+
+        self._pending: Dict[str, List[Dict]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.stats = {'queued': 0, 'written': 0, 'requests': 0, 'retries': 0, 'failed_flushes': 0}
+
+    @property
+    def pending_count(self) -> int:
+        """Number of rows waiting to be written."""
+        return sum(len(rows) for rows in self._pending.values())
+
+    async def add(self, table: str, row: Dict):
+        """
+        Queue a row for insertion.
+
+        Args:
+            table: Target table
+            row: Row data; an 'id' is assigned if missing (the idempotency key)
+        """
+        row = dict(row)
+        row.setdefault('id', str(uuid.uuid4()))
+        self._pending.setdefault(table, []).append(row)
+        self.stats['queued'] += 1
+
+        if len(self._pending[table]) >= self.max_rows:
+            await self.flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Start a delayed flush unless one is already pending."""
+        if self._flush_task and not self._flush_task.done():
+            return
+        self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # Keep going while rows arrive during a flush (they cannot schedule their own task)
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so close() cannot cancel a write halfway through
+            await asyncio.shield(self.flush())
+
+    async def _insert_with_retry(self, table: str, rows: List[Dict]) -> bool:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.stats['requests'] += 1
+                await self.db_service.insert_rows(table, rows)
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Error writing {len(rows)} {table} rows for batch {self.batch_id}: {str(e)}")
+                    return False
+                self.stats['retries'] += 1
+                logger.warning(f"Write of {len(rows)} {table} rows failed (attempt {attempt}/{self.max_retries}), retrying: {str(e)}")
+                await asyncio.sleep(self.retry_delay * (2 ** (attempt - 1)))
+        return False
+
+    async def flush(self) -> int:
+        """
+        Write every buffered row.
+
+        Returns:
+            Number of rows written; rows that could not be written stay buffered
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+            written = 0
+            unwritten: Dict[str, List[Dict]] = {}
+
+            for table, rows in pending.items():
+                for start in range(0, len(rows), self.max_rows):
+                    chunk = rows[start:start + self.max_rows]
+                    if await self._insert_with_retry(table, chunk):
+                        written += len(chunk)
+                    else:
+                        self.stats['failed_flushes'] += 1
+                        unwritten.setdefault(table, []).extend(chunk)
+
+            # Keep failed rows (same ids) ahead of newer ones so the next flush retries them safely
+            for table, rows in unwritten.items():
+                self._pending[table] = rows + self._pending.get(table, [])
+
+            self.stats['written'] += written
+            if written:
+                logger.debug(f"💾 Flushed {written} buffered rows for batch {self.batch_id}")
+            return written
+
+    async def close(self) -> bool:
+        """
+        Cancel any delayed flush and write the buffer now.
+
+        Returns:
+            True if nothing is left unwritten
+        """
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+
+        await self.flush()
+        if self.pending_count:
+            logger.error(f"❌ {self.pending_count} batch rows for batch {self.batch_id} could not be written")
+            return False
+
+        logger.info(f"💾 Batch {self.batch_id} writes: {self.stats['written']} rows in {self.stats['requests']} requests")
+        return True
@@ -0,0 +1,220 @@
+"""
+Adaptive concurrency governor for batch price updates.
+Additive-increase / multiplicative-decrease (AIMD) control shared by the batch scheduler and the Scrapfly scraper.
+"""
+
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+from loguru import logger
+
+from config import (
+    CONCURRENCY_MIN,
+    CONCURRENCY_MAX,
+    CONCURRENCY_LATENCY_FACTOR,
+    CONCURRENCY_FAILURE_THRESHOLD,
+    SCRAPFLY_MAX_CONCURRENT_REQUESTS
+)
+
+
+class ConcurrencyGovernor:
+    """
+    AIMD concurrency limit driven by upstream feedback.
+
+    The limit grows by one after a full round of fast successful requests (one success per
+    slot) and is cut multiplicatively on 429 throttling, when recent failures pile up, or
+    when p95 latency rises well above the best p95 seen so far. Decreases are separated by
+    a cooldown so that one burst of errors only counts once. Listeners (e.g. request
+    limiters) are notified whenever the limit changes.
+    """
+
+    def __init__(self, min_limit: int = CONCURRENCY_MIN, max_limit: int = CONCURRENCY_MAX,
+                 initial_limit: int = SCRAPFLY_MAX_CONCURRENT_REQUESTS,
+                 decrease_factor: float = 0.5, latency_factor: float = CONCURRENCY_LATENCY_FACTOR,
+                 failure_threshold: int = CONCURRENCY_FAILURE_THRESHOLD,
+                 latency_window: int = 20, cooldown_seconds: float = 10.0, history_size: int = 200):
+        """
+        Initialize the governor.
+
+        Args:
+            min_limit: Lowest allowed concurrency
+            max_limit: Highest allowed concurrency
+            initial_limit: Starting concurrency
+            decrease_factor: Multiplier applied on congestion signals
+            latency_factor: p95 above baseline * factor counts as congestion
+            failure_threshold: Failures within the last minute that count as congestion
+            latency_window: Number of recent latency samples used for p95
+            cooldown_seconds: Minimum seconds between two decreases
+            history_size: Number of limit changes kept for metrics
+        """
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+
+        self._limit = self._clamp(initial_limit)
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._baseline_p95: Optional[float] = None
+        self._successes_since_change = 0
+        self._last_decrease = None
+        self._listeners: List[Callable[[int], None]] = []
+        self.history: Deque[Dict] = deque(maxlen=history_size)
+        self.stats = {
+            'successes': 0,
+            'failures': 0,
+            'throttles': 0,
+            'increases': 0,
+            'decreases': 0
+        }
+
+        logger.info(f"🎚️ Concurrency governor initialized: limit={self._limit} (min={self.min_limit}, max={self.max_limit})")
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return self._limit
+
+    def _clamp(self, value) -> int:
+        return max(self.min_limit, min(self.max_limit, int(value)))
+
+    def add_listener(self, callback: Callable[[int], None]):
+        """
+        Register a callback invoked with the new limit whenever it changes.
+
+        Args:
+            callback: Function taking the new limit
+        """
+        self._listeners.append(callback)
+        callback(self._limit)
+
+    def remove_listener(self, callback: Callable[[int], None]):
+        """
+        Unregister a callback added with add_listener.
+
+        Args:
+            callback: Previously registered function
+        """
+        try:
+            self._listeners.remove(callback)
+        except ValueError:
+            pass
+
+    def _set_limit(self, new_limit: int, reason: str):
+        new_limit = self._clamp(new_limit)
+        if new_limit == self._limit:
+            return
+
+        old_limit = self._limit
+        self._limit = new_limit
+        self._successes_since_change = 0
+        self.history.append({
+            'timestamp': datetime.now().isoformat(),
+            'from': old_limit,
+            'to': new_limit,
+            'reason': reason,
+            'p95_latency': self.p95_latency()
+        })
+
+        arrow = "⬆️" if new_limit > old_limit else "⬇️"
+        logger.info(f"{arrow} Concurrency {old_limit} -> {new_limit} ({reason})")
+
+        for callback in self._listeners:
+            try:
+                callback(new_limit)
+            except Exception as e:
+                logger.error(f"Concurrency listener failed: {str(e)}")
+
+    def p95_latency(self) -> Optional[float]:
+        """Return the p95 of recent request latencies, or None without samples."""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def _decrease(self, reason: str) -> bool:
+        now = time.monotonic()
+        if self._last_decrease is not None and now - self._last_decrease < self.cooldown_seconds:
+            return False
+
+        self._last_decrease = now
+        self.stats['decreases'] += 1
+        # Latencies measured at the old limit no longer describe the new one
+        self._latencies.clear()
+        self._set_limit(int(self._limit * self.decrease_factor), reason)
+        return True
+
+    def record_success(self, latency: float):
+        """
+        Record a successful request.
+
+        Args:
+            latency: Request duration in seconds (excluding queueing)
+        """
+        self.stats['successes'] += 1
+        self._latencies.append(latency)
+        p95 = self.p95_latency()
+
+        window_full = len(self._latencies) == self._latencies.maxlen
+        latency_high = self._baseline_p95 is not None and p95 > self._baseline_p95 * self.latency_factor
+
+        # Baseline is the best p95 seen over a full window
+        if window_full and (self._baseline_p95 is None or p95 < self._baseline_p95):
+            self._baseline_p95 = p95
+
+        if latency_high:
+            # Only back off on a full window so one slow page cannot trigger it
+            if window_full:
+                self._decrease(f"p95 latency {p95:.1f}s above {self.latency_factor}x baseline {self._baseline_p95:.1f}s")
+            return
+
+        self._successes_since_change += 1
+        if self._successes_since_change >= self._limit and self._limit < self.max_limit:
+            self.stats['increases'] += 1
+            self._set_limit(self._limit + 1, "requests succeeding")
+
+    def record_throttle(self):
+        """Record an upstream 429 / throttling response."""
+        self.stats['throttles'] += 1
+        self._decrease("upstream throttling (429)")
+
+    def record_failure(self, recent_failures: int = 0):
+        """
+        Record a failed request.
+
+        Args:
+            recent_failures: Failures seen in the last minute (e.g. len(scraper.failed_requests))
+        """
+        self.stats['failures'] += 1
+        self._successes_since_change = 0
+        if recent_failures >= self.failure_threshold:
+            self._decrease(f"{recent_failures} failed requests in the last minute")
+
+    def get_metrics(self) -> Dict:
+        """Return the current limit, latency and counters, plus recent limit changes."""
+        return {
+            'limit': self._limit,
+            'min_limit': self.min_limit,
+            'max_limit': self.max_limit,
+            'p95_latency': self.p95_latency(),
+            'baseline_p95_latency': self._baseline_p95,
+            'stats': dict(self.stats),
+            'history': list(self.history)
+        }
+
+
+# Global governor instance
+_concurrency_governor: Optional[ConcurrencyGovernor] = None
+
+
+def get_concurrency_governor() -> ConcurrencyGovernor:
+    """Get or create the global concurrency governor instance."""
+    global _concurrency_governor
+
+    if _concurrency_governor is None:
+        _concurrency_governor = ConcurrencyGovernor()
+
+    return _concurrency_governor
@@ -1,6 +1,10 @@
 from supabase import create_client
+from postgrest import AsyncPostgrestClient
+from postgrest.types import ReturnMethod
 from datetime import datetime, timedelta
 from loguru import logger
+import asyncio
+import httpx
 import json
 import uuid
 from typing import List, Dict, Optional
@@ -8,18 +12,82 @@ from typing import List, Dict, Optional
 from config import (
     SUPABASE_URL, 
     SUPABASE_KEY, 
+    SUPABASE_REST_URL,
+    DB_POOL_SIZE,
+    DB_TIMEOUT,
     MACHINES_TABLE, 
     PRICE_HISTORY_TABLE
 )
 
 class DatabaseService:
-    """Service for interacting with the Supabase database."""
+    """
+    Service for interacting with the Supabase database.
     
-    def __init__(self):
-        """Initialize the Supabase client."""
+    Async methods go through `rest`, an async PostgREST client on a pooled HTTP/2
+    connection, so concurrent batch workers no longer block the event loop on DB calls.
+    `supabase` (the sync client) stays available for sync callers and scripts.
+    """
+    
+    def __init__(self, rest_url: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize the Supabase clients.
+        
+        Args:
+            rest_url: PostgREST base URL (defaults to SUPABASE_REST_URL)
+            transport: Optional httpx transport for the async client (e.g. a local PostgREST stand-in)
+        """
         self.supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        self.rest_url = rest_url or SUPABASE_REST_URL
+        self._transport = transport
+        self._rest: Optional[AsyncPostgrestClient] = None
+        self._rest_loop = None
+        self._write_buffers = {}
         logger.info("Database service initialized")
     
+    @property
+    def rest(self) -> AsyncPostgrestClient:
+        """
+        Async PostgREST client for the running event loop.
+        
+        httpx connections belong to the loop that opened them, so a new pooled client is
+        created the first time the service is used from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._rest is None or self._rest_loop is not loop:
+            self._discard_stale_rest_client()
+            headers = {
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+                "apikey": SUPABASE_KEY or "",
+                "Authorization": f"Bearer {SUPABASE_KEY}" if SUPABASE_KEY else ""
+            }
+            http_client = httpx.AsyncClient(
+                http2=self._transport is None,
+                transport=self._transport,
+                timeout=DB_TIMEOUT,
+                limits=httpx.Limits(max_connections=DB_POOL_SIZE, max_keepalive_connections=DB_POOL_SIZE),
+                follow_redirects=True
+            )
+            self._rest = AsyncPostgrestClient(self.rest_url, headers=headers, http_client=http_client)
+            self._rest_loop = loop
+        return self._rest
+    
+    def _discard_stale_rest_client(self):
+        """
+        Release the client created for a previous event loop.
+        
+        Its connections can only be closed on that loop: if the loop is still running (in
+        another thread) the close is scheduled there, otherwise the client is dropped.
+        """
+        stale_client, stale_loop = self._rest, self._rest_loop
+        self._rest, self._rest_loop = None, None
+        if stale_client is None:
+            return
+        if stale_loop is not None and stale_loop.is_running() and not stale_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(stale_client.aclose(), stale_loop)
+        else:
+            logger.debug("Dropped async database client of a finished event loop")
+    
     async def get_machine_by_id(self, machine_id):
         """
         Get a machine record by ID.
@@ -41,7 +109,7 @@ class DatabaseService:
             logger.debug(f"Looking for machine with normalized ID: {machine_id_str}")
             
             # First try direct exact match
-            response = self.supabase.table("machines") \
+            response = await self.rest.table("machines") \
                 .select("*") \
                 .eq("id", machine_id) \
                 .single() \
@@ -54,7 +122,7 @@ class DatabaseService:
             # If exact match failed, try with lowercase ID
             if machine_id != machine_id_str:
                 logger.debug(f"Exact match failed, trying case-insensitive match: {machine_id_str}")
-                response = self.supabase.table("machines") \
+                response = await self.rest.table("machines") \
                     .select("*") \
                     .eq("id", machine_id_str) \
                     .single() \
@@ -68,7 +136,7 @@ class DatabaseService:
             if ' ' in machine_id:
                 trimmed_id = machine_id.replace(' ', '')
                 logger.debug(f"Trying with whitespace removed: {trimmed_id}")
-                response = self.supabase.table("machines") \
+                response = await self.rest.table("machines") \
                     .select("*") \
                     .eq("id", trimmed_id) \
                     .single() \
@@ -87,38 +155,108 @@ class DatabaseService:
             logger.error(f"Error retrieving machine {machine_id}: {str(e)}")
             return None
     
-    async def update_machine_price(self, machine_id, new_price, html_content=None):
+    async def get_machines_by_ids(self, machine_ids: List[str], columns: str = "*", chunk_size: int = 200) -> List[Dict]:
         """
-        Update a machine's price and store the HTML content.
+        Get many machine records with a few set-based queries.
+        
+        Args:
+            machine_ids: Machine IDs to load
+            columns: PostgREST select list
+            chunk_size: IDs per query (keeps request URLs short)
+            
+        Returns:
+            List of machine records (errors are raised to the caller)
+        """
+        machines = []
+        ids = list(dict.fromkeys(machine_ids))
+        for start in range(0, len(ids), chunk_size):
+            response = await self.rest.table(MACHINES_TABLE) \
+                .select(columns) \
+                .in_("id", ids[start:start + chunk_size]) \
+                .execute()
+            machines.extend(response.data or [])
+        return machines
+    
+    async def get_recent_manual_corrections(self, machine_ids: List[str], days: int = 7, chunk_size: int = 200) -> Dict[str, List[Dict]]:
+        """
+        Get recent MANUAL_CORRECTION price history entries for many machines.
+        
+        Args:
+            machine_ids: Machine IDs to check
+            days: How far back to look
+            chunk_size: IDs per query
+            
+        Returns:
+            dict: machine_id -> corrections (newest first), each with price, date and status
+        """
+        since = (datetime.utcnow() - timedelta(days=days)).isoformat() + "Z"
+        corrections: Dict[str, List[Dict]] = {}
+        ids = list(dict.fromkeys(machine_ids))
+        for start in range(0, len(ids), chunk_size):
+            response = await self.rest.table(PRICE_HISTORY_TABLE) \
+                .select("machine_id, price, date, status") \
+                .in_("machine_id", ids[start:start + chunk_size]) \
+                .eq("status", "MANUAL_CORRECTION") \
+                .gte("date", since) \
+                .order("date", desc=True) \
+                .execute()
+            for entry in response.data or []:
+                corrections.setdefault(entry["machine_id"], []).append(entry)
+        return corrections
+    
+    async def update_machine_price(self, machine_id, new_price, html_content=None, snapshot_hash=None, machine_known=False, page_fetched=True):
+        """
+        Update a machine's price and reference the scraped page.
         
         Args:
             machine_id (str): The ID of the machine to update.
             new_price (float): The new price value.
-            html_content (str, optional): The HTML content of the scraped page.
+            html_content (str, optional): The HTML content of the scraped page (stored in the row only
+                when it could not be archived in the snapshot store).
+            snapshot_hash (str, optional): Hash of the page in the HTML snapshot store.
+            machine_known (bool): Skip the existence check (caller already loaded the machine).
+            page_fetched (bool): False when the price was read without fetching a page (e.g. from
+                product JSON); the row's stored page is cleared so it is not shown as current.
             
         Returns:
             bool: True if update was successful, False otherwise.
         """
         try:
             # First verify the machine exists
-            verify_machine = await self.get_machine_by_id(machine_id)
-            if not verify_machine:
-                logger.warning(f"Cannot update price: Machine with ID {machine_id} not found in database")
-                return False
+            if not machine_known:
+                verify_machine = await self.get_machine_by_id(machine_id)
+                if not verify_machine:
+                    logger.warning(f"Cannot update price: Machine with ID {machine_id} not found in database")
+                    return False
             
             update_data = {
                 "Price": new_price,
                 "html_timestamp": datetime.utcnow().isoformat() + "Z",
             }
             
-            if html_content:
+            if not page_fetched:
+                # No page behind this price, so drop the old page rather than show it under the new html_timestamp
+                update_data["html_hash"] = None
+                update_data["html_size"] = None
+                update_data["html_content"] = None
+            elif snapshot_hash:
+                # The page lives in the snapshot store; the admin HTML viewer loads it by hash,
+                # so the row keeps only the reference (and drops any copy from before the store)
+                update_data["html_hash"] = snapshot_hash
+                update_data["html_content"] = None
+                if html_content:
+                    update_data["html_size"] = len(html_content)
+            elif html_content:
+                # The page could not be archived: keep it in the row as before the snapshot store
+                # (the viewer prefers html_hash, so the old reference is dropped)
+                update_data["html_hash"] = None
                 update_data["html_content"] = html_content
                 update_data["html_size"] = len(html_content)
             
             # Log the exact update we're making
             logger.debug(f"Updating machine {machine_id} with price {new_price}")
             
-            response = self.supabase.table(MACHINES_TABLE) \
+            response = await self.rest.table(MACHINES_TABLE) \
                 .update(update_data) \
                 .eq("id", machine_id) \
                 .execute()
@@ -152,7 +290,7 @@ class DatabaseService:
             status (str, optional): Override status (e.g., 'MANUAL_CORRECTION').
             
         Returns:
-            bool: True if the history entry was added successfully, False otherwise.
+            bool: True if the history entry was added (or queued in the batch's write buffer), False otherwise.
         """
         try:
             # Calculate price change if there's an old price
@@ -216,76 +354,17 @@ class DatabaseService:
             
             # Calculate all-time low/high flags if we have a valid new price
             if new_price is not None and success:
-                try:
-                    # Get all historical prices for this machine
-                    history_response = self.supabase.table(PRICE_HISTORY_TABLE) \
-                        .select("price") \
-                        .eq("machine_id", machine_id) \
-                        .in_("status", ["AUTO_APPLIED", "APPROVED", "SUCCESS", "MANUAL_CORRECTION"]) \
-                        .execute()
-                    
-                    if history_response.data:
-                        # Extract valid prices
-                        historical_prices = [
-                            float(h["price"]) 
-                            for h in history_response.data 
-                            if h["price"] is not None
-                        ]
-                        
-                        if historical_prices:
-                            min_price = min(historical_prices)
-                            max_price = max(historical_prices)
-                            new_price_float = float(new_price)
-                            
-                            # Check if this is a new all-time low or high
-                            # Use small tolerance for floating point comparison
-                            if new_price_float <= min_price + 0.01:
-                                entry_data["is_all_time_low"] = True
-                                logger.info(f"🎯 New all-time LOW for machine {machine_id}: ${new_price_float:.2f}")
-                                
-                                # Reset previous all-time low flags for this machine
-                                if new_price_float < min_price - 0.01:  # Only if it's actually lower, not equal
-                                    try:
-                                        self.supabase.table(PRICE_HISTORY_TABLE) \
-                                            .update({"is_all_time_low": False}) \
-                                            .eq("machine_id", machine_id) \
-                                            .eq("is_all_time_low", True) \
-                                            .execute()
-                                        logger.debug(f"Reset previous all-time low flags for machine {machine_id}")
-                                    except Exception as e:
-                                        logger.warning(f"Could not reset previous all-time low flags: {str(e)}")
-                            
-                            if new_price_float >= max_price - 0.01:
-                                entry_data["is_all_time_high"] = True
-                                logger.info(f"📈 New all-time HIGH for machine {machine_id}: ${new_price_float:.2f}")
-                                
-                                # Reset previous all-time high flags for this machine
-                                if new_price_float > max_price + 0.01:  # Only if it's actually higher, not equal
-                                    try:
-                                        self.supabase.table(PRICE_HISTORY_TABLE) \
-                                            .update({"is_all_time_high": False}) \
-                                            .eq("machine_id", machine_id) \
-                                            .eq("is_all_time_high", True) \
-                                            .execute()
-                                        logger.debug(f"Reset previous all-time high flags for machine {machine_id}")
-                                    except Exception as e:
-                                        logger.warning(f"Could not reset previous all-time high flags: {str(e)}")
-                        else:
-                            # First price entry - mark as both low and high
-                            entry_data["is_all_time_low"] = True
-                            entry_data["is_all_time_high"] = True
-                            logger.info(f"First price entry for machine {machine_id}: ${new_price}")
-                    else:
-                        # No history - this is the first entry
-                        entry_data["is_all_time_low"] = True
-                        entry_data["is_all_time_high"] = True
-                        logger.info(f"First price entry for machine {machine_id}: ${new_price}")
-                        
-                except Exception as e:
-                    logger.warning(f"Could not calculate all-time low/high for machine {machine_id}: {str(e)}")
+                await self._set_all_time_flags(machine_id, new_price, entry_data)
+            
+            # Batch writes are buffered and flushed as multi-row inserts
+            write_buffer = self._write_buffers.get(batch_id) if batch_id else None
+            if write_buffer is not None:
+                await write_buffer.add(PRICE_HISTORY_TABLE, entry_data)
+                logger.debug(f"Queued price history entry for machine {machine_id}")
+                return True
             
             # Add to price history table
-            response = self.supabase.table(PRICE_HISTORY_TABLE) \
+            response = await self.rest.table(PRICE_HISTORY_TABLE) \
                 .insert(entry_data) \
                 .execute()
             
@@ -298,6 +377,259 @@ class DatabaseService:
             logger.error(f"Error adding price history for machine {machine_id}: {str(e)}")
             return False
     
+    async def get_machine_price_stats(self, machine_id):
+        """
+        Get the per-machine price aggregate maintained by the price_history trigger.
+        
+        Args:
+            machine_id (str): The ID of the machine.
+            
+        Returns:
+            dict: min_price, max_price, last_price, price_count, last_checked_at, check_count
+                  ({} if the machine has no history yet), or None if the stats table is unavailable.
+        """
+        try:
+            response = await self.rest.table("machine_price_stats") \
+                .select("*") \
+                .eq("machine_id", machine_id) \
+                .limit(1) \
+                .execute()
+            return response.data[0] if response.data else {}
+        except Exception as e:
+            logger.warning(f"Could not read price stats for machine {machine_id}: {str(e)}")
+            return None
+    
+    async def _set_all_time_flags(self, machine_id, new_price, entry_data):
+        """
+        Set is_all_time_low / is_all_time_high on a new price history entry.
+        
+        Uses the machine's row in machine_price_stats, so the cost does not grow with history
+        length; the table's trigger updates the aggregate and clears superseded flags on insert.
+        Falls back to scanning the machine's history if the stats table is unavailable.
+        
+        Args:
+            machine_id (str): The ID of the machine.
+            new_price (float): The newly extracted price.
+            entry_data (dict): Price history entry to update in place.
+        """
+        stats = await self.get_machine_price_stats(machine_id)
+        if stats is None:
+            await self._set_all_time_flags_from_history(machine_id, new_price, entry_data)
+            return
+        
+        try:
+            min_price = stats.get("min_price")
+            max_price = stats.get("max_price")
+            new_price_float = float(new_price)
+            
+            if min_price is None or max_price is None:
+                # No history - this is the first entry
+                entry_data["is_all_time_low"] = True
+                entry_data["is_all_time_high"] = True
+                logger.info(f"First price entry for machine {machine_id}: ${new_price}")
+                return
+            
+            # Use small tolerance for floating point comparison
+            if new_price_float <= float(min_price) + 0.01:
+                entry_data["is_all_time_low"] = True
+                logger.info(f"🎯 New all-time LOW for machine {machine_id}: ${new_price_float:.2f}")
+            
+            if new_price_float >= float(max_price) - 0.01:
+                entry_data["is_all_time_high"] = True
+                logger.info(f"📈 New all-time HIGH for machine {machine_id}: ${new_price_float:.2f}")
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Could not calculate all-time low/high for machine {machine_id}: {str(e)}")
+    
+    async def _set_all_time_flags_from_history(self, machine_id, new_price, entry_data):
+        """
+        Legacy all-time flag calculation that scans the machine's price history.
+        Only used when machine_price_stats is not available (migration 005 not applied).
+        """
+        try:
+            # Get all historical prices for this machine
+            history_response = await self.rest.table(PRICE_HISTORY_TABLE) \
+                .select("price") \
+                .eq("machine_id", machine_id) \
+                .in_("status", ["AUTO_APPLIED", "APPROVED", "SUCCESS", "MANUAL_CORRECTION"]) \
+                .execute()
+            
+            if history_response.data:
+                # Extract valid prices
+                historical_prices = [
+                    float(h["price"]) 
+                    for h in history_response.data 
+                    if h["price"] is not None
+                ]
+                
+                if historical_prices:
+                    min_price = min(historical_prices)
+                    max_price = max(historical_prices)
+                    new_price_float = float(new_price)
+                    
+                    # Check if this is a new all-time low or high
+                    # Use small tolerance for floating point comparison
+                    if new_price_float <= min_price + 0.01:
+                        entry_data["is_all_time_low"] = True
+                        logger.info(f"🎯 New all-time LOW for machine {machine_id}: ${new_price_float:.2f}")
+                        
+                        # Reset previous all-time low flags for this machine
+                        if new_price_float < min_price - 0.01:  # Only if it's actually lower, not equal
+                            try:
+                                await self.rest.table(PRICE_HISTORY_TABLE) \
+                                    .update({"is_all_time_low": False}) \
+                                    .eq("machine_id", machine_id) \
+                                    .eq("is_all_time_low", True) \
+                                    .execute()
+                                logger.debug(f"Reset previous all-time low flags for machine {machine_id}")
+                            except Exception as e:
+                                logger.warning(f"Could not reset previous all-time low flags: {str(e)}")
+                    
+                    if new_price_float >= max_price - 0.01:
+                        entry_data["is_all_time_high"] = True
+                        logger.info(f"📈 New all-time HIGH for machine {machine_id}: ${new_price_float:.2f}")
+                        
+                        # Reset previous all-time high flags for this machine
+                        if new_price_float > max_price + 0.01:  # Only if it's actually higher, not equal
+                            try:
+                                await self.rest.table(PRICE_HISTORY_TABLE) \
+                                    .update({"is_all_time_high": False}) \
+                                    .eq("machine_id", machine_id) \
+                                    .eq("is_all_time_high", True) \
+                                    .execute()
+                                logger.debug(f"Reset previous all-time high flags for machine {machine_id}")
+                            except Exception as e:
+                                logger.warning(f"Could not reset previous all-time high flags: {str(e)}")
+                else:
+                    # First price entry - mark as both low and high
+                    entry_data["is_all_time_low"] = True
+                    entry_data["is_all_time_high"] = True
+                    logger.info(f"First price entry for machine {machine_id}: ${new_price}")
+            else:
+                # No history - this is the first entry
+                entry_data["is_all_time_low"] = True
+                entry_data["is_all_time_high"] = True
+                logger.info(f"First price entry for machine {machine_id}: ${new_price}")
+                
+        except Exception as e:
+            logger.warning(f"Could not calculate all-time low/high for machine {machine_id}: {str(e)}")
+    
+    async def iter_machine_pages(self, columns: str = "*", page_size: int = 500, **filters):
+        """
+        Stream machine records page by page (ordered by id) without loading the whole table.
+        
+        Args:
+            columns: PostgREST select list
+            page_size: Rows per request
+            **filters: Equality filters, e.g. price_tracking_enabled=True
+            
+        Yields:
+            list: One page of machine records
+        """
+        offset = 0
+        while True:
+            query = self.rest.table(MACHINES_TABLE).select(columns)
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            response = await query.order("id").range(offset, offset + page_size - 1).execute()
+            page = response.data or []
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            offset += page_size
+    
+    async def _get_recently_checked_machine_ids(self, machine_ids: List[str], since: datetime, chunk_size: int = 200) -> set:
+        """
+        Get the machines (out of machine_ids) with a price check at or after `since`.
+        
+        Reads machine_price_stats.last_checked_at; without that table, looks for any
+        price_history entry in the window (only recent rows are returned either way).
+        
+        Args:
+            machine_ids: Machines to check
+            since: Start of the window
+            chunk_size: IDs per query (keeps request URLs short)
+            
+        Returns:
+            set: IDs of machines checked since the cutoff
+        """
+        if not machine_ids:
+            return set()
+        
+        since_iso = since.isoformat() + "Z"
+        checked = set()
+        use_stats = True
+        for start in range(0, len(machine_ids), chunk_size):
+            chunk = machine_ids[start:start + chunk_size]
+            if use_stats:
+                try:
+                    response = await self.rest.table("machine_price_stats") \
+                        .select("machine_id") \
+                        .in_("machine_id", chunk) \
+                        .gte("last_checked_at", since_iso) \
+                        .execute()
+                except Exception as e:
+                    logger.debug(f"machine_price_stats unavailable, using price_history window: {str(e)}")
+                    use_stats = False
+                else:
+                    checked.update(row["machine_id"] for row in response.data or [])
+                    continue
+            
+            # Several history rows per machine can match, so page past the server's row cap
+            offset, page_size = 0, 1000
+            while True:
+                response = await self.rest.table(PRICE_HISTORY_TABLE) \
+                    .select("machine_id") \
+                    .in_("machine_id", chunk) \
+                    .gte("date", since_iso) \
+                    .order("id") \
+                    .range(offset, offset + page_size - 1) \
+                    .execute()
+                rows = response.data or []
+                checked.update(row["machine_id"] for row in rows)
+                if len(rows) < page_size:
+                    break
+                offset += page_size
+        return checked
+    
+    async def get_price_history_window(self, machine_ids: List[str], days: int = 90, chunk_size: int = 100, page_size: int = 1000) -> Dict[str, List[Dict]]:
+        """
+        Get recent price history for many machines with a few set-based queries.
+        
+        Args:
+            machine_ids: Machines to load
+            days: Window size in days
+            chunk_size: Machine IDs per query
+            page_size: Rows per request (the server caps rows per response)
+            
+        Returns:
+            dict: machine_id -> history entries (price, status, failure_reason, date), oldest first
+        """
+        since_iso = (datetime.utcnow() - timedelta(days=days)).isoformat() + "Z"
+        history = {machine_id: [] for machine_id in machine_ids}
+        
+        for start in range(0, len(machine_ids), chunk_size):
+            chunk = machine_ids[start:start + chunk_size]
+            offset = 0
+            while True:
+                response = await self.rest.table(PRICE_HISTORY_TABLE) \
+                    .select("id, machine_id, price, status, failure_reason, date") \
+                    .in_("machine_id", chunk) \
+                    .gte("date", since_iso) \
+                    .order("id") \
+                    .range(offset, offset + page_size - 1) \
+                    .execute()
+                rows = response.data or []
+                for row in rows:
+                    history.setdefault(row["machine_id"], []).append(row)
+                if len(rows) < page_size:
+                    break
+                offset += page_size
+        
+        for entries in history.values():
+            entries.sort(key=lambda entry: entry.get("date") or "")
+        return history
+    
     async def get_machines_needing_update(self, days_threshold: int = 7, machine_ids: List[str] = None, limit: Optional[int] = None) -> List[Dict]:
         """
         Get machines that need price updates based on last price check (price_history), not last price change.
@@ -318,14 +650,14 @@ class DatabaseService:
             if machine_ids:
                 logger.info(f"Getting {len(machine_ids)} specific machines for batch update")
                 query = (
-                    self.supabase.table("machines")
+                    self.rest.table("machines")
                     .select(selected_columns)
                     .in_("id", machine_ids)
                     .eq("price_tracking_enabled", True)  # Only include machines with price tracking enabled
                 )
                 
                 # Execute the query for specific machine IDs
-                response = query.execute()
+                response = await query.execute()
                 machines = response.data
                 
                 if not machines:
@@ -344,7 +676,7 @@ class DatabaseService:
                 
                 try:
                     # Use the Supabase database function
-                    response = self.supabase.rpc(
+                    response = await self.rest.rpc(
                         'get_machines_needing_price_check', 
                         {
                             'days_threshold': days_threshold,
@@ -363,60 +695,25 @@ class DatabaseService:
                 except Exception as e:
                     logger.warning(f"Database function failed, falling back to manual method: {str(e)}")
                     
-                    # Fallback to manual method if function doesn't exist
-                    today = datetime.now()
-                    threshold_date = today - timedelta(days=days_threshold)
+                    # Fallback: page through tracked machines and drop the ones checked since the
+                    # threshold, using one set-based query per page instead of one per machine
+                    threshold_date = datetime.utcnow() - timedelta(days=days_threshold)
                     
                     logger.info(f"Finding machines that haven't been checked since {threshold_date.isoformat()}")
                     
-                    # Get all machines first (only those with price tracking enabled)
-                    all_machines_response = (
-                        self.supabase.table("machines")
-                        .select(selected_columns)
-                        .eq("price_tracking_enabled", True)
-                        .execute()
-                    )
-                    
-                    if not all_machines_response.data:
-                        logger.info("No machines found in database")
-                        return []
-                    
                     machines_needing_update = []
                     
-                    # Check each machine's last price history entry
-                    for machine in all_machines_response.data:
-                        machine_id = machine.get("id")
-                        
-                        # Get the most recent price history entry for this machine
-                        history_response = (
-                            self.supabase.table("price_history")
-                            .select("date")
-                            .eq("machine_id", machine_id)
-                            .order("date", desc=True)
-                            .limit(1)
-                            .execute()
+                    async for page in self.iter_machine_pages(selected_columns, price_tracking_enabled=True):
+                        recently_checked = await self._get_recently_checked_machine_ids(
+                            [machine.get("id") for machine in page], threshold_date
                         )
+                        for machine in page:
+                            if machine.get("id") not in recently_checked:
+                                machines_needing_update.append(machine)
                         
-                        # Check if machine needs update
-                        needs_update = False
-                        if not history_response.data:
-                            # Never checked
-                            needs_update = True
-                            logger.debug(f"Machine {machine_id} never checked - needs update")
-                        else:
-                            last_check = datetime.fromisoformat(history_response.data[0]["date"].replace('Z', '+00:00'))
-                            if last_check < threshold_date:
-                                # Last checked before threshold
-                                needs_update = True
-                                logger.debug(f"Machine {machine_id} last checked {last_check} - needs update")
-                            else:
-                                logger.debug(f"Machine {machine_id} last checked {last_check} - no update needed")
-                        
-                        if needs_update:
-                            machines_needing_update.append(machine)
-                            
                         # Apply limit
                         if limit and len(machines_needing_update) >= limit:
+                            machines_needing_update = machines_needing_update[:limit]
                             logger.info(f"Reached limit of {limit} machines")
                             break
                     
@@ -425,7 +722,7 @@ class DatabaseService:
             else:
                 # If days_threshold is 0, we're getting all machines
                 query = (
-                    self.supabase.table("machines")
+                    self.rest.table("machines")
                     .select(selected_columns)
                 )
                 
@@ -435,7 +732,7 @@ class DatabaseService:
                     logger.info(f"Limiting query to {limit} machines")
                 
                 # Execute the query
-                response = query.execute()
+                response = await query.execute()
                 machines = response.data
                 
                 if not machines:
@@ -449,7 +746,7 @@ class DatabaseService:
             logger.exception(f"Error in get_machines_needing_update: {str(e)}")
             return []
     
-    def get_price_history_for_machine(self, machine_id):
+    async def get_price_history_for_machine(self, machine_id):
         """
         Get the price history for a specific machine.
         
@@ -461,7 +758,7 @@ class DatabaseService:
         """
         try:
             # Query the price history table for this machine
-            response = self.supabase.table(PRICE_HISTORY_TABLE) \
+            response = await self.rest.table(PRICE_HISTORY_TABLE) \
                 .select("*") \
                 .eq("machine_id", machine_id) \
                 .order("date", desc=True) \
@@ -475,7 +772,7 @@ class DatabaseService:
             return []
 
     # Batch Operations
-    async def create_batch(self, count: int, days_threshold: int = None, machine_ids: List[str] = None, limit: Optional[int] = None, max_workers: Optional[int] = None, extraction_pipeline: str = 'standard') -> str:
+    async def create_batch(self, count: int, days_threshold: int = None, machine_ids: List[str] = None, limit: Optional[int] = None, max_workers: Optional[int] = None, extraction_pipeline: str = 'standard', planned_machine_ids: List[str] = None) -> str:
         """
         Create a new batch record for batch processing.
         
@@ -486,6 +783,7 @@ class DatabaseService:
             limit (Optional[int], optional): Limit used for this batch.
             max_workers (Optional[int], optional): Max workers used for this batch.
             extraction_pipeline (str, optional): Pipeline type ('standard' or 'scrapfly').
+            planned_machine_ids (List[str], optional): Every machine the batch will process (used to resume it).
             
         Returns:
             str: The ID of the created batch.
@@ -500,8 +798,12 @@ class DatabaseService:
             metadata = {
                 "limit": limit,
                 "max_workers": max_workers,
-                "machine_ids": machine_ids[:5] if machine_ids and len(machine_ids) > 5 else machine_ids
+                "machine_ids": machine_ids[:5] if machine_ids and len(machine_ids) > 5 else machine_ids,
+                # Failures are recorded in batch_failure_events; older batches only have their log
+                "failure_events": True
             }
+            if planned_machine_ids is not None:
+                metadata["planned_machine_ids"] = planned_machine_ids
             
             # Prepare batch data
             batch_data = {
@@ -518,7 +820,7 @@ class DatabaseService:
             logger.debug(f"Batch data being inserted: {batch_data}")
             
             # Create new batch record - no await needed for Supabase operations
-            response = self.supabase.table("batches").insert(batch_data).execute()
+            response = await self.rest.table("batches").insert(batch_data).execute()
             
             if not response:
                 logger.error("Empty response when creating batch record")
@@ -529,7 +831,7 @@ class DatabaseService:
                 
                 # Double-check that the batch was created by immediately querying for it
                 # No await needed for Supabase operations
-                verify_response = self.supabase.table("batches") \
+                verify_response = await self.rest.table("batches") \
                     .select("id, status") \
                     .eq("id", batch_id) \
                     .execute()
@@ -547,6 +849,37 @@ class DatabaseService:
             logger.exception(f"Error creating batch: {str(e)}")
             return None
             
+    async def get_batch(self, batch_id):
+        """
+        Get a batch record with its metadata decoded.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            
+        Returns:
+            dict: Batch record ('metadata' as a dict), or None if not found.
+        """
+        try:
+            response = await self.rest.table("batches") \
+                .select("*") \
+                .eq("id", batch_id) \
+                .execute()
+            
+            if not response.data:
+                logger.warning(f"Batch {batch_id} not found")
+                return None
+            
+            batch = response.data[0]
+            metadata = batch.get("metadata") or {}
+            if isinstance(metadata, str):
+                metadata = json.loads(metadata) if metadata.strip() else {}
+            batch["metadata"] = metadata
+            return batch
+            
+        except Exception as e:
+            logger.error(f"Error getting batch {batch_id}: {str(e)}")
+            return None
+    
     async def complete_batch(self, batch_id, completion_metadata=None):
         """
         Mark a batch as completed.
@@ -568,7 +901,7 @@ class DatabaseService:
             if completion_metadata:
                 # First get existing metadata
                 try:
-                    response = self.supabase.table("batches") \
+                    response = await self.rest.table("batches") \
                         .select("metadata") \
                         .eq("id", batch_id) \
                         .execute()
@@ -588,7 +921,7 @@ class DatabaseService:
                     logger.warning(f"Error handling metadata for batch {batch_id}: {meta_error}")
                     # Still proceed with completion, just without metadata update
             
-            response = self.supabase.table("batches") \
+            response = await self.rest.table("batches") \
                 .update(update_data) \
                 .eq("id", batch_id) \
                 .execute()
@@ -604,7 +937,7 @@ class DatabaseService:
             logger.error(f"Error completing batch {batch_id}: {str(e)}")
             return False
             
-    async def add_batch_result(self, batch_id, machine_id, result):
+    async def add_batch_result(self, batch_id, machine_id, result, machine=None):
         """
         Add a result entry to a batch operation.
         
@@ -612,13 +945,15 @@ class DatabaseService:
             batch_id (str): ID of the batch.
             machine_id (str): ID of the machine.
             result (dict): Result data from price update operation.
+            machine (dict, optional): Machine record already loaded by the caller (skips a lookup).
             
         Returns:
-            bool: True if added successfully, False otherwise.
+            bool: True if added, False otherwise.
         """
         try:
             # Get machine name
-            machine = await self.get_machine_by_id(machine_id)
+            if machine is None:
+                machine = await self.get_machine_by_id(machine_id)
             machine_name = machine.get("Machine Name") if machine else "Unknown"
             
             # Calculate duration if we have start and end times
@@ -660,7 +995,12 @@ class DatabaseService:
                 "end_time": result.get("end_time", current_time)
             }
             
-            response = self.supabase.table("batch_results") \
+            # Failures are also kept as structured events for retests
+            if not entry_data["success"] and not result.get("excluded"):
+                await self.add_batch_failure_event(batch_id, machine_id, result, machine_name=machine_name, url=url)
+            
+            # Written directly, not buffered: this row is the machine's resume checkpoint
+            response = await self.rest.table("batch_results") \
                 .insert(entry_data) \
                 .execute()
                 
@@ -675,6 +1015,116 @@ class DatabaseService:
             logger.error(f"Error adding batch result for machine {machine_id}: {str(e)}")
             return False
             
+    async def add_batch_failure_event(self, batch_id, machine_id, result, machine_name=None, url=None):
+        """
+        Record a failed machine update as a structured event.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            machine_id (str): ID of the machine.
+            result (dict): Failed result from the price update (stage, error_class, tier, credits).
+            machine_name (str, optional): Machine name.
+            url (str, optional): URL that was scraped.
+            
+        Returns:
+            bool: True if recorded, False otherwise.
+        """
+        try:
+            event = {
+                "batch_id": batch_id,
+                "machine_id": machine_id,
+                "machine_name": machine_name,
+                "url": url or result.get("url"),
+                "stage": result.get("stage") or "unknown",
+                "error_class": result.get("error_class"),
+                "error": result.get("error"),
+                "tier": result.get("tier"),
+                "credits": result.get("credits")
+            }
+            
+            # Written directly so retests never miss a failure that was still buffered
+            await self.insert_rows("batch_failure_events", [dict(event, id=str(uuid.uuid4()))])
+            return True
+            
+        except Exception as e:
+            logger.warning(f"Error recording failure event for machine {machine_id} in batch {batch_id}: {str(e)}")
+            return False
+    
+    async def get_batch_failure_events(self, batch_id, stages=None):
+        """
+        Get the failure events recorded for a batch.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            stages (list, optional): Only return events from these stages.
+            
+        Returns:
+            list: Failure events in the order they were recorded, or None if the
+                  failure store is unavailable (callers fall back to the batch log).
+        """
+        try:
+            query = self.rest.table("batch_failure_events") \
+                .select("machine_id, machine_name, url, stage, error_class, error, tier, credits, created_at") \
+                .eq("batch_id", batch_id)
+            if stages:
+                query = query.in_("stage", list(stages))
+            response = await query.order("created_at").execute()
+            return response.data or []
+            
+        except Exception as e:
+            logger.warning(f"Failure events unavailable for batch {batch_id}: {str(e)}")
+            return None
+    
+    def open_write_buffer(self, batch_id, **kwargs):
+        """
+        Start buffering price_history writes for a batch.
+        
+        batch_results and batch_failure_events are always written directly, since resumes
+        and retests read them back.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            **kwargs: BatchWriteBuffer options (max_rows, flush_interval, max_retries).
+            
+        Returns:
+            BatchWriteBuffer: The batch's buffer (existing one if already open).
+        """
+        from services.batch_write_buffer import BatchWriteBuffer
+        
+        if batch_id not in self._write_buffers:
+            self._write_buffers[batch_id] = BatchWriteBuffer(self, batch_id, **kwargs)
+        return self._write_buffers[batch_id]
+    
+    async def close_write_buffer(self, batch_id):
+        """
+        Flush and stop buffering writes for a batch.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            
+        Returns:
+            bool: True if every buffered row was written, False if some are still pending.
+        """
+        write_buffer = self._write_buffers.pop(batch_id, None)
+        if write_buffer is None:
+            return True
+        return await write_buffer.close()
+    
+    async def insert_rows(self, table, rows):
+        """
+        Insert many rows in one request.
+        
+        Rows carry client-generated ids and duplicates are ignored, so retrying a request
+        whose response was lost never writes a row twice. Errors are raised to the caller.
+        
+        Args:
+            table (str): Table name.
+            rows (list): Row dicts, each with an 'id'.
+        """
+        await self.rest.table(table) \
+            .upsert(rows, on_conflict="id", ignore_duplicates=True, returning=ReturnMethod.minimal, default_to_null=False) \
+            .execute()
+    
     async def get_batch_results(self, batch_id):
         """
         Get results for a batch operation.
@@ -687,7 +1137,7 @@ class DatabaseService:
         """
         try:
             # Query batch results table
-            response = self.supabase.table("batch_results") \
+            response = await self.rest.table("batch_results") \
                 .select("*") \
                 .eq("batch_id", batch_id) \
                 .execute()
@@ -707,10 +1157,45 @@ class DatabaseService:
             logger.error(f"Error getting batch results for batch {batch_id}: {str(e)}")
             return {}
             
+    async def get_batch_checkpoints(self, batch_id, page_size: int = 1000) -> Dict[str, Dict]:
+        """
+        Get the per-machine outcomes already recorded for a batch, for resuming it.
+        
+        Only the columns needed to rebuild batch counters are read, paged past the server's
+        row cap. Unlike get_batch_results, errors are raised: an empty answer would make a
+        resume scrape (and pay for) every machine again.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            page_size (int): Rows per request.
+            
+        Returns:
+            dict: machine_id -> {machine_id, machine_name, success, old_price, new_price, error}
+        """
+        checkpoints = {}
+        offset = 0
+        while True:
+            response = await self.rest.table("batch_results") \
+                .select("id, machine_id, machine_name, success, old_price, new_price, error") \
+                .eq("batch_id", batch_id) \
+                .order("id") \
+                .range(offset, offset + page_size - 1) \
+                .execute()
+            rows = response.data or []
+            for row in rows:
+                checkpoints[row["machine_id"]] = row
+            if len(rows) < page_size:
+                return checkpoints
+            offset += page_size
+    
     async def get_batch_stats(self, batch_id):
         """
         Get statistics for a batch operation.
         
+        Counters come from the batch's batch_stats row (kept current by a trigger on
+        batch_results), fetched together with the batch. Batches without a stats row
+        fall back to scanning batch_results.
+        
         Args:
             batch_id (str): ID of the batch.
             
@@ -718,153 +1203,229 @@ class DatabaseService:
             dict: Batch statistics.
         """
         try:
-            # Get batch metadata
-            batch_response = self.supabase.table("batches") \
-                .select("*") \
-                .eq("id", batch_id) \
-                .single() \
-                .execute()
+            # Get batch metadata with its running counters in one request
+            try:
+                batch_response = await self.rest.table("batches") \
+                    .select("*, batch_stats(*)") \
+                    .eq("id", batch_id) \
+                    .single() \
+                    .execute()
+            except Exception as e:
+                logger.debug(f"batch_stats unavailable for batch {batch_id}, scanning results: {str(e)}")
+                batch_response = await self.rest.table("batches") \
+                    .select("*") \
+                    .eq("id", batch_id) \
+                    .single() \
+                    .execute()
                 
             if not batch_response.data:
                 logger.warning(f"No batch found with ID {batch_id}")
                 return None
                 
-            batch = batch_response.data
-            
-            # Prepare success counts
-            success_counts = {
-                "total": 0,
-                "successful": 0,
-                "failed": 0,
-                "excluded": 0,
-                "percent_complete": 0
+            batch = dict(batch_response.data)
+            stats_row = batch.pop("batch_stats", None)
+            if isinstance(stats_row, list):
+                stats_row = stats_row[0] if stats_row else None
+            
+            if stats_row:
+                success_counts, price_stats = self._batch_stats_from_row(batch, stats_row)
+            else:
+                success_counts, price_stats = await self._batch_stats_from_results(batch_id, batch)
+            
+            excluded_machines = await self._get_excluded_batch_machines(batch_id) if success_counts["excluded"] > 0 else []
+            
+            return {
+                "batch": batch,
+                "success_counts": success_counts,
+                "price_stats": price_stats,
+                "excluded_machines": excluded_machines
             }
             
-            # Count successful results - use separate queries instead of group()
-            successful_response = self.supabase.table("batch_results") \
-                .select("*", count="exact") \
+        except Exception as e:
+            logger.exception(f"Error getting batch stats for batch {batch_id}: {str(e)}")
+            return None
+    
+    def _batch_stats_from_row(self, batch, stats_row):
+        """
+        Build success counts and price stats from a batch_stats row.
+        
+        Args:
+            batch (dict): Batch record (for total_machines).
+            stats_row (dict): Counters maintained by the batch_results trigger.
+            
+        Returns:
+            tuple: (success_counts, price_stats)
+        """
+        success_counts = {
+            "successful": stats_row.get("successful", 0),
+            "failed": stats_row.get("failed", 0),
+            "excluded": stats_row.get("excluded", 0),
+            "percent_complete": 0
+        }
+        success_counts["total"] = success_counts["successful"] + success_counts["failed"] + success_counts["excluded"]
+        
+        if (batch.get("total_machines") or 0) > 0:
+            success_counts["percent_complete"] = (success_counts["total"] / batch["total_machines"]) * 100
+        
+        change_count = stats_row.get("change_pct_count") or 0
+        price_stats = {
+            "increased": stats_row.get("increased", 0),
+            "decreased": stats_row.get("decreased", 0),
+            "unchanged": stats_row.get("unchanged", 0),
+            "avg_change_pct": float(stats_row["change_pct_sum"]) / change_count if change_count else None,
+            "max_increase_pct": stats_row.get("max_increase_pct"),
+            "max_decrease_pct": stats_row.get("max_decrease_pct")
+        }
+        price_stats["updated"] = price_stats["increased"] + price_stats["decreased"]
+        return success_counts, price_stats
+    
+    async def _batch_stats_from_results(self, batch_id, batch):
+        """
+        Build success counts and price stats by scanning batch_results.
+        Used for batches recorded before batch_stats existed.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            batch (dict): Batch record (for total_machines).
+            
+        Returns:
+            tuple: (success_counts, price_stats)
+        """
+        # Prepare success counts
+        success_counts = {
+            "total": 0,
+            "successful": 0,
+            "failed": 0,
+            "excluded": 0,
+            "percent_complete": 0
+        }
+        
+        # Count successful results - use separate queries instead of group()
+        successful_response = await self.rest.table("batch_results") \
+            .select("*", count="exact") \
+            .eq("batch_id", batch_id) \
+            .eq("success", True) \
+            .execute()
+            
+        # Count failed results - excluding intentionally skipped machines
+        failed_response = await self.rest.table("batch_results") \
+            .select("*", count="exact") \
+            .eq("batch_id", batch_id) \
+            .eq("success", False) \
+            .not_.like("error_message", "%excluded from price tracking%") \
+            .execute()
+            
+        # Count excluded/skipped machines
+        excluded_response = await self.rest.table("batch_results") \
+            .select("*", count="exact") \
+            .eq("batch_id", batch_id) \
+            .eq("success", False) \
+            .like("error_message", "%excluded from price tracking%") \
+            .execute()
+        
+        # Calculate status counts
+        if successful_response and hasattr(successful_response, 'count'):
+            success_counts["successful"] = successful_response.count
+        elif successful_response and successful_response.data:
+            success_counts["successful"] = len(successful_response.data)
+            
+        if failed_response and hasattr(failed_response, 'count'):
+            success_counts["failed"] = failed_response.count
+        elif failed_response and failed_response.data:
+            success_counts["failed"] = len(failed_response.data)
+            
+        if excluded_response and hasattr(excluded_response, 'count'):
+            success_counts["excluded"] = excluded_response.count
+        elif excluded_response and excluded_response.data:
+            success_counts["excluded"] = len(excluded_response.data)
+            
+        success_counts["total"] = success_counts["successful"] + success_counts["failed"] + success_counts["excluded"]
+        
+        # Calculate percent complete if we know the total
+        if batch.get("total_machines", 0) > 0:
+            expected_total = batch.get("total_machines")
+            success_counts["percent_complete"] = (success_counts["total"] / expected_total) * 100
+        
+        # Get stats about price changes
+        price_stats = {
+            "updated": 0,
+            "unchanged": 0,
+            "increased": 0,
+            "decreased": 0,
+            "avg_change_pct": None,
+            "max_increase_pct": None,
+            "max_decrease_pct": None
+        }
+        
+        # Manually calculate price changes instead of using database function
+        try:
+            # Get all successful results with price data
+            price_data_response = await self.rest.table("batch_results") \
+                .select("old_price, new_price") \
                 .eq("batch_id", batch_id) \
                 .eq("success", True) \
+                .not_.is_("old_price", "null") \
+                .not_.is_("new_price", "null") \
                 .execute()
+            
+            if price_data_response.data and len(price_data_response.data) > 0:
+                for result in price_data_response.data:
+                    old_price = result.get("old_price")
+                    new_price = result.get("new_price")
+                    
+                    if old_price is not None and new_price is not None:
+                        if new_price > old_price:
+                            price_stats["increased"] += 1
+                        elif new_price < old_price:
+                            price_stats["decreased"] += 1
+                        else:
+                            price_stats["unchanged"] += 1
                 
-            # Count failed results - excluding intentionally skipped machines
-            failed_response = self.supabase.table("batch_results") \
-                .select("*", count="exact") \
-                .eq("batch_id", batch_id) \
-                .eq("success", False) \
-                .not_.like("error_message", "%excluded from price tracking%") \
-                .execute()
-                
-            # Count excluded/skipped machines
-            excluded_response = self.supabase.table("batch_results") \
-                .select("*", count="exact") \
+                price_stats["updated"] = price_stats["increased"] + price_stats["decreased"]
+        except Exception as e:
+            logger.warning(f"Error calculating price stats for batch {batch_id}: {str(e)}")
+        
+        return success_counts, price_stats
+    
+    async def _get_excluded_batch_machines(self, batch_id):
+        """
+        Get the machines skipped in a batch because price tracking is disabled.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            
+        Returns:
+            list: machine_id, machine_name and url for each excluded machine.
+        """
+        excluded_machines = []
+        try:
+            excluded_details = await self.rest.table("batch_results") \
+                .select("machine_id, url") \
                 .eq("batch_id", batch_id) \
                 .eq("success", False) \
                 .like("error_message", "%excluded from price tracking%") \
                 .execute()
             
-            # Calculate status counts
-            if successful_response and hasattr(successful_response, 'count'):
-                success_counts["successful"] = successful_response.count
-            elif successful_response and successful_response.data:
-                success_counts["successful"] = len(successful_response.data)
-                
-            if failed_response and hasattr(failed_response, 'count'):
-                success_counts["failed"] = failed_response.count
-            elif failed_response and failed_response.data:
-                success_counts["failed"] = len(failed_response.data)
-                
-            if excluded_response and hasattr(excluded_response, 'count'):
-                success_counts["excluded"] = excluded_response.count
-            elif excluded_response and excluded_response.data:
-                success_counts["excluded"] = len(excluded_response.data)
-                
-            success_counts["total"] = success_counts["successful"] + success_counts["failed"] + success_counts["excluded"]
-            
-            # Calculate percent complete if we know the total
-            if batch.get("total_machines", 0) > 0:
-                expected_total = batch.get("total_machines")
-                success_counts["percent_complete"] = (success_counts["total"] / expected_total) * 100
-            
-            # Get stats about price changes
-            price_stats = {
-                "updated": 0,
-                "unchanged": 0,
-                "increased": 0,
-                "decreased": 0,
-                "avg_change_pct": None,
-                "max_increase_pct": None,
-                "max_decrease_pct": None
-            }
-            
-            # Manually calculate price changes instead of using database function
-            try:
-                # Get all successful results with price data
-                price_data_response = self.supabase.table("batch_results") \
-                    .select("old_price, new_price") \
-                    .eq("batch_id", batch_id) \
-                    .eq("success", True) \
-                    .not_.is_("old_price", "null") \
-                    .not_.is_("new_price", "null") \
+            if excluded_details.data:
+                # Get machine names for the excluded machines
+                machine_ids = [r["machine_id"] for r in excluded_details.data]
+                machines_response = await self.rest.table("machines") \
+                    .select("id, Machine Name") \
+                    .in_("id", machine_ids) \
                     .execute()
                 
-                if price_data_response.data and len(price_data_response.data) > 0:
-                    for result in price_data_response.data:
-                        old_price = result.get("old_price")
-                        new_price = result.get("new_price")
-                        
-                        if old_price is not None and new_price is not None:
-                            if new_price > old_price:
-                                price_stats["increased"] += 1
-                            elif new_price < old_price:
-                                price_stats["decreased"] += 1
-                            else:
-                                price_stats["unchanged"] += 1
-                    
-                    price_stats["updated"] = price_stats["increased"] + price_stats["decreased"]
-            except Exception as e:
-                logger.warning(f"Error calculating price stats for batch {batch_id}: {str(e)}")
-            
-            # Get details about excluded machines if any exist
-            excluded_machines = []
-            if success_counts["excluded"] > 0:
-                try:
-                    excluded_details = self.supabase.table("batch_results") \
-                        .select("machine_id, url") \
-                        .eq("batch_id", batch_id) \
-                        .eq("success", False) \
-                        .like("error_message", "%excluded from price tracking%") \
-                        .execute()
-                    
-                    if excluded_details.data:
-                        # Get machine names for the excluded machines
-                        machine_ids = [r["machine_id"] for r in excluded_details.data]
-                        machines_response = self.supabase.table("machines") \
-                            .select("id, Machine Name") \
-                            .in_("id", machine_ids) \
-                            .execute()
-                        
-                        if machines_response.data:
-                            machine_names = {m["id"]: m["Machine Name"] for m in machines_response.data}
-                            for result in excluded_details.data:
-                                excluded_machines.append({
-                                    "machine_id": result["machine_id"],
-                                    "machine_name": machine_names.get(result["machine_id"], "Unknown"),
-                                    "url": result["url"]
-                                })
-                except Exception as e:
-                    logger.warning(f"Could not get excluded machine details: {str(e)}")
-            
-            return {
-                "batch": batch,
-                "success_counts": success_counts,
-                "price_stats": price_stats,
-                "excluded_machines": excluded_machines
-            }
-            
+                if machines_response.data:
+                    machine_names = {m["id"]: m["Machine Name"] for m in machines_response.data}
+                    for result in excluded_details.data:
+                        excluded_machines.append({
+                            "machine_id": result["machine_id"],
+                            "machine_name": machine_names.get(result["machine_id"], "Unknown"),
+                            "url": result["url"]
+                        })
         except Exception as e:
-            logger.exception(f"Error getting batch stats for batch {batch_id}: {str(e)}")
-            return None
+            logger.warning(f"Could not get excluded machine details: {str(e)}")
+        
+        return excluded_machines
 
     async def update_batch_status(self, batch_id, status):
         """
@@ -886,7 +1447,7 @@ class DatabaseService:
             if status == "completed":
                 update_data["end_time"] = datetime.utcnow().isoformat() + "Z"
             
-            response = self.supabase.table("batches") \
+            response = await self.rest.table("batches") \
                 .update(update_data) \
                 .eq("id", batch_id) \
                 .execute()
@@ -914,7 +1475,7 @@ class DatabaseService:
         """
         try:
             # Search for machines with matching product_link or Affiliate Link
-            response = self.supabase.table("machines") \
+            response = await self.rest.table("machines") \
                 .select("*") \
                 .or_(f'product_link.eq.{url},"Affiliate Link".eq.{url}') \
                 .execute()
@@ -937,7 +1498,7 @@ class DatabaseService:
             bool: True if updated successfully, False otherwise.
         """
         try:
-            response = self.supabase.table("machines") \
+            response = await self.rest.table("machines") \
                 .update({"learned_selectors": learned_selectors}) \
                 .eq("id", machine_id) \
                 .execute()
@@ -965,7 +1526,7 @@ class DatabaseService:
         """
         try:
             # Get batch results with machine and pricing data
-            response = self.supabase.table("batch_results") \
+            response = await self.rest.table("batch_results") \
                 .select("""
                     *,
                     machines!inner(
@@ -1031,7 +1592,7 @@ class DatabaseService:
             if correction_reason:
                 update_data["failure_reason"] = correction_reason
                 
-            response = self.supabase.table(PRICE_HISTORY_TABLE) \
+            response = await self.rest.table(PRICE_HISTORY_TABLE) \
                 .update(update_data) \
                 .eq("id", price_history_id) \
                 .execute()
@@ -1084,7 +1645,7 @@ class DatabaseService:
             if reason:
                 correction_data["reason"] = reason
                 
-            response = self.supabase.table("price_corrections") \
+            response = await self.rest.table("price_corrections") \
                 .insert(correction_data) \
                 .execute()
                 
@@ -1110,7 +1671,7 @@ class DatabaseService:
             list: List of price correction records.
         """
         try:
-            response = self.supabase.table("price_corrections") \
+            response = await self.rest.table("price_corrections") \
                 .select("*") \
                 .eq("batch_id", batch_id) \
                 .order("corrected_at", desc=True) \
@@ -1131,7 +1692,7 @@ class DatabaseService:
             logger.info("🔧 Starting fix for bad learned selectors...")
             
             # Get all machines with learned selectors
-            response = self.supabase.table(MACHINES_TABLE) \
+            response = await self.rest.table(MACHINES_TABLE) \
                 .select("id, Machine Name, learned_selectors") \
                 .execute()
             
@@ -1188,7 +1749,7 @@ class DatabaseService:
                             logger.info(f"🗑️  Removing bad selector for {name}: {domain} → {selector}")
                     
                     # Update the machine
-                    update_response = self.supabase.table(MACHINES_TABLE) \
+                    update_response = await self.rest.table(MACHINES_TABLE) \
                         .update({"learned_selectors": updated_selectors}) \
                         .eq("id", machine_id) \
                         .execute()
@@ -1248,10 +1809,10 @@ class DatabaseService:
                         param_query = param_query.replace('%s', f"'{escaped_param}'", 1)
                 
                 logger.info(f"Executing parameterized query: {param_query}")
-                response = self.supabase.rpc('execute_sql', {'sql': param_query}).execute()
+                response = await self.rest.rpc('execute_sql', {'sql': param_query}).execute()
             else:
                 # Use the execute_sql function for non-parameterized queries
-                response = self.supabase.rpc('execute_sql', {'sql': query}).execute()
+                response = await self.rest.rpc('execute_sql', {'sql': query}).execute()
             
             return response.data or []
             
@@ -1262,7 +1823,7 @@ class DatabaseService:
     async def get_machine_categories(self):
         """Get all machine categories using database function"""
         try:
-            response = self.supabase.rpc('get_machine_categories').execute()
+            response = await self.rest.rpc('get_machine_categories').execute()
             return response.data or []
         except Exception as e:
             logger.error(f"Error getting machine categories: {str(e)}")
@@ -1271,7 +1832,7 @@ class DatabaseService:
     async def get_machines_by_category(self, category: str):
         """Get machines by category using database function"""
         try:
-            response = self.supabase.rpc('get_machines_by_category', {'category_name': category}).execute()
+            response = await self.rest.rpc('get_machines_by_category', {'category_name': category}).execute()
             return response.data or []
         except Exception as e:
             logger.error(f"Error getting machines for category {category}: {str(e)}")
@@ -1292,7 +1853,7 @@ class DatabaseService:
                 "scan_metadata": {"site_name": site_name}
             }
             
-            response = self.supabase.table("site_scan_logs").insert(scan_data).execute()
+            response = await self.rest.table("site_scan_logs").insert(scan_data).execute()
             
             if response.data:
                 logger.info(f"Created scan record: {scan_data['id']}")
@@ -1306,7 +1867,7 @@ class DatabaseService:
     async def get_scan_status(self, scan_id: str) -> Optional[Dict]:
         """Get scan status from site_scan_logs table"""
         try:
-            response = self.supabase.table("site_scan_logs").select("*").eq("id", scan_id).single().execute()
+            response = await self.rest.table("site_scan_logs").select("*").eq("id", scan_id).single().execute()
             return response.data
         except Exception as e:
             logger.error(f"Error getting scan status: {str(e)}")
@@ -1345,7 +1906,7 @@ class DatabaseService:
                 if "ai_cost_usd" not in kwargs and status == "completed":
                     try:
                         # Get all discovered machines for this scan and sum their AI costs
-                        machines_response = self.supabase.table("discovered_machines") \
+                        machines_response = await self.rest.table("discovered_machines") \
                             .select("ai_extraction_cost") \
                             .eq("scan_log_id", scan_id) \
                             .execute()
@@ -1362,7 +1923,7 @@ class DatabaseService:
                     except Exception as e:
                         logger.warning(f"Could not calculate AI cost for scan {scan_id}: {str(e)}")
             
-            response = self.supabase.table("site_scan_logs").update(update_data).eq("id", scan_id).execute()
+            response = await self.rest.table("site_scan_logs").update(update_data).eq("id", scan_id).execute()
             
             if response.data:
                 logger.info(f"Updated scan record {scan_id}: status={status}")
@@ -1443,7 +2004,7 @@ class DatabaseService:
             logger.debug(f"Validation errors: {discovered_data['validation_errors']}")
             logger.debug(f"Validation warnings: {discovered_data['validation_warnings']}")
             
-            response = self.supabase.table("discovered_machines").insert(discovered_data).execute()
+            response = await self.rest.table("discovered_machines").insert(discovered_data).execute()
             
             if response.data:
                 logger.info(f"✅ Stored discovered machine: {machine_name}")
@@ -1467,7 +2028,7 @@ class DatabaseService:
             List[Dict]: List of discovered machine records
         """
         try:
-            response = self.supabase.table("discovered_machines").select("*").execute()
+            response = await self.rest.table("discovered_machines").select("*").execute()
             return response.data or []
         except Exception as e:
             logger.error(f"Error getting discovered machines: {str(e)}")
@@ -1485,7 +2046,7 @@ class DatabaseService:
             bool: True if updated successfully
         """
         try:
-            response = self.supabase.table("discovered_machines") \
+            response = await self.rest.table("discovered_machines") \
                 .update({"normalized_data": normalized_data}) \
                 .eq("id", machine_id) \
                 .execute()
@@ -1503,5 +2064,15 @@ class DatabaseService:
 
     async def close(self):
         """Close database connection if needed"""
+        if self._rest is not None:
+            try:
+                if self._rest_loop is asyncio.get_running_loop():
+                    await self._rest.aclose()
+                else:
+                    self._discard_stale_rest_client()
+            except Exception as e:
+                logger.warning(f"Error closing async database client: {str(e)}")
+            self._rest = None
+            self._rest_loop = None
         # Supabase client doesn't need explicit closing
         pass
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+Content-addressed HTML snapshot store.
+Keeps compressed copies of scraped pages on disk, keyed by content hash, with per-machine and per-batch manifests.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+from loguru import logger
+
+from config import HTML_SNAPSHOT_DIR
+
+try:
+    import zstandard as zstd
+except ImportError:  # zstd is optional - fall back to gzip
+    zstd = None
+
+
+class HtmlSnapshotStore:
+    """
+    Stores each distinct page once, compressed, under its SHA-256 hash.
+
+    Layout:
+        objects/ab/<sha256>.html.zst (or .html.gz without zstandard)
+        manifests/machines/<machine_id>.jsonl
+        manifests/batches/<batch_id>.jsonl
+
+    Manifest lines record when a page was seen, for which machine and batch, and what the
+    extractor made of it, so pages can be re-extracted offline later.
+    """
+
+    def __init__(self, root_dir: str = HTML_SNAPSHOT_DIR):
+        """
+        Initialize the snapshot store.
+
+        Args:
+            root_dir: Directory holding objects and manifests
+        """
+        self.root_dir = root_dir
+        self.objects_dir = os.path.join(root_dir, 'objects')
+        self.machine_manifest_dir = os.path.join(root_dir, 'manifests', 'machines')
+        self.batch_manifest_dir = os.path.join(root_dir, 'manifests', 'batches')
+        self.extension = '.html.zst' if zstd else '.html.gz'
+
+        for directory in (self.objects_dir, self.machine_manifest_dir, self.batch_manifest_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def content_hash(html_content: str) -> str:
+        """Return the SHA-256 hex digest of the page."""
+        return hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+
+    def _object_path(self, snapshot_hash: str, extension: str) -> str:
+        return os.path.join(self.objects_dir, snapshot_hash[:2], f"{snapshot_hash}{extension}")
+
+    def _find_object(self, snapshot_hash: str) -> Optional[str]:
+        for extension in ('.html.zst', '.html.gz'):
+            path = self._object_path(snapshot_hash, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _compress(self, data: bytes) -> bytes:
+        if zstd:
+            return zstd.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def _write_object(self, path: str, compressed: bytes):
+        """Write an object through a unique temp file so readers never see a partial object."""
+        # Concurrent saves of the same page (machines sharing a URL) each get their own temp file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except OSError:
+            if not os.path.exists(path):
+                raise
+            # Another writer stored the same content first
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _append_manifest(self, path: str, entry: Dict):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    def save(self, html_content: str, machine_id: Optional[str] = None, batch_id: Optional[str] = None,
+             url: Optional[str] = None, price: Optional[float] = None, method: Optional[str] = None,
+             machine_name: Optional[str] = None, old_price: Optional[float] = None,
+             stage: Optional[str] = None) -> Optional[str]:
+        """
+        Store a page (once per distinct content) and record it in the manifests.
+
+        Args:
+            html_content: Page HTML
+            machine_id: Machine the page was fetched for
+            batch_id: Batch the fetch belonged to
+            url: URL the page was fetched from
+            price: Price extracted from the page, if any
+            method: Extraction method that produced the price
+            machine_name: Machine name (drives machine-specific rules on re-extraction)
+            old_price: Price on record before this fetch
+            stage: Pipeline stage that produced the price ('static', 'dynamic' or 'claude')
+
+        Returns:
+            Content hash of the stored page, or None on error
+        """
+        if not html_content:
+            return None
+
+        try:
+            data = html_content.encode('utf-8')
+            snapshot_hash = hashlib.sha256(data).hexdigest()
+            is_new = self._find_object(snapshot_hash) is None
+
+            if is_new:
+                path = self._object_path(snapshot_hash, self.extension)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._write_object(path, self._compress(data))
+
+            entry = {
+                'hash': snapshot_hash,
+                'machine_id': machine_id,
+                'machine_name': machine_name,
+                'batch_id': batch_id,
+                'url': url,
+                'price': price,
+                'method': method,
+                'stage': stage,
+                'old_price': old_price,
+                'size': len(data),
+                'new_content': is_new,
+                'captured_at': datetime.utcnow().isoformat() + "Z"
+            }
+            if machine_id:
+                self._append_manifest(os.path.join(self.machine_manifest_dir, f"{machine_id}.jsonl"), entry)
+            if batch_id:
+                self._append_manifest(os.path.join(self.batch_manifest_dir, f"{batch_id}.jsonl"), entry)
+
+            logger.debug(f"📦 Snapshot {snapshot_hash[:12]} for machine {machine_id} ({'new' if is_new else 'deduplicated'}, {len(data)} bytes)")
+            return snapshot_hash
+        except Exception as e:
+            logger.error(f"Error saving HTML snapshot for machine {machine_id}: {str(e)}")
+            return None
+
+    async def save_async(self, html_content: str, **kwargs) -> Optional[str]:
+        """Run save() in the default executor so compression and disk I/O stay off the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.save(html_content, **kwargs))
+
+    def load(self, snapshot_hash: Optional[str]) -> Optional[str]:
+        """
+        Load a stored page by hash.
+
+        Args:
+            snapshot_hash: Content hash returned by save()
+
+        Returns:
+            Page HTML, or None if the snapshot does not exist
+        """
+        if not snapshot_hash:
+            return None
+
+        path = self._find_object(snapshot_hash)
+        if not path:
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if path.endswith('.zst'):
+                if not zstd:
+                    logger.error(f"Snapshot {snapshot_hash} is zstd-compressed but zstandard is not installed")
+                    return None
+                data = zstd.ZstdDecompressor().decompress(data)
+            else:
+                data = gzip.decompress(data)
+            return data.decode('utf-8')
+        except Exception as e:
+            logger.error(f"Error loading HTML snapshot {snapshot_hash}: {str(e)}")
+            return None
+
+    def _read_manifest(self, path: str) -> List[Dict]:
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return entries
+
+    def get_machine_manifest(self, machine_id: str) -> List[Dict]:
+        """Return every snapshot recorded for a machine, oldest first."""
+        return self._read_manifest(os.path.join(self.machine_manifest_dir, f"{machine_id}.jsonl"))
+
+    def get_batch_manifest(self, batch_id: str) -> List[Dict]:
+        """Return every snapshot recorded during a batch, in capture order."""
+        return self._read_manifest(os.path.join(self.batch_manifest_dir, f"{batch_id}.jsonl"))
+
+
+# Global snapshot store instance
+_snapshot_store: Optional[HtmlSnapshotStore] = None
+
+
+def get_snapshot_store() -> HtmlSnapshotStore:
+    """Get or create the global HTML snapshot store instance."""
+    global _snapshot_store
+
+    if _snapshot_store is None:
+        _snapshot_store = HtmlSnapshotStore()
+
+    return _snapshot_store
@@ -0,0 +1,262 @@
+"""
+Offline bulk re-extraction over stored HTML snapshots.
+Re-runs static price extraction for saved pages on a process pool, with no network access, and diffs the results.
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from loguru import logger
+
+from services.html_snapshot_store import HtmlSnapshotStore
+
+
+# Per-process state for pool workers (set by _init_worker)
+_worker_extractor = None
+_worker_store = None
+
+
+# Only prices found by static extraction can be reproduced from a stored page
+COMPARABLE_STAGES = {'static'}
+
+
+def _recorded_stage(entry: Dict) -> Optional[str]:
+    """Pipeline stage of a manifest entry, inferred from the method for entries written before stages were recorded."""
+    if entry.get('stage'):
+        return entry['stage']
+    method = entry.get('method')
+    if not method:
+        return None
+    if method.startswith('Dynamic extraction'):
+        return 'dynamic'
+    if 'claude' in method.lower():
+        return 'claude'
+    return 'static'
+
+
+def _job_from_entry(entry: Dict) -> Dict:
+    """Turn a snapshot manifest entry into a re-extraction job."""
+    return {
+        'machine_id': entry.get('machine_id'),
+        'machine_name': entry.get('machine_name'),
+        'url': entry.get('url'),
+        'hash': entry.get('hash'),
+        'batch_id': entry.get('batch_id'),
+        'old_price': entry.get('old_price'),
+        'recorded_price': entry.get('price'),
+        'recorded_method': entry.get('method'),
+        'recorded_stage': _recorded_stage(entry),
+        'captured_at': entry.get('captured_at')
+    }
+
+
+def jobs_from_manifest(manifest_path: str) -> List[Dict]:
+    """
+    Build jobs from a JSONL manifest (e.g. manifests/batches/<batch_id>.jsonl).
+
+    Args:
+        manifest_path: Path to the manifest file
+
+    Returns:
+        One job per machine, using the latest capture if a machine appears more than once
+    """
+    latest: Dict[str, Dict] = {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            key = entry.get('machine_id') or entry.get('hash')
+            latest[key] = entry
+    return [_job_from_entry(entry) for entry in latest.values()]
+
+
+def jobs_from_store(store: HtmlSnapshotStore, batch_id: Optional[str] = None) -> List[Dict]:
+    """
+    Build jobs from a snapshot store.
+
+    Args:
+        store: Snapshot store to read manifests from
+        batch_id: Only re-extract pages captured in this batch; otherwise the latest page of every machine
+
+    Returns:
+        List of jobs
+    """
+    if batch_id:
+        return jobs_from_manifest(os.path.join(store.batch_manifest_dir, f"{batch_id}.jsonl"))
+
+    jobs = []
+    for filename in sorted(os.listdir(store.machine_manifest_dir)):
+        if not filename.endswith('.jsonl'):
+            continue
+        entries = store.get_machine_manifest(filename[:-len('.jsonl')])
+        if entries:
+            jobs.append(_job_from_entry(entries[-1]))
+    return jobs
+
+
+def _init_worker(snapshot_dir: str, log_level: Optional[str] = "WARNING"):
+    """Create one extractor and store per worker process; keep extraction logs quiet."""
+    global _worker_extractor, _worker_store
+
+    from scrapers.price_extractor import PriceExtractor
+
+    if log_level:
+        logger.remove()
+        logger.add(sys.stderr, level=log_level)
+
+    _worker_extractor = PriceExtractor()
+    _worker_store = HtmlSnapshotStore(snapshot_dir)
+
+
+def _reextract_job(job: Dict) -> Dict:
+    """Re-extract one stored page. Runs inside a pool worker."""
+    from bs4 import BeautifulSoup
+
+    result = dict(job)
+    result.update({'new_price': None, 'new_method': None, 'error': None})
+    started = time.perf_counter()
+
+    try:
+        html_content = _worker_store.load(job.get('hash'))
+        if not html_content:
+            result['error'] = 'Snapshot not found'
+            return result
+
+        machine_data = dict(job.get('machine_data') or {})
+        if job.get('machine_name'):
+            machine_data.setdefault('Machine Name', job['machine_name'])
+        machine_data['old_price'] = job.get('old_price')
+
+        soup = BeautifulSoup(html_content, 'html.parser')
+        price, method = _worker_extractor.extract_price_static(
+            soup, html_content, job.get('url'), job.get('old_price'), job.get('machine_name'), machine_data
+        )
+        result['new_price'] = price
+        result['new_method'] = method
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        result['duration'] = round(time.perf_counter() - started, 4)
+
+    return result
+
+
+def run_reextraction(jobs: Iterable[Dict], snapshot_dir: str, max_workers: Optional[int] = None,
+                     machine_data: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """
+    Re-extract prices for every job.
+
+    Args:
+        jobs: Jobs from jobs_from_manifest / jobs_from_store
+        snapshot_dir: Root directory of the snapshot store
+        max_workers: Process count (defaults to CPU count); 1 runs in this process
+        machine_data: Optional machine records by ID (e.g. with learned_selectors)
+
+    Returns:
+        Jobs with new_price, new_method, error and duration added, in input order
+    """
+    jobs = list(jobs)
+    if machine_data:
+        for job in jobs:
+            record = machine_data.get(job.get('machine_id'))
+            if record:
+                job['machine_data'] = record
+                job['machine_name'] = job.get('machine_name') or record.get('Machine Name')
+
+    if not jobs:
+        return []
+
+    logger.info(f"🔁 Re-extracting {len(jobs)} snapshots with {max_workers or os.cpu_count()} workers")
+    started = time.perf_counter()
+
+    if max_workers == 1:
+        # Inline run (debugging) - keep the caller's logging setup
+        _init_worker(snapshot_dir, log_level=None)
+        results = [_reextract_job(job) for job in jobs]
+    else:
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(snapshot_dir,)) as pool:
+            results = list(pool.map(_reextract_job, jobs, chunksize=chunksize))
+
+    logger.info(f"🔁 Re-extraction finished in {time.perf_counter() - started:.1f}s")
+    return results
+
+
+def _classify(result: Dict) -> str:
+    old_price = result.get('recorded_price')
+    new_price = result.get('new_price')
+    if result.get('error'):
+        return 'error'
+    # Dynamic (browser) and Claude prices cannot be reproduced offline - comparing them is noise
+    if old_price is not None and (result.get('recorded_stage') or 'static') not in COMPARABLE_STAGES:
+        return 'not_comparable'
+    if old_price is None and new_price is None:
+        return 'still_failing'
+    if old_price is None:
+        return 'fixed'
+    if new_price is None:
+        return 'broken'
+    if abs(float(old_price) - float(new_price)) < 0.005:
+        return 'unchanged' if result.get('recorded_method') == result.get('new_method') else 'method_changed'
+    return 'changed'
+
+
+def build_diff_report(results: List[Dict]) -> Dict:
+    """
+    Compare re-extracted prices with the prices recorded when each page was captured.
+
+    Prices recorded by dynamic or Claude extraction are only counted as not_comparable,
+    since static re-extraction cannot reproduce them.
+
+    Args:
+        results: Output of run_reextraction
+
+    Returns:
+        dict with a per-status summary and the rows that differ
+    """
+    summary = {status: 0 for status in ('unchanged', 'method_changed', 'changed', 'fixed', 'broken', 'still_failing', 'error', 'not_comparable')}
+    differences = []
+
+    for result in results:
+        status = _classify(result)
+        summary[status] += 1
+        if status not in ('unchanged', 'not_comparable'):
+            differences.append({
+                'status': status,
+                'machine_id': result.get('machine_id'),
+                'machine_name': result.get('machine_name'),
+                'url': result.get('url'),
+                'old_price': result.get('recorded_price'),
+                'new_price': result.get('new_price'),
+                'old_method': result.get('recorded_method'),
+                'new_method': result.get('new_method'),
+                'error': result.get('error'),
+                'snapshot_hash': result.get('hash')
+            })
+
+    return {
+        'generated_at': datetime.utcnow().isoformat() + "Z",
+        'total': len(results),
+        'summary': summary,
+        'differences': differences
+    }
+
+
+def write_report(report: Dict, output_path: str):
+    """Write a diff report as JSON."""
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"📝 Re-extraction report written to {output_path}")
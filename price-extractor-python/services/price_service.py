@@ -1,17 +1,30 @@
 from loguru import logger
 from datetime import datetime
+import asyncio
 import os
 import uuid
 from urllib.parse import urlparse
+from bs4 import BeautifulSoup
 
 from services.database import DatabaseService
 from scrapers.scrapfly_web_scraper import ScrapflyWebScraper
 from scrapers.price_extractor import PriceExtractor
+from scrapers.extraction_context import ExtractionContext
+from scrapers.batch_page_cache import BatchPageCache
+from scrapers.platform_adapters import get_platform_adapter
+from scrapers.variant_capture import prefer_terms_for
+from services.batch_scheduler import DomainFairScheduler
+from services.batch_prefetch import prefetch_batch_state
+from services.batch_events import get_batch_event_bus
+from services.recheck_scheduler import plan_adaptive_batch
+from services.concurrency_governor import get_concurrency_governor
+from services.html_snapshot_store import get_snapshot_store
 from services.variant_verification import VariantVerificationService
 from config import (
     MAX_PRICE_INCREASE_PERCENT,
     MAX_PRICE_DECREASE_PERCENT,
-    MIN_PRICE_THRESHOLD
+    MIN_PRICE_THRESHOLD,
+    RECHECK_CREDIT_BUDGET
 )
 
 class PriceService:
@@ -24,6 +37,7 @@ class PriceService:
         self.scrapfly_scraper = None  # Will be initialized when needed
         self.price_extractor = PriceExtractor()
         self.variant_verifier = None  # Will be initialized per batch
+        self._resuming_batches = set()  # Batches a resume_batch call is currently handling
         logger.info("Price service initialized with Scrapfly scraper as default")
     
     def _setup_batch_logging(self, batch_id):
@@ -78,7 +92,14 @@ class PriceService:
                 raise
         return self.scrapfly_scraper
     
-    async def _should_require_manual_approval(self, old_price, new_price, machine_id):
+    async def close(self):
+        """Write back buffered tier history and close the Scrapfly scraper, if one was created."""
+        if self.scrapfly_scraper is not None:
+            await self.scrapfly_scraper.tier_cache.close()
+            self.scrapfly_scraper.close()
+            self.scrapfly_scraper = None
+    
+    async def _should_require_manual_approval(self, old_price, new_price, machine_id, recent_corrections=None):
         """
         Determine if a price change requires manual approval based on thresholds.
         
@@ -86,6 +107,7 @@ class PriceService:
             old_price (float): Previous price
             new_price (float): New price
             machine_id (str): Machine ID to check price history
+            recent_corrections (list, optional): Prefetched MANUAL_CORRECTION entries (skips the history query)
             
         Returns:
             tuple: (requires_approval, reason)
@@ -99,11 +121,15 @@ class PriceService:
         
         # Check if this price was recently manually corrected
         try:
-            # Query recent price history for this machine
-            response = self.db_service.supabase.table("price_history").select("*").eq("machine_id", machine_id).order("date", desc=True).limit(10).execute()
+            if recent_corrections is not None:
+                entries = recent_corrections
+            else:
+                # Query recent price history for this machine
+                response = await self.db_service.rest.table("price_history").select("*").eq("machine_id", machine_id).order("date", desc=True).limit(10).execute()
+                entries = response.data
             
-            if response.data:
-                for entry in response.data:
+            if entries:
+                for entry in entries:
                     # Check if there's a recent manual correction to this exact price
                     if (entry.get("status") == "MANUAL_CORRECTION" and 
                         entry.get("price") == new_price and
@@ -149,8 +175,127 @@ class PriceService:
         # Do NOT use manual corrections as baseline for extraction
         logger.info(f"📊 Using machines.Price as baseline: ${fallback_price}")
         return fallback_price
-    
-    async def update_machine_price(self, machine_id, url=None, batch_id=None, use_scrapfly=True):
+
+    # Machine rules that pick a variant by page text or clicks; the product JSON path cannot follow them
+    MACHINE_VARIANT_RULE_KEYS = ('variant_keywords', 'variant_detection_rules', 'variant_selection')
+
+    def _platform_variant_options(self, product_url, machine_name):
+        """
+        Resolve the variant rules that apply to a machine for the product JSON path.
+
+        Combines the machine's site-specific rule (target variant ID, base price range),
+        the site's variant selection rules (bundles to avoid, base price) and
+        PriceExtractor._get_variant_rules (preferred phrases, expected price range).
+
+        Args:
+            product_url (str): Product page URL
+            machine_name (str): Machine name
+
+        Returns:
+            dict: Keyword arguments for the adapter's extract(), or None when the machine has
+                variant rules only the page pipeline can apply
+        """
+        domain = urlparse(product_url).netloc.lower()
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        site_extractor = self.price_extractor.site_extractor
+        site_rule = site_extractor.site_rules.get(domain) or {}
+        machine_rule = site_extractor.get_machine_rule(domain, machine_name, product_url) or {}
+        variant_rules = self.price_extractor._get_variant_rules(product_url)
+
+        if not machine_rule.get('target_variant_id') and any(key in machine_rule for key in self.MACHINE_VARIANT_RULE_KEYS):
+            return None
+
+        selection_rules = site_rule.get('variant_selection_rules') or {}
+        prefer_terms = prefer_terms_for(machine_name, variant_rules)
+        if selection_rules.get('prefer_base_machine'):
+            prefer_terms += selection_rules.get('base_keywords', [])
+
+        price_range = machine_rule.get('base_price_range')
+        if not price_range and (variant_rules.get('min_expected_price') or variant_rules.get('max_expected_price')):
+            price_range = (variant_rules.get('min_expected_price') or 0, variant_rules.get('max_expected_price') or float('inf'))
+
+        return {
+            'target_variant_id': machine_rule.get('target_variant_id'),
+            'prefer_terms': prefer_terms,
+            'avoid_terms': selection_rules.get('avoid_bundles', []),
+            'prefer_lowest': bool(site_rule.get('use_base_price')),
+            'price_range': tuple(price_range) if price_range else None
+        }
+
+    def _platform_endpoint_url(self, product_url):
+        """Structured product endpoint a machine's price may be read from, or None."""
+        adapter = get_platform_adapter(product_url, self.price_extractor.site_extractor.site_rules)
+        return adapter.product_json_url(product_url) if adapter else None
+
+    async def _extract_with_platform_adapter(self, product_url, machine_name, current_price, scraper,
+                                             page_cache=None, batch_id=None, machine_id=None, use_scrapfly=True):
+        """
+        Extract a price from the store platform's product endpoint instead of the product page.
+
+        Args:
+            product_url (str): Product page URL
+            machine_name (str): Machine name used to pick the variant
+            current_price (float): Baseline price for variant tie-breaks and validation
+            scraper: Scraper used for the fetch
+            page_cache (BatchPageCache, optional): Per-batch cache; the endpoint is shared by every
+                machine on the same product, whatever its ?variant= parameter
+            batch_id (str, optional): Batch ID for credit logging
+            machine_id (str, optional): Machine ID for credit logging
+            use_scrapfly (bool): Whether credit usage is logged
+
+        Returns:
+            tuple: (price, method, fetch_info), or None to use the HTML pipeline
+        """
+        adapter = get_platform_adapter(product_url, self.price_extractor.site_extractor.site_rules)
+        if adapter is None:
+            return None
+        variant_options = self._platform_variant_options(product_url, machine_name)
+        if variant_options is None:
+            logger.info(f"↩️ {machine_name} has machine-specific variant rules, using page extraction")
+            return None
+
+        endpoint_url = adapter.product_json_url(product_url)
+        try:
+            # Endpoint fetches keep their own tier history so they never push the store's HTML pages up a tier
+            from_cache = False
+            if page_cache is not None:
+                content, _, from_cache = await page_cache.get_page_content(endpoint_url, tier_key=adapter.tier_key(product_url))
+                operation = page_cache.get_operation(endpoint_url) or {}
+            else:
+                content, _, operation = await scraper.fetch_page(endpoint_url, parse=False, tier_key=adapter.tier_key(product_url))
+
+            if from_cache:
+                fetch_info = {"tier": operation.get('tier', 1), "credits": 0}
+            else:
+                fetch_info = {"tier": operation.get('tier'), "credits": operation.get('credits')}
+
+            if use_scrapfly and hasattr(scraper, 'log_credit_usage') and batch_id:
+                await scraper.log_credit_usage(
+                    batch_id, machine_id, endpoint_url,
+                    tier=fetch_info["tier"],
+                    credits=fetch_info["credits"] or 0,
+                    success=content is not None
+                )
+
+            result = adapter.extract(content, product_url, machine_name, current_price, **variant_options)
+        except Exception as e:
+            logger.warning(f"⚠️ {adapter.platform} product endpoint failed for {product_url}: {str(e)}")
+            return None
+
+        if result is None:
+            logger.info(f"↩️ Falling back to page extraction for {product_url}")
+            return None
+
+        price, method = result
+        if not self.price_extractor._validate_extracted_price(price, product_url, current_price, machine_name):
+            logger.warning(f"⚠️ {method} price ${price} failed validation, falling back to page extraction")
+            return None
+
+        logger.info(f"🛍️ Extracted ${price} for {machine_name} from {endpoint_url}")
+        return price, method, fetch_info
+
+    async def update_machine_price(self, machine_id, url=None, batch_id=None, use_scrapfly=True, page_cache=None, snapshot=None):
         """
         Update the price for a specific machine by scraping its URL.
         
@@ -159,6 +304,8 @@ class PriceService:
             url (str, optional): URL to override the one in the database.
             batch_id (str, optional): The batch ID if this update is part of a batch.
             use_scrapfly (bool, optional): Whether to use Scrapfly scraper. Always True (legacy parameter).
+            page_cache (BatchPageCache, optional): Per-batch cache so shared URLs are fetched once.
+            snapshot (MachineSnapshot, optional): Prefetched machine state (skips per-machine lookups).
             
         Returns:
             dict: Update result with new price, old price, and status.
@@ -166,18 +313,21 @@ class PriceService:
         logger.info(f"Processing price update for machine {machine_id}")
         
         try:
-            # Get machine data from database
-            machine = await self.db_service.get_machine_by_id(machine_id)
+            # Get machine data from the batch snapshot or the database
+            if snapshot is not None:
+                machine = dict(snapshot.machine)
+            else:
+                machine = await self.db_service.get_machine_by_id(machine_id)
             if not machine:
                 logger.error(f"Machine {machine_id} not found in database")
-                return {"success": False, "error": f"Machine not found in database: {machine_id}", "machine_id": machine_id}
+                return {"success": False, "error": f"Machine not found in database: {machine_id}", "machine_id": machine_id, "stage": "lookup"}
             
             # Use provided URL or get from database
             product_url = url or machine.get("product_link")
             
             if not product_url:
                 logger.error(f"No product URL available for machine {machine_id}")
-                return {"success": False, "error": "No product URL available", "machine_id": machine_id}
+                return {"success": False, "error": "No product URL available", "machine_id": machine_id, "stage": "url"}
             
             # Get current price - check for recent manual corrections first
             current_price = await self._get_effective_current_price(machine_id, machine.get("Price"))
@@ -207,67 +357,119 @@ class PriceService:
             logger.info(f"🚀 Using Scrapfly scraper for {product_url}")
             scraper = self._get_scrapfly_scraper()
 
-            # Skip URL health check to reduce failed requests
-            # The actual scraping will detect if URL is invalid
-            # This prevents unnecessary failed requests counting against rate limits
+            # Platforms with a structured product endpoint (Shopify product JSON) skip page rendering;
+            # the HTML pipeline below is the fallback when the endpoint is unusable
+            machine_name = machine.get("Machine Name")
+            platform_result = await self._extract_with_platform_adapter(
+                product_url, machine_name, current_price, scraper,
+                page_cache=page_cache, batch_id=batch_id, machine_id=machine_id, use_scrapfly=use_scrapfly
+            )
+            if platform_result is not None:
+                new_price, method, fetch_info = platform_result
+                # No page was fetched, so there is nothing to archive or store
+                html_content, snapshot_hash = None, None
+                page_fetched = False
+            else:
+                page_fetched = True
+                # Skip URL health check to reduce failed requests
+                # The actual scraping will detect if URL is invalid
+                # This prevents unnecessary failed requests counting against rate limits
             
-            # Scrape the product page with retry logic
-            html_content, soup = await scraper.get_page_content(product_url)
+                # Scrape the product page with retry logic - shared URLs are fetched once per batch
+                # (tier and credits come back per fetch; the scraper's last_operation is shared by concurrent machines)
+                from_cache = False
+                if page_cache is not None:
+                    html_content, soup, from_cache = await page_cache.get_page_content(product_url)
+                    operation = page_cache.get_operation(product_url) or {}
+                else:
+                    html_content, soup, operation = await scraper.fetch_page(product_url, parse=False)
             
-            # Log credit usage if using Scrapfly
-            if use_scrapfly and hasattr(scraper, 'log_credit_usage') and batch_id:
-                # Use actual credit data from the scraper's last operation
-                await scraper.log_credit_usage(batch_id, machine_id, product_url)
-            if not html_content or not soup:
-                logger.error(f"Failed to fetch content from {product_url} after retries")
-                await self.db_service.add_price_history(
+                # Tier and credits of this fetch (a page shared within the batch costs nothing extra)
+                if from_cache:
+                    fetch_info = {"tier": operation.get('tier', 1), "credits": 0}
+                else:
+                    fetch_info = {"tier": operation.get('tier'), "credits": operation.get('credits')}
+            
+                # Log credit usage if using Scrapfly
+                if use_scrapfly and hasattr(scraper, 'log_credit_usage') and batch_id:
+                    # A page fetched for another machine in this batch logs no extra credits
+                    await scraper.log_credit_usage(
+                        batch_id, machine_id, product_url,
+                        tier=fetch_info["tier"],
+                        credits=fetch_info["credits"] or 0,
+                        success=operation.get('success', html_content is not None)
+                    )
+                if not html_content:
+                    logger.error(f"Failed to fetch content from {product_url} after retries")
+                    await self.db_service.add_price_history(
+                        machine_id=machine_id,
+                        old_price=current_price,
+                        new_price=None,
+                        success=False,
+                        error_message="Failed to fetch product page after retries",
+                        batch_id=batch_id
+                    )
+                    return {"success": False, "error": "Failed to fetch product page after retries", "machine_id": machine_id, "url": product_url, "stage": "fetch", **fetch_info}
+            
+                # Get machine name for variant selection
+                machine_name = machine.get("Machine Name")
+                logger.info(f"Using machine name for variant selection: '{machine_name}'")
+            
+                # Prepare machine data with old_price for better extraction
+                machine_data_for_extraction = dict(machine)  # Create a copy
+                machine_data_for_extraction['old_price'] = current_price  # Add old_price field for extraction logic
+            
+                # Extract price - now passing machine data for learned selectors
+                # (pages are fetched unparsed, so soup is None and parsing and static extraction
+                # run in the extraction process pool)
+                new_price, method = await self.price_extractor.extract_price(soup, html_content, product_url, current_price, machine_name, machine_data_for_extraction)
+                # Pipeline stage that produced the price (offline re-extraction can only reproduce static ones)
+                extraction_stage = 'dynamic' if method and method.startswith('Dynamic extraction') else 'static'
+            
+                # Validate the extracted price - must be a reasonable value
+                if new_price is not None:
+                    # Verify price is in a reasonable range (between $10 and $100,000)
+                    if not (10 <= new_price <= 100000):
+                        logger.warning(f"Extracted price ${new_price} for machine {machine_id} is outside reasonable range")
+                        # Try the next best extraction method - common selectors if JSON-LD was used
+                        if method == "JSON-LD" or method == "JSON-LD offers":
+                            logger.info(f"Falling back to common selectors for machine {machine_id}")
+                            if soup is None:
+                                soup = BeautifulSoup(html_content, 'html.parser')
+                            context = ExtractionContext(url=product_url, old_price=current_price, machine_name=machine_name, machine_data=machine_data_for_extraction)
+                            new_price, alt_method = self.price_extractor._extract_from_common_selectors(soup, context)
+                            if new_price is not None:
+                                if 10 <= new_price <= 100000:
+                                    logger.info(f"Found better price ${new_price} using {alt_method}")
+                                    method = alt_method
+                                else:
+                                    logger.warning(f"Fallback price ${new_price} is also outside reasonable range")
+                                    new_price = None
+                        # Try Claude if common selectors also failed
+                        if new_price is None:
+                            logger.info(f"Falling back to Claude AI for machine {machine_id}")
+                            new_price, claude_method = await self.price_extractor._extract_using_claude(html_content, product_url, current_price)
+                            if new_price is not None:
+                                if 10 <= new_price <= 100000:
+                                    logger.info(f"Found better price ${new_price} using {claude_method}")
+                                    method = claude_method
+                                    extraction_stage = 'claude'
+                                else:
+                                    logger.warning(f"Claude price ${new_price} is also outside reasonable range")
+                                    new_price = None
+            
+                # Archive the page (stored once per distinct content) for offline re-extraction
+                snapshot_hash = await get_snapshot_store().save_async(
+                    html_content,
                     machine_id=machine_id,
-                    old_price=current_price,
-                    new_price=None,
-                    success=False,
-                    error_message="Failed to fetch product page after retries",
-                    batch_id=batch_id
+                    batch_id=batch_id,
+                    url=product_url,
+                    price=new_price,
+                    method=method if new_price is not None else None,
+                    stage=extraction_stage if new_price is not None else None,
+                    machine_name=machine.get("Machine Name"),
+                    old_price=current_price
                 )
-                return {"success": False, "error": "Failed to fetch product page after retries", "machine_id": machine_id, "url": product_url}
-            
-            # Get machine name for variant selection
-            machine_name = machine.get("Machine Name")
-            logger.info(f"Using machine name for variant selection: '{machine_name}'")
-            
-            # Prepare machine data with old_price for better extraction
-            machine_data_for_extraction = dict(machine)  # Create a copy
-            machine_data_for_extraction['old_price'] = current_price  # Add old_price field for extraction logic
-            
-            # Extract price - now passing machine data for learned selectors
-            new_price, method = await self.price_extractor.extract_price(soup, html_content, product_url, current_price, machine_name, machine_data_for_extraction)
-            
-            # Validate the extracted price - must be a reasonable value
-            if new_price is not None:
-                # Verify price is in a reasonable range (between $10 and $100,000)
-                if not (10 <= new_price <= 100000):
-                    logger.warning(f"Extracted price ${new_price} for machine {machine_id} is outside reasonable range")
-                    # Try the next best extraction method - common selectors if JSON-LD was used
-                    if method == "JSON-LD" or method == "JSON-LD offers":
-                        logger.info(f"Falling back to common selectors for machine {machine_id}")
-                        new_price, alt_method = self.price_extractor._extract_from_common_selectors(soup)
-                        if new_price is not None:
-                            if 10 <= new_price <= 100000:
-                                logger.info(f"Found better price ${new_price} using {alt_method}")
-                                method = alt_method
-                            else:
-                                logger.warning(f"Fallback price ${new_price} is also outside reasonable range")
-                                new_price = None
-                    # Try Claude if common selectors also failed
-                    if new_price is None:
-                        logger.info(f"Falling back to Claude AI for machine {machine_id}")
-                        new_price, claude_method = await self.price_extractor._extract_using_claude(html_content, product_url, current_price)
-                        if new_price is not None:
-                            if 10 <= new_price <= 100000:
-                                logger.info(f"Found better price ${new_price} using {claude_method}")
-                                method = claude_method
-                            else:
-                                logger.warning(f"Claude price ${new_price} is also outside reasonable range")
-                                new_price = None
             
             if new_price is None:
                 logger.error(f"Failed to extract price for machine {machine_id} from {product_url}")
@@ -283,11 +485,13 @@ class PriceService:
                     "success": False,
                     "error": "Failed to extract price",
                     "machine_id": machine_id,
-                    "url": product_url
+                    "url": product_url,
+                    "stage": "extract",
+                    **fetch_info
                 }
             
-            # Get the old price - use same effective current price logic
-            old_price = await self._get_effective_current_price(machine_id, machine.get("Price"))
+            # Get the old price - same effective current price as the extraction baseline
+            old_price = current_price
             logger.debug(f"Old price: {old_price}, New price: {new_price}")
             
             # Record price for variant verification (if in batch mode)
@@ -325,7 +529,10 @@ class PriceService:
                 }
             
             # Check if price change requires manual approval
-            requires_approval, approval_reason = await self._should_require_manual_approval(old_price, new_price, machine_id)
+            requires_approval, approval_reason = await self._should_require_manual_approval(
+                old_price, new_price, machine_id,
+                recent_corrections=list(snapshot.recent_corrections) if snapshot is not None else None
+            )
             
             if requires_approval:
                 # Log price change for manual review - don't update machines table
@@ -363,7 +570,10 @@ class PriceService:
             update_success = await self.db_service.update_machine_price(
                 machine_id=machine_id,
                 new_price=new_price,
-                html_content=html_content
+                html_content=html_content,
+                snapshot_hash=snapshot_hash,
+                machine_known=snapshot is not None,
+                page_fetched=page_fetched
             )
             
             if not update_success:
@@ -373,7 +583,9 @@ class PriceService:
                     "success": False,
                     "error": error_msg,
                     "machine_id": machine_id,
-                    "url": product_url
+                    "url": product_url,
+                    "stage": "database",
+                    **fetch_info
                 }
             
             # Add to price history
@@ -411,7 +623,9 @@ class PriceService:
                 "success": False,
                 "error": "An error occurred while processing the price update",
                 "machine_id": machine_id,
-                "url": product_url
+                "url": product_url,
+                "stage": "exception",
+                "error_class": type(e).__name__
             }
     
     async def _process_machines_concurrently(self, machines, batch_id, results, max_workers, use_scrapfly=False):
@@ -422,91 +636,160 @@ class PriceService:
             machines: List of machine dictionaries to process
             batch_id: Batch ID for tracking
             results: Results dictionary to update (thread-safe)
-            max_workers: Maximum concurrent workers
+            max_workers: Ceiling for concurrent workers; the governor adapts below it
             use_scrapfly: Whether to use Scrapfly scraper
         """
         import asyncio
-        from asyncio import Semaphore
-        
-        # Create semaphore to limit concurrent processing
-        semaphore = Semaphore(max_workers)
         
         # Thread-safe result aggregation lock
         results_lock = asyncio.Lock()
         
+        # Fetch each normalized URL once per batch and share the page across its machines
+        scrapfly_scraper = self._get_scrapfly_scraper()
+        # Product JSON endpoints are shared per product and released with the machines using them
+        page_cache = BatchPageCache(scrapfly_scraper, machines, parse=False, related_url=self._platform_endpoint_url)
+        
+        # Load tier history for all domains once so tier lookups never hit the database
+        await scrapfly_scraper.tier_cache.load(force=True)
+        machines = BatchPageCache.group_machines_by_url(machines)
+        
+        # Load every machine's DB state once; workers read these snapshots instead of querying
+        snapshots = await prefetch_batch_state(self.db_service, [machine.get("id") for machine in machines])
+        logger.info(f"🔗 {page_cache.shared_url_count()} URLs are shared by multiple machines in this batch")
+        
+        # Worker count follows the shared AIMD governor, capped at max_workers
+        governor = get_concurrency_governor()
+        
+        # Interleave domains so one slow or throttled host cannot hold every worker
+        scheduler = DomainFairScheduler(
+            machines,
+            lambda: min(max_workers, governor.limit),
+            policy_func=self.price_extractor.site_extractor.get_fetch_policy
+        )
+        logger.info(f"🌐 Machines per domain: {scheduler.domain_summary()}")
+        
         async def process_single_machine(machine):
-            """Process a single machine with semaphore control and result tracking."""
-            async with semaphore:
-                try:
-                    machine_id = machine.get("id")
-                    machine_name = machine.get("Machine Name", "Unknown")
-                    
-                    # Log start of processing for this machine
-                    logger.info(f"🔄 Processing machine {machine_name} (ID: {machine_id}) - Worker available")
-                    
-                    # Process the machine (this maintains all existing logging)
-                    result = await self.update_machine_price(machine_id, batch_id=batch_id, use_scrapfly=use_scrapfly)
-                    
-                    # Track result in database
-                    await self.db_service.add_batch_result(batch_id, machine_id, result)
-                    
-                    # Thread-safe result aggregation
-                    async with results_lock:
-                        if result["success"]:
-                            results["successful"] += 1
-                            if "message" in result and result["message"] == "Price unchanged":
-                                results["unchanged"] += 1
-                            else:
-                                results["updated"] += 1
+            """Process a single machine with result tracking (concurrency is enforced by the scheduler)."""
+            try:
+                machine_id = machine.get("id")
+                machine_name = machine.get("Machine Name", "Unknown")
+                
+                # Log start of processing for this machine
+                logger.info(f"🔄 Processing machine {machine_name} (ID: {machine_id}) - Worker available")
+                
+                # Process the machine (this maintains all existing logging)
+                result = await self.update_machine_price(
+                    machine_id, batch_id=batch_id, use_scrapfly=use_scrapfly,
+                    page_cache=page_cache, snapshot=snapshots.get(machine_id)
+                )
+                
+                # Track result in database
+                await self.db_service.add_batch_result(batch_id, machine_id, result, machine=machine)
+                
+                # Thread-safe result aggregation
+                async with results_lock:
+                    if result["success"]:
+                        results["successful"] += 1
+                        if "message" in result and result["message"] == "Price unchanged":
+                            results["unchanged"] += 1
                         else:
-                            results["failed"] += 1
-                            results["failures"].append({
-                                "machine_id": machine_id,
-                                "error": result.get("error", "Unknown error")
-                            })
-                    
-                    # Log completion
-                    status = "✅ SUCCESS" if result["success"] else "❌ FAILED"
-                    logger.info(f"{status} Machine {machine_name} - {results['successful'] + results['failed']}/{results['total']} completed")
-                    
-                    return result
-                    
-                except Exception as e:
-                    logger.exception(f"❌ Concurrent processing error for machine {machine.get('Machine Name', 'Unknown')} (ID: {machine.get('id')}): {str(e)}")
-                    
-                    # Create error result
-                    error_result = {
-                        "success": False,
-                        "error": f"Concurrent processing error: {str(e)}",
-                        "machine_id": machine.get("id"),
-                        "url": machine.get("product_link")
-                    }
-                    
-                    # Track error in database
-                    await self.db_service.add_batch_result(batch_id, machine.get("id"), error_result)
-                    
-                    # Update results
-                    async with results_lock:
+                            results["updated"] += 1
+                    else:
                         results["failed"] += 1
                         results["failures"].append({
-                            "machine_id": machine.get("id"),
-                            "error": str(e)
+                            "machine_id": machine_id,
+                            "error": result.get("error", "Unknown error")
                         })
-                    
-                    return error_result
+                    self._publish_machine_progress(batch_id, results, machine, result, governor, page_cache)
+                
+                # Log completion
+                status = "✅ SUCCESS" if result["success"] else "❌ FAILED"
+                logger.info(f"{status} Machine {machine_name} - {results['successful'] + results['failed']}/{results['total']} completed")
+                
+                return result
+                
+            except Exception as e:
+                logger.exception(f"❌ Concurrent processing error for machine {machine.get('Machine Name', 'Unknown')} (ID: {machine.get('id')}): {str(e)}")
+                
+                # Create error result
+                error_result = {
+                    "success": False,
+                    "error": f"Concurrent processing error: {str(e)}",
+                    "machine_id": machine.get("id"),
+                    "url": machine.get("product_link"),
+                    "stage": "exception",
+                    "error_class": type(e).__name__
+                }
+                
+                # Track error in database
+                await self.db_service.add_batch_result(batch_id, machine.get("id"), error_result, machine=machine)
+                
+                # Update results
+                async with results_lock:
+                    results["failed"] += 1
+                    results["failures"].append({
+                        "machine_id": machine.get("id"),
+                        "error": str(e)
+                    })
+                    self._publish_machine_progress(batch_id, results, machine, error_result, governor, page_cache)
+                
+                return error_result
+            
+            finally:
+                # Evict the shared page once the last machine using it is done
+                page_cache.release(machine.get("product_link"))
         
         # Log start of concurrent processing
-        logger.info(f"🚀 Starting concurrent processing of {len(machines)} machines with {max_workers} workers")
-        
-        # Create tasks for all machines
-        tasks = [process_single_machine(machine) for machine in machines]
-        
-        # Process all tasks concurrently
-        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"🚀 Starting concurrent processing of {len(machines)} machines with up to {max_workers} workers (currently {scheduler.worker_limit})")
         
-        logger.info(f"🎉 Concurrent processing completed - {results['successful']} successful, {results['failed']} failed")
+        try:
+            # Workers pull machines from per-domain queues in round-robin order; start enough
+            # workers for the ceiling and let the governor decide how many run at once
+            await scheduler.run(process_single_machine, worker_count=max_workers)
+            
+            governor_metrics = governor.get_metrics()
+            logger.info(f"🎚️ Concurrency ended at {governor_metrics['limit']} (p95 latency {governor_metrics['p95_latency']}s, {governor_metrics['stats']['increases']} increases, {governor_metrics['stats']['decreases']} decreases)")
+            
+            logger.info(f"🎉 Concurrent processing completed - {results['successful']} successful, {results['failed']} failed")
+            logger.info(f"♻️ Page cache: {page_cache.stats['fetches']} fetches, {page_cache.stats['hits']} shared-page hits")
+        finally:
+            page_cache.clear()
+            
+            # Write back any buffered tier history successes, even if the batch was cancelled
+            await scrapfly_scraper.tier_cache.close()
     
-    async def batch_update_machines(self, days_threshold=7, max_workers=5, limit=None, machine_ids=None, use_scrapfly=True):
+    def _progress_counters(self, results):
+        """Running counters for batch progress events."""
+        return {
+            "total": results["total"],
+            "completed": results["successful"] + results["failed"],
+            "successful": results["successful"],
+            "failed": results["failed"],
+            "unchanged": results["unchanged"],
+            "updated": results["updated"]
+        }
+    
+    def _publish_machine_progress(self, batch_id, results, machine, result, governor, page_cache):
+        """Publish one machine's completion with the batch's running counters."""
+        get_batch_event_bus().publish(
+            batch_id, "machine_completed",
+            machine={
+                "machine_id": machine.get("id"),
+                "machine_name": machine.get("Machine Name", "Unknown"),
+                "success": result.get("success", False),
+                "old_price": result.get("old_price"),
+                "new_price": result.get("new_price"),
+                "method": result.get("method"),
+                "requires_approval": result.get("requires_approval", False),
+                "error": result.get("error"),
+                "stage": result.get("stage")
+            },
+            counters=self._progress_counters(results),
+            concurrency=governor.limit,
+            credits_spent=page_cache.credits_spent
+        )
+    
+    async def batch_update_machines(self, days_threshold=7, max_workers=5, limit=None, machine_ids=None, use_scrapfly=True, schedule=None, credit_budget=None):
         """
         Update prices for all machines that need an update.
         
@@ -518,6 +801,9 @@ class PriceService:
             machine_ids (List[str], optional): Specific machine IDs to update. If provided,
                                               days_threshold is ignored.
             use_scrapfly (bool, optional): Whether to use Scrapfly scraper. Always True (legacy parameter).
+            schedule (str, optional): "adaptive" to pick machines by per-machine recheck interval
+                                      instead of days_threshold.
+            credit_budget (int, optional): Expected Scrapfly credits for an adaptive run.
             
         Returns:
             dict: Summary of batch update operation.
@@ -525,9 +811,20 @@ class PriceService:
         logger.info(f"Starting batch update with days_threshold={days_threshold}, limit={limit}, machine_ids={(len(machine_ids) if machine_ids else 'None')}, use_scrapfly={use_scrapfly}")
         
         # Get machines needing update - use machine_ids if provided
+        schedule_summary = None
         if machine_ids:
             logger.info(f"Using {len(machine_ids)} provided machine IDs for batch update")
             machines = await self.db_service.get_machines_needing_update(machine_ids=machine_ids)
+        elif schedule == "adaptive":
+            # Most overdue machines by their own volatility-based interval, within the credit budget
+            scraper = self._get_scrapfly_scraper()
+            await scraper.tier_cache.load()
+            machines, schedule_summary = await plan_adaptive_batch(
+                self.db_service,
+                lambda url: scraper._get_optimal_tier(scraper._extract_domain(url)),
+                credit_budget=credit_budget if credit_budget is not None else RECHECK_CREDIT_BUDGET,
+                limit=limit
+            )
         else:
             # Otherwise use the days_threshold
             machines = await self.db_service.get_machines_needing_update(days_threshold=days_threshold, limit=limit)
@@ -539,7 +836,7 @@ class PriceService:
         # Log how many machines we're actually updating
         logger.info(f"Starting batch update for {len(machines)} machines")
         
-        # Create a batch record
+        # Create a batch record; the full machine list is stored so the batch can be resumed
         pipeline_type = 'scrapfly' if use_scrapfly else 'standard'
         batch_id = await self.db_service.create_batch(
             count=len(machines),
@@ -547,44 +844,173 @@ class PriceService:
             machine_ids=machine_ids,
             limit=limit,
             max_workers=max_workers,
-            extraction_pipeline=pipeline_type
+            extraction_pipeline=pipeline_type,
+            planned_machine_ids=[machine.get("id") for machine in machines]
         )
         
         if not batch_id:
             logger.error("Failed to create batch record")
             return {"success": False, "error": "Failed to create batch record"}
         
-        # Set up batch-specific logging
-        batch_log_path = self._setup_batch_logging(batch_id)
-        
-        # Initialize variant verifier for this batch
-        self.variant_verifier = VariantVerificationService()
+        results = self._new_batch_results(batch_id, len(machines))
+        summary = await self._run_batch(batch_id, machines, results, max_workers, use_scrapfly, VariantVerificationService())
+        if schedule_summary:
+            summary["schedule"] = schedule_summary
+        return summary
+    
+    async def resume_batch(self, batch_id, max_workers=None, use_scrapfly=True):
+        """
+        Resume an interrupted batch, processing only the machines without a recorded result.
         
-        # Set effective max workers (use config default if not specified)
-        from config import MAX_CONCURRENT_EXTRACTIONS
-        effective_max_workers = max_workers if max_workers is not None else MAX_CONCURRENT_EXTRACTIONS
+        Counters and variant verification state are rebuilt from the batch's recorded results,
+        so the resumed run finishes the batch as if it had never stopped.
         
-        # Log concurrent processing configuration
-        logger.info(f"🔧 Configured for concurrent processing with {effective_max_workers} workers")
+        Args:
+            batch_id (str): ID of the batch to resume.
+            max_workers (int, optional): Worker ceiling; defaults to the one the batch was started with.
+            use_scrapfly (bool, optional): Whether to use Scrapfly scraper. Always True (legacy parameter).
+            
+        Returns:
+            dict: Summary of batch update operation.
+        """
+        # Two runs of one batch would scrape the same machines and count their results twice
+        if get_batch_event_bus().is_active(batch_id) or batch_id in self._resuming_batches:
+            logger.warning(f"Batch {batch_id} is still running in this process - not resuming it")
+            return {"success": False, "error": f"Batch {batch_id} is still running"}
         
-        # Update each machine and track in batch_results
-        results = {
+        self._resuming_batches.add(batch_id)
+        try:
+            batch = await self.db_service.get_batch(batch_id)
+            if not batch:
+                return {"success": False, "error": f"Batch {batch_id} not found"}
+            
+            if batch.get("status") == "completed":
+                logger.info(f"Batch {batch_id} is already completed - nothing to resume")
+                return {"success": True, "message": "Batch already completed", "batch_id": batch_id, "count": 0}
+            
+            metadata = batch.get("metadata") or {}
+            planned_machine_ids = metadata.get("planned_machine_ids")
+            if not planned_machine_ids:
+                logger.error(f"Batch {batch_id} has no recorded machine list and cannot be resumed")
+                return {"success": False, "error": f"Batch {batch_id} was not started with a resumable machine list"}
+            
+            # Recorded batch results are the per-machine checkpoints; without a complete set the
+            # resume would pay for already processed machines again, so any error aborts it
+            try:
+                recorded = await self.db_service.get_batch_checkpoints(batch_id)
+                remaining_ids = [machine_id for machine_id in planned_machine_ids if machine_id not in recorded]
+                machines_by_id = {machine["id"]: machine for machine in await self.db_service.get_machines_by_ids(remaining_ids)} if remaining_ids else {}
+            except Exception as e:
+                logger.error(f"Could not load checkpoints for batch {batch_id}, not resuming: {str(e)}")
+                return {"success": False, "error": f"Could not load batch checkpoints: {str(e)}", "batch_id": batch_id}
+            
+            logger.info(f"♻️ Resuming batch {batch_id}: {len(recorded)} of {len(planned_machine_ids)} machines already processed, {len(remaining_ids)} remaining")
+            results, variant_verifier = self._rebuild_batch_state(batch_id, len(planned_machine_ids), recorded.values())
+            machines = [machines_by_id[machine_id] for machine_id in remaining_ids if machine_id in machines_by_id]
+            
+            await self.db_service.update_batch_status(batch_id, "in_progress")
+            if max_workers is None:
+                max_workers = metadata.get("max_workers")
+            return await self._run_batch(batch_id, machines, results, max_workers, use_scrapfly, variant_verifier,
+                                         resumed_runs=metadata.get("resumed_runs", 0) + 1)
+        finally:
+            self._resuming_batches.discard(batch_id)
+    
+    def _new_batch_results(self, batch_id, total):
+        """Empty counters for a batch run."""
+        return {
             "batch_id": batch_id,
-            "total": len(machines),
+            "total": total,
             "successful": 0,
             "failed": 0,
             "unchanged": 0,
             "updated": 0,
             "failures": []
         }
+    
+    def _rebuild_batch_state(self, batch_id, total, recorded_results):
+        """
+        Rebuild batch counters and variant verification from recorded batch results.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            total (int): Number of machines planned for the batch.
+            recorded_results: batch_results rows already written for the batch.
+            
+        Returns:
+            tuple: (results dict, VariantVerificationService)
+        """
+        results = self._new_batch_results(batch_id, total)
+        variant_verifier = VariantVerificationService()
+        
+        for entry in recorded_results:
+            if entry.get("success"):
+                results["successful"] += 1
+                if entry.get("old_price") == entry.get("new_price"):
+                    results["unchanged"] += 1
+                else:
+                    results["updated"] += 1
+                if entry.get("new_price") is not None:
+                    variant_verifier.record_price(entry.get("machine_name") or "Unknown", entry["new_price"], batch_id, entry.get("machine_id"))
+            else:
+                results["failed"] += 1
+                results["failures"].append({
+                    "machine_id": entry.get("machine_id"),
+                    "error": entry.get("error") or "Unknown error"
+                })
+        
+        return results, variant_verifier
+    
+    async def _run_batch(self, batch_id, machines, results, max_workers, use_scrapfly, variant_verifier, resumed_runs=0):
+        """
+        Process a batch's machines, then verify variants and complete the batch.
+        
+        Args:
+            batch_id (str): ID of the batch.
+            machines (list): Machines still to process.
+            results (dict): Batch counters (pre-filled when resuming).
+            max_workers (int, optional): Worker ceiling.
+            use_scrapfly (bool): Whether to use Scrapfly scraper.
+            variant_verifier (VariantVerificationService): Variant state for the batch.
+            resumed_runs (int, optional): How many times the batch has been resumed.
+            
+        Returns:
+            dict: Summary of batch update operation.
+        """
+        # Set up batch-specific logging
+        batch_log_path = self._setup_batch_logging(batch_id)
+        
+        # Variant verifier for this batch
+        self.variant_verifier = variant_verifier
+        
+        # Set the worker ceiling (the governor's maximum if not specified)
+        effective_max_workers = max_workers if max_workers is not None else get_concurrency_governor().max_limit
+        
+        # Log concurrent processing configuration
+        logger.info(f"🔧 Configured for adaptive concurrent processing with up to {effective_max_workers} workers")
+        
+        event_bus = get_batch_event_bus()
+        event_bus.publish(batch_id, "batch_started", counters=self._progress_counters(results),
+                          max_workers=effective_max_workers, concurrency=get_concurrency_governor().limit,
+                          credits_spent=0, resumed_runs=resumed_runs)
         
-        # Process machines concurrently with controlled concurrency
-        await self._process_machines_concurrently(machines, batch_id, results, effective_max_workers, use_scrapfly)
+        # Buffer per-machine price_history rows and write them in bulk (batch_results are the
+        # resume checkpoints and go straight to the database); flushed even if the batch is cancelled
+        if machines:
+            self.db_service.open_write_buffer(batch_id)
+            try:
+                # Process machines concurrently with controlled concurrency
+                await self._process_machines_concurrently(machines, batch_id, results, effective_max_workers, use_scrapfly)
+            except BaseException as e:
+                event_bus.publish(batch_id, "batch_failed", counters=self._progress_counters(results), error=str(e) or type(e).__name__)
+                raise
+            finally:
+                await asyncio.shield(self.db_service.close_write_buffer(batch_id))
         
         logger.info(f"Batch update completed. Results: {results['successful']} successful, {results['failed']} failed")
         
         # Generate and log variant verification report
-        completion_metadata = {}
+        completion_metadata = {"resumed_runs": resumed_runs} if resumed_runs else {}
         variant_blocked = False
         
         if self.variant_verifier:
@@ -605,6 +1031,8 @@ class PriceService:
         
         # Mark batch as completed with metadata
         await self.db_service.complete_batch(batch_id, completion_metadata)
+        event_bus.publish(batch_id, "batch_completed", counters=self._progress_counters(results),
+                          variant_blocked=variant_blocked)
         
         # Log batch completion details
         logger.info(f"======================")
@@ -661,7 +1089,39 @@ class PriceService:
             logger.exception(f"Error retrieving batch results for batch_id {batch_id}: {str(e)}")
             return None 
     
+    # Failure stages a retest re-runs: price extraction and database write failures, as the
+    # batch log parser did. Lookup, URL, fetch and exception failures are not retested.
+    RETEST_FAILURE_STAGES = ('extract', 'database')
+    
     async def get_batch_failures(self, batch_id):
+        """
+        Get machine IDs whose price extraction failed in a batch, from the batch's failure events.
+        
+        Only RETEST_FAILURE_STAGES count. An empty result means the batch had no such failures;
+        the batch log file is parsed only when the failure store is unavailable or the batch
+        was created before it existed.
+        
+        Args:
+            batch_id (str): The batch ID to get failures for
+            
+        Returns:
+            List[str]: List of machine IDs that completely failed
+        """
+        events = await self.db_service.get_batch_failure_events(batch_id, stages=self.RETEST_FAILURE_STAGES)
+        if events is None:
+            return await self._get_batch_failures_from_log(batch_id)
+        
+        if not events:
+            # Batches created with the failure store are flagged in their metadata
+            batch = await self.db_service.get_batch(batch_id)
+            if not (batch or {}).get("metadata", {}).get("failure_events"):
+                return await self._get_batch_failures_from_log(batch_id)
+        
+        failed_machine_ids = list(dict.fromkeys(event["machine_id"] for event in events if event.get("machine_id")))
+        logger.info(f"Found {len(failed_machine_ids)} failed machines in batch {batch_id} ({len(events)} failure events)")
+        return failed_machine_ids
+    
+    async def _get_batch_failures_from_log(self, batch_id):
         """
         Parse batch log file to extract failed machine IDs.
         
@@ -706,63 +1166,61 @@ class PriceService:
             
             failed_machine_ids = []
             
-            with open(log_file, 'r') as f:
-                lines = f.readlines()
-            
             # Parse log lines to find ACTUAL extraction failures (not approval requests)
             error_lines_found = 0
-            for line in lines:
-                # Look for actual extraction failures - "Failed to extract price"
-                if "ERROR" in line and "Failed to extract price for machine" in line:
-                    error_lines_found += 1
-                    logger.info(f"🔧 DEBUG: Found extraction failure line {error_lines_found}: {line.strip()[:100]}...")
-                    try:
-                        # Extract machine ID from: "Failed to extract price for machine ebd7976d-9fa0-4142-84cf-065d7adcb870 from https://..."
-                        match_text = "Failed to extract price for machine "
-                        start_idx = line.find(match_text)
-                        if start_idx != -1:
-                            start_idx += len(match_text)
-                            # Find the end of the machine ID (next space or tab)
-                            end_idx = line.find(" ", start_idx)
-                            if end_idx != -1:
-                                machine_id = line[start_idx:end_idx].strip()
-                                logger.info(f"🔧 DEBUG: Extracted machine_id: '{machine_id}' (length: {len(machine_id)}, dashes: {machine_id.count('-')})")
-                                # Validate it looks like a UUID (36 chars with 4 dashes)
-                                if len(machine_id) == 36 and machine_id.count('-') == 4:
-                                    if machine_id not in failed_machine_ids:
-                                        failed_machine_ids.append(machine_id)
-                                        logger.info(f"🔧 DEBUG: Added failed machine ID: {machine_id}")
-                                else:
-                                    logger.warning(f"🔧 DEBUG: Invalid machine ID format: '{machine_id}'")
-                    except Exception as e:
-                        logger.warning(f"Failed to parse machine ID from extraction failure line: {line.strip()}")
-                        continue
+            with open(log_file, 'r') as f:
+                for line in f:
+                    # Look for actual extraction failures - "Failed to extract price"
+                    if "ERROR" in line and "Failed to extract price for machine" in line:
+                        error_lines_found += 1
+                        logger.info(f"🔧 DEBUG: Found extraction failure line {error_lines_found}: {line.strip()[:100]}...")
+                        try:
+                            # Extract machine ID from: "Failed to extract price for machine ebd7976d-9fa0-4142-84cf-065d7adcb870 from https://..."
+                            match_text = "Failed to extract price for machine "
+                            start_idx = line.find(match_text)
+                            if start_idx != -1:
+                                start_idx += len(match_text)
+                                # Find the end of the machine ID (next space or tab)
+                                end_idx = line.find(" ", start_idx)
+                                if end_idx != -1:
+                                    machine_id = line[start_idx:end_idx].strip()
+                                    logger.info(f"🔧 DEBUG: Extracted machine_id: '{machine_id}' (length: {len(machine_id)}, dashes: {machine_id.count('-')})")
+                                    # Validate it looks like a UUID (36 chars with 4 dashes)
+                                    if len(machine_id) == 36 and machine_id.count('-') == 4:
+                                        if machine_id not in failed_machine_ids:
+                                            failed_machine_ids.append(machine_id)
+                                            logger.info(f"🔧 DEBUG: Added failed machine ID: {machine_id}")
+                                    else:
+                                        logger.warning(f"🔧 DEBUG: Invalid machine ID format: '{machine_id}'")
+                        except Exception as e:
+                            logger.warning(f"Failed to parse machine ID from extraction failure line: {line.strip()}")
+                            continue
                 
-                # Also look for database errors when adding price history - these contain machine IDs
-                elif "ERROR" in line and "services.database:add_price_history" in line and "Error adding price history for machine" in line:
-                    error_lines_found += 1
-                    logger.info(f"🔧 DEBUG: Found database error line {error_lines_found}: {line.strip()[:100]}...")
-                    try:
-                        # Extract machine ID from: "Error adding price history for machine ebd7976d-9fa0-4142-84cf-065d7adcb870: {'message':..."
-                        match_text = "Error adding price history for machine "
-                        start_idx = line.find(match_text)
-                        if start_idx != -1:
-                            start_idx += len(match_text)
-                            # Find the end of the machine ID (next colon)
-                            end_idx = line.find(":", start_idx)
-                            if end_idx != -1:
-                                machine_id = line[start_idx:end_idx].strip()
-                                logger.info(f"🔧 DEBUG: Extracted machine_id: '{machine_id}' (length: {len(machine_id)}, dashes: {machine_id.count('-')})")
-                                # Validate it looks like a UUID (36 chars with 4 dashes)
-                                if len(machine_id) == 36 and machine_id.count('-') == 4:
-                                    if machine_id not in failed_machine_ids:
-                                        failed_machine_ids.append(machine_id)
-                                        logger.info(f"🔧 DEBUG: Added failed machine ID: {machine_id}")
-                                else:
-                                    logger.warning(f"🔧 DEBUG: Invalid machine ID format: '{machine_id}'")
-                    except Exception as e:
-                        logger.warning(f"Failed to parse machine ID from database error line: {line.strip()}")
-                        continue
+                    # Also look for database errors when adding price history - these contain machine IDs
+                    elif "ERROR" in line and "services.database:add_price_history" in line and "Error adding price history for machine" in line:
+                        error_lines_found += 1
+                        logger.info(f"🔧 DEBUG: Found database error line {error_lines_found}: {line.strip()[:100]}...")
+                        try:
+                            # Extract machine ID from: "Error adding price history for machine ebd7976d-9fa0-4142-84cf-065d7adcb870: {'message':..."
+                            match_text = "Error adding price history for machine "
+                            start_idx = line.find(match_text)
+                            if start_idx != -1:
+                                start_idx += len(match_text)
+                                # Find the end of the machine ID (next colon)
+                                end_idx = line.find(":", start_idx)
+                                if end_idx != -1:
+                                    machine_id = line[start_idx:end_idx].strip()
+                                    logger.info(f"🔧 DEBUG: Extracted machine_id: '{machine_id}' (length: {len(machine_id)}, dashes: {machine_id.count('-')})")
+                                    # Validate it looks like a UUID (36 chars with 4 dashes)
+                                    if len(machine_id) == 36 and machine_id.count('-') == 4:
+                                        if machine_id not in failed_machine_ids:
+                                            failed_machine_ids.append(machine_id)
+                                            logger.info(f"🔧 DEBUG: Added failed machine ID: {machine_id}")
+                                    else:
+                                        logger.warning(f"🔧 DEBUG: Invalid machine ID format: '{machine_id}'")
+                        except Exception as e:
+                            logger.warning(f"Failed to parse machine ID from database error line: {line.strip()}")
+                            continue
             
             logger.info(f"🔧 DEBUG: Found {error_lines_found} error lines total")
             logger.info(f"Found {len(failed_machine_ids)} failed machines in batch {batch_id}")
@@ -0,0 +1,302 @@
+"""
+Volatility-driven recheck scheduling.
+Gives each machine its own check interval from its price history and picks the most overdue
+machines that fit a per-run Scrapfly credit budget.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from statistics import median, pstdev
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from scrapers.batch_page_cache import normalize_url
+from config import (
+    RECHECK_MIN_DAYS,
+    RECHECK_MAX_DAYS,
+    RECHECK_DEFAULT_DAYS,
+    RECHECK_HISTORY_DAYS
+)
+
+
+# Approximate Scrapfly credits per fetch at each tier (basic, JS rendering, anti-bot)
+TIER_CREDITS = {1: 1, 2: 5, 3: 25}
+
+# Statuses that record a real observed price (PENDING_REVIEW is an observed, unapproved change)
+OBSERVED_STATUSES = {'AUTO_APPLIED', 'APPROVED', 'SUCCESS', 'MANUAL_CORRECTION', 'PENDING_REVIEW'}
+
+# Same columns get_machines_needing_update returns, so batches treat both selections alike
+SCHEDULE_MACHINE_COLUMNS = 'id, "Machine Name", "Company", Price, product_link, "Affiliate Link", html_timestamp, price_tracking_enabled'
+
+
+def _parse_date(value) -> Optional[datetime]:
+    """Parse an ISO timestamp into a naive UTC datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _is_failure(entry: Dict) -> bool:
+    """Whether a history entry records a failed check."""
+    return entry.get('status') == 'FAILED' or (entry.get('failure_reason') or '').startswith('Failed')
+
+
+@dataclass(frozen=True)
+class RecheckEstimate:
+    """When a machine should next be checked, and what checking it costs"""
+    machine: Dict
+    interval_days: float
+    last_checked: Optional[datetime]
+    overdue_ratio: float
+    credits: int
+    reasons: Tuple[str, ...] = ()
+
+    @property
+    def machine_id(self) -> str:
+        return self.machine.get('id')
+
+    @property
+    def next_check(self) -> Optional[datetime]:
+        if self.last_checked is None:
+            return None
+        return self.last_checked + timedelta(days=self.interval_days)
+
+    @property
+    def is_due(self) -> bool:
+        return self.overdue_ratio >= 1.0
+
+
+class RecheckScheduler:
+    """
+    Per-machine check intervals from price history.
+
+    Machines are checked about twice per observed price change (so a weekly mover is
+    checked every few days and a machine that never moves drifts toward the maximum
+    interval). Intervals are shortened for recent volatility and for prices that sit
+    below their usual level (a sale that will end), retried quickly after a single
+    failure and backed off exponentially on failure streaks.
+    """
+
+    def __init__(self, min_days: float = RECHECK_MIN_DAYS, max_days: float = RECHECK_MAX_DAYS,
+                 default_days: float = RECHECK_DEFAULT_DAYS, change_threshold: float = 0.005,
+                 volatility_threshold: float = 0.03, sale_threshold: float = 0.05,
+                 volatility_window_days: int = 30, min_observations: int = 3):
+        """
+        Initialize the scheduler.
+
+        Args:
+            min_days: Shortest interval
+            max_days: Longest interval
+            default_days: Interval for machines with fewer than min_observations prices
+            change_threshold: Relative price move that counts as a change
+            volatility_threshold: Coefficient of variation (recent window) that halves the interval
+            sale_threshold: Latest price this far below the window median counts as a sale
+            volatility_window_days: Recent window used for volatility
+            min_observations: Observed prices needed before history drives the interval
+        """
+        self.min_days = min_days
+        self.max_days = max(min_days, max_days)
+        self.default_days = default_days
+        self.change_threshold = change_threshold
+        self.volatility_threshold = volatility_threshold
+        self.sale_threshold = sale_threshold
+        self.volatility_window_days = volatility_window_days
+        self.min_observations = min_observations
+
+    def _clamp(self, days: float) -> float:
+        return max(self.min_days, min(self.max_days, days))
+
+    def interval_days(self, history: List[Dict], now: Optional[datetime] = None) -> Tuple[float, Tuple[str, ...]]:
+        """
+        Compute a machine's check interval.
+
+        Args:
+            history: Price history entries, oldest first
+            now: Current time (naive UTC)
+
+        Returns:
+            Tuple of (interval in days, reasons that shaped it)
+        """
+        now = now or datetime.utcnow()
+
+        # Failure streaks: retry once soon, then back off so broken pages stop burning credits
+        streak = 0
+        for entry in reversed(history):
+            if not _is_failure(entry):
+                break
+            streak += 1
+        if streak == 1:
+            return self.min_days, ('retry after failure',)
+        if streak > 1:
+            return self._clamp(self.min_days * 2 ** (streak - 1)), (f'{streak} failures in a row',)
+
+        observed = [
+            (date, float(entry['price']))
+            for entry in history
+            if entry.get('status') in OBSERVED_STATUSES and entry.get('price') is not None
+            for date in [_parse_date(entry.get('date'))] if date is not None
+        ]
+        if len(observed) < self.min_observations:
+            return self._clamp(self.default_days), ('little history',)
+
+        reasons = []
+        changes = sum(
+            1 for (_, previous), (_, current) in zip(observed, observed[1:])
+            if previous > 0 and abs(current - previous) / previous > self.change_threshold
+        )
+        span_days = max((observed[-1][0] - observed[0][0]).total_seconds() / 86400, 1.0)
+
+        if changes:
+            # Sample about twice per expected change
+            interval = span_days / changes / 2
+            reasons.append(f'{changes} changes in {span_days:.0f} days')
+        else:
+            # Stable prices: the longer they have held, the longer we wait
+            interval = max(self.default_days, span_days / 4)
+            reasons.append(f'stable for {span_days:.0f} days')
+
+        recent = [price for date, price in observed if date >= now - timedelta(days=self.volatility_window_days)]
+        if len(recent) >= 2 and sum(recent) > 0:
+            variation = pstdev(recent) / (sum(recent) / len(recent))
+            if variation > self.volatility_threshold:
+                interval /= 2
+                reasons.append(f'volatile ({variation:.1%})')
+
+        usual_price = median(price for _, price in observed)
+        if usual_price > 0 and observed[-1][1] < usual_price * (1 - self.sale_threshold):
+            interval /= 2
+            reasons.append('below usual price (sale)')
+
+        return self._clamp(interval), tuple(reasons)
+
+    def estimate(self, machine: Dict, history: List[Dict], tier: int = 1, now: Optional[datetime] = None) -> RecheckEstimate:
+        """
+        Estimate when a machine is due and what a check costs.
+
+        Args:
+            machine: Machine record
+            history: Price history entries, oldest first
+            tier: Expected Scrapfly tier for the machine's domain
+            now: Current time (naive UTC)
+
+        Returns:
+            RecheckEstimate
+        """
+        now = now or datetime.utcnow()
+        interval, reasons = self.interval_days(history, now)
+
+        checked = [date for date in (_parse_date(entry.get('date')) for entry in history) if date is not None]
+        last_checked = max(checked) if checked else None
+        if last_checked is None:
+            # Never checked within the window
+            overdue_ratio = math.inf
+        else:
+            overdue_ratio = (now - last_checked).total_seconds() / 86400 / interval
+
+        return RecheckEstimate(
+            machine=machine,
+            interval_days=interval,
+            last_checked=last_checked,
+            overdue_ratio=overdue_ratio,
+            credits=TIER_CREDITS.get(tier, TIER_CREDITS[1]),
+            reasons=reasons
+        )
+
+    def select(self, estimates: List[RecheckEstimate], credit_budget: Optional[int] = None,
+               limit: Optional[int] = None) -> List[RecheckEstimate]:
+        """
+        Pick the most overdue due machines that fit the credit budget.
+
+        Machines sharing a URL are fetched once per batch, so only the first of them is charged.
+        A machine that does not fit is skipped and cheaper, less overdue machines may still fit.
+
+        Args:
+            estimates: Estimates for every candidate machine
+            credit_budget: Maximum expected credits (None for no budget)
+            limit: Maximum number of machines
+
+        Returns:
+            Selected estimates, most overdue first
+        """
+        selected = []
+        charged_urls = set()
+        spent = 0
+
+        for estimate in sorted((e for e in estimates if e.is_due), key=lambda e: e.overdue_ratio, reverse=True):
+            if limit is not None and len(selected) >= limit:
+                break
+            url = normalize_url(estimate.machine.get('product_link'))
+            cost = 0 if url and url in charged_urls else estimate.credits
+            if credit_budget is not None and spent + cost > credit_budget:
+                continue
+            spent += cost
+            if url:
+                charged_urls.add(url)
+            selected.append(estimate)
+
+        return selected
+
+
+async def plan_adaptive_batch(db_service, tier_lookup: Callable[[str], Awaitable[int]],
+                              credit_budget: Optional[int] = None, limit: Optional[int] = None,
+                              scheduler: Optional[RecheckScheduler] = None,
+                              history_days: int = RECHECK_HISTORY_DAYS,
+                              now: Optional[datetime] = None) -> Tuple[List[Dict], Dict]:
+    """
+    Choose the machines for a scheduled run.
+
+    Args:
+        db_service: DatabaseService
+        tier_lookup: Async callable returning the expected Scrapfly tier for a URL
+        credit_budget: Maximum expected credits for the run (None for no budget)
+        limit: Maximum number of machines
+        scheduler: RecheckScheduler (default settings if omitted)
+        history_days: Price history window in days
+        now: Current time (naive UTC)
+
+    Returns:
+        Tuple of (machines to check, summary dict)
+    """
+    scheduler = scheduler or RecheckScheduler()
+    now = now or datetime.utcnow()
+    estimates = []
+
+    async for page in db_service.iter_machine_pages(SCHEDULE_MACHINE_COLUMNS, price_tracking_enabled=True):
+        histories = await db_service.get_price_history_window([machine['id'] for machine in page], days=history_days)
+        for machine in page:
+            tier = await tier_lookup(machine.get('product_link')) if machine.get('product_link') else 1
+            estimates.append(scheduler.estimate(machine, histories.get(machine['id'], []), tier=tier, now=now))
+
+    selected = scheduler.select(estimates, credit_budget=credit_budget, limit=limit)
+    due = sum(1 for estimate in estimates if estimate.is_due)
+    charged = set()
+    expected_credits = 0
+    for estimate in selected:
+        url = normalize_url(estimate.machine.get('product_link'))
+        if not url or url not in charged:
+            expected_credits += estimate.credits
+            charged.add(url)
+
+    summary = {
+        'candidates': len(estimates),
+        'due': due,
+        'selected': len(selected),
+        'deferred': due - len(selected),
+        'expected_credits': expected_credits,
+        'credit_budget': credit_budget,
+        'median_interval_days': round(median(e.interval_days for e in estimates), 1) if estimates else None
+    }
+    logger.info(f"🗓️ Adaptive schedule: {summary['selected']} of {due} due machines selected "
+                f"(~{expected_credits} credits, budget {credit_budget}), {len(estimates)} candidates")
+    for estimate in selected[:10]:
+        logger.debug(f"🗓️ {estimate.machine.get('Machine Name')}: every {estimate.interval_days:.1f}d, "
+                     f"{estimate.overdue_ratio:.1f}x overdue ({', '.join(estimate.reasons)})")
+
+    return [estimate.machine for estimate in selected], summary
@@ -0,0 +1,241 @@
+"""
+In-memory cache of Scrapfly tier history with buffered write-back.
+Answers tier lookups without a database round trip and flushes success counts in bulk.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+from loguru import logger
+
+
+TIER_HISTORY_TABLE = 'scrapfly_tier_history'
+
+
+class TierHistoryCache:
+    """
+    Process-wide cache of the best starting tier per domain.
+
+    All domains are loaded with a single query and lookups are served from memory.
+    Successes update the in-memory record immediately and are buffered as per-domain
+    increments; a background flush writes them with one RPC call that increments
+    success_count on the server, so concurrent workers never race on read-modify-write.
+    """
+
+    def __init__(self, db_service, flush_interval: float = 30.0, min_successes: int = 3):
+        """
+        Initialize the cache.
+
+        Args:
+            db_service: DatabaseService whose async PostgREST client is used
+            flush_interval: Seconds to collect successes before writing them back
+            min_successes: Successes needed before a learned tier is used
+        """
+        self.db_service = db_service
+        self.flush_interval = flush_interval
+        self.min_successes = min_successes
+
+        self._history: Dict[str, Dict] = {}
+        self._pending: Dict[str, Dict] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def pending_count(self) -> int:
+        """Number of domains with unflushed successes."""
+        return len(self._pending)
+
+    async def load(self, force: bool = False) -> int:
+        """
+        Load tier history for every domain.
+
+        Args:
+            force: Reload even if already loaded
+
+        Returns:
+            Number of domains in the cache
+        """
+        async with self._load_lock:
+            if self._loaded and not force:
+                return len(self._history)
+
+            try:
+                response = await self.db_service.rest.table(TIER_HISTORY_TABLE) \
+                    .select('domain, successful_tier, success_count, last_success_at') \
+                    .execute()
+
+                history = {}
+                for row in response.data or []:
+                    domain = row.get('domain')
+                    if not domain:
+                        continue
+                    # Keep the most recent row if a domain appears more than once
+                    existing = history.get(domain)
+                    if existing and (existing.get('last_success_at') or '') >= (row.get('last_success_at') or ''):
+                        continue
+                    history[domain] = dict(row)
+
+                # Successes recorded before the load finished stay on top of the loaded counts
+                for domain, pending in self._pending.items():
+                    record = history.setdefault(domain, {'domain': domain, 'success_count': 0})
+                    record['successful_tier'] = pending['successful_tier']
+                    record['success_count'] = (record.get('success_count') or 0) + pending['increment']
+                    record['last_success_at'] = pending['last_success_at']
+
+                self._history = history
+                logger.info(f"📊 Loaded tier history for {len(history)} domains")
+            except Exception as e:
+                logger.warning(f"Error loading tier history: {str(e)}")
+
+            # Even on error, don't query again for every page - fall back to tier 1
+            self._loaded = True
+            return len(self._history)
+
+    async def get_optimal_tier(self, domain: str) -> int:
+        """
+        Get the optimal starting tier for a domain.
+
+        Args:
+            domain: Domain to check
+
+        Returns:
+            Optimal starting tier (1, 2, or 3)
+        """
+        if not self._loaded:
+            await self.load()
+
+        history = self._history.get(domain)
+        if history:
+            success_count = history.get('success_count') or 0
+            successful_tier = history.get('successful_tier') or 1
+
+            # If tier has been successful 3+ times, start there
+            if success_count >= self.min_successes:
+                logger.info(f"📊 Using learned tier {successful_tier} for {domain} ({success_count} successes)")
+                return successful_tier
+
+        # Default to Tier 1 for new domains
+        return 1
+
+    def record_success(self, domain: str, tier: int):
+        """
+        Record a successful fetch in memory and schedule a write-back.
+
+        Args:
+            domain: Domain that succeeded
+            tier: Tier that worked
+        """
+        now = datetime.utcnow().isoformat()
+
+        record = self._history.setdefault(domain, {'domain': domain, 'success_count': 0})
+        record['successful_tier'] = tier
+        record['success_count'] = (record.get('success_count') or 0) + 1
+        record['last_success_at'] = now
+
+        pending = self._pending.setdefault(domain, {'increment': 0})
+        pending['successful_tier'] = tier
+        pending['increment'] += 1
+        pending['last_success_at'] = now
+
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Start a delayed flush unless one is already pending."""
+        if self._flush_task and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+        except RuntimeError:
+            # No running loop - the next flush() call will write the buffer
+            pass
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_interval)
+        # Shielded so close() cannot cancel a write halfway through
+        await asyncio.shield(self.flush())
+
+    async def flush(self) -> int:
+        """
+        Write buffered successes back to the database.
+
+        Returns:
+            Number of domains written
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+            rows = [
+                {
+                    'domain': domain,
+                    'successful_tier': item['successful_tier'],
+                    'increment': item['increment'],
+                    'last_success_at': item['last_success_at']
+                }
+                for domain, item in pending.items()
+            ]
+
+            try:
+                await self.db_service.rest.rpc('increment_scrapfly_tier_history', {'p_rows': rows}).execute()
+                logger.debug(f"📊 Flushed tier history for {len(rows)} domains")
+                return len(rows)
+            except Exception as e:
+                logger.warning(f"Tier history increment RPC failed, falling back to upsert: {str(e)}")
+
+            try:
+                # Without the RPC, write our in-memory totals (not atomic across processes)
+                upsert_rows = [
+                    {
+                        'domain': row['domain'],
+                        'successful_tier': row['successful_tier'],
+                        'success_count': self._history.get(row['domain'], {}).get('success_count', row['increment']),
+                        'last_success_at': row['last_success_at']
+                    }
+                    for row in rows
+                ]
+                await self.db_service.rest.table(TIER_HISTORY_TABLE) \
+                    .upsert(upsert_rows, on_conflict='domain') \
+                    .execute()
+                return len(rows)
+            except Exception as e:
+                logger.warning(f"Error flushing tier history: {str(e)}")
+                # Put the increments back so the next flush retries them
+                for domain, item in pending.items():
+                    current = self._pending.get(domain)
+                    if current:
+                        current['increment'] += item['increment']
+                    else:
+                        self._pending[domain] = item
+                return 0
+
+    async def close(self):
+        """Cancel any delayed flush and write the buffer now."""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        await self.flush()
+
+
+# Global tier history cache instance
+_tier_history_cache: Optional[TierHistoryCache] = None
+
+
+def get_tier_history_cache(db_service) -> TierHistoryCache:
+    """Get or create the global tier history cache instance."""
+    global _tier_history_cache
+
+    if _tier_history_cache is None:
+        _tier_history_cache = TierHistoryCache(db_service)
+
+    return _tier_history_cache
@@ -0,0 +1,90 @@
+"""
+Tests for the batch progress event bus
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.batch_events import BatchEventBus
+
+
+def counters(completed, total=3):
+    return {'total': total, 'completed': completed, 'successful': completed, 'failed': 0}
+
+
+class TestBatchEventBus:
+    """Test cases for publishing and streaming batch progress"""
+
+    def test_late_subscriber_gets_snapshot_then_live_events(self):
+        """A subscriber joining mid-batch first sees the current state, then follows along"""
+        bus = BatchEventBus()
+
+        async def run():
+            bus.publish('b1', 'batch_started', counters=counters(0), concurrency=4, credits_spent=0)
+            bus.publish('b1', 'machine_completed', machine={'machine_id': 'm1', 'success': True},
+                        counters=counters(1), concurrency=5, credits_spent=3)
+
+            received = []
+
+            async def follow():
+                async for event in bus.subscribe('b1', heartbeat=None):
+                    received.append(event)
+
+            follower = asyncio.create_task(follow())
+            await asyncio.sleep(0)
+            bus.publish('b1', 'machine_completed', machine={'machine_id': 'm2', 'success': True},
+                        counters=counters(2), concurrency=5, credits_spent=6)
+            bus.publish('b1', 'batch_completed', counters=counters(2))
+            await asyncio.wait_for(follower, 1)
+            return received
+
+        received = asyncio.run(run())
+
+        assert [event['type'] for event in received] == ['snapshot', 'machine_completed', 'batch_completed']
+        snapshot = received[0]
+        assert snapshot['counters']['completed'] == 1
+        assert snapshot['concurrency'] == 5 and snapshot['credits_spent'] == 3
+        assert [machine['machine_id'] for machine in snapshot['recent']] == ['m1']
+        assert received[1]['machine']['machine_id'] == 'm2'
+        assert not bus.is_active('b1')
+
+    def test_finished_batch_returns_final_snapshot(self):
+        """Subscribing after completion yields the final state and ends the stream"""
+        bus = BatchEventBus(retained_batches=1)
+        bus.publish('b1', 'batch_started', counters=counters(0))
+        bus.publish('b1', 'batch_completed', counters=counters(3))
+
+        async def collect(batch_id):
+            return [event async for event in bus.subscribe(batch_id, heartbeat=None)]
+
+        events = asyncio.run(collect('b1'))
+        assert len(events) == 1
+        assert events[0]['status'] == 'completed' and events[0]['counters']['completed'] == 3
+
+        # Older finished batches age out of the retention window
+        bus.publish('b2', 'batch_started', counters=counters(0))
+        bus.publish('b2', 'batch_completed', counters=counters(3))
+        assert not bus.has_batch('b1') and bus.has_batch('b2')
+
+    def test_slow_subscriber_drops_oldest_events(self):
+        """A full subscriber queue keeps the newest events so counters stay current"""
+        bus = BatchEventBus(queue_size=2)
+
+        async def run():
+            bus.publish('b1', 'batch_started', counters=counters(0, total=10))
+            stream = bus.subscribe('b1', heartbeat=None)
+            snapshot = await stream.__anext__()
+            for completed in range(1, 6):
+                bus.publish('b1', 'machine_completed', machine={'machine_id': f'm{completed}'}, counters=counters(completed, total=10))
+            newest = [await stream.__anext__(), await stream.__anext__()]
+            await stream.aclose()
+            return snapshot, newest
+
+        snapshot, newest = asyncio.run(run())
+
+        assert snapshot['type'] == 'snapshot'
+        assert [event['counters']['completed'] for event in newest] == [4, 5]
+        assert bus._subscribers == {}
@@ -0,0 +1,139 @@
+"""
+Tests for the per-batch single-flight page cache
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.batch_page_cache import BatchPageCache, normalize_url
+
+
+class FakeScraper:
+    """Scraper stand-in that counts fetches"""
+
+    def __init__(self, delays=None, costs=None):
+        self.calls = []
+        self.delays = delays or {}
+        self.costs = costs or {}
+        self.last_operation = {'tier': 1, 'credits': 1, 'success': False}
+
+    async def fetch_page(self, url, parse=True, **options):
+        self.calls.append(url)
+        await asyncio.sleep(self.delays.get(url, 0.01))
+        operation = {'tier': 2, 'credits': self.costs.get(url, 5), 'success': True}
+        self.last_operation = operation
+        await asyncio.sleep(0.02)  # Other fetches finish while this one records its result
+        return f"<html>{url}</html>", object(), operation
+
+
+class TestNormalizeUrl:
+    """Test cases for URL normalization"""
+
+    def test_equivalent_urls_share_key(self):
+        """Host case, www, trailing slash, fragments and tracking params are ignored"""
+        base = normalize_url("https://commarker.com/product/b6")
+        assert normalize_url("https://WWW.ComMarker.com/product/b6/") == base
+        assert normalize_url("https://commarker.com/product/b6#reviews") == base
+        assert normalize_url("https://commarker.com/product/b6?utm_source=x&gclid=1") == base
+
+    def test_variant_query_is_kept(self):
+        """Variant parameters select different prices and must stay in the key"""
+        assert normalize_url("https://xtool.com/products/s1?variant=1") != normalize_url("https://xtool.com/products/s1?variant=2")
+        assert normalize_url("https://xtool.com/products/s1?b=2&variant=1") == normalize_url("https://xtool.com/products/s1?variant=1&b=2")
+
+
+class TestBatchPageCache:
+    """Test cases for single-flight fetching"""
+
+    def test_concurrent_requests_fetch_once(self):
+        """Machines sharing a URL trigger exactly one fetch"""
+        scraper = FakeScraper()
+        machines = [
+            {'id': '1', 'product_link': 'https://xtool.com/products/f1'},
+            {'id': '2', 'product_link': 'https://www.xtool.com/products/f1/'},
+            {'id': '3', 'product_link': 'https://xtool.com/products/p2'},
+        ]
+        cache = BatchPageCache(scraper, machines)
+
+        async def run():
+            return await asyncio.gather(*[cache.get_page_content(m['product_link']) for m in machines])
+
+        results = asyncio.run(run())
+
+        assert len(scraper.calls) == 2
+        assert cache.stats == {'fetches': 2, 'hits': 1}
+        assert results[0][0] == results[1][0]
+        assert [r[2] for r in results].count(True) == 1
+        assert cache.get_operation(machines[1]['product_link'])['credits'] == 5
+
+    def test_credits_are_attributed_per_fetch(self):
+        """A fetch finishing in between does not lend its credits to another URL"""
+        slow, fast = 'https://xtool.com/products/p2', 'https://commarker.com/product/b6'
+        scraper = FakeScraper(delays={slow: 0.02, fast: 0.03}, costs={slow: 25, fast: 1})
+        cache = BatchPageCache(scraper, [{'product_link': slow}, {'product_link': fast}])
+
+        async def run():
+            await asyncio.gather(cache.get_page_content(slow), cache.get_page_content(fast))
+
+        asyncio.run(run())
+
+        assert cache.get_operation(slow)['credits'] == 25
+        assert cache.get_operation(fast)['credits'] == 1
+        assert cache.credits_spent == 26
+
+    def test_release_evicts_after_last_machine(self):
+        """The page is dropped once every machine using it is done"""
+        scraper = FakeScraper()
+        machines = [
+            {'id': '1', 'product_link': 'https://commarker.com/product/b6'},
+            {'id': '2', 'product_link': 'https://commarker.com/product/b6'},
+        ]
+        cache = BatchPageCache(scraper, machines)
+
+        async def run():
+            await cache.get_page_content(machines[0]['product_link'])
+            cache.release(machines[0]['product_link'])
+            await cache.get_page_content(machines[1]['product_link'])
+            cache.release(machines[1]['product_link'])
+
+        asyncio.run(run())
+
+        assert len(scraper.calls) == 1
+        assert cache.get_operation(machines[0]['product_link']) is None
+
+    def test_related_endpoint_is_released_with_its_machines(self):
+        """Product JSON fetched for variant links is shared, then dropped after its last machine"""
+        scraper = FakeScraper()
+        machines = [
+            {'id': '1', 'product_link': 'https://xtool.com/products/f1?variant=1'},
+            {'id': '2', 'product_link': 'https://xtool.com/products/f1?variant=2'},
+        ]
+        endpoint = 'https://xtool.com/products/f1.json'
+        cache = BatchPageCache(scraper, machines, related_url=lambda url: endpoint if '/products/' in url else None)
+
+        async def run():
+            await cache.get_page_content(endpoint, tier_key='xtool.com/products.json')
+            cache.release(machines[0]['product_link'])
+            await cache.get_page_content(endpoint, tier_key='xtool.com/products.json')
+            held = cache.get_operation(endpoint) is not None
+            cache.release(machines[1]['product_link'])
+            return held
+
+        assert asyncio.run(run()) is True
+        assert scraper.calls == [endpoint]
+        assert cache.get_operation(endpoint) is None
+        assert not cache._fetches and not cache._pending
+
+    def test_group_machines_by_url(self):
+        """Duplicates are pulled next to the first machine using the URL"""
+        machines = [
+            {'id': 'a', 'product_link': 'https://x.com/1'},
+            {'id': 'b', 'product_link': 'https://x.com/2'},
+            {'id': 'c', 'product_link': 'https://x.com/1/'},
+            {'id': 'd', 'product_link': None},
+        ]
+        ordered = [m['id'] for m in BatchPageCache.group_machines_by_url(machines)]
+        assert ordered == ['a', 'c', 'b', 'd']
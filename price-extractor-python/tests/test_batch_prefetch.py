@@ -0,0 +1,65 @@
+"""
+Tests for batch prefetch snapshots
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.batch_prefetch import prefetch_batch_state, BATCH_MACHINE_COLUMNS
+
+
+class FakeDatabaseService:
+    """Records the set-based queries made by the prefetch"""
+
+    def __init__(self, machines, corrections=None, fail=False):
+        self.machines = machines
+        self.corrections = corrections or {}
+        self.fail = fail
+        self.calls = []
+
+    async def get_machines_by_ids(self, machine_ids, columns="*"):
+        self.calls.append(('machines', list(machine_ids), columns))
+        if self.fail:
+            raise RuntimeError("column machines.learned_selectors does not exist")
+        return [m for m in self.machines if m['id'] in machine_ids]
+
+    async def get_recent_manual_corrections(self, machine_ids, days=7):
+        self.calls.append(('corrections', list(machine_ids), days))
+        return self.corrections
+
+
+class TestBatchPrefetch:
+    """Test cases for loading batch state up front"""
+
+    def test_one_query_per_kind_and_immutable_snapshots(self):
+        """All machines and corrections are loaded together and handed out read-only"""
+        db = FakeDatabaseService(
+            [{'id': 'm1', 'Machine Name': 'Laser A', 'Price': 999.0}, {'id': 'm2', 'Machine Name': 'Laser B', 'Price': 450.0}],
+            {'m2': [{'machine_id': 'm2', 'price': 430.0, 'date': '2026-10-14T00:00:00Z', 'status': 'MANUAL_CORRECTION'}]}
+        )
+
+        snapshots = asyncio.run(prefetch_batch_state(db, ['m1', 'm2', 'm3']))
+
+        assert [call[0] for call in db.calls] == ['machines', 'corrections']
+        assert db.calls[0][2] == BATCH_MACHINE_COLUMNS
+        assert set(snapshots) == {'m1', 'm2'}
+        assert snapshots['m1'].recent_corrections == ()
+        assert snapshots['m2'].recent_corrections[0]['price'] == 430.0
+
+        with pytest.raises(TypeError):
+            snapshots['m1'].machine['Price'] = 1.0
+        # Workers copy the record before adding extraction fields
+        machine = dict(snapshots['m1'].machine)
+        machine['old_price'] = 999.0
+        assert 'old_price' not in snapshots['m1'].machine
+
+    def test_failed_prefetch_falls_back_to_per_machine_lookups(self):
+        """A failing query yields no snapshots instead of failing the batch"""
+        db = FakeDatabaseService([], fail=True)
+        assert asyncio.run(prefetch_batch_state(db, ['m1'])) == {}
+        assert asyncio.run(prefetch_batch_state(db, [])) == {}
@@ -0,0 +1,133 @@
+"""
+Tests for resuming interrupted batches
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.batch_events import get_batch_event_bus
+from services.price_service import PriceService
+
+
+class FakeDatabaseService:
+    """Batch record, recorded results and machine lookups for a resume"""
+
+    def __init__(self, batch, recorded, checkpoint_error=None):
+        self.batch = batch
+        self.recorded = recorded
+        self.checkpoint_error = checkpoint_error
+        self.statuses = []
+        self.requested_ids = None
+
+    async def get_batch(self, batch_id):
+        return self.batch
+
+    async def get_batch_checkpoints(self, batch_id):
+        if self.checkpoint_error:
+            raise self.checkpoint_error
+        return {entry['machine_id']: entry for entry in self.recorded}
+
+    async def get_machines_by_ids(self, machine_ids, **kwargs):
+        self.requested_ids = list(machine_ids)
+        # Database order, not plan order
+        return [{'id': machine_id} for machine_id in reversed(machine_ids)]
+
+    async def update_batch_status(self, batch_id, status):
+        self.statuses.append(status)
+        return True
+
+
+def make_service(db):
+    service = PriceService.__new__(PriceService)
+    service.db_service = db
+    service.variant_verifier = None
+    service._resuming_batches = set()
+    runs = []
+
+    async def run_batch(batch_id, machines, results, max_workers, use_scrapfly, variant_verifier, resumed_runs=0):
+        runs.append((machines, results, max_workers, variant_verifier, resumed_runs))
+        return {"success": True, "batch_id": batch_id, "results": results}
+
+    service._run_batch = run_batch
+    return service, runs
+
+
+class TestBatchResume:
+    """Test cases for picking up a batch from its recorded results"""
+
+    def test_resume_processes_only_unrecorded_machines(self):
+        """Recorded machines are skipped and their outcomes restored into the counters"""
+        db = FakeDatabaseService(
+            {'id': 'b1', 'status': 'started', 'metadata': {'planned_machine_ids': ['m1', 'm2', 'm3', 'm4'], 'max_workers': 6}},
+            [
+                {'machine_id': 'm1', 'machine_name': 'Laser A', 'success': True, 'old_price': 100.0, 'new_price': 100.0},
+                {'machine_id': 'm2', 'machine_name': 'Laser B', 'success': True, 'old_price': 100.0, 'new_price': 90.0},
+                {'machine_id': 'm3', 'machine_name': 'Laser C', 'success': False, 'error': 'Failed to extract price'}
+            ]
+        )
+        service, runs = make_service(db)
+
+        asyncio.run(service.resume_batch('b1'))
+
+        machines, results, max_workers, _, resumed_runs = runs[0]
+        assert db.requested_ids == ['m4'] and [m['id'] for m in machines] == ['m4']
+        assert results['total'] == 4
+        assert (results['successful'], results['unchanged'], results['updated'], results['failed']) == (2, 1, 1, 1)
+        assert results['failures'] == [{'machine_id': 'm3', 'error': 'Failed to extract price'}]
+        assert max_workers == 6 and resumed_runs == 1
+        assert db.statuses == ['in_progress']
+
+    def test_variant_state_rebuilt_from_recorded_prices(self):
+        """Variant prices recorded before the interruption still count toward the batch's checks"""
+        service, _ = make_service(None)
+        recorded = [
+            {'machine_id': 'm1', 'machine_name': 'ComMarker B6 MOPA 30W', 'success': True, 'old_price': 3000.0, 'new_price': 3500.0},
+            {'machine_id': 'm2', 'machine_name': 'ComMarker B6 MOPA 60W', 'success': True, 'old_price': 4000.0, 'new_price': 3500.0}
+        ]
+
+        _, variant_verifier = service._rebuild_batch_state('b1', 2, recorded)
+
+        assert {entry['machine_id'] for entry in variant_verifier.variant_prices['ComMarker B6 MOPA'].values()} == {'m1', 'm2'}
+
+    def test_batches_without_machine_list_are_not_resumed(self):
+        """Batches started before machine lists were recorded report an error"""
+        service, runs = make_service(FakeDatabaseService({'id': 'b1', 'status': 'started', 'metadata': {}}, []))
+
+        result = asyncio.run(service.resume_batch('b1'))
+
+        assert result['success'] is False
+        assert runs == []
+
+    def test_checkpoint_errors_abort_the_resume(self):
+        """A failed checkpoint query must not turn into re-scraping every planned machine"""
+        db = FakeDatabaseService(
+            {'id': 'b1', 'status': 'started', 'metadata': {'planned_machine_ids': ['m1', 'm2']}},
+            [], checkpoint_error=RuntimeError('connection reset')
+        )
+        service, runs = make_service(db)
+
+        result = asyncio.run(service.resume_batch('b1'))
+
+        assert result['success'] is False and 'connection reset' in result['error']
+        assert runs == [] and db.statuses == []
+
+    def test_running_batch_is_not_resumed(self):
+        """A batch still running in this process is refused; machines keep their plan order"""
+        db = FakeDatabaseService(
+            {'id': 'b-live', 'status': 'in_progress', 'metadata': {'planned_machine_ids': ['m1', 'm2', 'm3']}}, []
+        )
+        service, runs = make_service(db)
+        event_bus = get_batch_event_bus()
+        event_bus.publish('b-live', 'batch_started', counters={})
+        try:
+            refused = asyncio.run(service.resume_batch('b-live'))
+        finally:
+            event_bus.publish('b-live', 'batch_completed', counters={})
+
+        assert refused['success'] is False and runs == []
+
+        asyncio.run(service.resume_batch('b-live'))
+        assert [m['id'] for m in runs[0][0]] == ['m1', 'm2', 'm3']
@@ -0,0 +1,86 @@
+"""
+Tests for the domain-fair batch scheduler
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.batch_scheduler import DomainFairScheduler, get_machine_domain
+
+
+def make_machines(domain, count):
+    return [{'id': f"{domain}-{i}", 'product_link': f"https://www.{domain}/products/{i}"} for i in range(count)]
+
+
+class TestDomainFairScheduler:
+    """Test cases for per-domain fairness and limits"""
+
+    def test_domains_are_interleaved(self):
+        """A long run on one domain does not delay other domains"""
+        machines = make_machines('xtool.com', 6) + make_machines('commarker.com', 2)
+        scheduler = DomainFairScheduler(machines, 1, policy_func=lambda d: {'max_concurrent': 1, 'min_interval': 0})
+        order = []
+
+        async def handler(machine):
+            order.append(get_machine_domain(machine))
+            await asyncio.sleep(0)
+
+        asyncio.run(scheduler.run(handler))
+
+        assert order[:4] == ['xtool.com', 'commarker.com', 'xtool.com', 'commarker.com']
+        assert len(order) == 8
+
+    def test_per_domain_cap_is_enforced(self):
+        """No domain exceeds its max_concurrent even with spare workers"""
+        machines = make_machines('thunderlaserusa.com', 4) + make_machines('xtool.com', 4)
+        policies = {
+            'thunderlaserusa.com': {'max_concurrent': 1, 'min_interval': 0},
+            'xtool.com': {'max_concurrent': 2, 'min_interval': 0},
+        }
+        scheduler = DomainFairScheduler(machines, 5, policy_func=policies.get)
+        active = {'thunderlaserusa.com': 0, 'xtool.com': 0}
+        peak = dict(active)
+
+        async def handler(machine):
+            domain = get_machine_domain(machine)
+            active[domain] += 1
+            peak[domain] = max(peak[domain], active[domain])
+            await asyncio.sleep(0.01)
+            active[domain] -= 1
+
+        asyncio.run(scheduler.run(handler))
+
+        assert peak == {'thunderlaserusa.com': 1, 'xtool.com': 2}
+
+    def test_min_interval_spaces_request_starts(self):
+        """Requests to one domain start at least min_interval apart"""
+        machines = make_machines('commarker.com', 3)
+        scheduler = DomainFairScheduler(machines, 3, policy_func=lambda d: {'max_concurrent': 3, 'min_interval': 0.05})
+        starts = []
+
+        async def handler(machine):
+            starts.append(asyncio.get_running_loop().time())
+
+        asyncio.run(scheduler.run(handler))
+
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        assert len(starts) == 3
+        assert all(gap >= 0.04 for gap in gaps)
+
+    def test_handler_errors_do_not_stop_workers(self):
+        """A failing item releases its slot and the rest still run"""
+        machines = make_machines('xtool.com', 3)
+        scheduler = DomainFairScheduler(machines, 1)
+        seen = []
+
+        async def handler(machine):
+            seen.append(machine['id'])
+            if machine['id'] == 'xtool.com-0':
+                raise RuntimeError("boom")
+
+        asyncio.run(scheduler.run(handler))
+
+        assert seen == ['xtool.com-0', 'xtool.com-1', 'xtool.com-2']
@@ -0,0 +1,107 @@
+"""
+Tests for the buffered bulk writer used by batches
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.batch_write_buffer import BatchWriteBuffer
+
+
+class FakeDatabaseService:
+    """insert_rows stand-in that ignores duplicate ids like the real upsert"""
+
+    def __init__(self, fail_times=0, lose_responses=0):
+        self.tables = {}
+        self.requests = []
+        self.fail_times = fail_times
+        self.lose_responses = lose_responses
+
+    async def insert_rows(self, table, rows):
+        self.requests.append((table, len(rows)))
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("connection reset")
+
+        stored = self.tables.setdefault(table, {})
+        for row in rows:
+            stored.setdefault(row['id'], row)
+
+        if self.lose_responses:
+            # The write committed but the client never saw the response
+            self.lose_responses -= 1
+            raise TimeoutError("read timeout")
+
+
+class TestBatchWriteBuffer:
+    """Test cases for size/time flushing and idempotent retries"""
+
+    def test_size_triggered_multi_row_inserts(self):
+        """Rows are written in chunks of max_rows, not one request per row"""
+        db = FakeDatabaseService()
+
+        async def run():
+            buffer = BatchWriteBuffer(db, 'b1', max_rows=10, flush_interval=60)
+            for i in range(25):
+                await buffer.add('price_history', {'machine_id': f'm{i}'})
+                await buffer.add('batch_results', {'machine_id': f'm{i}'})
+            assert await buffer.close() is True
+            return buffer
+
+        buffer = asyncio.run(run())
+
+        assert len(db.tables['price_history']) == 25
+        assert len(db.tables['batch_results']) == 25
+        assert len(db.requests) == 6
+        assert buffer.stats['written'] == 50
+
+    def test_time_triggered_flush(self):
+        """A partial buffer is written once flush_interval passes"""
+        db = FakeDatabaseService()
+
+        async def run():
+            buffer = BatchWriteBuffer(db, 'b1', max_rows=100, flush_interval=0.05)
+            await buffer.add('batch_results', {'machine_id': 'm1'})
+            await asyncio.sleep(0.2)
+            written_before_close = len(db.tables.get('batch_results', {}))
+            await buffer.close()
+            return written_before_close
+
+        assert asyncio.run(run()) == 1
+        assert db.requests == [('batch_results', 1)]
+
+    def test_retry_after_lost_response_does_not_double_write(self):
+        """A retried chunk reuses its ids, so rows that already landed are not duplicated"""
+        db = FakeDatabaseService(lose_responses=1)
+
+        async def run():
+            buffer = BatchWriteBuffer(db, 'b1', max_rows=5, flush_interval=60, retry_delay=0)
+            for i in range(5):
+                await buffer.add('price_history', {'machine_id': f'm{i}'})
+            return await buffer.close(), buffer
+
+        closed, buffer = asyncio.run(run())
+
+        assert closed is True
+        assert len(db.tables['price_history']) == 5
+        assert buffer.stats['retries'] == 1
+
+    def test_failed_rows_stay_buffered_until_next_flush(self):
+        """Rows that exhaust their retries are kept and written by a later flush"""
+        db = FakeDatabaseService(fail_times=2)
+
+        async def run():
+            buffer = BatchWriteBuffer(db, 'b1', max_rows=50, flush_interval=60, max_retries=2, retry_delay=0)
+            await buffer.add('batch_results', {'machine_id': 'm1'})
+            first = await buffer.flush()
+            pending = buffer.pending_count
+            closed = await buffer.close()
+            return first, pending, closed
+
+        first, pending, closed = asyncio.run(run())
+
+        assert (first, pending, closed) == (0, 1, True)
+        assert len(db.tables['batch_results']) == 1
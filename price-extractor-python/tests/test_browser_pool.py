@@ -0,0 +1,196 @@
+"""
+Tests for context-level browser pooling and page recycling
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.browser_pool import BrowserPool
+
+
+class FakePage:
+    """Page that answers the pool's health, heap and reset calls"""
+
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+        self.heap_bytes = 10 * 1024 * 1024
+        self.responsive = True
+        self.url = "about:blank"
+
+    def is_closed(self):
+        return self.closed
+
+    async def evaluate(self, script):
+        if not self.responsive:
+            raise RuntimeError("Target crashed")
+        if "usedJSHeapSize" in script:
+            return self.heap_bytes
+        if "localStorage" in script:
+            self.context.storage_cleared += 1
+            return None
+        return 1
+
+    async def goto(self, url):
+        self.url = url
+
+
+class FakeContext:
+    """Browser context holding one page"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+        self.cookies_cleared = 0
+        self.storage_cleared = 0
+        self.page = None
+
+    async def new_page(self):
+        self.page = FakePage(self)
+        return self.page
+
+    async def clear_cookies(self):
+        self.cookies_cleared += 1
+
+    async def close(self):
+        self.closed = True
+        self.page.closed = True
+
+
+class FakeBrowser:
+    """Browser that records the contexts opened on it"""
+
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeBrowserType:
+    def __init__(self):
+        self.launched = []
+
+    async def launch(self, **options):
+        browser = FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeBrowserType()
+        self.firefox = FakeBrowserType()
+
+    async def stop(self):
+        pass
+
+
+def make_pool(**options):
+    pool = BrowserPool(**options)
+    pool.playwright = FakePlaywright()
+    return pool
+
+
+class TestBrowserPool:
+    """Test cases for page leases on shared browsers"""
+
+    def test_prewarmed_pages_are_reused_and_wiped(self):
+        """Leases share one browser, reuse prewarmed pages and reset state between leases"""
+        pool = make_pool(pool_size=3, browser_count=1, prewarm=2, max_uses=10)
+
+        async def run():
+            await pool.initialize()
+            async with pool.lease_page() as first:
+                pass
+            async with pool.lease_page() as second:
+                pass
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert len(pool.playwright.chromium.launched) == 1
+        assert first is second and first.uses == 2
+        assert first.context.cookies_cleared == 2 and first.context.storage_cleared == 2
+        assert pool.stats['pages_created'] == 2 and pool.stats['leases'] == 2
+
+    def test_pages_recycled_after_max_uses_heap_or_error(self):
+        """Contexts are closed and replaced after N uses, a heavy JS heap, or a failed lease"""
+        pool = make_pool(pool_size=1, browser_count=1, prewarm=1, max_uses=2, max_heap_mb=100)
+
+        async def run():
+            await pool.initialize()
+            async with pool.lease_page() as a:
+                pass
+            async with pool.lease_page() as b:
+                pass
+            async with pool.lease_page() as c:
+                c.page.heap_bytes = 200 * 1024 * 1024
+            with pytest.raises(ValueError):
+                async with pool.lease_page() as d:
+                    raise ValueError("extraction failed")
+            return a, b, c, d
+
+        a, b, c, d = asyncio.run(run())
+
+        assert a is b and a.context.closed
+        assert c is not a and c.context.closed
+        assert d is not c and d.context.closed
+        assert pool.stats['pages_recycled'] == 3
+        assert pool.get_metrics()['idle_pages'] == 0
+
+    def test_unhealthy_pages_and_dead_browsers_are_replaced(self):
+        """A crashed page fails its health check and a disconnected browser is relaunched"""
+        pool = make_pool(pool_size=2, browser_count=1, prewarm=1)
+
+        async def run():
+            await pool.initialize()
+            pool._idle[0].page.responsive = False
+            async with pool.lease_page() as replaced:
+                pass
+            pool.browsers[0].connected = False
+            async with pool.lease_page() as relaunched:
+                pass
+            return replaced, relaunched
+
+        replaced, relaunched = asyncio.run(run())
+
+        assert pool.stats['health_failures'] == 2
+        assert pool.stats['browser_restarts'] == 1
+        assert replaced.page.responsive and relaunched.browser is pool.browsers[0]
+        assert len(pool.playwright.chromium.launched) == 2
+
+    def test_concurrent_leases_are_capped(self):
+        """No more than pool_size pages are leased at once"""
+        pool = make_pool(pool_size=2, browser_count=2, prewarm=0)
+        peak = 0
+
+        async def worker():
+            nonlocal peak
+            async with pool.lease_page():
+                peak = max(peak, pool.get_metrics()['active_leases'])
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(worker() for _ in range(6)))
+            await pool.cleanup()
+
+        asyncio.run(run())
+
+        assert peak == 2
+        assert pool.stats['leases'] == 6 and pool.stats['pages_created'] == 2
+        assert not pool.is_initialized
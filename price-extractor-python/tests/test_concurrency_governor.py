@@ -0,0 +1,102 @@
+"""
+Tests for the AIMD concurrency governor
+"""
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.concurrency_governor import ConcurrencyGovernor
+
+
+def make_governor(**kwargs):
+    options = dict(min_limit=1, max_limit=8, initial_limit=2, latency_window=5, cooldown_seconds=0)
+    options.update(kwargs)
+    return ConcurrencyGovernor(**options)
+
+
+class TestConcurrencyGovernor:
+    """Test cases for additive increase / multiplicative decrease"""
+
+    def test_increases_after_a_round_of_successes(self):
+        """One success per slot raises the limit by one"""
+        governor = make_governor()
+        governor.record_success(1.0)
+        assert governor.limit == 2
+        governor.record_success(1.0)
+        assert governor.limit == 3
+
+    def test_never_exceeds_max_limit(self):
+        """Growth stops at max_limit"""
+        governor = make_governor(max_limit=3)
+        for _ in range(50):
+            governor.record_success(1.0)
+        assert governor.limit == 3
+
+    def test_throttle_halves_limit_and_notifies_listeners(self):
+        """A 429 cuts the limit multiplicatively and listeners see the change"""
+        governor = make_governor(initial_limit=8)
+        seen = []
+        governor.add_listener(seen.append)
+
+        governor.record_throttle()
+
+        assert governor.limit == 4
+        assert seen == [8, 4]
+        assert governor.get_metrics()['history'][-1]['reason'].startswith("upstream throttling")
+
+    def test_removed_listener_is_not_notified(self):
+        """remove_listener drops the callback; removing it twice is harmless"""
+        governor = make_governor(initial_limit=8)
+        seen = []
+        governor.add_listener(seen.append)
+        governor.remove_listener(seen.append)
+        governor.remove_listener(seen.append)
+
+        governor.record_throttle()
+
+        assert seen == [8]
+
+    def test_cooldown_collapses_bursts(self):
+        """Back-to-back throttles within the cooldown only decrease once"""
+        governor = make_governor(initial_limit=8, cooldown_seconds=60)
+        governor.record_throttle()
+        governor.record_throttle()
+        assert governor.limit == 4
+        assert governor.stats['throttles'] == 2
+
+    def test_failures_back_off_only_past_threshold(self):
+        """Occasional failures are tolerated; a failure burst decreases the limit"""
+        governor = make_governor(initial_limit=6, failure_threshold=5)
+        governor.record_failure(recent_failures=2)
+        assert governor.limit == 6
+        governor.record_failure(recent_failures=5)
+        assert governor.limit == 3
+
+    def test_rising_p95_latency_decreases_limit(self):
+        """Latency well above the best observed p95 counts as congestion"""
+        governor = make_governor(initial_limit=8, max_limit=8, latency_factor=2.0, latency_window=20)
+        for _ in range(20):
+            governor.record_success(1.0)
+        assert governor.limit == 8
+
+        # A single slow page stays below p95
+        governor.record_success(5.0)
+        assert governor.limit == 8
+
+        governor.record_success(5.0)
+        assert governor.limit == 4
+
+        # Still slow after backing off: no increase until latency recovers
+        for _ in range(8):
+            governor.record_success(5.0)
+        assert governor.limit == 4
+        assert governor.get_metrics()['baseline_p95_latency'] == 1.0
+
+    def test_never_drops_below_min_limit(self):
+        """Decreases stop at min_limit"""
+        governor = make_governor(initial_limit=2, min_limit=1)
+        for _ in range(5):
+            governor.record_throttle()
+        assert governor.limit == 1
@@ -0,0 +1,500 @@
+"""
+Tests for the async PostgREST data layer in DatabaseService
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.database as database
+from services.database import DatabaseService
+
+
+REST_URL = 'http://postgrest.local/rest/v1'
+
+
+class PostgrestStandIn:
+    """Minimal PostgREST: eq filters on GET/PATCH, POST inserts, for in-memory tables, with optional latency"""
+
+    def __init__(self, tables, latency=0.0, missing_tables=(), embeds=None):
+        self.tables = tables
+        self.latency = latency
+        self.missing_tables = set(missing_tables)
+        self.embeds = embeds or {}  # {(parent, child): child foreign key column}
+        self.requests = []
+
+    def _matches(self, row, params):
+        for column, value in params.items():
+            if column in ('select', 'limit', 'offset', 'order'):
+                continue
+            if value.startswith('eq.') and str(row.get(column)).lower() != value[3:].lower():
+                return False
+            if value.startswith('in.') and str(row.get(column)) not in value[4:-1].split(','):
+                return False
+            if value.startswith('gte.') and (row.get(column) is None or str(row.get(column)) < value[4:]):
+                return False
+        return True
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        table = request.url.path.rsplit('/', 1)[-1]
+        if table in self.missing_tables or '/rpc/' in request.url.path:
+            return httpx.Response(404, json={'code': '42P01', 'message': f'relation "{table}" does not exist', 'details': None, 'hint': None})
+
+        if request.method == 'POST':
+            payload = json.loads(request.content)
+            inserted = payload if isinstance(payload, list) else [payload]
+            self.tables.setdefault(table, []).extend(inserted)
+            return httpx.Response(201, json=inserted)
+
+        params = dict(request.url.params)
+        rows = [row for row in self.tables.get(table, []) if self._matches(row, params)]
+        for (parent, child), foreign_key in self.embeds.items():
+            if parent == table and f'{child}(*)' in params.get('select', ''):
+                if child in self.missing_tables:
+                    return httpx.Response(400, json={'code': 'PGRST200', 'message': f'Could not find a relationship between {parent} and {child}', 'details': None, 'hint': None})
+                rows = [dict(row, **{child: [c for c in self.tables.get(child, []) if c[foreign_key] == row['id']]}) for row in rows]
+        if 'order' in params:
+            rows.sort(key=lambda row: str(row.get(params['order'].split('.')[0])))
+        if 'limit' in params:
+            offset = int(params.get('offset', 0))
+            rows = rows[offset:offset + int(params['limit'])]
+
+        if request.method == 'PATCH':
+            changes = json.loads(request.content)
+            for row in rows:
+                row.update(changes)
+
+        if 'vnd.pgrst.object' in request.headers.get('accept', ''):
+            if len(rows) != 1:
+                return httpx.Response(406, json={'code': 'PGRST116', 'message': 'JSON object requested, multiple (or no) rows returned', 'details': '', 'hint': None})
+            return httpx.Response(200, json=rows[0])
+        headers = {'Content-Range': f'0-{max(len(rows) - 1, 0)}/{len(rows)}'} if 'count=exact' in request.headers.get('prefer', '') else {}
+        return httpx.Response(200, json=rows, headers=headers)
+
+
+def make_service(monkeypatch, stand_in):
+    # The sync client is not exercised here; only the async PostgREST path is
+    monkeypatch.setattr(database, 'create_client', lambda url, key: None)
+    return DatabaseService(rest_url=REST_URL, transport=httpx.MockTransport(stand_in))
+
+
+class TestAsyncDatabaseService:
+    """Test cases for non-blocking DB access against a PostgREST stand-in"""
+
+    def test_get_and_update_machine(self, monkeypatch):
+        """Reads and writes go through the async client with the same method surface"""
+        stand_in = PostgrestStandIn({'machines': [{'id': 'm1', 'Machine Name': 'Laser X', 'Price': 999.0}]})
+        db = make_service(monkeypatch, stand_in)
+
+        async def run():
+            machine = await db.get_machine_by_id('m1')
+            updated = await db.update_machine_price('m1', 1099.0)
+            missing = await db.get_machine_by_id('nope')
+            await db.close()
+            return machine, updated, missing
+
+        machine, updated, missing = asyncio.run(run())
+
+        assert machine['Machine Name'] == 'Laser X'
+        assert updated is True
+        assert missing is None
+        assert stand_in.tables['machines'][0]['Price'] == 1099.0
+        assert all(str(request.url).startswith(REST_URL) for request in stand_in.requests)
+
+    def test_price_update_references_snapshot(self, monkeypatch):
+        """The row keeps the snapshot hash and size; the page itself is no longer copied into it"""
+        stand_in = PostgrestStandIn({'machines': [{'id': 'm1', 'Price': 999.0, 'html_content': '<old/>'}]})
+        db = make_service(monkeypatch, stand_in)
+
+        async def run():
+            updated = await db.update_machine_price('m1', 1099.0, html_content='<html>new</html>', snapshot_hash='ab12', machine_known=True)
+            await db.close()
+            return updated
+
+        assert asyncio.run(run()) is True
+        row = stand_in.tables['machines'][0]
+        assert row['html_content'] is None
+        assert row['html_hash'] == 'ab12' and row['html_size'] == 16
+
+    def test_price_update_without_page_clears_snapshot(self, monkeypatch):
+        """A price read from product JSON has no page, so the previous page is not kept under the new timestamp"""
+        stand_in = PostgrestStandIn({'machines': [{'id': 'm1', 'Price': 999.0, 'html_hash': 'ab12', 'html_size': 16, 'html_timestamp': '2026-01-01T00:00:00Z'}]})
+        db = make_service(monkeypatch, stand_in)
+
+        async def run():
+            updated = await db.update_machine_price('m1', 1099.0, machine_known=True, page_fetched=False)
+            await db.close()
+            return updated
+
+        assert asyncio.run(run()) is True
+        row = stand_in.tables['machines'][0]
+        assert row['html_hash'] is None and row['html_size'] is None
+        assert row['html_timestamp'] != '2026-01-01T00:00:00Z'
+
+    def test_unarchived_page_is_kept_in_row(self, monkeypatch, tmp_path):
+        """When the snapshot store cannot save a fetched page, the row stores the page itself"""
+        from services.html_snapshot_store import HtmlSnapshotStore
+
+        store = HtmlSnapshotStore(str(tmp_path))
+        monkeypatch.setattr(store, 'save', lambda html_content, **kwargs: None)
+        stand_in = PostgrestStandIn({'machines': [{'id': 'm1', 'Price': 999.0, 'html_hash': 'ab12', 'html_size': 16}]})
+        db = make_service(monkeypatch, stand_in)
+        page = '<html>new</html>'
+
+        async def run():
+            snapshot_hash = await store.save_async(page, machine_id='m1')
+            updated = await db.update_machine_price('m1', 1099.0, html_content=page, snapshot_hash=snapshot_hash, machine_known=True)
+            await db.close()
+            return snapshot_hash, updated
+
+        assert asyncio.run(run()) == (None, True)
+        row = stand_in.tables['machines'][0]
+        assert row['html_content'] == page and row['html_size'] == 16
+        assert row['html_hash'] is None
+
+    def test_concurrent_calls_overlap(self, monkeypatch):
+        """Concurrent lookups run in parallel instead of serializing on DB latency"""
+        machines = [{'id': f'm{i}', 'Machine Name': f'Laser {i}'} for i in range(10)]
+        db = make_service(monkeypatch, PostgrestStandIn({'machines': machines}, latency=0.1))
+
+        async def run():
+            started = time.perf_counter()
+            results = await asyncio.gather(*(db.get_machine_by_id(f'm{i}') for i in range(10)))
+            elapsed = time.perf_counter() - started
+            await db.close()
+            return results, elapsed
+
+        results, elapsed = asyncio.run(run())
+
+        assert [machine['id'] for machine in results] == [f'm{i}' for i in range(10)]
+        assert elapsed < 0.5
+
+    def test_client_is_recreated_per_event_loop(self, monkeypatch):
+        """A service reused across asyncio.run calls gets a client bound to each loop"""
+        db = make_service(monkeypatch, PostgrestStandIn({'machines': [{'id': 'm1'}]}))
+
+        first = asyncio.run(db.get_machine_by_id('m1'))
+        second = asyncio.run(db.get_machine_by_id('m1'))
+
+        assert first == second == {'id': 'm1'}
+
+    def test_client_of_a_live_loop_is_closed_when_replaced(self, monkeypatch):
+        """Switching loops closes the previous client on its own loop instead of leaking it"""
+        import threading
+
+        db = make_service(monkeypatch, PostgrestStandIn({'machines': [{'id': 'm1'}]}))
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(db.get_machine_by_id('m1'), other_loop).result(timeout=5)
+            stale_session = db._rest.session
+
+            assert asyncio.run(db.get_machine_by_id('m1')) == {'id': 'm1'}
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other_loop).result(timeout=5)
+
+            assert stale_session.is_closed
+            assert db._rest.session is not stale_session
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join(timeout=5)
+            other_loop.close()
+
+    def test_all_time_flags_come_from_price_stats(self, monkeypatch):
+        """Flags are derived from the machine's stats row without reading its price history"""
+        stand_in = PostgrestStandIn({
+            'machine_price_stats': [{'machine_id': 'm1', 'min_price': 900.0, 'max_price': 1200.0}],
+            'price_history': []
+        })
+        db = make_service(monkeypatch, stand_in)
+
+        async def run():
+            added = await db.add_price_history('m1', 950.0, 850.0)
+            first = await db.add_price_history('m2', None, 500.0)
+            await db.close()
+            return added, first
+
+        added, first = asyncio.run(run())
+
+        new_low, first_entry = stand_in.tables['price_history']
+        assert added and first
+        assert new_low['is_all_time_low'] is True and 'is_all_time_high' not in new_low
+        assert first_entry['is_all_time_low'] is True and first_entry['is_all_time_high'] is True
+        assert not any(r.method == 'GET' and r.url.path.endswith('/price_history') for r in stand_in.requests)
+
+    def test_all_time_flags_fall_back_to_history_scan(self, monkeypatch):
+        """Without the stats table the flags are computed from the machine's history"""
+        stand_in = PostgrestStandIn({
+            'price_history': [{'machine_id': 'm1', 'price': 900.0, 'status': 'AUTO_APPLIED'}]
+        }, missing_tables={'machine_price_stats'})
+        db = make_service(monkeypatch, stand_in)
+
+        async def run():
+            added = await db.add_price_history('m1', 900.0, 1000.0)
+            await db.close()
+            return added
+
+        assert asyncio.run(run()) is True
+        assert stand_in.tables['price_history'][-1]['is_all_time_high'] is True
+
+    def test_needing_update_fallback_is_set_based(self, monkeypatch):
+        """Without the RPC, machines are paged and filtered with one check query per page"""
+        machines = [{'id': f'm{i:02d}', 'Machine Name': f'Laser {i}', 'price_tracking_enabled': True} for i in range(12)]
+        machines.append({'id': 'm99', 'Machine Name': 'Untracked', 'price_tracking_enabled': False})
+        stats = [
+            {'machine_id': 'm01', 'last_checked_at': '2099-01-01T00:00:00Z'},
+            {'machine_id': 'm03', 'last_checked_at': '2099-01-01T00:00:00Z'},
+            {'machine_id': 'm05', 'last_checked_at': '2000-01-01T00:00:00Z'}
+        ]
+        stand_in = PostgrestStandIn({'machines': machines, 'machine_price_stats': stats})
+        db = make_service(monkeypatch, stand_in)
+
+        async def run():
+            due = await db.get_machines_needing_update(days_threshold=7)
+            limited = await db.get_machines_needing_update(days_threshold=7, limit=3)
+            pages = [page async for page in db.iter_machine_pages('id', page_size=5, price_tracking_enabled=True)]
+            await db.close()
+            return due, limited, pages
+
+        due, limited, pages = asyncio.run(run())
+
+        assert [m['id'] for m in due] == [f'm{i:02d}' for i in range(12) if i not in (1, 3)]
+        assert [m['id'] for m in limited] == ['m00', 'm02', 'm04']
+        assert [len(page) for page in pages] == [5, 5, 2]
+        assert not any(r.url.path.endswith('/price_history') for r in stand_in.requests)
+
+    def test_needing_update_fallback_without_price_stats(self, monkeypatch):
+        """Without machine_price_stats, a windowed price_history query marks recent checks"""
+        machines = [{'id': f'm{i}', 'price_tracking_enabled': True} for i in range(4)]
+        history = [
+            {'id': 'h1', 'machine_id': 'm0', 'date': '2099-01-01T00:00:00Z'},
+            {'id': 'h2', 'machine_id': 'm0', 'date': '2099-01-02T00:00:00Z'},
+            {'id': 'h3', 'machine_id': 'm2', 'date': '2000-01-01T00:00:00Z'}
+        ]
+        stand_in = PostgrestStandIn({'machines': machines, 'price_history': history}, missing_tables={'machine_price_stats'})
+        db = make_service(monkeypatch, stand_in)
+
+        due = asyncio.run(db.get_machines_needing_update(days_threshold=7))
+
+        assert [m['id'] for m in due] == ['m1', 'm2', 'm3']
+
+    def test_recent_check_lookup_is_chunked(self, monkeypatch):
+        """A page of machine IDs is split so no single in.() filter grows past chunk_size"""
+        from datetime import datetime
+
+        ids = [f'm{i:03d}' for i in range(450)]
+        stats = [{'machine_id': machine_id, 'last_checked_at': '2099-01-01T00:00:00Z'} for machine_id in ids[::100]]
+        stand_in = PostgrestStandIn({'machine_price_stats': stats})
+        db = make_service(monkeypatch, stand_in)
+
+        checked = asyncio.run(db._get_recently_checked_machine_ids(ids, datetime(2026, 1, 1)))
+
+        assert checked == {'m000', 'm100', 'm200', 'm300', 'm400'}
+        in_filters = [dict(r.url.params)['machine_id'] for r in stand_in.requests]
+        assert len(in_filters) == 3
+        assert max(len(value[4:-1].split(',')) for value in in_filters) == 200
+
+    def test_batch_stats_read_from_counter_row(self, monkeypatch):
+        """Progress comes from the batch's stats row without scanning batch_results"""
+        stand_in = PostgrestStandIn({
+            'batches': [{'id': 'b1', 'total_machines': 10}],
+            'batch_stats': [{'batch_id': 'b1', 'successful': 4, 'failed': 1, 'excluded': 0, 'increased': 1,
+                             'decreased': 1, 'unchanged': 2, 'change_pct_sum': 4.0, 'change_pct_count': 4,
+                             'max_increase_pct': 10.0, 'max_decrease_pct': -6.0}]
+        }, embeds={('batches', 'batch_stats'): 'batch_id'})
+        db = make_service(monkeypatch, stand_in)
+
+        stats = asyncio.run(db.get_batch_stats('b1'))
+
+        assert stats['success_counts'] == {'successful': 4, 'failed': 1, 'excluded': 0, 'total': 5, 'percent_complete': 50.0}
+        assert stats['price_stats']['updated'] == 2
+        assert stats['price_stats']['avg_change_pct'] == 1.0
+        assert 'batch_stats' not in stats['batch']
+        assert len(stand_in.requests) == 1
+
+    def test_batch_stats_fall_back_to_scan(self, monkeypatch):
+        """Without the batch_stats table the counts are rebuilt from batch_results"""
+        stand_in = PostgrestStandIn({
+            'batches': [{'id': 'b1', 'total_machines': 2}],
+            'batch_results': [
+                {'batch_id': 'b1', 'success': True, 'old_price': 100.0, 'new_price': 120.0},
+                {'batch_id': 'b1', 'success': True, 'old_price': 100.0, 'new_price': 100.0}
+            ]
+        }, missing_tables={'batch_stats'}, embeds={('batches', 'batch_stats'): 'batch_id'})
+        db = make_service(monkeypatch, stand_in)
+
+        stats = asyncio.run(db.get_batch_stats('b1'))
+
+        assert stats['success_counts']['successful'] == 2
+        assert stats['price_stats']['increased'] == 1
+        assert stats['price_stats']['unchanged'] == 1
+
+    def test_failures_recorded_as_events(self, monkeypatch):
+        """Failed results become indexed failure events; successes and exclusions do not"""
+        stand_in = PostgrestStandIn({'batch_results': [], 'batch_failure_events': []})
+        db = make_service(monkeypatch, stand_in)
+        machine = {'id': 'm1', 'Machine Name': 'Laser A'}
+
+        async def run():
+            await db.add_batch_result('b1', 'm1', {'success': False, 'error': 'Failed to extract price', 'url': 'https://a.example/p',
+                                                   'stage': 'extract', 'tier': 2, 'credits': 5}, machine=machine)
+            await db.add_batch_result('b1', 'm2', {'success': False, 'error': 'Machine excluded from price tracking: B', 'excluded': True}, machine=machine)
+            await db.add_batch_result('b1', 'm3', {'success': True, 'old_price': 1.0, 'new_price': 1.0}, machine=machine)
+            events = await db.get_batch_failure_events('b1')
+            fetch_only = await db.get_batch_failure_events('b1', stages=['fetch'])
+            await db.close()
+            return events, fetch_only
+
+        events, fetch_only = asyncio.run(run())
+
+        assert [(e['machine_id'], e['stage'], e['tier'], e['credits']) for e in events] == [('m1', 'extract', 2, 5)]
+        assert events[0]['url'] == 'https://a.example/p' and events[0]['machine_name'] == 'Laser A'
+        assert fetch_only == []
+        assert len(stand_in.tables['batch_results']) == 3
+
+    def test_open_buffer_only_holds_price_history(self, monkeypatch):
+        """Results and failure events are written at once during a batch; price history waits for the flush"""
+        stand_in = PostgrestStandIn({'batch_results': [], 'batch_failure_events': [], 'price_history': []})
+        db = make_service(monkeypatch, stand_in)
+        machine = {'id': 'm1', 'Machine Name': 'Laser A'}
+
+        async def run():
+            db.open_write_buffer('b1', flush_interval=60)
+            await db.add_price_history('m1', 100.0, 90.0, batch_id='b1')
+            await db.add_batch_result('b1', 'm1', {'success': True, 'old_price': 100.0, 'new_price': 90.0}, machine=machine)
+            await db.add_batch_result('b1', 'm2', {'success': False, 'stage': 'extract', 'error': 'Failed to extract price'}, machine=machine)
+            written = {table: len(stand_in.tables[table]) for table in ('batch_results', 'batch_failure_events', 'price_history')}
+            await db.close_write_buffer('b1')
+            await db.close()
+            return written
+
+        written = asyncio.run(run())
+
+        assert written == {'batch_results': 2, 'batch_failure_events': 1, 'price_history': 0}
+        assert len(stand_in.tables['price_history']) == 1
+
+    def test_failure_events_unavailable(self, monkeypatch):
+        """Without the failure store, lookups return None so callers can fall back to the batch log"""
+        stand_in = PostgrestStandIn({'batch_results': []}, missing_tables={'batch_failure_events'})
+        db = make_service(monkeypatch, stand_in)
+
+        async def run():
+            added = await db.add_batch_result('b1', 'm1', {'success': False, 'stage': 'fetch'}, machine={'id': 'm1'})
+            events = await db.get_batch_failure_events('b1')
+            await db.close()
+            return added, events
+
+        added, events = asyncio.run(run())
+
+        assert added is True
+        assert events is None
+
+    def test_batch_checkpoints_are_paged_and_raise(self, monkeypatch):
+        """Every recorded outcome is read past the page size; a failed query raises instead of looking empty"""
+        import pytest
+
+        results = [{'id': f'r{i:02d}', 'batch_id': 'b1', 'machine_id': f'm{i:02d}', 'success': True} for i in range(7)]
+        results.append({'id': 'r99', 'batch_id': 'b2', 'machine_id': 'm99', 'success': True})
+        stand_in = PostgrestStandIn({'batch_results': results})
+        db = make_service(monkeypatch, stand_in)
+
+        checkpoints = asyncio.run(db.get_batch_checkpoints('b1', page_size=3))
+
+        assert sorted(checkpoints) == [f'm{i:02d}' for i in range(7)]
+        assert len(stand_in.requests) == 3
+
+        broken = make_service(monkeypatch, PostgrestStandIn({}, missing_tables={'batch_results'}))
+        with pytest.raises(Exception):
+            asyncio.run(broken.get_batch_checkpoints('b1'))
+
+    def test_retest_failures_are_extraction_failures(self, monkeypatch):
+        """Retests pick up extraction and database failures, not lookups, missing URLs or fetches"""
+        from services.price_service import PriceService
+
+        events = [
+            {'batch_id': 'b1', 'machine_id': 'm1', 'stage': 'extract', 'created_at': '2026-01-01T00:00:01'},
+            {'batch_id': 'b1', 'machine_id': 'm2', 'stage': 'lookup', 'created_at': '2026-01-01T00:00:02'},
+            {'batch_id': 'b1', 'machine_id': 'm3', 'stage': 'url', 'created_at': '2026-01-01T00:00:03'},
+            {'batch_id': 'b1', 'machine_id': 'm4', 'stage': 'fetch', 'created_at': '2026-01-01T00:00:04'},
+            {'batch_id': 'b1', 'machine_id': 'm5', 'stage': 'database', 'created_at': '2026-01-01T00:00:05'}
+        ]
+        service = PriceService.__new__(PriceService)
+        service.db_service = make_service(monkeypatch, PostgrestStandIn({'batch_failure_events': events}))
+
+        assert asyncio.run(service.get_batch_failures('b1')) == ['m1', 'm5']
+
+    def test_retest_falls_back_to_log_only_for_batches_before_the_store(self, monkeypatch, tmp_path):
+        """Batches created before the failure store are parsed from their log; newer batches without failures are not"""
+        from services.price_service import PriceService
+
+        machine_id = '3f1c2a9e-7b4d-4e21-9c0a-5d6e7f8a9b0c'
+        (tmp_path / 'logs').mkdir()
+        for short_id in ('oldbatch', 'newbatch'):
+            (tmp_path / 'logs' / f'batch_20250101_000000_{short_id}.log').write_text(
+                f"2025-01-01 00:00:01 | ERROR | Failed to extract price for machine {machine_id} from https://example.com/laser\n"
+            )
+        monkeypatch.chdir(tmp_path)
+
+        old_batch = 'oldbatch-0000-0000-0000-000000000000'
+        new_batch = 'newbatch-0000-0000-0000-000000000000'
+        stand_in = PostgrestStandIn({
+            'batches': [
+                {'id': old_batch, 'metadata': json.dumps({'max_workers': 5})},
+                {'id': new_batch, 'metadata': json.dumps({'max_workers': 5, 'failure_events': True})}
+            ],
+            'batch_failure_events': [{'batch_id': new_batch, 'machine_id': 'm9', 'stage': 'fetch', 'created_at': '2026-01-01T00:00:01'}]
+        })
+        service = PriceService.__new__(PriceService)
+        service.db_service = make_service(monkeypatch, stand_in)
+
+        assert asyncio.run(service.get_batch_failures(old_batch)) == [machine_id]
+        # An empty event list means no retest failures; the log is not scanned
+        assert asyncio.run(service.get_batch_failures(new_batch)) == []
+
+    def test_killed_run_resumes_from_written_checkpoints(self, monkeypatch):
+        """A run killed between buffer flushes keeps its result rows, so the resume skips those machines"""
+        from services.price_service import PriceService
+
+        stand_in = PostgrestStandIn({
+            'batches': [{'id': 'b1', 'status': 'in_progress', 'metadata': {'planned_machine_ids': ['m1', 'm2']}}],
+            'machines': [{'id': 'm1', 'Machine Name': 'Laser A', 'Price': 100.0}, {'id': 'm2', 'Machine Name': 'Laser B', 'Price': 200.0}],
+            'batch_results': [], 'batch_failure_events': [], 'price_history': []
+        })
+        machine = stand_in.tables['machines'][0]
+
+        async def killed_run():
+            db = make_service(monkeypatch, stand_in)
+            db.open_write_buffer('b1', flush_interval=60)
+            await db.update_machine_price('m1', 90.0, machine_known=True)
+            await db.add_price_history('m1', 100.0, 90.0, batch_id='b1')
+            await db.add_batch_result('b1', 'm1', {'success': True, 'old_price': 100.0, 'new_price': 90.0}, machine=machine)
+            # The process dies here: the write buffer is never closed and its timed flush never runs
+
+        asyncio.run(killed_run())
+        assert len(stand_in.tables['batch_results']) == 1
+
+        service = PriceService.__new__(PriceService)
+        service.db_service = make_service(monkeypatch, stand_in)
+        service._resuming_batches = set()
+        runs = []
+
+        async def run_batch(batch_id, machines, results, max_workers, use_scrapfly, variant_verifier, resumed_runs=0):
+            runs.append((machines, results))
+            return {"success": True, "batch_id": batch_id, "results": results}
+
+        service._run_batch = run_batch
+        asyncio.run(service.resume_batch('b1'))
+
+        machines, results = runs[0]
+        assert [m['id'] for m in machines] == ['m2']
+        assert (results['successful'], results['updated'], results['unchanged']) == (1, 1, 0)
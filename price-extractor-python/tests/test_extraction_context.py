@@ -0,0 +1,51 @@
+"""
+Tests for per-call extraction context on a shared PriceExtractor
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from bs4 import BeautifulSoup
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.extraction_context import ExtractionContext
+from scrapers.price_extractor import PriceExtractor
+
+
+MULTI_PRICE_PAGE = '<html><body><div class="price">$1,000.00\n$2,000.00</div></body></html>'
+URL = 'https://example-laser.com/products/x'
+
+
+class TestExtractionContext:
+    """Test cases for sharing one extractor between concurrent workers"""
+
+    def test_parse_price_uses_context_old_price(self):
+        """Multiple prices resolve to the one closest to the context's old price"""
+        extractor = PriceExtractor()
+
+        assert extractor._parse_price('$1,000.00\n$2,000.00', ExtractionContext(old_price=1050.0)) == 1000.0
+        assert extractor._parse_price('$1,000.00\n$2,000.00', ExtractionContext(old_price=1950.0)) == 2000.0
+        assert extractor._parse_price('$1,000.00\n$2,000.00') == 1000.0
+
+    def test_concurrent_calls_keep_their_own_old_price(self):
+        """Interleaved static extractions on one instance never see each other's baseline"""
+        extractor = PriceExtractor()
+        soup = BeautifulSoup(MULTI_PRICE_PAGE, 'html.parser')
+        old_prices = [1050.0 if i % 2 == 0 else 1950.0 for i in range(40)]
+
+        def run(old_price):
+            return extractor.extract_price_static(soup, MULTI_PRICE_PAGE, URL, old_price, 'Laser X')
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(run, old_prices))
+
+        for old_price, (price, method) in zip(old_prices, results):
+            assert price == (1000.0 if old_price < 1500 else 2000.0)
+        assert not hasattr(extractor, '_old_price')
+
+    def test_context_domain(self):
+        """Domain strips www and is empty without a URL"""
+        assert ExtractionContext(url='https://www.Example-Laser.com/p').domain == 'example-laser.com'
+        assert ExtractionContext().domain == ''
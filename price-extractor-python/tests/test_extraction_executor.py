@@ -0,0 +1,45 @@
+"""
+Tests for the static extraction process pool
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.extraction_executor import ExtractionExecutor
+from scrapers.price_extractor import PriceExtractor
+
+
+JSON_LD_PAGE = ('<html><head><title>Laser X</title><script type="application/ld+json">'
+                '{"@type":"Product","name":"Laser","offers":{"@type":"Offer","price":"1299.00","priceCurrency":"USD"}}'
+                '</script></head><body><h1>Laser</h1></body></html>')
+URL = 'https://example-laser.com/products/x'
+
+
+class TestExtractionExecutor:
+    """Test cases for off-loop extraction"""
+
+    def test_extracts_in_worker_process_with_trace(self):
+        """Price, method and a trace of the worker's logs come back from another process"""
+        executor = ExtractionExecutor(max_workers=2)
+        try:
+            price, method, trace = asyncio.run(executor.extract(JSON_LD_PAGE, URL, 1250.0, 'Laser X'))
+        finally:
+            executor.shutdown()
+
+        assert (price, method) == (1299.0, 'JSON-LD')
+        assert trace['pid'] != os.getpid()
+        assert trace['parse_seconds'] >= 0
+        assert any('METHOD 3 SUCCESS' in message for _, message in trace['messages'])
+
+    def test_extract_price_without_soup_matches_in_process_result(self):
+        """extract_price(None, ...) uses the pool and agrees with in-process extraction"""
+        from bs4 import BeautifulSoup
+
+        extractor = PriceExtractor()
+        pooled = asyncio.run(extractor.extract_price(None, JSON_LD_PAGE, URL, 1250.0))
+        in_process = asyncio.run(extractor.extract_price(BeautifulSoup(JSON_LD_PAGE, 'html.parser'), JSON_LD_PAGE, URL, 1250.0))
+
+        assert pooled == in_process == (1299.0, 'JSON-LD')
@@ -0,0 +1,82 @@
+"""
+Tests for the content-addressed HTML snapshot store
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.html_snapshot_store import HtmlSnapshotStore
+
+
+PAGE = "<html><body><span class='price'>$1,299.00</span></body></html>"
+
+
+class TestHtmlSnapshotStore:
+    """Test cases for dedup, round-trip and manifests"""
+
+    def test_round_trip(self, tmp_path):
+        """A stored page loads back unchanged"""
+        store = HtmlSnapshotStore(str(tmp_path))
+        snapshot_hash = store.save(PAGE, machine_id='m1')
+        assert snapshot_hash == HtmlSnapshotStore.content_hash(PAGE)
+        assert store.load(snapshot_hash) == PAGE
+        assert store.load('0' * 64) is None
+
+    def test_identical_pages_are_stored_once(self, tmp_path):
+        """Machines sharing a page share one object"""
+        store = HtmlSnapshotStore(str(tmp_path))
+        first = store.save(PAGE, machine_id='m1', batch_id='b1', price=1299.0, method='css')
+        second = store.save(PAGE, machine_id='m2', batch_id='b1', price=1299.0, method='css')
+
+        assert first == second
+        objects = [name for _, _, files in os.walk(store.objects_dir) for name in files]
+        assert len(objects) == 1
+
+        manifest = store.get_batch_manifest('b1')
+        assert [entry['machine_id'] for entry in manifest] == ['m1', 'm2']
+        assert [entry['new_content'] for entry in manifest] == [True, False]
+
+    def test_machine_manifest_records_extraction(self, tmp_path):
+        """Per-machine manifest keeps price and method for each capture"""
+        store = HtmlSnapshotStore(str(tmp_path))
+
+        async def run():
+            await store.save_async(PAGE, machine_id='m1', batch_id='b1', url='https://x.com/p', price=1299.0, method='JSON-LD')
+            await store.save_async(PAGE.replace('1,299', '1,199'), machine_id='m1', batch_id='b2', price=1199.0, method='JSON-LD')
+
+        asyncio.run(run())
+
+        manifest = store.get_machine_manifest('m1')
+        assert [entry['price'] for entry in manifest] == [1299.0, 1199.0]
+        assert manifest[0]['url'] == 'https://x.com/p'
+        assert manifest[0]['hash'] != manifest[1]['hash']
+
+    def test_empty_content_is_not_stored(self, tmp_path):
+        """Nothing is written for an empty page"""
+        store = HtmlSnapshotStore(str(tmp_path))
+        assert store.save('', machine_id='m1') is None
+        assert store.get_machine_manifest('m1') == []
+
+    def test_concurrent_saves_of_one_page(self, tmp_path):
+        """Executor threads saving the same new page all succeed and leave one object"""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        store = HtmlSnapshotStore(str(tmp_path))
+        compress = store._compress
+
+        def slow_compress(data):
+            time.sleep(0.05)
+            return compress(data)
+
+        store._compress = slow_compress
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            hashes = list(pool.map(lambda i: store.save(PAGE, machine_id=f'm{i}'), range(8)))
+
+        assert hashes == [HtmlSnapshotStore.content_hash(PAGE)] * 8
+        objects = [name for _, _, files in os.walk(store.objects_dir) for name in files]
+        assert len(objects) == 1 and not objects[0].endswith('.tmp')
+        assert store.load(hashes[0]) == PAGE
@@ -0,0 +1,110 @@
+"""
+Tests for the machine_price_stats triggers (database/migrations/005_machine_price_stats.sql)
+
+Runs the migration in a throwaway schema of the Postgres database at TEST_DATABASE_URL;
+skipped when no test database is configured.
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+MIGRATION_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'database', 'migrations', '005_machine_price_stats.sql'
+)
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+BASE_TABLES = """
+CREATE TABLE machines (id uuid PRIMARY KEY);
+CREATE TABLE price_history (
+    id uuid PRIMARY KEY,
+    machine_id uuid REFERENCES machines(id) ON DELETE CASCADE,
+    price numeric,
+    status text,
+    date timestamptz,
+    is_all_time_low boolean DEFAULT false,
+    is_all_time_high boolean DEFAULT false
+);
+"""
+
+
+@pytest.fixture
+def cursor():
+    import psycopg2
+
+    schema = f"price_stats_test_{uuid.uuid4().hex[:8]}"
+    connection = psycopg2.connect(TEST_DATABASE_URL)
+    connection.autocommit = True
+    cur = connection.cursor()
+    cur.execute(f"CREATE SCHEMA {schema}; SET search_path TO {schema};")
+    try:
+        cur.execute(BASE_TABLES)
+        with open(MIGRATION_PATH, 'r', encoding='utf-8') as f:
+            cur.execute(f.read())
+        yield cur
+    finally:
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        connection.close()
+
+
+class TestMachinePriceStatsTriggers:
+    """Test cases for keeping the aggregate in step with corrected and deleted history"""
+
+    def _insert(self, cur, machine_id, price, status, minutes, low=False, high=False):
+        row_id = str(uuid.uuid4())
+        cur.execute(
+            "INSERT INTO price_history (id, machine_id, price, status, date, is_all_time_low, is_all_time_high) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (row_id, machine_id, price, status, datetime(2026, 1, 1) + timedelta(minutes=minutes), low, high)
+        )
+        return row_id
+
+    def _stats(self, cur, machine_id):
+        cur.execute("SELECT min_price, max_price, last_price, price_count FROM machine_price_stats WHERE machine_id = %s", (machine_id,))
+        row = cur.fetchone()
+        return tuple(float(value) if value is not None and not isinstance(value, int) else value for value in row)
+
+    def _flags(self, cur, row_id):
+        cur.execute("SELECT is_all_time_low, is_all_time_high FROM price_history WHERE id = %s", (row_id,))
+        return cur.fetchone()
+
+    def test_correct_then_read(self, cursor):
+        """A corrected bad low stops being the minimum and its flag moves back"""
+        machine_id = str(uuid.uuid4())
+        cursor.execute("INSERT INTO machines (id) VALUES (%s)", (machine_id,))
+        first = self._insert(cursor, machine_id, 1000, 'AUTO_APPLIED', 0, low=True, high=True)
+        bad = self._insert(cursor, machine_id, 100, 'AUTO_APPLIED', 1, low=True)
+
+        assert self._stats(cursor, machine_id) == (100.0, 1000.0, 100.0, 2)
+        assert self._flags(cursor, first) == (False, True)
+
+        cursor.execute("UPDATE price_history SET price = 990, status = 'MANUAL_CORRECTION' WHERE id = %s", (bad,))
+        assert self._stats(cursor, machine_id) == (990.0, 1000.0, 990.0, 2)
+
+        cursor.execute("DELETE FROM price_history WHERE id = %s", (bad,))
+        assert self._stats(cursor, machine_id) == (1000.0, 1000.0, 1000.0, 1)
+        assert self._flags(cursor, first) == (True, True)
+
+    def test_approval_and_machine_delete(self, cursor):
+        """Approving a pending price counts it; deleting the machine cascades cleanly"""
+        machine_id = str(uuid.uuid4())
+        cursor.execute("INSERT INTO machines (id) VALUES (%s)", (machine_id,))
+        self._insert(cursor, machine_id, 1000, 'AUTO_APPLIED', 0, low=True, high=True)
+        pending = self._insert(cursor, machine_id, 850, 'PENDING_REVIEW', 1)
+
+        assert self._stats(cursor, machine_id) == (1000.0, 1000.0, 1000.0, 1)
+
+        cursor.execute("UPDATE price_history SET status = 'APPROVED' WHERE id = %s", (pending,))
+        assert self._stats(cursor, machine_id) == (850.0, 1000.0, 850.0, 2)
+
+        cursor.execute("DELETE FROM machines WHERE id = %s", (machine_id,))
+        cursor.execute("SELECT count(*) FROM machine_price_stats WHERE machine_id = %s", (machine_id,))
+        assert cursor.fetchone()[0] == 0
@@ -0,0 +1,98 @@
+"""
+Tests for offline re-extraction over stored HTML snapshots
+"""
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.html_snapshot_store import HtmlSnapshotStore
+from services.offline_reextraction import (
+    jobs_from_manifest,
+    jobs_from_store,
+    run_reextraction,
+    build_diff_report
+)
+
+
+JSON_LD_PAGE = ('<html><head><script type="application/ld+json">'
+                '{"@type":"Product","name":"Laser","offers":{"@type":"Offer","price":"1299.00","priceCurrency":"USD"}}'
+                '</script></head><body><h1>Laser</h1></body></html>')
+SELECTOR_PAGE = '<html><body><div class="price">$999.00</div></body></html>'
+EMPTY_PAGE = '<html><body><p>Coming soon</p></body></html>'
+
+
+def make_store(tmp_path):
+    store = HtmlSnapshotStore(str(tmp_path))
+    store.save(JSON_LD_PAGE, machine_id='m1', machine_name='Laser X', batch_id='b1',
+               url='https://example-laser.com/products/x', price=1299.0, method='JSON-LD', old_price=1250.0)
+    store.save(SELECTOR_PAGE, machine_id='m2', machine_name='Laser B', batch_id='b1',
+               url='https://example-laser.com/products/b', price=None, method=None, old_price=990.0)
+    store.save(EMPTY_PAGE, machine_id='m3', machine_name='Laser C', batch_id='b1',
+               url='https://example-laser.com/products/c', price=450.0, method='CSS', old_price=450.0)
+    return store
+
+
+class TestOfflineReextraction:
+    """Test cases for job loading, pooled extraction and the diff report"""
+
+    def test_jobs_use_latest_capture_per_machine(self, tmp_path):
+        """A machine captured twice yields one job for its newest page"""
+        store = make_store(tmp_path)
+        store.save(SELECTOR_PAGE, machine_id='m1', machine_name='Laser X', batch_id='b2',
+                   url='https://example-laser.com/products/x', price=999.0, method='CSS')
+
+        jobs = {job['machine_id']: job for job in jobs_from_store(store)}
+        assert len(jobs) == 3
+        assert jobs['m1']['hash'] == HtmlSnapshotStore.content_hash(SELECTOR_PAGE)
+
+        batch_jobs = jobs_from_manifest(os.path.join(store.batch_manifest_dir, 'b1.jsonl'))
+        assert sorted(job['machine_id'] for job in batch_jobs) == ['m1', 'm2', 'm3']
+
+    def test_process_pool_reextraction_and_report(self, tmp_path):
+        """Pages are re-extracted in worker processes and diffed against recorded prices"""
+        store = make_store(tmp_path)
+        results = run_reextraction(jobs_from_store(store, batch_id='b1'), str(tmp_path), max_workers=2)
+
+        by_machine = {result['machine_id']: result for result in results}
+        assert by_machine['m1']['new_price'] == 1299.0
+        assert by_machine['m2']['new_price'] == 999.0
+
+        report = build_diff_report(results)
+        assert report['total'] == 3
+        assert report['summary']['unchanged'] == 1
+        assert report['summary']['fixed'] == 1
+        assert report['summary']['broken'] == 1
+        assert {row['machine_id'] for row in report['differences']} == {'m2', 'm3'}
+
+    def test_missing_snapshot_is_reported_as_error(self, tmp_path):
+        """A manifest entry without its object is reported, not raised"""
+        store = HtmlSnapshotStore(str(tmp_path))
+        jobs = [{'machine_id': 'm9', 'hash': '0' * 64, 'url': 'https://example-laser.com/p', 'recorded_price': 10.0}]
+
+        results = run_reextraction(jobs, str(tmp_path), max_workers=1)
+
+        assert results[0]['error'] == 'Snapshot not found'
+        assert build_diff_report(results)['summary']['error'] == 1
+
+    def test_dynamic_and_claude_prices_are_not_comparable(self, tmp_path):
+        """Prices static extraction cannot reproduce are counted, not reported as broken or changed"""
+        store = HtmlSnapshotStore(str(tmp_path))
+        store.save(EMPTY_PAGE, machine_id='m1', machine_name='ComMarker B6 MOPA 60W', batch_id='b1',
+                   url='https://commarker.com/product/b6-mopa', price=4589.0,
+                   method='Dynamic extraction (captured variant JSON: 60w)', stage='dynamic')
+        store.save(SELECTOR_PAGE, machine_id='m2', machine_name='Laser B', batch_id='b1',
+                   url='https://example-laser.com/products/b', price=950.0, method='Claude AI', stage='claude')
+        # Written before stages were recorded - inferred from the method
+        store.save(EMPTY_PAGE, machine_id='m3', machine_name='xTool F1', batch_id='b1',
+                   url='https://www.xtool.com/products/f1', price=1099.0, method='Dynamic extraction (F1)')
+
+        jobs = jobs_from_store(store, batch_id='b1')
+        assert [job['recorded_stage'] for job in jobs] == ['dynamic', 'claude', 'dynamic']
+
+        report = build_diff_report(run_reextraction(jobs, str(tmp_path), max_workers=1))
+
+        assert report['summary']['not_comparable'] == 3
+        assert report['summary']['broken'] == 0 and report['summary']['changed'] == 0
+        assert report['differences'] == []
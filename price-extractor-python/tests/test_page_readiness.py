@@ -0,0 +1,122 @@
+"""
+Tests for event-driven page readiness waits
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.page_readiness import PageReadiness
+
+
+class FakeRequest:
+    def __init__(self, resource_type='xhr'):
+        self.resource_type = resource_type
+
+
+class FakePage:
+    """Page that emits request events and answers the settle script"""
+
+    def __init__(self, settle_result=None, selector_delay=None):
+        self.listeners = {}
+        self.settle_result = settle_result or {'settled': True, 'changes': 0, 'elapsed': 300}
+        self.selector_delay = selector_delay
+        self.evaluated = []
+
+    def on(self, event, listener):
+        self.listeners.setdefault(event, []).append(listener)
+
+    def remove_listener(self, event, listener):
+        self.listeners[event].remove(listener)
+
+    def emit(self, event, request):
+        for listener in list(self.listeners.get(event, [])):
+            listener(request)
+
+    async def evaluate(self, script, arg=None):
+        self.evaluated.append(arg)
+        return self.settle_result
+
+    async def wait_for_selector(self, selector, state='visible', timeout=30000):
+        if self.selector_delay is None or self.selector_delay > timeout / 1000:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded")
+        await asyncio.sleep(self.selector_delay)
+
+
+class TestPageReadiness:
+    """Test cases for network idle, price settle and selector waits"""
+
+    def test_network_idle_waits_for_variant_request(self):
+        """Idle is declared only after the in-flight variant XHR finishes"""
+        page = FakePage()
+        readiness = PageReadiness(page)
+        request = FakeRequest('xhr')
+
+        async def run():
+            page.emit('request', request)
+            page.emit('request', FakeRequest('websocket'))  # Never finishes; must be ignored
+
+            async def finish_later():
+                await asyncio.sleep(0.2)
+                page.emit('requestfinished', request)
+
+            started = time.monotonic()
+            finisher = asyncio.create_task(finish_later())
+            idle = await readiness.wait_for_network_idle(idle_ms=100, timeout_ms=2000)
+            await finisher
+            return idle, time.monotonic() - started
+
+        idle, elapsed = asyncio.run(run())
+
+        assert idle
+        assert 0.3 <= elapsed < 1.0
+        assert readiness.stats['ceilings_hit'] == 0
+
+    def test_network_idle_ceiling(self):
+        """A request that never finishes ends the wait at the ceiling"""
+        page = FakePage()
+        readiness = PageReadiness(page)
+        page.emit('request', FakeRequest('fetch'))
+
+        idle = asyncio.run(readiness.wait_for_network_idle(idle_ms=50, timeout_ms=200))
+
+        assert not idle
+        assert readiness.stats['ceilings_hit'] == 1
+
+    def test_settle_selector_and_detach(self):
+        """Price settle passes its limits to the page; missing selectors time out; detach stops tracking"""
+        page = FakePage(settle_result={'settled': False, 'changes': 12, 'elapsed': 3000}, selector_delay=0.01)
+        readiness = PageReadiness(page, price_selectors=['.price'])
+
+        async def run():
+            settled = await readiness.wait_for_price_settle(quiet_ms=250, timeout_ms=3000)
+            appeared = await readiness.wait_for_selector('text=40W', timeout_ms=1000)
+            page.selector_delay = None
+            missing = await readiness.wait_for_selector('text=F1 Lite', timeout_ms=100)
+            return settled, appeared, missing
+
+        settled, appeared, missing = asyncio.run(run())
+
+        assert page.evaluated == [{'selectors': ['.price'], 'quietMs': 250, 'timeoutMs': 3000}]
+        assert not settled and appeared and not missing
+        stats = readiness.detach()
+        assert stats['waits'] == 3 and stats['ceilings_hit'] == 2
+        assert all(not listeners for listeners in page.listeners.values())
+
+    def test_interaction_wait_shares_one_ceiling(self):
+        """A page that keeps polling costs about the interaction ceiling, not network plus settle ceilings"""
+        page = FakePage()
+        readiness = PageReadiness(page)
+        page.emit('request', FakeRequest('fetch'))  # Polling request that never finishes
+
+        started = time.monotonic()
+        ready = asyncio.run(readiness.wait_after_interaction(timeout_ms=500))
+        elapsed = time.monotonic() - started
+
+        assert not ready
+        assert 0.5 <= elapsed < 0.8
+        # The price check gets only the short window left after the network ceiling
+        assert page.evaluated[0]['timeoutMs'] == 400
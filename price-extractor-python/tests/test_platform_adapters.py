@@ -0,0 +1,148 @@
+"""
+Tests for the Shopify product JSON fast path
+"""
+import json
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.platform_adapters import ShopifyProductAdapter, get_platform_adapter
+
+
+SITE_RULES = {
+    'xtool.com': {'type': 'shopify'},
+    'aeonlaser.us': {'type': 'shopify_variants'},
+    'optout.com': {'type': 'shopify', 'product_json': False},
+    'commarker.com': {'type': 'woocommerce'}
+}
+
+XTOOL_F1_JSON = {
+    'product': {
+        'title': 'xTool F1 Portable Laser Engraver',
+        'variants': [
+            {'id': 101, 'title': 'F1 / Standalone', 'option1': 'F1', 'option2': 'Standalone', 'price': '1099.00'},
+            {'id': 102, 'title': 'F1 / Deluxe Bundle', 'option1': 'F1', 'option2': 'Deluxe Bundle', 'price': '1399.00'},
+            {'id': 103, 'title': 'F1 Lite / F1 Lite Standalone', 'option1': 'F1 Lite', 'option2': 'F1 Lite Standalone', 'price': '799.00'}
+        ]
+    }
+}
+
+
+class TestShopifyProductAdapter:
+    """Test cases for Shopify detection, endpoint URLs and variant selection"""
+
+    def test_detection_and_endpoint_url(self):
+        """Only Shopify product pages without an opt-out get a product JSON URL"""
+        adapter = ShopifyProductAdapter(SITE_RULES)
+
+        assert adapter.product_json_url('https://www.xtool.com/products/xtool-f1?variant=103') == 'https://www.xtool.com/products/xtool-f1.json'
+        assert adapter.product_json_url('https://aeonlaser.us/collections/lasers/products/mira-9/') == 'https://aeonlaser.us/collections/lasers/products/mira-9.json'
+        assert adapter.product_json_url('https://demo-store.myshopify.com/products/laser') == 'https://demo-store.myshopify.com/products/laser.json'
+        assert not adapter.applies_to('https://www.xtool.com/pages/f1')
+        assert not adapter.applies_to('https://optout.com/products/laser')
+        assert not adapter.applies_to('https://commarker.com/products/b6')
+        assert adapter.tier_key('https://www.xtool.com/products/xtool-f1') == 'xtool.com/products.json'
+
+        assert isinstance(get_platform_adapter('https://xtool.com/products/xtool-f1', SITE_RULES), ShopifyProductAdapter)
+        assert get_platform_adapter('https://commarker.com/product/b6', SITE_RULES) is None
+
+    def test_extract_matches_variant(self):
+        """The variant is chosen from option values, also when the JSON arrives wrapped in HTML"""
+        adapter = ShopifyProductAdapter(SITE_RULES)
+        content = json.dumps(XTOOL_F1_JSON)
+        url = 'https://www.xtool.com/products/xtool-f1'
+
+        assert adapter.extract(content, url, 'xTool F1 Lite') == (799.0, 'Shopify product JSON (F1 Lite / F1 Lite Standalone)')
+        assert adapter.extract(content, url, 'xTool F1')[0] == 1099.0
+
+        wrapped = f'<html><body><pre>{content}</pre></body></html>'
+        assert adapter.extract(wrapped, url, 'xTool F1 Lite')[0] == 799.0
+
+    def test_extract_falls_back(self):
+        """Blocked endpoints and ambiguous variants return None"""
+        adapter = ShopifyProductAdapter(SITE_RULES)
+        url = 'https://www.xtool.com/products/laser'
+        tied = json.dumps({'product': {'title': 'Laser', 'variants': [
+            {'id': 1, 'title': '10W / Red', 'price': '999.00'},
+            {'id': 2, 'title': '10W / Blue', 'price': '1099.00'}
+        ]}})
+
+        assert adapter.extract('<html><body>Access denied</body></html>', url, 'Laser 10W') is None
+        assert adapter.extract(None, url, 'Laser 10W') is None
+        assert adapter.extract(tied, url, 'Laser 10W') is None
+        assert adapter.extract(tied, url + '?variant=2', 'Laser 10W')[0] == 1099.0
+        assert adapter.extract(tied, url, 'Laser 10W', old_price=1000)[0] == 999.0
+
+    def test_url_variant_wins_over_old_price(self):
+        """The linked ?variant= is used even when the old price is closer to another variant"""
+        adapter = ShopifyProductAdapter(SITE_RULES)
+        content = json.dumps({'product': {'title': 'xTool S1', 'variants': [
+            {'id': 20, 'title': 'S1 20W / Standalone', 'price': '1499.00'},
+            {'id': 40, 'title': 'S1 40W / Standalone', 'price': '2999.00'}
+        ]}})
+        url = 'https://www.xtool.com/products/xtool-s1'
+
+        assert adapter.extract(content, url + '?variant=40', 'xTool S1', old_price=1999)[0] == 2999.0
+        # An id that is not in the JSON falls back to name matching
+        assert adapter.extract(content, url + '?variant=999', 'xTool S1 20W', old_price=1999)[0] == 1499.0
+
+    def test_extract_applies_variant_rules(self):
+        """Rule target IDs, avoided bundles, base-price ties and expected ranges steer the choice"""
+        adapter = ShopifyProductAdapter(SITE_RULES)
+        content = json.dumps(XTOOL_F1_JSON)
+        url = 'https://www.xtool.com/products/xtool-f1'
+
+        # The machine's target variant wins over the link's ?variant= and the name
+        assert adapter.extract(content, url + '?variant=101', 'xTool F1', target_variant_id='103')[0] == 799.0
+        assert adapter.extract(content, url, 'xTool F1 Lite', price_range=(900, 3000)) is None
+
+        bundles = json.dumps({'product': {'title': 'Monport GA 30W', 'variants': [
+            {'id': 1, 'title': 'Machine + Rotary', 'price': '2199.00'},
+            {'id': 2, 'title': 'Machine', 'price': '1899.00'},
+            {'id': 3, 'title': 'Machine + LightBurn', 'price': '1999.00'}
+        ]}})
+        monport = adapter.extract(bundles, url, 'Monport GA 30W', old_price=2150,
+                                  avoid_terms=['lightburn', 'rotary'], prefer_terms=['machine'])
+        assert monport[0] == 1899.0
+
+        tied = json.dumps({'product': {'title': 'Glowforge Pro', 'variants': [
+            {'id': 1, 'title': 'Pro / White', 'price': '5995.00'},
+            {'id': 2, 'title': 'Pro / Black', 'price': '6495.00'}
+        ]}})
+        assert adapter.extract(tied, url, 'Glowforge Pro', old_price=6400, prefer_lowest=True)[0] == 5995.0
+
+    def test_price_service_resolves_site_variant_rules(self):
+        """Machine and site variant rules reach the adapter; text-matched machine rules skip it"""
+        from scrapers.price_extractor import PriceExtractor
+        from services.price_service import PriceService
+
+        service = PriceService.__new__(PriceService)
+        service.price_extractor = PriceExtractor()
+
+        f1_lite = service._platform_variant_options('https://www.xtool.com/products/xtool-f1', 'xTool F1 Lite')
+        assert f1_lite['target_variant_id'] == '46187559157999'
+        assert f1_lite['price_range'] == (500, 3000)
+
+        b6 = 'https://store.commarker.com/products/b6-jpt-mopa-fiber-laser-engraver'
+        assert service._platform_variant_options(b6, 'ComMarker B6 MOPA 20W') is None
+
+        monport = service._platform_variant_options('https://monportlaser.com/products/monport-ga-30w', 'Monport GA 30W')
+        assert 'rotary' in monport['avoid_terms'] and 'standalone' in monport['prefer_terms']
+
+        assert service._platform_variant_options('https://shop.glowforge.com/products/glowforge-pro', 'Glowforge Pro')['prefer_lowest'] is True
+
+    def test_price_service_uses_extractor_site_rules(self):
+        """Rules patched on one extractor decide that extractor's adapter, not the module-level SITE_RULES"""
+        from scrapers.price_extractor import PriceExtractor
+        from services.price_service import PriceService
+
+        service = PriceService.__new__(PriceService)
+        service.price_extractor = PriceExtractor()
+        url = 'https://www.xtool.com/products/xtool-f1'
+        assert service._platform_endpoint_url(url) == 'https://www.xtool.com/products/xtool-f1.json'
+
+        service.price_extractor.site_extractor.site_rules['xtool.com']['product_json'] = False
+        assert service._platform_endpoint_url(url) is None
+        assert SITE_RULES['xtool.com'].get('product_json') is not False
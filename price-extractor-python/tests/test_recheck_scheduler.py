@@ -0,0 +1,100 @@
+"""
+Tests for volatility-driven recheck scheduling
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.recheck_scheduler import RecheckScheduler, plan_adaptive_batch
+
+
+NOW = datetime(2026, 10, 1, 12, 0, 0)
+
+
+def history(prices, every_days=1, status='AUTO_APPLIED', end=NOW):
+    """Daily (or every_days) checks ending at `end`, oldest first."""
+    start = end - timedelta(days=every_days * (len(prices) - 1))
+    return [
+        {'price': price, 'status': status, 'date': (start + timedelta(days=every_days * i)).isoformat() + 'Z'}
+        for i, price in enumerate(prices)
+    ]
+
+
+class FakeDatabaseService:
+    """Pages of machines and their price history windows"""
+
+    def __init__(self, machines, histories):
+        self.machines = machines
+        self.histories = histories
+
+    async def iter_machine_pages(self, columns, page_size=500, **filters):
+        yield self.machines
+
+    async def get_price_history_window(self, machine_ids, days=90):
+        return {machine_id: self.histories.get(machine_id, []) for machine_id in machine_ids}
+
+
+class TestRecheckScheduler:
+    """Test cases for per-machine check intervals and budgeted selection"""
+
+    def test_interval_follows_change_frequency(self):
+        """Machines that change weekly are checked far more often than ones that never move"""
+        scheduler = RecheckScheduler(min_days=1, max_days=30, default_days=7)
+        weekly = history([1000 + 50 * (day // 7 % 2) for day in range(60)])
+        stable = history([1000] * 60)
+
+        weekly_interval, _ = scheduler.interval_days(weekly, NOW)
+        stable_interval, reasons = scheduler.interval_days(stable, NOW)
+
+        assert weekly_interval < 5
+        assert stable_interval >= 14
+        assert reasons[0].startswith('stable')
+
+    def test_sale_and_failures_adjust_interval(self):
+        """A price below its usual level is rechecked sooner; failure streaks back off"""
+        scheduler = RecheckScheduler(min_days=1, max_days=30, default_days=7)
+        on_sale, reasons = scheduler.interval_days(history([1000] * 50 + [850] * 5), NOW)
+        stable, _ = scheduler.interval_days(history([1000] * 55), NOW)
+        assert on_sale < stable
+        assert 'below usual price (sale)' in reasons
+
+        failed = history([1000] * 10) + [{'price': 1000, 'status': 'FAILED', 'date': NOW.isoformat() + 'Z'}]
+        assert scheduler.interval_days(failed, NOW)[0] == 1
+        streak = failed + [{'price': 1000, 'status': 'FAILED', 'date': NOW.isoformat() + 'Z'}] * 3
+        assert scheduler.interval_days(streak, NOW)[0] == 8
+
+    def test_selection_fits_credit_budget(self):
+        """Most overdue machines go first; shared URLs are charged once and costly ones are deferred"""
+        scheduler = RecheckScheduler(min_days=1, max_days=30, default_days=7)
+        old = history([1000] * 3, every_days=7, end=NOW - timedelta(days=40))
+        estimates = [
+            scheduler.estimate({'id': 'never', 'product_link': 'https://a.example/p'}, [], tier=1, now=NOW),
+            scheduler.estimate({'id': 'shared', 'product_link': 'https://www.a.example/p/'}, old, tier=1, now=NOW),
+            scheduler.estimate({'id': 'antibot', 'product_link': 'https://b.example/p'}, old, tier=3, now=NOW),
+            scheduler.estimate({'id': 'cheap', 'product_link': 'https://c.example/p'}, old, tier=1, now=NOW),
+            scheduler.estimate({'id': 'fresh', 'product_link': 'https://d.example/p'}, history([1000] * 3), tier=1, now=NOW)
+        ]
+
+        selected = scheduler.select(estimates, credit_budget=5)
+
+        assert [estimate.machine_id for estimate in selected] == ['never', 'shared', 'cheap']
+        assert not estimates[4].is_due
+
+    def test_plan_adaptive_batch(self):
+        """Planning pages through tracked machines and reports what was deferred"""
+        machines = [{'id': f'm{i}', 'Machine Name': f'Laser {i}', 'product_link': f'https://shop{i}.example/p'} for i in range(4)]
+        histories = {'m0': history([1000] * 30), 'm1': history([1000] * 3, end=NOW - timedelta(days=20))}
+        db = FakeDatabaseService(machines, histories)
+
+        async def tier_lookup(url):
+            return 2 if 'shop3' in url else 1
+
+        selected, summary = asyncio.run(plan_adaptive_batch(db, tier_lookup, credit_budget=3, now=NOW))
+
+        assert [machine['id'] for machine in selected] == ['m2', 'm1']
+        assert summary['due'] == 3 and summary['deferred'] == 1
+        assert summary['expected_credits'] == 2
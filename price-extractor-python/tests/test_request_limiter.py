@@ -0,0 +1,85 @@
+"""
+Tests for the FIFO request limiter used by the Scrapfly scraper
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.request_limiter import FifoRequestLimiter
+
+
+class TestFifoRequestLimiter:
+    """Test cases for slot hand-off"""
+
+    def test_limit_is_enforced(self):
+        """Never more than `limit` holders at once"""
+        limiter = FifoRequestLimiter(2)
+        peak = 0
+
+        async def worker():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.active)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*[worker() for _ in range(6)])
+
+        asyncio.run(run())
+        assert peak == 2
+        assert limiter.active == 0
+
+    def test_waiters_are_served_in_arrival_order(self):
+        """Queued tasks get slots first-in first-out"""
+        limiter = FifoRequestLimiter(1)
+        order = []
+
+        async def worker(index):
+            async with limiter.slot():
+                order.append(index)
+                await asyncio.sleep(0)
+
+        async def run():
+            await limiter.acquire()
+            tasks = []
+            for index in range(5):
+                tasks.append(asyncio.create_task(worker(index)))
+                await asyncio.sleep(0)
+            limiter.release()
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        assert order == [0, 1, 2, 3, 4]
+
+    def test_raising_limit_wakes_waiters(self):
+        """Raising the limit lets queued tasks through immediately"""
+        limiter = FifoRequestLimiter(1)
+
+        async def run():
+            await limiter.acquire()
+            waiter = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            assert limiter.waiting == 1
+            limiter.set_limit(2)
+            await asyncio.wait_for(waiter, timeout=1)
+            return limiter.active
+
+        assert asyncio.run(run()) == 2
+
+    def test_cancelled_waiter_does_not_leak_slot(self):
+        """A cancelled waiter leaves the slot count consistent"""
+        limiter = FifoRequestLimiter(1)
+
+        async def run():
+            await limiter.acquire()
+            waiter = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            limiter.release()
+            return limiter.active, limiter.waiting
+
+        assert asyncio.run(run()) == (0, 0)
@@ -0,0 +1,116 @@
+"""
+Tests for Playwright request blocking
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.resource_blocker import ResourceBlocker, merge_resource_policy, release_page
+from scrapers.site_specific_extractors import SiteSpecificExtractor
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    """Route that records whether it was aborted or continued"""
+
+    def __init__(self, url, resource_type):
+        self.request = FakeRequest(url, resource_type)
+        self.outcome = None
+
+    async def abort(self, error_code=None):
+        self.outcome = 'aborted'
+
+    async def continue_(self):
+        self.outcome = 'continued'
+
+
+class FakePage:
+    """Page that keeps its route handlers and replays requests through them"""
+
+    def __init__(self):
+        self.handlers = []
+
+    def is_closed(self):
+        return False
+
+    async def route(self, pattern, handler):
+        self.handlers.append(handler)
+
+    async def unroute(self, pattern, handler):
+        self.handlers.remove(handler)
+
+    async def request(self, url, resource_type):
+        route = FakeRoute(url, resource_type)
+        if self.handlers:
+            await self.handlers[-1](route)
+        else:
+            route.outcome = 'continued'
+        return route.outcome
+
+
+class TestResourceBlocker:
+    """Test cases for per-domain request blocking policies"""
+
+    def test_default_policy_blocks_heavy_types_and_trackers(self):
+        """Images, fonts and third-party trackers are blocked; documents, scripts and XHR are not"""
+        blocker = ResourceBlocker(merge_resource_policy(None), 'https://www.commarker.com/product/b6')
+
+        assert blocker.block_reason('https://www.commarker.com/product/b6', 'document') is None
+        assert blocker.block_reason('https://www.commarker.com/wp-content/app.js', 'script') is None
+        assert blocker.block_reason('https://www.commarker.com/?wc-ajax=get_variation', 'xhr') is None
+        assert blocker.block_reason('https://cdn.commarker.com/b6.webp', 'image') == 'image'
+        assert blocker.block_reason('https://fonts.gstatic.com/s/inter.woff2', 'font') == 'font'
+        assert blocker.block_reason('https://www.googletagmanager.com/gtm.js', 'script') == 'tracker'
+        assert blocker.block_reason('https://widget.intercom.io/widget/abc', 'script') == 'tracker'
+        assert blocker.block_reason('data:image/png;base64,AAAA', 'image') is None
+
+    def test_site_rules_opt_out(self):
+        """A site's resource_policy can allow types back or disable blocking"""
+        extractor = SiteSpecificExtractor()
+        extractor.site_rules = {
+            'swatches.example': {'resource_policy': {'allow_types': ['image'], 'allow_domains': ['klaviyo.com']}},
+            'fragile.example': {'resource_policy': {'enabled': False}}
+        }
+
+        swatches = extractor.get_resource_policy('swatches.example')
+        assert swatches['block_types'] == ['media', 'font']
+        blocker = ResourceBlocker(swatches, 'https://swatches.example/p')
+        assert blocker.block_reason('https://swatches.example/swatch.png', 'image') is None
+        assert blocker.block_reason('https://static.klaviyo.com/onsite.js', 'script') is None
+
+        assert extractor.get_resource_policy('fragile.example')['enabled'] is False
+        assert extractor.get_resource_policy('unknown.example')['block_types'] == ['image', 'media', 'font']
+
+    def test_stats_and_release(self):
+        """Blocked requests are counted per reason and releasing the page removes its route"""
+        page = FakePage()
+        blocker = ResourceBlocker(merge_resource_policy(None), 'https://xtool.com/products/f1')
+
+        async def run():
+            await blocker.attach(page)
+            outcomes = [
+                await page.request('https://xtool.com/products/f1.js', 'fetch'),
+                await page.request('https://cdn.shopify.com/f1.jpg', 'image'),
+                await page.request('https://cdn.shopify.com/f1.mp4', 'media'),
+                await page.request('https://connect.facebook.net/fbevents.js', 'script')
+            ]
+            released = await release_page(page)
+            after = await page.request('https://cdn.shopify.com/f1.jpg', 'image')
+            return outcomes, released, after
+
+        outcomes, released, after = asyncio.run(run())
+
+        assert outcomes == ['continued', 'aborted', 'aborted', 'aborted']
+        assert blocker.stats['requests_blocked'] == 3 and blocker.stats['requests_allowed'] == 1
+        assert blocker.stats['blocked_by_reason'] == {'image': 1, 'media': 1, 'tracker': 1}
+        assert blocker.stats['estimated_bytes_saved'] > 1_000_000
+        assert released is blocker and page.handlers == [] and after == 'continued'
+        assert 'blocked 3 of 4 requests' in blocker.summary()
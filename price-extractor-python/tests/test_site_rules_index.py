@@ -0,0 +1,93 @@
+"""
+Tests for the compiled site rules index
+"""
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.site_rules_index import MachinePatternTrie, SiteRulesIndex
+from scrapers.site_specific_extractors import SiteSpecificExtractor, SITE_RULES_INDEX
+
+
+RULES = {
+    'example-laser.com': {
+        'price_selectors': ['.price'],
+        'avoid_selectors': ['.bundle'],
+        'machine_specific_rules': {
+            'Laser F1': {'url_patterns': ['/f1'], 'price_selectors': ['.f1-price']},
+            'Laser F1 Lite': {'url_patterns': ['/f1-lite'], 'avoid_selectors': ['.f1-upsell']},
+            'Laser S1': {'price_selectors': ['.s1-price']}
+        }
+    }
+}
+
+
+class TestSiteRulesIndex:
+    """Test cases for longest-match resolution and memoization"""
+
+    def test_trie_finds_every_occurring_pattern(self):
+        """Overlapping and nested patterns are all reported"""
+        trie = MachinePatternTrie(['laser f1 lite', 'laser f1', 'f1'])
+        assert sorted(trie.find_all('xtool laser f1 lite 10w')) == [0, 1, 2]
+        assert trie.find_all('laser s1') == []
+
+    def test_longest_pattern_with_matching_url_wins(self):
+        """'Laser F1 Lite' beats 'Laser F1', but only on a URL it claims"""
+        index = SiteRulesIndex(RULES)
+
+        rules, pattern = index.resolve('example-laser.com', 'Laser F1 Lite 10W', 'https://example-laser.com/f1-lite')
+        assert pattern == 'Laser F1 Lite'
+        assert rules['avoid_selectors'] == ['.bundle', '.f1-upsell']
+        assert rules['price_selectors'] == ['.price']
+
+        rules, pattern = index.resolve('example-laser.com', 'Laser F1 Lite 10W', 'https://example-laser.com/F1')
+        assert pattern == 'Laser F1'
+        assert rules['price_selectors'] == ['.f1-price']
+
+    def test_unmatched_machine_and_unknown_domain(self):
+        """Patterns without URL patterns never match; unknown domains resolve to None"""
+        index = SiteRulesIndex(RULES)
+
+        rules, pattern = index.resolve('example-laser.com', 'Laser S1', 'https://example-laser.com/s1')
+        assert pattern is None
+        assert rules['price_selectors'] == ['.price']
+        assert index.resolve('other.com', 'Laser S1', 'https://other.com/s1') == (None, None)
+
+    def test_resolution_is_memoized_and_read_only(self):
+        """Repeat lookups hit the cache and compiled rules cannot be mutated"""
+        index = SiteRulesIndex(RULES)
+        for _ in range(3):
+            rules, _ = index.resolve('example-laser.com', 'Laser F1', 'https://example-laser.com/f1')
+
+        assert index.cache_info().hits == 2
+        with pytest.raises(TypeError):
+            rules['price_selectors'] = []
+
+    def test_extractor_returns_independent_copies(self):
+        """get_machine_specific_rules hands out a fresh dict backed by the shared index"""
+        extractor = SiteSpecificExtractor()
+        first = extractor.get_machine_specific_rules('xtool.com', 'xTool F1', 'https://www.xtool.com/products/xtool-f1')
+        first['injected'] = True
+        second = extractor.get_machine_specific_rules('xtool.com', 'xTool F1', 'https://www.xtool.com/products/xtool-f1')
+
+        assert 'injected' not in second
+        assert extractor.rules_index is SITE_RULES_INDEX
+
+    def test_rule_changes_stay_on_one_extractor(self):
+        """Changing one extractor's rules leaves other extractors and the shared index alone"""
+        from scrapers.site_specific_extractors import SITE_RULES
+
+        patched, other = SiteSpecificExtractor(), SiteSpecificExtractor()
+        patched.site_rules['commarker.com'] = {'price_selectors': ['.sale-price']}
+        patched.site_rules['xtool.com']['avoid_meta_tags'] = False
+        patched.rebuild_rules_index()
+
+        url = 'https://commarker.com/product/b6'
+        assert patched.get_machine_specific_rules('commarker.com', 'ComMarker B6', url)['price_selectors'] == ['.sale-price']
+        assert other.get_machine_specific_rules('commarker.com', 'ComMarker B6', url)['price_selectors'] != ['.sale-price']
+        assert SITE_RULES['xtool.com']['avoid_meta_tags'] is True
+        assert other.rules_index is SITE_RULES_INDEX and patched.rules_index is not SITE_RULES_INDEX
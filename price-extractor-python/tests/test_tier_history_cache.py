@@ -0,0 +1,148 @@
+"""
+Tests for the in-memory Scrapfly tier history cache
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.tier_history_cache import TierHistoryCache
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Records the chained PostgREST call and returns canned data on execute()"""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.action = None
+        self.payload = None
+
+    def select(self, *args):
+        self.action = 'select'
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.action = 'upsert'
+        self.payload = rows
+        return self
+
+    async def execute(self):
+        self.client.calls.append((self.name, self.action, self.payload))
+        if self.action == 'rpc' and self.client.rpc_fails:
+            raise Exception("function does not exist")
+        if self.action == 'select':
+            return FakeResponse(self.client.rows)
+        return FakeResponse([])
+
+
+class FakeRestClient:
+    def __init__(self, rows, rpc_fails=False):
+        self.rows = rows
+        self.rpc_fails = rpc_fails
+        self.calls = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        query = FakeQuery(self, name)
+        query.action = 'rpc'
+        query.payload = params
+        return query
+
+
+class FakeDatabaseService:
+    def __init__(self, rest):
+        self.rest = rest
+
+
+HISTORY = [
+    {'domain': 'xtool.com', 'successful_tier': 2, 'success_count': 5, 'last_success_at': '2025-07-01T00:00:00'},
+    {'domain': 'commarker.com', 'successful_tier': 3, 'success_count': 1, 'last_success_at': '2025-07-01T00:00:00'},
+]
+
+
+class TestTierHistoryCache:
+    """Test cases for cached lookups and buffered write-back"""
+
+    def test_lookups_use_one_query(self):
+        """All domains load once and lookups are answered from memory"""
+        rest = FakeRestClient(HISTORY)
+        cache = TierHistoryCache(FakeDatabaseService(rest))
+
+        async def run():
+            return [await cache.get_optimal_tier(domain) for domain in ('xtool.com', 'commarker.com', 'new.com', 'xtool.com')]
+
+        assert asyncio.run(run()) == [2, 1, 1, 2]
+        assert len(rest.calls) == 1
+
+    def test_successes_flush_as_single_increment_rpc(self):
+        """Buffered successes are written with one server-side increment call"""
+        rest = FakeRestClient(HISTORY)
+        cache = TierHistoryCache(FakeDatabaseService(rest), flush_interval=60)
+
+        async def run():
+            await cache.load()
+            for _ in range(3):
+                cache.record_success('commarker.com', 3)
+            cache.record_success('xtool.com', 2)
+            tier = await cache.get_optimal_tier('commarker.com')
+            await cache.close()
+            return tier
+
+        assert asyncio.run(run()) == 3
+        rpc_calls = [call for call in rest.calls if call[1] == 'rpc']
+        assert len(rpc_calls) == 1
+        rows = {row['domain']: row for row in rpc_calls[0][2]['p_rows']}
+        assert rows['commarker.com']['increment'] == 3
+        assert rows['xtool.com']['increment'] == 1
+        assert cache.pending_count == 0
+
+    def test_falls_back_to_upsert_without_rpc(self):
+        """If the increment function is missing, in-memory totals are upserted"""
+        rest = FakeRestClient(HISTORY, rpc_fails=True)
+        cache = TierHistoryCache(FakeDatabaseService(rest))
+
+        async def run():
+            await cache.load()
+            cache.record_success('xtool.com', 2)
+            await cache.close()
+
+        asyncio.run(run())
+        upserts = [call for call in rest.calls if call[1] == 'upsert']
+        assert len(upserts) == 1
+        assert upserts[0][2][0]['success_count'] == 6
+
+    def test_price_service_close_flushes_buffer(self):
+        """Single-machine runs write their successes on close instead of losing the delayed flush"""
+        from services.price_service import PriceService
+
+        rest = FakeRestClient(HISTORY)
+        cache = TierHistoryCache(FakeDatabaseService(rest), flush_interval=60)
+
+        class FakeScraper:
+            tier_cache = cache
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        service = PriceService.__new__(PriceService)
+        scraper = service.scrapfly_scraper = FakeScraper()
+
+        async def run():
+            await cache.load()
+            cache.record_success('xtool.com', 2)
+            await service.close()
+
+        asyncio.run(run())
+        assert [call[1] for call in rest.calls] == ['select', 'rpc']
+        assert scraper.closed and service.scrapfly_scraper is None
@@ -0,0 +1,82 @@
+"""
+Tests for the Scrapfly tier history migration (database/migrations/004_scrapfly_tier_history.sql)
+
+Runs the migration in a throwaway schema of the Postgres database at TEST_DATABASE_URL;
+skipped when no test database is configured.
+"""
+import os
+import sys
+import uuid
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+MIGRATION_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'database', 'migrations', '004_scrapfly_tier_history.sql'
+)
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+# The table as earlier writers left it: no unique index, several rows per domain
+EXISTING_TABLE = """
+CREATE TABLE scrapfly_tier_history (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    domain text NOT NULL,
+    successful_tier integer NOT NULL DEFAULT 1,
+    success_count integer NOT NULL DEFAULT 0,
+    last_success_at timestamp,
+    created_at timestamp DEFAULT now()
+);
+INSERT INTO scrapfly_tier_history (domain, successful_tier, success_count, last_success_at) VALUES
+    ('xtool.com', 1, 3, '2026-01-01'),
+    ('xtool.com', 3, 2, '2026-02-01'),
+    ('xtool.com', 2, 1, NULL),
+    ('commarker.com', 2, 5, '2026-01-05');
+"""
+
+
+@pytest.fixture
+def cursor():
+    import psycopg2
+
+    schema = f"tier_history_test_{uuid.uuid4().hex[:8]}"
+    connection = psycopg2.connect(TEST_DATABASE_URL)
+    connection.autocommit = True
+    cur = connection.cursor()
+    cur.execute(f"CREATE SCHEMA {schema}; SET search_path TO {schema};")
+    try:
+        yield cur
+    finally:
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        connection.close()
+
+
+class TestTierHistoryMigration:
+    """Test cases for applying the migration over existing duplicate rows"""
+
+    def _rows(self, cur):
+        cur.execute("SELECT domain, successful_tier, success_count FROM scrapfly_tier_history ORDER BY domain")
+        return cur.fetchall()
+
+    def test_duplicate_domains_are_merged(self, cursor):
+        """Duplicates collapse into the latest row with summed counts, and the bulk increment works"""
+        cursor.execute(EXISTING_TABLE)
+        with open(MIGRATION_PATH, 'r', encoding='utf-8') as f:
+            migration = f.read()
+        cursor.execute(migration)
+
+        assert self._rows(cursor) == [('commarker.com', 2, 5), ('xtool.com', 3, 6)]
+
+        cursor.execute(
+            "SELECT increment_scrapfly_tier_history(%s::jsonb)",
+            ('[{"domain": "xtool.com", "successful_tier": 2, "increment": 4, "last_success_at": "2026-03-01"}]',)
+        )
+        assert self._rows(cursor) == [('commarker.com', 2, 5), ('xtool.com', 2, 10)]
+
+        # Re-running the migration is a no-op
+        cursor.execute(migration)
+        assert self._rows(cursor) == [('commarker.com', 2, 5), ('xtool.com', 2, 10)]
@@ -0,0 +1,181 @@
+"""
+Tests for variant price capture from product and variation JSON
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.variant_capture import (
+    VariantCapture,
+    match_variant,
+    parse_shopify_product,
+    parse_woocommerce_variations
+)
+
+
+XTOOL_F1_JS = {
+    'title': 'xTool F1 Portable Laser Engraver',
+    'variants': [
+        {'id': 101, 'title': 'F1 / Standalone', 'option1': 'F1', 'option2': 'Standalone', 'price': 109900, 'available': True},
+        {'id': 102, 'title': 'F1 / Deluxe Bundle', 'option1': 'F1', 'option2': 'Deluxe Bundle', 'price': 139900, 'available': True},
+        {'id': 103, 'title': 'F1 Lite / F1 Lite Standalone', 'option1': 'F1 Lite', 'option2': 'F1 Lite Standalone', 'price': 79900, 'available': True},
+        {'id': 104, 'title': 'F1 Lite / F1 Lite Bundle', 'option1': 'F1 Lite', 'option2': 'F1 Lite Bundle', 'price': 94900, 'available': False}
+    ]
+}
+
+COMMARKER_B6_MOPA_VARIATIONS = [
+    {'variation_id': 11, 'attributes': {'attribute_pa_effect-power': '30w', 'attribute_pa_package': 'b6-mopa-machine-only'}, 'display_price': 3599, 'is_in_stock': True},
+    {'variation_id': 12, 'attributes': {'attribute_pa_effect-power': '60w', 'attribute_pa_package': 'b6-mopa-machine-only'}, 'display_price': 4589, 'is_in_stock': True},
+    {'variation_id': 13, 'attributes': {'attribute_pa_effect-power': '60w', 'attribute_pa_package': 'b6-mopa-basic-bundle'}, 'display_price': 4799, 'is_in_stock': True},
+    {'variation_id': 14, 'attributes': {'attribute_pa_effect-power': '100w', 'attribute_pa_package': 'b6-mopa-basic-bundle'}, 'display_price': 6999, 'is_in_stock': True}
+]
+
+
+class FakeResponse:
+    def __init__(self, url, data, status=200):
+        self.url = url
+        self.status = status
+        self._data = data
+
+    async def json(self):
+        return self._data
+
+
+class FakePage:
+    """Page that emits responses and returns embedded variation data"""
+
+    def __init__(self, embedded=None, url='https://www.xtool.com/products/f1'):
+        self.url = url
+        self.listeners = {}
+        self.embedded = embedded or {'woocommerce': [], 'shopify': None}
+        self.evaluate_args = []
+
+    def on(self, event, listener):
+        self.listeners.setdefault(event, []).append(listener)
+
+    def remove_listener(self, event, listener):
+        self.listeners[event].remove(listener)
+
+    def emit_response(self, response):
+        for listener in self.listeners.get('response', []):
+            listener(response)
+
+    async def evaluate(self, script, arg=None):
+        self.evaluate_args.append(arg)
+        return self.embedded
+
+
+class TestVariantCapture:
+    """Test cases for parsing captured variant data and matching it to machines"""
+
+    def test_shopify_variant_matching(self):
+        """Shopify cents are converted and the standalone model variant is chosen"""
+        variants = parse_shopify_product(XTOOL_F1_JS, cents=True)
+
+        assert [variant.price for variant in variants] == [1099.0, 1399.0, 799.0, 949.0]
+        assert not variants[3].available
+        assert match_variant(variants, 'xTool F1 Lite').variant_id == '103'
+        assert match_variant(variants, 'xTool F1').variant_id == '101'
+        assert match_variant(variants, 'xTool F1', target_variant_id=102).price == 1399.0
+
+        product_json = {'product': {'title': 'xTool S1', 'variants': [{'id': 7, 'title': 'Default Title', 'price': '1999.00'}]}}
+        single = parse_shopify_product(product_json, cents=False)
+        assert single[0].price == 1999.0 and single[0].title == 'xTool S1'
+        assert match_variant(single, 'xTool S1 40W').variant_id == '7'
+
+    def test_woocommerce_variation_matching(self):
+        """Wattage rules out other powers; bundles are only chosen when preferred"""
+        variants = parse_woocommerce_variations(COMMARKER_B6_MOPA_VARIATIONS)
+
+        assert variants[1].title == '60w / b6 mopa machine only'
+        assert match_variant(variants, 'ComMarker B6 MOPA 60W').variant_id == '12'
+        assert match_variant(variants, 'ComMarker B6 MOPA 60W', prefer_terms=['basic bundle']).variant_id == '13'
+        assert match_variant(variants, 'ComMarker B6 MOPA 20W') is None
+
+    def test_ambiguous_match_uses_anchor_price(self):
+        """Equally good variants at different prices need the previous price to decide"""
+        variants = parse_woocommerce_variations([
+            {'variation_id': 1, 'attributes': {'attribute_pa_power': '10w', 'attribute_pa_color': 'red'}, 'display_price': 999},
+            {'variation_id': 2, 'attributes': {'attribute_pa_power': '10w', 'attribute_pa_color': 'blue'}, 'display_price': 1099}
+        ])
+
+        assert match_variant(variants, 'Laser 10W') is None
+        assert match_variant(variants, 'Laser 10W', anchor_price=1080).variant_id == '2'
+        assert match_variant(variants, 'Blue Laser 10W').variant_id == '2'
+
+    def test_capture_records_responses_and_embedded_data(self):
+        """Product JSON responses and data-product_variations end up in one variant set"""
+        page = FakePage(embedded={'woocommerce': COMMARKER_B6_MOPA_VARIATIONS[:2], 'shopify': None})
+        capture = VariantCapture(page)
+
+        async def run():
+            page.emit_response(FakeResponse('https://www.xtool.com/products/f1.js', XTOOL_F1_JS))
+            page.emit_response(FakeResponse('https://www.xtool.com/products/f1.js?v=2', {}, status=404))
+            page.emit_response(FakeResponse('https://www.xtool.com/cart.js', {'items': []}))
+            page.emit_response(FakeResponse('https://commarker.com/?wc-ajax=get_variation', COMMARKER_B6_MOPA_VARIATIONS[2]))
+            return await capture.collect()
+
+        variants = asyncio.run(run())
+
+        assert capture.responses == 2
+        assert len(variants) == 7
+        # Shopify product JSON was already captured, so the page is not asked to fetch it
+        assert page.evaluate_args == [{'capturedHandles': ['f1']}]
+        capture.detach()
+        assert page.listeners['response'] == []
+
+    def test_upsell_product_json_is_ignored(self):
+        """Add-on and cart products loaded by the theme neither match nor count as the page's product"""
+        upsell_js = {
+            'title': 'xTool F1 Lite Slide Extension',
+            'variants': [{'id': 900, 'title': 'Default Title', 'price': 4900, 'available': True}]
+        }
+        own_js = dict(XTOOL_F1_JS, variants=XTOOL_F1_JS['variants'][2:3])
+        page = FakePage(
+            embedded={'woocommerce': [], 'shopify': own_js, 'pathname': '/collections/lasers/products/xtool-f1'},
+            url='https://www.xtool.com/collections/lasers/products/xtool-f1?variant=103'
+        )
+        capture = VariantCapture(page)
+
+        async def run():
+            page.emit_response(FakeResponse('https://www.xtool.com/products/f1-lite-slide-extension.js', upsell_js))
+            return await capture.collect()
+
+        variants = asyncio.run(run())
+
+        # The add-on's JSON does not stop the page fetching its own product
+        assert page.evaluate_args == [{'capturedHandles': ['f1-lite-slide-extension']}]
+        assert [variant.variant_id for variant in variants] == ['103']
+        assert capture.match('xTool F1 Lite').price == 799.0
+
+        # Without the page's own product there is nothing to match, even for a same-family add-on
+        capture.detach()
+        page.embedded = {'woocommerce': [], 'shopify': None, 'pathname': '/products/xtool-f1'}
+        alone = VariantCapture(page)
+
+        async def run_alone():
+            page.emit_response(FakeResponse('https://www.xtool.com/products/f1-lite-slide-extension.js', upsell_js))
+            return await alone.collect()
+
+        assert asyncio.run(run_alone()) == []
+        assert alone.match('xTool F1 Lite') is None
+
+    def test_dynamic_scraper_uses_link_variant_and_leaves_ties_to_clicks(self):
+        """The URL's ?variant= picks the captured variant; ties fall back to variant selection"""
+        from scrapers.dynamic_scraper import DynamicScraper
+
+        tied = [
+            {'variation_id': 1, 'attributes': {'attribute_pa_power': '10w', 'attribute_pa_color': 'red'}, 'display_price': 999},
+            {'variation_id': 2, 'attributes': {'attribute_pa_power': '10w', 'attribute_pa_color': 'blue'}, 'display_price': 1099}
+        ]
+        scraper = DynamicScraper(block_resources=False, capture_variants=True)
+
+        scraper.variant_capture = VariantCapture(FakePage(embedded={'woocommerce': tied, 'shopify': None}))
+        assert asyncio.run(scraper._price_from_captured_variants('Laser 10W', {}, 'https://laser.example/p')) is None
+
+        scraper.variant_capture = VariantCapture(FakePage(embedded={'woocommerce': [], 'shopify': XTOOL_F1_JS, 'pathname': '/products/f1'}))
+        captured = asyncio.run(scraper._price_from_captured_variants('xTool F1', {}, 'https://www.xtool.com/products/f1?variant=102'))
+        assert captured == (1399.0, 'F1 / Deluxe Bundle')
@@ -31,7 +31,10 @@ async def update_machine_price(machine_id):
     
     # Update the price
     logger.info(f"Updating price for machine {machine_id}")
-    result = await price_service.update_machine_price(machine_id)
+    try:
+        result = await price_service.update_machine_price(machine_id)
+    finally:
+        await price_service.close()
     
     # Print the result
     if result["success"]: